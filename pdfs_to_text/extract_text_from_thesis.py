@@ -1,14 +1,18 @@
 import argparse
+import hashlib
 import logging
 from pathlib import Path
-from typing import Callable, Dict
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
 import re
 import functools
 from collections import Counter
 import sys
 
+import requests
 from science_parse_api.api import parse_pdf
 
+from science_parse_stream import parse_pdf_sections
+
 logger = logging.getLogger(__name__)
 
 def _header_pre_processing(header: str) -> str:
@@ -214,6 +218,110 @@ def is_header_to_remove(header: str) -> bool:
         return True
     return False
 
+def iter_section_texts(sections: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    '''
+    :param sections: The sections of the output of the Science Parse server 
+                     for a thesis.
+    :returns: Yields the text of each section except those whose header is 
+              not required, see `is_header_to_remove`, and paragraphs that are 
+              believed to be the declaration statement. Table of contents like 
+              text is removed from the text of each section.
+    '''
+    for section in sections:
+        section_header = section.get('heading')
+        # Skip sections for headers that are not of interest
+        if section_header is not None:
+            if is_header_to_remove(section['heading']):
+                continue
+        section_text = section.get('text')
+        if section_text is not None:
+            # Skip text that is likely a declaration of originality
+            if is_declaration_paragraph(section_text):
+                continue
+            # Remove text that is similar in format to table of
+            # contents text
+            yield remove_table_of_content_info(section_text)
+
+def pdf_json_to_text(pdf_json: Dict[str, Any]) -> str:
+    '''
+    :param pdf_json: The output of the Science Parse server for a thesis.
+    :returns: The text of the thesis, the text of the sections from 
+              `iter_section_texts` joined together. Whitespace is removed from 
+              the start and end of the text.
+    '''
+    return ''.join(iter_section_texts(pdf_json.get('sections', []))).strip()
+
+def parse_pdf_text(server_address: str, pdf_file_path: Path, 
+                   port: str) -> Optional[str]:
+    '''
+    The same as `pdf_json_to_text` of the output of the Science Parse server 
+    for the PDF, but the output is streamed and only the section headings 
+    and texts are decoded, see `science_parse_stream.parse_pdf_sections`. 
+    Each section is pre-processed as soon as it has been read, so the 
+    references, authors, and metadata of the output are never held in 
+    memory.
+
+    :param server_address: The URL to the Science Parse server.
+    :param pdf_file_path: The thesis in PDF format.
+    :param port: The port to the Science Parse server.
+    :returns: The text of the thesis, None if the server could not parse it.
+    '''
+    sections = parse_pdf_sections(server_address, pdf_file_path, port)
+    if sections is None:
+        return None
+    try:
+        return ''.join(iter_section_texts(sections)).strip()
+    except (ValueError, requests.exceptions.RequestException):
+        logger.error('The output of the Science Parse server could not be '
+                     f'read for the following PDF: {pdf_file_path.name}',
+                     exc_info=True)
+    return None
+
+def iter_parsed_pdfs(pdf_file_paths: Iterable[Path], server_address: str, 
+                     port: str) -> Iterator[Tuple[Path, Optional[str]]]:
+    '''
+    :param pdf_file_paths: The theses in PDF format.
+    :param server_address: The URL to the Science Parse server.
+    :param port: The port to the Science Parse server.
+    :returns: Yields each PDF file path and its text, see `parse_pdf_text`, 
+              None if the server could not parse it.
+    '''
+    for _pdf in pdf_file_paths:
+        logger.info(f'Processing: {_pdf.name}')
+        yield _pdf, parse_pdf_text(server_address, _pdf, port)
+
+def iter_pdf_texts(parsed_pdfs: Iterable[Tuple[Path, Optional[str]]],
+                   minimum_number_of_words: int = 0) -> Iterator[Tuple[str, str]]:
+    '''
+    The same as the export of this script but without writing the texts to 
+    the export directory.
+
+    :param parsed_pdfs: Each PDF file path and its text, e.g. from 
+                        `iter_parsed_pdfs`.
+    :param minimum_number_of_words: Minimum number of words, based on 
+                                    whitespace, that a thesis must have.
+    :returns: Yields the name of the export file of each thesis, e.g. 
+              `thesis.txt` for `thesis.pdf`, and its text. Theses that could 
+              not be parsed, have no text, or have fewer than 
+              `minimum_number_of_words` words are logged and not yielded.
+    '''
+    for _pdf, pdf_text in parsed_pdfs:
+        if pdf_text is None:
+            logger.debug('Science Parse server could not parse the '
+                         f'following PDF: {_pdf.name}')
+            continue
+        if not pdf_text:
+            logger.info('Science Parse could not extract any text from the'
+                        f' following PDF: {_pdf.name}')
+            continue
+        number_words = len(pdf_text.split())
+        if number_words < minimum_number_of_words:
+            logger.info(f'PDF contains {number_words} words which is '
+                        'fewer than the minimum of '
+                        f'{minimum_number_of_words} words: {_pdf.name}')
+            continue
+        yield f'{_pdf.stem}.txt', pdf_text
+
 def debug(pdf_directory: Path) -> None:
     '''
     This function through logging outputs various statistics about the PDFs
@@ -353,6 +461,38 @@ def create_dir_path(_dir_string: str) -> Path:
         _dir_path.mkdir(parents=True)
     return _dir_path
 
+# `shard_type` and `in_shard` are copied in `word_cloud_statistics/shard_counts.py`
+# as the two directories are built into separate Docker images. Text
+# extraction and counting have to assign the same shards, so keep the two
+# copies the same.
+def shard_type(shard: str) -> Tuple[int, int]:
+    '''
+    :param shard: Shard in the format `i/N`, e.g. `2/4` is the second of 
+                  four shards.
+    :returns: The shard index and the number of shards.
+    '''
+    try:
+        shard_index, number_of_shards = (int(value) for value in shard.split('/'))
+    except ValueError:
+        raise TypeError(f'The shard {shard} is not in the format `i/N` e.g. 1/4')
+    if not 1 <= shard_index <= number_of_shards:
+        raise TypeError(f'The shard index of {shard} has to be between 1 and '
+                        f'{number_of_shards}.')
+    return shard_index, number_of_shards
+
+def in_shard(_file_path: Path, shard_index: int, number_of_shards: int) -> bool:
+    '''
+    :param _file_path: File to partition.
+    :param shard_index: Shard index, between 1 and `number_of_shards`.
+    :param number_of_shards: Number of shards.
+    :returns: True if the file belongs to the shard. The partition is based on 
+              a stable hash of the file name without the suffix, which is the 
+              same partition as the `--shard` option of 
+              `word_cloud_statistics/token_tag_statistics.py`.
+    '''
+    digest = hashlib.sha1(_file_path.stem.encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') % number_of_shards == shard_index - 1
+
 if __name__ == '__main__':
 
     description = ('Given a directory of student thesis in PDF format (1st argument), '
@@ -377,6 +517,10 @@ if __name__ == '__main__':
     minimum_number_words_help = ('Minimum number of words, based on whitespace'
                                  ' that a thesis must have for it to be '
                                  'exported.')
+    shard_help = ('Only export the shard `i` of `N` shards of the thesis e.g. '
+                  '`2/4`, so that N machines can each export a disjoint subset'
+                  ' of the thesis. Thesis are assigned to shards by a stable '
+                  'hash of their file name.')
     parser = argparse.ArgumentParser(description=description)
     parser.add_argument('thesis_directory', type=exist_dir_path, 
                         help=thesis_directory_help)
@@ -390,6 +534,7 @@ if __name__ == '__main__':
     parser.add_argument('--replace', action='store_true', help=replace_help)
     parser.add_argument('--min-number-words', type=int, default=1000, 
                         help=minimum_number_words_help)
+    parser.add_argument('--shard', type=shard_type, help=shard_help)
     args = parser.parse_args()
 
     server_address: str = args.science_parse_server_url
@@ -424,6 +569,8 @@ if __name__ == '__main__':
         number_of_files_exported = 0
 
         for _pdf in thesis_directory.iterdir():
+            if args.shard is not None and not in_shard(_pdf, *args.shard):
+                continue
             number_of_files_in_thesis_directory += 1
             if _pdf.suffix != '.pdf':
                 error_msg = ('The following file is not a PDF and will not be '
@@ -438,39 +585,16 @@ if __name__ == '__main__':
                 continue
             
             logger.info(f'Processing: {_pdf.name}')
-            pdf_json = parse_pdf(server_address, _pdf, port)
+            # A PDF without any sections has no text.
+            pdf_text = parse_pdf_text(server_address, _pdf, port)
 
-            if pdf_json is None:
+            if pdf_text is None:
                 error_msg = ('Science Parse server could not parse the '
                              f'following PDF: {_pdf.name}')
                 logger.debug(error_msg)
                 number_of_pdfs_that_could_not_be_parsed += 1
                 continue
-
-            if 'sections' not in pdf_json:
-                error_msg = ('Science Parse could not extract any text from the'
-                             f' following PDF: {_pdf.name}')
-                logger.info(error_msg)
-                number_of_pdfs_that_contain_no_data += 1
-                continue
             
-            pdf_text = ''
-            for section in pdf_json['sections']:
-                section_header = section.get('heading')
-                # Skip sections for headers that are not of interest
-                if section_header is not None:
-                    if is_header_to_remove(section['heading']):
-                        continue
-                section_text = section.get('text')
-                if section_text is not None:
-                    # Skip text that is likely a declaration of originality
-                    if is_declaration_paragraph(section_text):
-                        continue
-                    # Remove text that is similar in format to table of
-                    # contents text
-                    section_text = remove_table_of_content_info(section_text)
-                    pdf_text += section_text
-            pdf_text = pdf_text.strip()
             if pdf_text:
                 number_words = len(pdf_text.split())
                 if number_words < minimum_number_of_words:
@@ -0,0 +1,250 @@
+import logging
+from pathlib import Path
+import json
+import re
+from typing import Collection, Dict, Iterable, Iterator, Optional
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+# The fields of each section that are decoded, all other fields of the
+# Science Parse output, e.g. the references, authors, and metadata, are
+# skipped without being decoded.
+SECTION_FIELDS = ('heading', 'text')
+
+_WHITESPACE = re.compile(rb'[ \t\n\r]*')
+# The rest of a JSON string after its opening quote, up to and including its
+# closing quote.
+_STRING_REST = re.compile(rb'[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+# Numbers, true, false, and null.
+_LITERAL = re.compile(rb'[-+.0-9a-zA-Z]+')
+# Everything up to the next bracket that is not within a string, or up to
+# the start of a string that continues in the next chunk.
+_UP_TO_BRACKET = re.compile(rb'[^"\[\]{}]*(?:"[^"\\]*(?:\\.[^"\\]*)*"[^"\[\]{}]*)*',
+                            re.DOTALL)
+
+
+class _JSONByteStream():
+    '''
+    Reads JSON values from a stream of bytes, e.g. the chunks of a HTTP
+    response, holding only the bytes of the current value in memory.
+    '''
+
+    def __init__(self, chunks: Iterable[bytes]) -> None:
+        self._chunks = iter(chunks)
+        self._buffer = b''
+        self._position = 0
+
+    def _read_more(self) -> bool:
+        '''
+        Drops the bytes that have been read from the buffer and adds the next
+        chunk to it.
+
+        :returns: False if there are no more chunks.
+        '''
+        for chunk in self._chunks:
+            if chunk:
+                self._buffer = self._buffer[self._position:] + chunk
+                self._position = 0
+                return True
+        return False
+
+    def peek(self) -> bytes:
+        '''
+        :returns: The next byte that is not whitespace, without reading it.
+        :raises ValueError: If the stream ends.
+        '''
+        while True:
+            self._position = _WHITESPACE.match(self._buffer, self._position).end()
+            if self._position < len(self._buffer):
+                return self._buffer[self._position:self._position + 1]
+            if not self._read_more():
+                raise ValueError('The JSON ended before it was complete')
+
+    def read(self, expected: bytes) -> None:
+        '''
+        :param expected: The next byte that is not whitespace.
+        :raises ValueError: If the next byte is not the expected byte.
+        '''
+        byte = self.peek()
+        if byte != expected:
+            raise ValueError(f'Expected {expected!r} but found {byte!r} in the JSON')
+        self._position += 1
+
+    def read_separator(self, end: bytes) -> bool:
+        '''
+        :param end: The byte that ends the current array or object.
+        :returns: True if there is another item in the array or object, False
+                  if it has ended.
+        '''
+        byte = self.peek()
+        self._position += 1
+        if byte == b',':
+            return True
+        if byte == end:
+            return False
+        raise ValueError(f'Expected b"," or {end!r} but found {byte!r} in the JSON')
+
+    def read_string(self) -> bytes:
+        '''
+        :returns: The next JSON string, including its quotes, as bytes.
+        '''
+        self.read(b'"')
+        start = self._position - 1
+        while True:
+            match = _STRING_REST.match(self._buffer, self._position)
+            if match is not None:
+                self._position = match.end()
+                return self._buffer[start:self._position]
+            # Reading more drops the bytes before the current position.
+            self._position = start
+            if not self._read_more():
+                raise ValueError('The JSON ended before it was complete')
+            start = 0
+            self._position = 1
+
+    def skip_value(self) -> None:
+        '''
+        Skips the next JSON value, without decoding it.
+        '''
+        byte = self.peek()
+        if byte == b'"':
+            self.read_string()
+        elif byte in (b'{', b'['):
+            self._position += 1
+            depth = 1
+            while depth:
+                self._position = _UP_TO_BRACKET.match(self._buffer, self._position).end()
+                byte = self._buffer[self._position:self._position + 1]
+                if not byte or byte == b'"':
+                    if not self._read_more():
+                        raise ValueError('The JSON ended before it was complete')
+                    continue
+                self._position += 1
+                depth += 1 if byte in (b'{', b'[') else -1
+        else:
+            while True:
+                match = _LITERAL.match(self._buffer, self._position)
+                if match is None:
+                    raise ValueError(f'Unexpected {byte!r} in the JSON')
+                # The literal may continue in the next chunk.
+                if match.end() < len(self._buffer) or not self._read_more():
+                    self._position = match.end()
+                    return
+
+
+def iter_sections(chunks: Iterable[bytes],
+                  fields: Collection[str] = SECTION_FIELDS
+                  ) -> Iterator[Dict[str, str]]:
+    '''
+    Streams the sections out of the JSON output of the Science Parse server,
+    yielding each section as soon as its bytes have been read. Only the
+    string values of the given fields of each section are decoded, all of
+    the other values, e.g. the references, are skipped without being
+    decoded, therefore the memory and time used scale with the text that is
+    kept rather than the size of the output.
+
+    :param chunks: The JSON output of the Science Parse server for a PDF, in
+                   chunks of bytes e.g. from `requests.Response.iter_content`.
+    :param fields: The fields of each section to decode.
+    :returns: Yields each section with the fields it has, whereby fields that
+              are null or not strings are left out, the same as the section
+              of the `science_parse_api.api.parse_pdf` output for the
+              `section.get` of those fields. Nothing is yielded if the output
+              has no sections.
+    :raises ValueError: If the JSON is not valid.
+    '''
+    stream = _JSONByteStream(chunks)
+    stream.read(b'{')
+    if stream.peek() == b'}':
+        return
+    while True:
+        key = json.loads(stream.read_string())
+        stream.read(b':')
+        if key == 'sections' and stream.peek() == b'[':
+            stream.read(b'[')
+            if stream.peek() == b']':
+                stream.read(b']')
+            else:
+                while True:
+                    yield _read_section(stream, fields)
+                    if not stream.read_separator(b']'):
+                        break
+        else:
+            stream.skip_value()
+        if not stream.read_separator(b'}'):
+            return
+
+
+def _read_section(stream: _JSONByteStream, fields: Collection[str]
+                  ) -> Dict[str, str]:
+    section: Dict[str, str] = {}
+    stream.read(b'{')
+    if stream.peek() == b'}':
+        stream.read(b'}')
+        return section
+    while True:
+        key = json.loads(stream.read_string())
+        stream.read(b':')
+        if key in fields and stream.peek() == b'"':
+            section[key] = json.loads(stream.read_string())
+        else:
+            stream.skip_value()
+        if not stream.read_separator(b'}'):
+            return section
+
+
+def parse_pdf_sections(server_address: str, file_path: Path, port: str = '',
+                       timeout: int = 60, chunk_size: int = 65536
+                       ) -> Optional[Iterator[Dict[str, str]]]:
+    '''
+    The same as `science_parse_api.api.parse_pdf` but the response of the
+    Science Parse server is streamed and only the section headings and texts
+    are decoded, see `iter_sections`.
+
+    :param server_address: Address of the server e.g. `http://127.0.0.1`
+    :param file_path: Path to the PDF file to be processed.
+    :param port: The port to the server e.g. 8080
+    :param timeout: The amount of time to allow the request, and each read of
+                    the response, to take.
+    :param chunk_size: Number of bytes of the response to read at a time.
+    :returns: The sections of the PDF, which are read from the response as
+              they are iterated over, or None if the request failed, which is
+              logged as an error. A response that is cut off or is not valid
+              JSON raises a `ValueError` or a
+              `requests.exceptions.RequestException` while iterating.
+    '''
+    endpoint = '/v1'
+    if port:
+        url = f'{server_address}:{port}{endpoint}'
+    else:
+        url = f'{server_address}{endpoint}'
+    file_name = file_path.name
+    try:
+        with file_path.open('rb') as pdf_file:
+            files = {'data-binary': (file_name, pdf_file, 'application/pdf',
+                                     {'Expires': '0'})}
+            response = requests.post(url, files=files,
+                                     headers={'Accept': 'application/json'},
+                                     timeout=timeout, stream=True)
+    except requests.exceptions.Timeout:
+        logger.error(f'URL: {url}. {file_name} failed due to a timeout.')
+        return None
+    except Exception:
+        logger.error(f'URL: {url}. {file_name} failed due to the following error:',
+                     exc_info=True)
+        return None
+    status_code = response.status_code
+    if status_code != 200:
+        response.close()
+        logger.error(f'URL: {url}. {file_name} failed with a status code: '
+                     f'{status_code}')
+        return None
+    return _iter_response_sections(response, chunk_size)
+
+
+def _iter_response_sections(response: requests.Response, chunk_size: int
+                            ) -> Iterator[Dict[str, str]]:
+    with response:
+        yield from iter_sections(response.iter_content(chunk_size))
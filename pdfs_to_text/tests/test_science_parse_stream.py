@@ -0,0 +1,130 @@
+import json
+from pathlib import Path
+import random
+import sys
+from typing import Any, Dict, Iterator, List
+import unittest
+
+# The modules are scripts in the directory above, not a package.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from science_parse_stream import SECTION_FIELDS, _JSONByteStream, iter_sections
+
+# Characters that have to be escaped in JSON, are more than one byte in
+# UTF-8, or are brackets within strings, to find any chunk boundary that
+# splits an escape sequence, a character, or is mistaken for the end of a
+# value.
+CHARACTERS = 'ab "\\/\n\té \U0001F600{}[],:0-'
+LITERALS = [0, -1, 12.5, -3e-07, 10**20, True, False, None]
+
+
+def random_string(rng: random.Random) -> str:
+    return ''.join(rng.choice(CHARACTERS) for _ in range(rng.randint(0, 12)))
+
+
+def random_value(rng: random.Random, depth: int = 0) -> Any:
+    kind = rng.choice(['string', 'literal', 'list', 'dict'] if depth < 3
+                      else ['string', 'literal'])
+    if kind == 'string':
+        return random_string(rng)
+    if kind == 'literal':
+        return rng.choice(LITERALS)
+    if kind == 'list':
+        return [random_value(rng, depth + 1) for _ in range(rng.randint(0, 4))]
+    return {random_string(rng): random_value(rng, depth + 1)
+            for _ in range(rng.randint(0, 4))}
+
+
+def random_output(rng: random.Random) -> Dict[str, Any]:
+    '''
+    :returns: Output in the format of the Science Parse server, whose
+              sections, and other values, have fields of every JSON type.
+    '''
+    sections: List[Dict[str, Any]] = []
+    for _ in range(rng.randint(0, 6)):
+        section: Dict[str, Any] = {}
+        for field in SECTION_FIELDS:
+            if rng.random() < 0.8:
+                section[field] = (random_string(rng) if rng.random() < 0.8
+                                  else random_value(rng))
+        for _ in range(rng.randint(0, 2)):
+            section[random_string(rng) + 'a'] = random_value(rng)
+        sections.append(section)
+    output = {'id': random_string(rng), 'title': random_string(rng),
+              'authors': [random_value(rng)], 'references': random_value(rng),
+              'year': rng.choice(LITERALS)}
+    output['sections'] = rng.choice([sections, sections, None])
+    keys = list(output)
+    rng.shuffle(keys)
+    return {key: output[key] for key in keys}
+
+
+def random_chunks(data: bytes, rng: random.Random) -> Iterator[bytes]:
+    index = 0
+    while index < len(data):
+        size = rng.choice([0, 1, 1, 2, 3, 7, 64])
+        yield data[index:index + size]
+        index += size
+
+
+def fixed_chunks(data: bytes, chunk_size: int) -> Iterator[bytes]:
+    for index in range(0, len(data), chunk_size):
+        yield data[index:index + chunk_size]
+
+
+def expected_sections(output: Dict[str, Any]) -> List[Dict[str, str]]:
+    sections = output.get('sections')
+    if not isinstance(sections, list):
+        return []
+    return [{field: section[field] for field in SECTION_FIELDS
+             if isinstance(section.get(field), str)}
+            for section in sections]
+
+
+class TestIterSections(unittest.TestCase):
+
+    def test_every_chunk_size(self) -> None:
+        rng = random.Random(0)
+        for _ in range(40):
+            output = random_output(rng)
+            data = json.dumps(output, ensure_ascii=rng.random() < 0.5,
+                              indent=rng.choice([None, 2])).encode('utf-8')
+            self.assertEqual(expected_sections(json.loads(data)),
+                             list(iter_sections(fixed_chunks(data, len(data) or 1))))
+            for chunk_size in list(range(1, 18)) + [64]:
+                self.assertEqual(expected_sections(json.loads(data)),
+                                 list(iter_sections(fixed_chunks(data, chunk_size))),
+                                 (data, chunk_size))
+
+    def test_random_chunks(self) -> None:
+        rng = random.Random(1)
+        for _ in range(300):
+            output = random_output(rng)
+            data = json.dumps(output, ensure_ascii=rng.random() < 0.5).encode('utf-8')
+            self.assertEqual(expected_sections(json.loads(data)),
+                             list(iter_sections(random_chunks(data, rng))), data)
+
+    def test_skip_value(self) -> None:
+        rng = random.Random(2)
+        for _ in range(300):
+            values = [random_value(rng), random_value(rng), random_string(rng)]
+            data = json.dumps(values).encode('utf-8')
+            stream = _JSONByteStream(random_chunks(data, rng))
+            stream.read(b'[')
+            stream.skip_value()
+            self.assertTrue(stream.read_separator(b']'))
+            stream.skip_value()
+            self.assertTrue(stream.read_separator(b']'))
+            self.assertEqual(values[2], json.loads(stream.read_string()))
+            self.assertFalse(stream.read_separator(b']'))
+
+    def test_invalid_json(self) -> None:
+        for data in [b'{"sections": [{"text": "a"}', b'{"sections" []}',
+                     b'{"sections": [{"text": "a"} {"text": "b"}]}',
+                     b'{"references": [[1, 2]', b'']:
+            with self.assertRaises(ValueError):
+                list(iter_sections(fixed_chunks(data, 3)))
+
+
+if __name__ == '__main__':
+    unittest.main()
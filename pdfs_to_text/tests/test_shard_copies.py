@@ -0,0 +1,44 @@
+from pathlib import Path
+import sys
+import unittest
+
+# The modules are scripts, not packages, and the Docker images of the two
+# directories are built separately, hence each has its own copy of
+# `shard_type` and `in_shard` which have to partition the texts the same.
+REPOSITORY_DIRECTORY = Path(__file__).resolve().parent.parent.parent
+sys.path.insert(0, str(Path(REPOSITORY_DIRECTORY, 'word_cloud_statistics')))
+sys.path.insert(0, str(Path(REPOSITORY_DIRECTORY, 'pdfs_to_text')))
+
+import extract_text_from_thesis
+import shard_counts
+
+
+class TestShardCopies(unittest.TestCase):
+
+    def test_shard_type(self) -> None:
+        for shard in ['1/1', '2/4', '4/4', '0/4', '5/4', '1/0', 'a/4', '1-4',
+                      '1/2/3', '']:
+            results = []
+            for module in [extract_text_from_thesis, shard_counts]:
+                try:
+                    results.append(module.shard_type(shard))
+                except TypeError as error:
+                    results.append(str(error))
+            self.assertEqual(results[0], results[1], shard)
+
+    def test_in_shard(self) -> None:
+        # The PDFs and their exported texts have the same stem.
+        for index in range(200):
+            pdf_path = Path(f'thesis_{index}.pdf')
+            text_path = Path(f'thesis_{index}.txt')
+            for number_of_shards in [1, 2, 3, 7]:
+                for shard_index in range(1, number_of_shards + 1):
+                    self.assertEqual(
+                        extract_text_from_thesis.in_shard(pdf_path, shard_index,
+                                                          number_of_shards),
+                        shard_counts.in_shard(text_path, shard_index,
+                                              number_of_shards))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,315 @@
+import argparse
+import logging
+from pathlib import Path
+import queue
+import sys
+import threading
+import time
+from time import sleep
+from typing import Any, Callable, List, Optional, Tuple
+
+# The stages are the scripts of the other directories of this repository.
+REPOSITORY_DIRECTORY = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(Path(REPOSITORY_DIRECTORY, 'pdfs_to_text')))
+sys.path.insert(0, str(Path(REPOSITORY_DIRECTORY, 'word_cloud_statistics')))
+
+from ucrel_api.api import UCREL_API
+
+from extract_text_from_thesis import parse_pdf_text
+from shard_counts import ShardCounts
+from significance import significant_token_tag_statistics
+from stages import count_texts, read_tagged_texts
+from token_filter import TokenFilter
+from token_tag_statistics import (create_dir_path, create_output_file,
+                                  default_usas_tagger_version,
+                                  exist_dir_path, path_type,
+                                  read_frequency_file)
+from usas_cache import USASCache, atomic_write
+from usas_tagging import cached_usas_file, tag_and_cache_text
+
+logger = logging.getLogger(__name__)
+
+# Put onto a queue to tell the workers reading from it that there are no more
+# items.
+_END_OF_QUEUE = object()
+
+
+class Stage():
+    '''
+    A pool of worker threads, each of which takes an item from the input
+    queue, processes it, and puts the result onto the output queue unless the
+    result is None e.g. the item could not be processed. The input and output
+    queues are bounded, therefore a stage that is faster than the next stage
+    waits for the next stage rather than building up a backlog in memory.
+    '''
+
+    def __init__(self, name: str, process: Callable[[Any], Any],
+                 number_of_workers: int, input_queue: queue.Queue,
+                 output_queue: Optional[queue.Queue] = None) -> None:
+        '''
+        :param name: Name of the stage, used for logging.
+        :param process: Processes one item.
+        :param number_of_workers: Number of worker threads.
+        :param input_queue: Queue of items to process.
+        :param output_queue: Queue to put the results onto, the next stage's
+                             input queue. If None the results are discarded.
+        '''
+        self.name = name
+        self.process = process
+        self.input_queue = input_queue
+        self.output_queue = output_queue
+        self.number_processed = 0
+        self.number_failed = 0
+        self.busy_seconds = 0.0
+        self._lock = threading.Lock()
+        self._workers = [threading.Thread(target=self._work, daemon=True,
+                                          name=f'{name}_{index}')
+                         for index in range(number_of_workers)]
+
+    def _work(self) -> None:
+        while True:
+            item = self.input_queue.get()
+            if item is _END_OF_QUEUE:
+                # Leave it on the queue for the other workers of this stage.
+                self.input_queue.put(_END_OF_QUEUE)
+                return
+            start_time = time.perf_counter()
+            try:
+                result = self.process(item)
+            except Exception:
+                logger.exception(f'The {self.name} stage failed to process: '
+                                 f'{item}')
+                result = None
+            with self._lock:
+                self.busy_seconds += time.perf_counter() - start_time
+                if result is None:
+                    self.number_failed += 1
+                else:
+                    self.number_processed += 1
+            if result is not None and self.output_queue is not None:
+                self.output_queue.put(result)
+
+    def start(self) -> None:
+        for worker in self._workers:
+            worker.start()
+
+    def join(self) -> None:
+        '''
+        Waits for the workers to finish, which happens once the previous
+        stage has been joined, and then tells the next stage that there are
+        no more items.
+        '''
+        for worker in self._workers:
+            worker.join()
+        if self.output_queue is not None:
+            self.output_queue.put(_END_OF_QUEUE)
+
+
+if __name__ == '__main__':
+
+    description = ('Given a directory of student thesis in PDF format (1st '
+                   'argument), exports each thesis to text (2nd argument), '
+                   'tags the text with USAS caching the result (3rd argument) '
+                   'and counts the tokens and USAS tags of each thesis, the '
+                   'Tokens and USAS tags that are used significantly more in '
+                   'the thesis compared to the reference texts are stored in '
+                   'the token and usas output files (4th and 5th arguments). '
+                   'Unlike running extract_text_from_thesis.py and then '
+                   'token_tag_statistics.py, the extraction, tagging, and '
+                   'counting run at the same time, connected by bounded '
+                   'queues, so that a thesis is tagged as soon as it has been '
+                   'extracted and counted as soon as it has been tagged. The '
+                   'output is the same as running the two scripts.')
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('thesis_directory', type=exist_dir_path,
+                        help='Directory that contains the thesis in PDF format.')
+    parser.add_argument('export_directory', type=create_dir_path,
+                        help='Directory to store the thesis in text format.')
+    parser.add_argument('usas_caching_directory', type=create_dir_path,
+                        help='Directory that caches the USAS output of each text.')
+    parser.add_argument('token_output_path', type=path_type,
+                        help='File path to store the significant tokens.')
+    parser.add_argument('usas_output_path', type=path_type,
+                        help='File path to store the significant USAS tags.')
+    parser.add_argument('reference_token_frequency_path', type=path_type,
+                        help='File Path to the reference token frequencies.')
+    parser.add_argument('reference_usas_tag_frequency_path', type=path_type,
+                        help='File Path to the reference USAS tag frequencies.')
+    parser.add_argument('sigeff_binary_file_path', type=path_type,
+                        help='File path to the SigEff C binary')
+    parser.add_argument('semtag_summary_file_path', type=path_type,
+                        help='File path to the USAS tag summary file.')
+    parser.add_argument('--science-parse-server-url', default="http://127.0.0.1",
+                        type=str, help='The URL to the science parse server')
+    parser.add_argument('--science-parse-server-port', default='8080', type=str,
+                        help='The Port to the science parse server')
+    parser.add_argument('--min-number-words', type=int, default=1000,
+                        help='Minimum number of words a thesis must have for '
+                             'it to be exported.')
+    parser.add_argument('--replace', action='store_true',
+                        help='Export thesis that have already been exported.')
+    parser.add_argument('--replace-usas-cache', action='store_true',
+                        help='Tag texts that have already been tagged.')
+    parser.add_argument('--usas-api-url', type=str,
+                        default='http://ucrel-api.lancaster.ac.uk',
+                        help='URL of the UCREL API.')
+    parser.add_argument('--usas-api-port', type=str, default='',
+                        help='Port of the UCREL API, if required.')
+    parser.add_argument('--usas-api-email', type=str,
+                        default='a.moore@lancaster.ac.uk',
+                        help='Email address that identifies the user of the '
+                             'UCREL API.')
+    parser.add_argument('--usas-tagger-version', type=str,
+                        default=default_usas_tagger_version(),
+                        help='Version of the USAS tagger, see '
+                             'token_tag_statistics.py')
+    parser.add_argument('--remove-punctuation', action='store_true')
+    parser.add_argument('--remove-determiners', action='store_true')
+    parser.add_argument('--remove-stop-words', action='store_true')
+    parser.add_argument('--remove-digits', action='store_true')
+    parser.add_argument('--lower-case', action='store_true')
+    parser.add_argument('--significance-level', default=0.05, type=float,
+                        choices=[0.05, 0.01, 0.001, 0.0001])
+    parser.add_argument('--minimum-token-frequency', default=5, type=int)
+    parser.add_argument('--USAS-tags-to-labels', action='store_true')
+    parser.add_argument('--time-to-wait-between-usas-api-calls', default=10,
+                        type=int, help='Time in seconds each tagging worker '
+                                       'waits between calls of the UCREL API.')
+    parser.add_argument('--extract-workers', default=2, type=int,
+                        help='Number of PDFs extracted at the same time.')
+    parser.add_argument('--tag-workers', default=1, type=int,
+                        help='Number of texts tagged at the same time.')
+    parser.add_argument('--count-workers', default=1, type=int,
+                        help='Number of tagged texts counted at the same time.')
+    parser.add_argument('--queue-size', default=8, type=int,
+                        help='Maximum number of items waiting between two '
+                             'stages.')
+    args = parser.parse_args()
+
+    # logs to stdout, including the logs of the stages.
+    stdout_handler = logging.StreamHandler(stream=sys.stdout)
+    formatter = logging.Formatter('%(asctime)s - %(threadName)s - %(name)s - %(levelname)s - %(message)s')
+    stdout_handler.setFormatter(formatter)
+    for logger_name in [__name__, 'extract_text_from_thesis', 'science_parse_stream',
+                        'token_tag_statistics', 'usas_tagging']:
+        stage_logger = logging.getLogger(logger_name)
+        stage_logger.setLevel(logging.DEBUG)
+        stage_logger.addHandler(stdout_handler)
+
+    server_address: str = args.science_parse_server_url
+    port: str = args.science_parse_server_port
+    export_directory: Path = args.export_directory
+    minimum_number_of_words: int = args.min_number_words
+
+    def extract(pdf_path: Path) -> Optional[Tuple[str, str]]:
+        '''
+        :returns: The name of the exported text file and the text of the
+                  thesis, None if no text could be extracted.
+        '''
+        export_file_path = Path(export_directory, f'{pdf_path.stem}.txt')
+        if not args.replace and export_file_path.exists():
+            with export_file_path.open('r') as export_file:
+                return export_file_path.name, export_file.read()
+        logger.info(f'Processing: {pdf_path.name}')
+        pdf_text = parse_pdf_text(server_address, pdf_path, port)
+        if pdf_text is None:
+            logger.info('Science Parse server could not parse the following '
+                        f'PDF: {pdf_path.name}')
+            return None
+        number_words = len(pdf_text.split())
+        if number_words < minimum_number_of_words:
+            logger.info(f'PDF contains {number_words} words which is fewer '
+                        f'than the minimum of {minimum_number_of_words} words:'
+                        f' {pdf_path.name}')
+            return None
+        atomic_write(export_file_path, pdf_text)
+        return export_file_path.name, pdf_text
+
+    ucrel_api = UCREL_API(args.usas_api_email, args.usas_api_url,
+                          args.usas_api_port)
+    usas_cache = USASCache(args.usas_caching_directory, args.usas_tagger_version)
+    journal_status = usas_cache.journal_status()
+    sleep_time: int = args.time_to_wait_between_usas_api_calls
+
+    def tag(name_text: Tuple[str, str]) -> Optional[Tuple[str, Path]]:
+        '''
+        :returns: The name of the text file and its cached USAS file, None if
+                  the tagging failed.
+        '''
+        text_name, text = name_text
+        if not args.replace_usas_cache:
+            usas_file_path = cached_usas_file(usas_cache, Path(text_name), text)
+            if usas_file_path is not None:
+                return text_name, usas_file_path
+        usas_file_path = tag_and_cache_text(ucrel_api, usas_cache, text_name,
+                                            text, journal_status)
+        # Each worker waits between its calls of the UCREL API.
+        sleep(sleep_time)
+        if usas_file_path is None:
+            return None
+        return text_name, usas_file_path
+
+    token_filter = TokenFilter(remove_punctuation=args.remove_punctuation,
+                               remove_determiners=args.remove_determiners,
+                               remove_stop_words=args.remove_stop_words,
+                               remove_digits=args.remove_digits,
+                               lower_case=args.lower_case)
+    counting_settings = {'remove_punctuation': args.remove_punctuation,
+                         'remove_determiners': args.remove_determiners,
+                         'remove_stop_words': args.remove_stop_words,
+                         'remove_digits': args.remove_digits,
+                         'lower_case': args.lower_case,
+                         'usas_tagger_version': args.usas_tagger_version}
+    # The counts are ordered by text name rather than the order the texts
+    # finish tagging in, so the output does not depend on the timings.
+    corpus_counts = ShardCounts(counting_settings)
+    corpus_counts_lock = threading.Lock()
+
+    def count(name_usas_file: Tuple[str, Path]) -> bool:
+        text_name = name_usas_file[0]
+        _, document_counts = next(count_texts(read_tagged_texts([name_usas_file]),
+                                              token_filter))
+        with corpus_counts_lock:
+            corpus_counts.update(text_name, *document_counts)
+        return True
+
+    pdf_queue: queue.Queue = queue.Queue(maxsize=args.queue_size)
+    text_queue: queue.Queue = queue.Queue(maxsize=args.queue_size)
+    usas_queue: queue.Queue = queue.Queue(maxsize=args.queue_size)
+    stages: List[Stage] = [Stage('extract', extract, args.extract_workers,
+                                 pdf_queue, text_queue),
+                           Stage('tag', tag, args.tag_workers, text_queue,
+                                 usas_queue),
+                           Stage('count', count, args.count_workers, usas_queue)]
+    start_time = time.perf_counter()
+    for stage in stages:
+        stage.start()
+    for pdf_path in sorted(args.thesis_directory.iterdir()):
+        if pdf_path.suffix != '.pdf':
+            logger.debug('The following file is not a PDF and will not be '
+                         f'used/parsed: {pdf_path.name}')
+            continue
+        pdf_queue.put(pdf_path.resolve())
+    pdf_queue.put(_END_OF_QUEUE)
+    for stage in stages:
+        stage.join()
+    pipeline_seconds = time.perf_counter() - start_time
+    for stage in stages:
+        logger.info(f'Stage {stage.name}: {stage.number_processed} processed, '
+                    f'{stage.number_failed} failed or skipped, '
+                    f'{stage.busy_seconds:.1f}s of worker time')
+    logger.info(f'Extracted, tagged, and counted {len(corpus_counts.documents)}'
+                f' texts in {pipeline_seconds:.1f}s')
+
+    reference_token_counter = read_frequency_file(args.reference_token_frequency_path,
+                                                  args.lower_case)
+    reference_usas_counter = read_frequency_file(args.reference_usas_tag_frequency_path,
+                                                 False)
+    significant_tokens, significant_tags = significant_token_tag_statistics(
+        corpus_counts.token_counter(), corpus_counts.usas_counter(),
+        corpus_counts.token_usas_tag, reference_token_counter,
+        reference_usas_counter, args.sigeff_binary_file_path,
+        args.semtag_summary_file_path, args.significance_level,
+        args.minimum_token_frequency, args.USAS_tags_to_labels)
+    create_output_file(args.token_output_path, significant_tokens)
+    create_output_file(args.usas_output_path, significant_tags)
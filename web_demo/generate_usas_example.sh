@@ -1,3 +1,5 @@
 #!/bin/bash
 
-python usas_text_to_json.py ./usas_example.txt ./usas_example.json ./semtags_subcategories_utf_8.txt ./C7_to_json/C7_tag_label.json
\ No newline at end of file
+python usas_text_to_json.py ./usas_example.txt ./usas_example.json ./semtags_subcategories_utf_8.txt ./C7_to_json/C7_tag_label.json
+python usas_text_to_json.py ./usas_example.txt ./usas_example.ndjson ./semtags_subcategories_utf_8.txt ./C7_to_json/C7_tag_label.json --ndjson
+python usas_text_to_json.py ./usas_example.txt ./usas_example_bundle ./semtags_subcategories_utf_8.txt ./C7_to_json/C7_tag_label.json --bundle
\ No newline at end of file
@@ -7,8 +7,8 @@ import React, { useState, useEffect } from 'react';
 
 import Col from 'react-bootstrap/Col';
 
-import UCRELDoc from './UCRELDoc';
-import {getJSONData, LoadObject} from './Utilities';
+import UCRELDoc, {UCRELPagedDoc} from './UCRELDoc';
+import {getJSONData, getNDJSONData, LoadObject} from './Utilities';
 
 function KeyBoxes(props) {
     return (
@@ -47,15 +47,47 @@ function SemanticTagKey() {
 function SemanticTagging() {
     const [ucrelData, setUcrelData] = useState({})
     
+    // Adds the sentences of the newline delimited JSON records, the first 
+    // record is a header that contains no sentence.
+    function addSentences(records){
+        setUcrelData(previousData => {
+            const tokens = previousData.tokens ? previousData.tokens.slice() : [];
+            const sentenceIndexes = previousData.sentence_indexes ? previousData.sentence_indexes.slice() : [];
+            for (let record of records) {
+                if ('tokens' in record){
+                    tokens.push(...record.tokens);
+                    sentenceIndexes.push(record.token_indexes);
+                }
+            }
+            return {'tokens': tokens, 'sentence_indexes': sentenceIndexes};
+        });
+    }
+
+    const bundleURL = process.env.PUBLIC_URL + '/data/usas_example_bundle';
+
     useEffect( () => {
         if (Object.keys(ucrelData).length === 0){
-            getJSONData(process.env.PUBLIC_URL + '/data/usas_example.json')
-            .then(setUcrelData)
-            .catch(() => {setUcrelData({'error': true})});
+            // Only the pages of the paged bundle near the viewport are 
+            // downloaded. If it does not exist the sentences of the newline 
+            // delimited JSON are shown as they are downloaded, if that does 
+            // not exist the JSON is used.
+            getJSONData(bundleURL + '/index.json')
+            .then(index => {setUcrelData({'bundle_index': index})})
+            .catch(() => {
+                getNDJSONData(process.env.PUBLIC_URL + '/data/usas_example.ndjson', addSentences)
+                .catch(() => {
+                    getJSONData(process.env.PUBLIC_URL + '/data/usas_example.json')
+                    .then(setUcrelData)
+                    .catch(() => {setUcrelData({'error': true})});
+                });
+            });
         }
-    }, [ucrelData])
+    }, [ucrelData, bundleURL])
 
     function ucrelDoc(){
+        if ('bundle_index' in ucrelData){
+            return(<UCRELPagedDoc index={ucrelData.bundle_index} bundleURL={bundleURL}/>)
+        }
         return(<UCRELDoc tokens={ucrelData.tokens} 
                          sentenceIndexes={ucrelData.sentence_indexes}/>)
     }
@@ -1,9 +1,13 @@
 import './_flex-styles.scss';
 import './_ucrel.scss';
 
+import { useState, useEffect, useRef } from 'react';
+
 import OverlayTrigger from 'react-bootstrap/OverlayTrigger';
 import Tooltip from 'react-bootstrap/Tooltip';
 
+import {getJSONData} from './Utilities';
+
 
 
 const UCRELToken = (props) => {
@@ -62,4 +66,76 @@ const UCRELDoc = (props) => {
     )
 }
 
+/*
+A page of a paged bundle, see `write_labelled_bundle` in `usas_text_to_json.py`. 
+The page is only downloaded and rendered while it is near the viewport, once 
+it is scrolled away it is removed and replaced by an empty element of the 
+same height, so that the memory used by the browser stays the same however 
+long the document is.
+*/
+const UCRELPage = (props) => {
+    const [pageData, setPageData] = useState(null);
+    const [height, setHeight] = useState(null);
+    const pageElement = useRef(null);
+    const url = props.url;
+
+    useEffect(() => {
+        const element = pageElement.current;
+        let isVisible = false;
+        const observer = new IntersectionObserver((entries) => {
+            for (let entry of entries) {
+                isVisible = entry.isIntersecting;
+                if (isVisible) {
+                    getJSONData(url)
+                    .then(data => {if (isVisible) {setPageData(data);}})
+                    .catch(() => {setPageData({'error': true})});
+                }
+                else {
+                    setHeight(element.offsetHeight);
+                    setPageData(null);
+                }
+            }
+        }, {rootMargin: '1000px 0px'});
+        observer.observe(element);
+        return () => {observer.disconnect();};
+    }, [url]);
+
+    let content = null;
+    let minHeight = undefined;
+    if (pageData === null) {
+        // Until the page has been shown its height is estimated from its 
+        // number of tokens.
+        minHeight = height === null ? `${Math.ceil(props.numberTokens / 10) * 2.5}rem` : `${height}px`;
+    }
+    else if ('error' in pageData) {
+        content = <h5>Error: Could not load page {props.pageNumber + 1}.</h5>;
+    }
+    else {
+        content = <UCRELDoc tokens={pageData.tokens} sentenceIndexes={pageData.sentence_indexes}/>;
+    }
+    return (
+        <div ref={pageElement} style={{minHeight: minHeight}}>
+            {content}
+        </div>
+    )
+}
+
+/*
+A document written as a paged bundle, `index` is the content of the bundle's 
+`index.json` and `bundleURL` the URL of the bundle directory.
+*/
+const UCRELPagedDoc = (props) => {
+    const pages = props.index.pages.map((page, pageNumber) => {
+        const [startIndex, endIndex] = page.token_indexes;
+        return (<UCRELPage key={page.file} url={`${props.bundleURL}/${page.file}`} 
+                           pageNumber={pageNumber} numberTokens={endIndex - startIndex}/>);
+    });
+    return (
+        <div>
+            {pages}
+        </div>
+    )
+}
+
+export { UCRELPagedDoc };
 export default UCRELDoc
\ No newline at end of file
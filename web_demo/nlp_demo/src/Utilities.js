@@ -57,6 +57,46 @@ async function getJSONData(url = '') {
         throw new Error(`Wrong Content-Type Return`); 
     }
 }
+/* 
+Reads newline delimited JSON as it is downloaded, calling `onRecords` with 
+the records of each downloaded chunk so that they can be shown before the 
+whole file has been downloaded.
+*/
+async function getNDJSONData(url = '', onRecords) {
+    const response = await fetch(url, {
+        method: 'GET',
+        mode: 'cors',
+        cache: 'default',
+        credentials: 'same-origin',
+        redirect: 'follow',
+        referrerPolicy: 'same-origin'
+    });
+    if (!response.ok) {
+        throw new Error(`HTTP error! status: ${response.status}`);
+    }
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    while (true) {
+        const {done, value} = await reader.read();
+        if (done) {
+            break;
+        }
+        buffer += decoder.decode(value, {stream: true});
+        const lines = buffer.split('\n');
+        // The last line may be incomplete.
+        buffer = lines.pop();
+        const records = lines.filter(line => line.trim()).map(line => JSON.parse(line));
+        if (records.length) {
+            onRecords(records);
+        }
+    }
+    buffer += decoder.decode();
+    if (buffer.trim()) {
+        onRecords([JSON.parse(buffer)]);
+    }
+}
+
 
 const LoadObject = (props) => {
 
@@ -82,4 +122,4 @@ const LoadObject = (props) => {
     }
 }
 
-export { InfoTitle, getJSONData, LoadObject };
\ No newline at end of file
+export { InfoTitle, getJSONData, getNDJSONData, LoadObject };
\ No newline at end of file
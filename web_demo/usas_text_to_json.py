@@ -1,10 +1,25 @@
 import argparse
+from collections import Counter, OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+import glob
+import hashlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 import logging
 import json
+import os
 from pathlib import Path
-from typing import Dict, Optional
+import sys
+import threading
+import time
+import typing
+from typing import (Callable, Dict, Iterable, Iterator, List, Optional, TextIO, 
+                    Tuple)
+import unicodedata
 
 from ucrel_api.api import UCREL_API
+from ucrel_api.ucrel_doc import UCREL_Doc, UCREL_Token
+
+logger = logging.getLogger(__name__)
 
 def tag_to_label(tag_to_label_mapper: Dict[str, str], tag: str, 
                  lemma: Optional[str] = None) -> str:
@@ -61,6 +76,539 @@ def tag_to_label(tag_to_label_mapper: Dict[str, str], tag: str,
                    f'number: {ditto_numbers}, or a tag itself.')
     raise ValueError(error_msg)
 
+def load_usas_tag_labels(semtag_summary_file_path: Path) -> Dict[str, str]:
+    '''
+    :param semtag_summary_file_path: File path to the USAS tag summary file, 
+                                     tab separated tags and labels.
+    :returns: The USAS tags and their labels.
+    '''
+    usas_tag_label: Dict[str, str] = {}
+    with semtag_summary_file_path.open('r') as semtag_file:
+        for line in semtag_file:
+            if not line.strip():
+                continue
+            tag, label = line.split('\t')
+            tag = tag.strip()
+            label = label.strip()
+            usas_tag_label[tag] = label
+    return usas_tag_label
+
+def load_pos_tag_labels(pos_tag_to_label_json_file_path: Path) -> Dict[str, str]:
+    '''
+    :param pos_tag_to_label_json_file_path: File path to a JSON file that 
+                                            contains an object whereby the keys 
+                                            are POS tags and the values are the 
+                                            associated labels.
+    :returns: The POS tags and their labels.
+    '''
+    with pos_tag_to_label_json_file_path.open('r') as pos_file:
+        return json.load(pos_file)
+
+def label_token(token: UCREL_Token, usas_tag_label: Dict[str, str], 
+                pos_tag_label: Dict[str, str]) -> None:
+    '''
+    :param token: The USAS tagged token, it is labelled in place.
+    :param usas_tag_label: Maps USAS tags to labels.
+    :param pos_tag_label: Maps POS tags to labels.
+    :returns: None
+    '''
+    if token.pos_tag is not None:
+        token.pos_label = tag_to_label(pos_tag_label, token.pos_tag, token.lemma)
+    if token.usas_tag is not None:
+        usas_tag = token.usas_tag
+        if '/' in usas_tag:
+            usas_tags = [] 
+            for tag in usas_tag.split('/'):
+                usas_tags.append(tag_to_label(usas_tag_label, tag, token.lemma))
+            token.usas_label = '/'.join(usas_tags)
+        else:
+            token.usas_label = tag_to_label(usas_tag_label, usas_tag, token.lemma)
+
+def label_ucrel_doc(ucrel_doc: UCREL_Doc, usas_tag_label: Dict[str, str], 
+                    pos_tag_label: Dict[str, str]) -> UCREL_Doc:
+    '''
+    :param ucrel_doc: The USAS tagged document, its tokens are labelled in 
+                      place.
+    :param usas_tag_label: Maps USAS tags to labels.
+    :param pos_tag_label: Maps POS tags to labels.
+    :returns: The document whereby each token has a POS and USAS label as 
+              well as the tags.
+    '''
+    for token in ucrel_doc:
+        label_token(token, usas_tag_label, pos_tag_label)
+    return ucrel_doc
+
+def iter_sentences(ucrel_doc: UCREL_Doc) -> Iterator[List[UCREL_Token]]:
+    '''
+    :param ucrel_doc: The USAS tagged document.
+    :returns: The tokens of each sentence, or all of the tokens as one 
+              sentence if the document has no sentence indexes.
+    '''
+    try:
+        yield from ucrel_doc.sentences
+    except ValueError:
+        yield ucrel_doc.tokens
+
+def write_labelled_ndjson(ucrel_doc: UCREL_Doc, ndjson_file: TextIO, 
+                          usas_tag_label: Dict[str, str], 
+                          pos_tag_label: Dict[str, str]) -> None:
+    '''
+    Writes the document as newline delimited JSON, labelling the tokens of 
+    each sentence as the sentence is written rather than creating the JSON 
+    string of the whole document. The first line is a header object with 
+    the `number_tokens`, `number_sentences` and `text_length` of the 
+    document, each following line is a sentence object with its 
+    `token_indexes`, the start and end index of its tokens in the document, 
+    and its labelled `tokens`, in the same format as the tokens of 
+    `UCREL_Doc.to_json`. The text of the document is not written.
+
+    :param ucrel_doc: The USAS tagged document.
+    :param ndjson_file: File to write the newline delimited JSON to.
+    :param usas_tag_label: Maps USAS tags to labels.
+    :param pos_tag_label: Maps POS tags to labels.
+    :returns: None
+    '''
+    sentences = list(iter_sentences(ucrel_doc))
+    header = {'number_tokens': len(ucrel_doc), 
+              'number_sentences': len(sentences),
+              'text_length': len(ucrel_doc.text)}
+    ndjson_file.write(json.dumps(header) + '\n')
+    start_index = 0
+    for sentence in sentences:
+        end_index = start_index + len(sentence)
+        ndjson_file.write(f'{{"token_indexes": [{start_index}, {end_index}], "tokens": [')
+        for token_index, token in enumerate(sentence):
+            label_token(token, usas_tag_label, pos_tag_label)
+            if token_index:
+                ndjson_file.write(', ')
+            ndjson_file.write(token.to_json())
+        ndjson_file.write(']}\n')
+        start_index = end_index
+
+BUNDLE_INDEX_FILE_NAME = 'index.json'
+
+def iter_pages(ucrel_doc: UCREL_Doc, page_size: int
+               ) -> Iterator[List[List[UCREL_Token]]]:
+    '''
+    :param ucrel_doc: The USAS tagged document.
+    :param page_size: Maximum number of tokens of a page, a sentence that is 
+                      longer than this is a page on its own.
+    :returns: The sentences of each page, whereby the sentences are never 
+              split across pages.
+    '''
+    page: List[List[UCREL_Token]] = []
+    number_page_tokens = 0
+    for sentence in iter_sentences(ucrel_doc):
+        if page and number_page_tokens + len(sentence) > page_size:
+            yield page
+            page = []
+            number_page_tokens = 0
+        page.append(sentence)
+        number_page_tokens += len(sentence)
+    if page:
+        yield page
+
+def write_labelled_bundle(ucrel_doc: UCREL_Doc, bundle_directory: Path, 
+                          usas_tag_label: Dict[str, str], 
+                          pos_tag_label: Dict[str, str], 
+                          page_size: int = 1000, 
+                          number_page_tags: int = 5) -> None:
+    '''
+    Writes the document as a paged bundle, so that a long document can be 
+    shown a few pages at a time rather than downloaded in full. Each page is 
+    written to `page_<page number>.json`, in the same format as 
+    `UCREL_Doc.to_json` without the text, whereby the `sentence_indexes` are 
+    relative to the page. `index.json` is written last and contains the 
+    `number_tokens`, `number_sentences`, `text_length` and `page_size` of 
+    the document and for each page its `file`, `token_indexes`, the start 
+    and end index of its tokens in the document, `number_sentences`, and 
+    `usas_tags`, its most frequent USAS tags as `[tag, label, count]`. Pages 
+    of a previous, longer, bundle in the directory are removed.
+
+    :param ucrel_doc: The USAS tagged document.
+    :param bundle_directory: Directory to write the bundle to, created if it 
+                             does not exist.
+    :param usas_tag_label: Maps USAS tags to labels.
+    :param pos_tag_label: Maps POS tags to labels.
+    :param page_size: Maximum number of tokens of a page, see `iter_pages`.
+    :param number_page_tags: Number of the most frequent USAS tags of each 
+                             page to add to the index.
+    :returns: None
+    '''
+    bundle_directory.mkdir(parents=True, exist_ok=True)
+    pages = []
+    number_sentences = 0
+    start_index = 0
+    for page_number, page_sentences in enumerate(iter_pages(ucrel_doc, page_size)):
+        page_file_name = f'page_{page_number}.json'
+        usas_tag_counts: typing.Counter[str] = Counter()
+        page_sentence_indexes = []
+        number_page_tokens = 0
+        temporary_file_path = Path(bundle_directory, f'{page_file_name}.tmp')
+        with temporary_file_path.open('w') as page_file:
+            page_file.write('{"tokens": [')
+            for sentence in page_sentences:
+                for token in sentence:
+                    label_token(token, usas_tag_label, pos_tag_label)
+                    if number_page_tokens:
+                        page_file.write(', ')
+                    page_file.write(token.to_json())
+                    number_page_tokens += 1
+                    if token.usas_tag is not None:
+                        usas_tag_counts.update(token.usas_tag.split('/'))
+                page_sentence_indexes.append([number_page_tokens - len(sentence), 
+                                              number_page_tokens])
+            page_file.write(f'], "sentence_indexes": {json.dumps(page_sentence_indexes)}}}')
+        os.replace(temporary_file_path, Path(bundle_directory, page_file_name))
+        pages.append({'file': page_file_name, 
+                      'token_indexes': [start_index, start_index + number_page_tokens],
+                      'number_sentences': len(page_sentences),
+                      'usas_tags': [[tag, tag_to_label(usas_tag_label, tag), count] 
+                                    for tag, count in usas_tag_counts.most_common(number_page_tags)]})
+        number_sentences += len(page_sentences)
+        start_index += number_page_tokens
+    index = {'number_tokens': len(ucrel_doc), 'number_sentences': number_sentences,
+             'text_length': len(ucrel_doc.text), 'page_size': page_size, 
+             'pages': pages}
+    temporary_file_path = Path(bundle_directory, f'{BUNDLE_INDEX_FILE_NAME}.tmp')
+    with temporary_file_path.open('w') as index_file:
+        json.dump(index, index_file)
+    os.replace(temporary_file_path, Path(bundle_directory, BUNDLE_INDEX_FILE_NAME))
+    page_number = len(pages)
+    while Path(bundle_directory, f'page_{page_number}.json').exists():
+        Path(bundle_directory, f'page_{page_number}.json').unlink()
+        page_number += 1
+
+class RateLimiter():
+    '''
+    Limits the rate of calls, e.g. to the UCREL API, across threads by 
+    spacing the calls at least `1 / calls_per_second` seconds apart.
+    '''
+    def __init__(self, calls_per_second: float) -> None:
+        self.interval = 1.0 / calls_per_second
+        self._lock = threading.Lock()
+        self._next_call_time = time.monotonic()
+
+    def wait(self) -> None:
+        '''
+        Blocks until the next call is allowed.
+        '''
+        with self._lock:
+            call_time = max(self._next_call_time, time.monotonic())
+            self._next_call_time = call_time + self.interval
+        time.sleep(max(0.0, call_time - time.monotonic()))
+
+def batch_input_file_paths(input_path: str) -> List[Path]:
+    '''
+    :param input_path: A directory of text files or a glob pattern e.g. 
+                       `texts/*.txt`.
+    :returns: The text files, sorted, excluding hidden files.
+    '''
+    if Path(input_path).is_dir():
+        file_paths = Path(input_path).iterdir()
+    else:
+        file_paths = (Path(_file_path) for _file_path in glob.glob(input_path))
+    return sorted(_file_path.resolve() for _file_path in file_paths 
+                  if _file_path.is_file() and not _file_path.name.startswith('.'))
+
+def is_output_current(input_file_path: Path, output_file_path: Path, 
+                      dependency_file_paths: Iterable[Path]) -> bool:
+    '''
+    :param input_file_path: The text file.
+    :param output_file_path: The labelled JSON output of the text file.
+    :param dependency_file_paths: Other files the output depends on e.g. the 
+                                  tag to label mapping files.
+    :returns: True if the output exists and was modified after the text and 
+              all of the dependencies.
+    '''
+    if not output_file_path.exists():
+        return False
+    output_modified_time = output_file_path.stat().st_mtime
+    return all(_file_path.stat().st_mtime <= output_modified_time 
+               for _file_path in [input_file_path, *dependency_file_paths])
+
+def write_labelled_json(api: UCREL_API, input_file_path: Path, 
+                        output_file_path: Path, usas_tag_label: Dict[str, str], 
+                        pos_tag_label: Dict[str, str], 
+                        rate_limiter: Optional[RateLimiter] = None, 
+                        ndjson: bool = False, 
+                        bundle_page_size: Optional[int] = None) -> None:
+    '''
+    Tags the text file with USAS, labels the tags, and writes it to the 
+    output file in JSON format, or newline delimited JSON format see 
+    `write_labelled_ndjson`, or a paged bundle see `write_labelled_bundle`. 
+    The output is written to a temporary file first so that an interrupted 
+    write never looks like a current output.
+
+    :param api: The UCREL API that tags the text.
+    :param input_file_path: The text file.
+    :param output_file_path: File path to write the labelled JSON to.
+    :param usas_tag_label: Maps USAS tags to labels.
+    :param pos_tag_label: Maps POS tags to labels.
+    :param rate_limiter: Limits the rate of the UCREL API calls, if given.
+    :param ndjson: Whether to write newline delimited JSON.
+    :param bundle_page_size: If given a paged bundle, with pages of at most 
+                             this many tokens, is written to the 
+                             `output_file_path` directory.
+    :returns: None
+    '''
+    with input_file_path.open('r') as input_fp:
+        text = input_fp.read()
+    if rate_limiter is not None:
+        rate_limiter.wait()
+    ucrel_doc = api.usas(text)
+    if bundle_page_size is not None:
+        write_labelled_bundle(ucrel_doc, output_file_path, usas_tag_label, 
+                              pos_tag_label, bundle_page_size)
+        return
+    temporary_file_path = output_file_path.with_name(f'{output_file_path.name}.tmp')
+    with temporary_file_path.open('w') as _fp:
+        if ndjson:
+            write_labelled_ndjson(ucrel_doc, _fp, usas_tag_label, pos_tag_label)
+        else:
+            label_ucrel_doc(ucrel_doc, usas_tag_label, pos_tag_label)
+            _fp.write(ucrel_doc.to_json())
+    os.replace(temporary_file_path, output_file_path)
+
+def normalise_text(text: str) -> str:
+    '''
+    :param text: Text to be tagged.
+    :returns: The text in Unicode NFC form, with Unix line endings, no 
+              trailing whitespace on each line, and no leading or trailing 
+              whitespace. Texts that only differ in these ways are tagged the 
+              same, therefore only the normalised text is tagged and cached.
+    '''
+    text = unicodedata.normalize('NFC', text)
+    text = text.replace('\r\n', '\n').replace('\r', '\n')
+    return '\n'.join(line.rstrip() for line in text.split('\n')).strip()
+
+class LabelledResultCache():
+    '''
+    Least recently used cache of labelled USAS JSON results in memory, 
+    optionally backed by a directory on disk that keeps every result and 
+    survives restarts.
+    '''
+    def __init__(self, max_entries: int, 
+                 cache_directory: Optional[Path] = None) -> None:
+        '''
+        :param max_entries: Maximum number of results kept in memory.
+        :param cache_directory: Directory to also store the results in, one 
+                                `<key>.json` file per result.
+        '''
+        self.max_entries = max_entries
+        self.cache_directory = cache_directory
+        self._results: typing.OrderedDict[str, str] = OrderedDict()
+        self._lock = threading.Lock()
+        if cache_directory is not None:
+            cache_directory.mkdir(parents=True, exist_ok=True)
+
+    def _cache_path(self, key: str) -> Path:
+        return Path(self.cache_directory, f'{key}.json')
+
+    def _remember(self, key: str, result: str) -> None:
+        with self._lock:
+            self._results[key] = result
+            self._results.move_to_end(key)
+            while len(self._results) > self.max_entries:
+                self._results.popitem(last=False)
+
+    def get(self, key: str) -> Tuple[Optional[str], str]:
+        '''
+        :param key: Key of the result.
+        :returns: The result, or None if it is not cached, and where it was 
+                  found, `memory` or `disk`.
+        '''
+        with self._lock:
+            if key in self._results:
+                self._results.move_to_end(key)
+                return self._results[key], 'memory'
+        if self.cache_directory is not None:
+            cache_path = self._cache_path(key)
+            if cache_path.exists():
+                result = cache_path.read_text(encoding='utf-8')
+                self._remember(key, result)
+                return result, 'disk'
+        return None, ''
+
+    def put(self, key: str, result: str) -> None:
+        '''
+        :param key: Key of the result.
+        :param result: The labelled USAS JSON result.
+        :returns: None
+        '''
+        self._remember(key, result)
+        if self.cache_directory is not None:
+            cache_path = self._cache_path(key)
+            temporary_path = cache_path.with_name(f'{cache_path.name}.tmp.{threading.get_ident()}')
+            temporary_path.write_text(result, encoding='utf-8')
+            os.replace(temporary_path, cache_path)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._results)
+
+class RequestCoalescer():
+    '''
+    Coalesces identical in-flight requests, so that while a result is being 
+    computed any other request for the same key waits for that result rather 
+    than computing it again.
+    '''
+    def __init__(self) -> None:
+        self._in_flight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str, compute: Callable[[], str]) -> Tuple[str, bool]:
+        '''
+        :param key: Key of the result.
+        :param compute: Computes the result, only called if no request for 
+                        the key is in-flight.
+        :returns: The result and whether it was computed by another request. 
+                  If `compute` raises an exception every request waiting on 
+                  it raises that exception.
+        '''
+        with self._lock:
+            future = self._in_flight.get(key)
+            is_owner = future is None
+            if is_owner:
+                future = Future()
+                self._in_flight[key] = future
+        if not is_owner:
+            return future.result(), True
+        try:
+            result = compute()
+            future.set_result(result)
+            return result, False
+        except BaseException as error:
+            future.set_exception(error)
+            raise
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+
+class TaggingService():
+    '''
+    Tags texts with USAS and labels the tags, keeping the tag to label 
+    mappings in memory, caching the labelled results by a hash of the 
+    normalised text, and coalescing identical in-flight requests.
+    '''
+    def __init__(self, api: UCREL_API, usas_tag_label: Dict[str, str], 
+                 pos_tag_label: Dict[str, str], cache: LabelledResultCache, 
+                 rate_limiter: Optional[RateLimiter] = None) -> None:
+        self.api = api
+        self.usas_tag_label = usas_tag_label
+        self.pos_tag_label = pos_tag_label
+        self.cache = cache
+        self.rate_limiter = rate_limiter
+        self.coalescer = RequestCoalescer()
+        # The labels are part of the key so that cached results on disk are 
+        # not used after the tag to label mappings have changed.
+        labels = json.dumps([usas_tag_label, pos_tag_label], sort_keys=True)
+        self.labels_hash = hashlib.sha256(labels.encode('utf-8')).hexdigest()
+
+    def key(self, normalised_text: str) -> str:
+        '''
+        :param normalised_text: Text normalised by `normalise_text`.
+        :returns: The cache key of the text.
+        '''
+        key_text = f'{self.labels_hash}\0{normalised_text}'
+        return hashlib.sha256(key_text.encode('utf-8')).hexdigest()
+
+    def _tag_and_label(self, key: str, normalised_text: str) -> str:
+        if self.rate_limiter is not None:
+            self.rate_limiter.wait()
+        ucrel_doc = label_ucrel_doc(self.api.usas(normalised_text), 
+                                    self.usas_tag_label, self.pos_tag_label)
+        result = ucrel_doc.to_json()
+        self.cache.put(key, result)
+        return result
+
+    def tag(self, text: str) -> Tuple[str, str]:
+        '''
+        :param text: Text to be tagged.
+        :returns: The labelled USAS JSON result and where it came from, 
+                  `memory`, `disk`, `coalesced` (another request tagged the 
+                  same text at the same time), or `upstream` (the UCREL API).
+        '''
+        normalised_text = normalise_text(text)
+        key = self.key(normalised_text)
+        result, source = self.cache.get(key)
+        if result is not None:
+            return result, source
+        result, coalesced = self.coalescer.get(
+            key, lambda: self._tag_and_label(key, normalised_text))
+        return result, 'coalesced' if coalesced else 'upstream'
+
+class TaggingServiceHandler(BaseHTTPRequestHandler):
+    '''
+    `POST /usas` with the text as the UTF-8 encoded body returns the 
+    labelled USAS JSON of the text, the `X-Cache` header states where the 
+    result came from, see `TaggingService.tag`. `GET /health` returns the 
+    number of results cached in memory.
+    '''
+    service: Optional[TaggingService] = None
+    max_text_length = 20000
+    allowed_origin = '*'
+
+    def _send(self, status: int, body: bytes, 
+              headers: Optional[Dict[str, str]] = None) -> None:
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Access-Control-Allow-Origin', self.allowed_origin)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error(self, status: int, message: str) -> None:
+        self._send(status, json.dumps({'error': message}).encode('utf-8'))
+
+    def do_OPTIONS(self) -> None:
+        self._send(204, b'', {'Access-Control-Allow-Methods': 'POST, GET, OPTIONS',
+                              'Access-Control-Allow-Headers': 'Content-Type'})
+
+    def do_GET(self) -> None:
+        if self.path != '/health':
+            self._send_error(404, 'Not found')
+            return
+        self._send(200, json.dumps({'cached results in memory': 
+                                    len(self.service.cache)}).encode('utf-8'))
+
+    def do_POST(self) -> None:
+        if self.path != '/usas':
+            self._send_error(404, 'Not found')
+            return
+        content_length = int(self.headers.get('Content-Length', 0))
+        # At most 4 bytes per character in UTF-8.
+        if content_length > 4 * self.max_text_length:
+            self._send_error(413, f'The text is longer than {self.max_text_length} characters.')
+            return
+        try:
+            text = self.rfile.read(content_length).decode('utf-8')
+        except UnicodeDecodeError:
+            self._send_error(400, 'The text is not UTF-8 encoded.')
+            return
+        if len(text) > self.max_text_length:
+            self._send_error(413, f'The text is longer than {self.max_text_length} characters.')
+            return
+        if not text.strip():
+            self._send_error(400, 'No text to tag.')
+            return
+        start_time = time.perf_counter()
+        try:
+            result, source = self.service.tag(text)
+        except Exception:
+            logger.exception('Failed to tag text')
+            self._send_error(502, 'The text could not be tagged.')
+            return
+        logger.info(f'Tagged {len(text)} characters from {source} in '
+                    f'{time.perf_counter() - start_time:.3f}s')
+        self._send(200, result.encode('utf-8'), {'X-Cache': source})
+
+    def log_message(self, format: str, *args) -> None:
+        # Requests are logged by `do_POST` instead.
+        pass
+
 def path_exists(file_path: str) -> Path:
     _fp = Path(file_path)
     if not _fp.exists():
@@ -76,65 +624,175 @@ if __name__ == '__main__':
                   (2nd argument). In addition to the expected USAS output 
                   (see https://ucrel.github.io/ucrel-python-api/ucrel_doc.html#UCREL_Doc.to_json) 
                   each token will have a POS and USAS label as well as the 
-                  tags. The USAS and POS labels are more human readable.'''
-    input_file_path_help = ('File path that contains the text to be '
-                            'processed by USAS.')
-    output_file_path_help = ('File path that will contains the USAS data in '
-                             'JSON formatted, whereby all USAS and POS tags '
-                             'will include a label field.')
+                  tags. The USAS and POS labels are more human readable. 
+                  Given a directory of text files, or a glob pattern, instead 
+                  (1st argument) each text is processed and output to 
+                  `<text file name>.json` in the output directory 
+                  (2nd argument). With `--serve` no input or output is given, 
+                  instead texts are tagged over HTTP by `POST /usas`.'''
+    input_path_help = ('File path that contains the text to be processed by '
+                       'USAS, or a directory of, or glob pattern matching, '
+                       'such text files e.g. `"texts/*.txt"`.')
+    output_path_help = ('File path that will contains the USAS data in '
+                        'JSON formatted, whereby all USAS and POS tags '
+                        'will include a label field. If the input is a '
+                        'directory or glob pattern this is the directory '
+                        'that will contain one such file per text file.')
     semtag_summary_file_path_help = ('File path to the USAS tag summary file. '
                                      'This has to be in UTF-8 or ASCII encoding.')
     pos_tag_file_path_help = ('File path to a JSON file that contains an object'
                               ' whereby the keys are tags and the values are '
                               'the associated label for the tag.')
+    workers_help = ('Number of text files tagged at the same time when the '
+                    'input is a directory or glob pattern.')
+    requests_per_second_help = ('Maximum number of calls per second to the '
+                                'UCREL API when the input is a directory or '
+                                'glob pattern.')
+    force_help = ('When the input is a directory or glob pattern, text files '
+                  'whose output was modified after the text file and the tag '
+                  'to label files are skipped, unless this is set.')
+    ndjson_help = ('Write newline delimited JSON, a header line followed by '
+                   'one line per sentence, rather than one JSON object so '
+                   'that the sentences can be read before the whole file. '
+                   'When the input is a directory or glob pattern the output '
+                   'files are `<text file name>.ndjson`.')
+    bundle_help = ('Write a paged bundle, a directory of pages of at most '
+                   '`--page-size` tokens of whole sentences and an '
+                   '`index.json` of the page offsets, sentence counts and '
+                   'most frequent USAS tags of each page, so that a long '
+                   'text can be shown a page at a time. The output path is '
+                   'the bundle directory, when the input is a directory or '
+                   'glob pattern the bundles are `<text file name>` '
+                   'directories.')
+    page_size_help = 'Maximum number of tokens of a page of a `--bundle`.'
+    serve_help = ('Run an HTTP service on this port that tags the text '
+                  'POSTed to `/usas` and returns the labelled USAS JSON. The '
+                  'results are cached by a hash of the normalised text and '
+                  'identical requests that arrive while the text is being '
+                  'tagged wait for that result.')
+    cache_size_help = ('Maximum number of labelled results the service keeps '
+                       'in memory, the least recently used are removed first.')
+    cache_directory_help = ('Directory that the service also caches every '
+                            'labelled result in, so that they survive restarts.')
+    max_text_length_help = ('Maximum number of characters of a text the '
+                            'service will tag.')
     parser = argparse.ArgumentParser(description=description)
-    parser.add_argument('input_file_path', type=path_exists, 
-                        help=input_file_path_help)
-    parser.add_argument('output_file_path', type=path_type, 
-                        help=output_file_path_help)
+    parser.add_argument('input_path', type=str, nargs='?', help=input_path_help)
+    parser.add_argument('output_path', type=path_type, nargs='?', 
+                        help=output_path_help)
     parser.add_argument('semtag_summary_file_path', type=path_exists, 
                         help=semtag_summary_file_path_help)
     parser.add_argument('pos_tag_to_label_json_file_path', type=path_exists, 
                         help=pos_tag_file_path_help)
+    parser.add_argument('--usas-api-url', type=str, 
+                        default='http://ucrel-api.lancaster.ac.uk', 
+                        help='URL of the UCREL API that tags the text with USAS.')
+    parser.add_argument('--usas-api-port', type=str, default='', 
+                        help='Port of the UCREL API, if required.')
+    parser.add_argument('--usas-api-email', type=str, 
+                        default='a.moore@lancaster.ac.uk', 
+                        help='Email address that identifies the user of the UCREL API.')
+    parser.add_argument('--workers', type=int, default=4, help=workers_help)
+    parser.add_argument('--requests-per-second', type=float, default=1.0, 
+                        help=requests_per_second_help)
+    parser.add_argument('--force', action='store_true', help=force_help)
+    parser.add_argument('--ndjson', action='store_true', help=ndjson_help)
+    parser.add_argument('--bundle', action='store_true', help=bundle_help)
+    parser.add_argument('--page-size', type=int, default=1000, 
+                        help=page_size_help)
+    parser.add_argument('--serve', type=int, metavar='PORT', help=serve_help)
+    parser.add_argument('--host', type=str, default='127.0.0.1', 
+                        help='Host the service listens on.')
+    parser.add_argument('--cache-size', type=int, default=1000, 
+                        help=cache_size_help)
+    parser.add_argument('--cache-directory', type=path_type, 
+                        help=cache_directory_help)
+    parser.add_argument('--max-text-length', type=int, default=20000, 
+                        help=max_text_length_help)
+    parser.add_argument('--allowed-origin', type=str, default='*', 
+                        help='The CORS allowed origin of the service.')
     args = parser.parse_args()
+    if args.serve is None and (args.input_path is None or args.output_path is None):
+        parser.error('the input_path and output_path are required unless '
+                     '`--serve` is given')
+    if args.serve is not None and args.input_path is not None:
+        parser.error('the input_path and output_path cannot be used with `--serve`')
+    if args.bundle and args.ndjson:
+        parser.error('`--bundle` cannot be used with `--ndjson`')
+    bundle_page_size: Optional[int] = args.page_size if args.bundle else None
 
-    input_file_path = args.input_file_path
+    # logs to stdout
+    logger.setLevel(logging.DEBUG)
+    stdout_handler = logging.StreamHandler(stream=sys.stdout)
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    stdout_handler.setFormatter(formatter)
+    logger.addHandler(stdout_handler)
 
-    api = UCREL_API('a.moore@lancaster.ac.uk', 'http://ucrel-api.lancaster.ac.uk')
-    with input_file_path.open('r') as input_fp:
-        ucrel_doc = api.usas(input_fp.read())
-
-
-        usas_tag_label: Dict[str, str] = {}
-        semtag_summary_file_path = args.semtag_summary_file_path
-        with semtag_summary_file_path.open('r') as semtag_file:
-            for line in semtag_file:
-                if not line.strip():
-                    continue
-                tag, label = line.split('\t')
-                tag = tag.strip()
-                label = label.strip()
-                usas_tag_label[tag] = label
-
-        pos_tag_label: Dict[str, str] = {}
-        pos_tag_to_label_json_file_path = args.pos_tag_to_label_json_file_path
-        with pos_tag_to_label_json_file_path.open('r') as pos_file:
-            pos_tag_label = json.load(pos_file)
-        for token in ucrel_doc:
-            if token.pos_tag is not None:
-                token.pos_label = tag_to_label(pos_tag_label, token.pos_tag, token.lemma)
-            if token.usas_tag is not None:
-                usas_tag = token.usas_tag
-                if '/' in usas_tag:
-                    usas_tags = [] 
-                    for tag in usas_tag.split('/'):
-                        usas_tags.append(tag_to_label(usas_tag_label, tag, token.lemma))
-                    token.usas_label = '/'.join(usas_tags)
-                else:
-                    token.usas_label = tag_to_label(usas_tag_label, usas_tag, token.lemma)
-
-
-        output_file_path = args.output_file_path
-        with output_file_path.open('w') as _fp:
-            _fp.write(ucrel_doc.to_json())
+    api = UCREL_API(args.usas_api_email, args.usas_api_url, args.usas_api_port)
+    semtag_summary_file_path: Path = args.semtag_summary_file_path
+    pos_tag_to_label_json_file_path: Path = args.pos_tag_to_label_json_file_path
+    # The mappings are loaded once and shared by all of the text files.
+    usas_tag_label = load_usas_tag_labels(semtag_summary_file_path)
+    pos_tag_label = load_pos_tag_labels(pos_tag_to_label_json_file_path)
+
+    if args.serve is not None:
+        cache = LabelledResultCache(args.cache_size, args.cache_directory)
+        TaggingServiceHandler.service = TaggingService(
+            api, usas_tag_label, pos_tag_label, cache, 
+            RateLimiter(args.requests_per_second))
+        TaggingServiceHandler.max_text_length = args.max_text_length
+        TaggingServiceHandler.allowed_origin = args.allowed_origin
+        server = ThreadingHTTPServer((args.host, args.serve), TaggingServiceHandler)
+        logger.info(f'Tagging service listening on http://{args.host}:{args.serve}/usas')
+        server.serve_forever()
+
+    input_path = Path(args.input_path)
+    output_path: Path = args.output_path
+    if input_path.is_file():
+        write_labelled_json(api, input_path.resolve(), output_path, 
+                            usas_tag_label, pos_tag_label, ndjson=args.ndjson, 
+                            bundle_page_size=bundle_page_size)
+        sys.exit(0)
 
+    input_file_paths = batch_input_file_paths(args.input_path)
+    if not input_file_paths:
+        raise FileNotFoundError(f'No text files found in {args.input_path}')
+    output_path.mkdir(parents=True, exist_ok=True)
+    dependency_file_paths = [semtag_summary_file_path, 
+                             pos_tag_to_label_json_file_path]
+    output_suffix = '.ndjson' if args.ndjson else '.json'
+    input_output_file_paths = []
+    if args.bundle:
+        output_suffix = ''
+    for input_file_path in input_file_paths:
+        output_file_path = Path(output_path, f'{input_file_path.stem}{output_suffix}')
+        # The index of a bundle is written last.
+        current_file_path = output_file_path
+        if args.bundle:
+            current_file_path = Path(output_file_path, BUNDLE_INDEX_FILE_NAME)
+        if not args.force and is_output_current(input_file_path, current_file_path, 
+                                                dependency_file_paths):
+            continue
+        input_output_file_paths.append((input_file_path, output_file_path))
+    logger.info(f'Tagging {len(input_output_file_paths)} of '
+                f'{len(input_file_paths)} text files, the others are current.')
+
+    rate_limiter = RateLimiter(args.requests_per_second)
+    def tag_file(input_file_path: Path, output_file_path: Path) -> bool:
+        try:
+            write_labelled_json(api, input_file_path, output_file_path, 
+                                usas_tag_label, pos_tag_label, rate_limiter, 
+                                args.ndjson, bundle_page_size)
+        except Exception:
+            logger.exception(f'Failed to tag {input_file_path}')
+            return False
+        logger.info(f'Written {output_file_path}')
+        return True
+    
+    with ThreadPoolExecutor(args.workers) as executor:
+        successes = list(executor.map(lambda paths: tag_file(*paths), 
+                                      input_output_file_paths))
+    number_failed = successes.count(False)
+    if number_failed:
+        logger.error(f'Tagging failed for {number_failed} text files.')
+        sys.exit(1)
@@ -0,0 +1,180 @@
+from array import array
+import hashlib
+import heapq
+import math
+from typing import Any, Dict, Iterator, List, Set, Tuple
+
+
+class CountMinSketch():
+    '''
+    Count-min sketch, a fixed memory frequency table whose estimates are never
+    lower than the true count and, with probability `1 - delta`, are at most
+    `epsilon * total_count` higher than the true count.
+
+    Reference: Cormode and Muthukrishnan, An improved data stream summary:
+    the count-min sketch and its applications, 2005.
+    '''
+
+    def __init__(self, epsilon: float, delta: float) -> None:
+        '''
+        :param epsilon: Error of the estimates as a fraction of the total of
+                        all counts added.
+        :param delta: Probability that an estimate is outside the error bound.
+        :raises ValueError: If `epsilon` or `delta` are not between 0 and 1.
+        '''
+        if not 0 < epsilon < 1 or not 0 < delta < 1:
+            raise ValueError('Both epsilon and delta have to be between 0 and '
+                             f'1, epsilon: {epsilon}, delta: {delta}')
+        self.epsilon = epsilon
+        self.delta = delta
+        self.width = math.ceil(math.e / epsilon)
+        self.depth = math.ceil(math.log(1 / delta))
+        self._rows = [array('Q', bytes(8 * self.width)) for _ in range(self.depth)]
+        self.total_count = 0
+
+    def _indexes(self, key: str) -> Iterator[int]:
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        hash_1 = int.from_bytes(digest[:8], 'little')
+        hash_2 = int.from_bytes(digest[8:], 'little') | 1
+        for row_index in range(self.depth):
+            yield (hash_1 + row_index * hash_2) % self.width
+
+    def add(self, key: str, count: int = 1) -> int:
+        '''
+        :returns: The estimated count of the key after adding `count` to it.
+        '''
+        self.total_count += count
+        estimate = None
+        for row, index in zip(self._rows, self._indexes(key)):
+            row[index] += count
+            if estimate is None or row[index] < estimate:
+                estimate = row[index]
+        return estimate
+
+    def estimate(self, key: str) -> int:
+        return min(row[index] for row, index in zip(self._rows, self._indexes(key)))
+
+    @property
+    def error_bound(self) -> float:
+        '''
+        :returns: The maximum amount an estimate can be over the true count,
+                  with probability `1 - delta`.
+        '''
+        return self.epsilon * self.total_count
+
+    @property
+    def memory_bytes(self) -> int:
+        return self.width * self.depth * 8
+
+
+class HeavyHitters():
+    '''
+    Keeps at most `capacity` keys, those with the highest estimated counts
+    that are at least `threshold`. Evicting, or not being able to add, a key
+    whose estimate is at least the threshold means the capacity was too
+    small, this is recorded in `number_dropped`.
+    '''
+
+    def __init__(self, capacity: int, threshold: int) -> None:
+        self.capacity = capacity
+        self.threshold = threshold
+        self._estimates: Dict[str, int] = {}
+        # Min heap of (estimate, key), entries whose estimate is no longer the
+        # key's current estimate are skipped.
+        self._heap: List[Tuple[int, str]] = []
+        self.number_dropped = 0
+
+    def _pop_minimum(self) -> Tuple[int, str]:
+        while True:
+            estimate, key = heapq.heappop(self._heap)
+            if self._estimates.get(key) == estimate:
+                return estimate, key
+
+    def _peek_minimum(self) -> int:
+        while True:
+            estimate, key = self._heap[0]
+            if self._estimates.get(key) == estimate:
+                return estimate
+            heapq.heappop(self._heap)
+
+    def offer(self, key: str, estimate: int) -> None:
+        if estimate < self.threshold:
+            return
+        if key in self._estimates:
+            self._estimates[key] = estimate
+            heapq.heappush(self._heap, (estimate, key))
+            if len(self._heap) > 2 * self.capacity:
+                self._heap = [(value, a_key) for a_key, value in self._estimates.items()]
+                heapq.heapify(self._heap)
+            return
+        if len(self._estimates) >= self.capacity:
+            if estimate <= self._peek_minimum():
+                self.number_dropped += 1
+                return
+            _, evicted_key = self._pop_minimum()
+            del self._estimates[evicted_key]
+            self.number_dropped += 1
+        self._estimates[key] = estimate
+        heapq.heappush(self._heap, (estimate, key))
+
+    @property
+    def keys(self) -> Set[str]:
+        return set(self._estimates)
+
+
+class ApproximateCounts():
+    '''
+    Approximate first pass of the counting, a count-min sketch per kind of
+    count (tokens and USAS tags) in fixed memory of which the keys with an
+    estimated count of at least `minimum_count` are kept as candidates in a
+    bounded heavy hitters structure. As the sketch never under estimates a
+    count, if no candidates were dropped every token/tag with a true count of
+    at least `minimum_count` is a candidate. The candidates are then counted
+    exactly in a second pass.
+    '''
+
+    def __init__(self, epsilon: float, delta: float, capacity: int,
+                 minimum_count: int) -> None:
+        '''
+        :param epsilon: Error of the sketch estimates as a fraction of the
+                        total count, see `CountMinSketch`.
+        :param delta: Probability that a sketch estimate is outside of the
+                      error bound.
+        :param capacity: Maximum number of candidate tokens, and separately
+                         candidate USAS tags, to keep.
+        :param minimum_count: The minimum count for a token/tag to be a
+                              candidate.
+        '''
+        self.token_sketch = CountMinSketch(epsilon, delta)
+        self.usas_sketch = CountMinSketch(epsilon, delta)
+        self.token_candidates = HeavyHitters(capacity, minimum_count)
+        self.usas_candidates = HeavyHitters(capacity, minimum_count)
+
+    def update(self, token_counter: Dict[str, int],
+               usas_counter: Dict[str, int]) -> None:
+        '''
+        Adds the counts, e.g. the counts from one document.
+        '''
+        for token, count in token_counter.items():
+            self.token_candidates.offer(token, self.token_sketch.add(token, count))
+        for tag, count in usas_counter.items():
+            self.usas_candidates.offer(tag, self.usas_sketch.add(tag, count))
+
+    def report(self) -> Dict[str, Any]:
+        '''
+        :returns: The error bounds and the sizes of the approximate counting.
+        '''
+        _report: Dict[str, Any] = {}
+        for name, sketch, candidates in [('token', self.token_sketch, self.token_candidates),
+                                         ('usas', self.usas_sketch, self.usas_candidates)]:
+            _report[name] = {'epsilon': sketch.epsilon, 'delta': sketch.delta,
+                             'sketch width': sketch.width,
+                             'sketch depth': sketch.depth,
+                             'sketch memory (bytes)': sketch.memory_bytes,
+                             'total count': sketch.total_count,
+                             'maximum over estimate': sketch.error_bound,
+                             'number of candidates': len(candidates.keys),
+                             'candidate capacity': candidates.capacity,
+                             'number of candidates dropped': candidates.number_dropped,
+                             'all frequent items are candidates': candidates.number_dropped == 0}
+        return _report
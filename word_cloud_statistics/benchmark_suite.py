@@ -0,0 +1,241 @@
+import argparse
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+import json
+from pathlib import Path
+import random
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Tuple
+import typing
+
+from ucrel_api.api import UCREL_API
+
+from significance import extract_significant_key_words
+from token_filter import TokenFilter, count_tokens
+from usas_api_stand_in import FUNCTION_WORDS, WORD_USAS_TAGS, tag_token
+from usas_cache import USASCache
+from usas_json_reader import iter_usas_tokens
+from usas_tagging import tag_and_cache_text
+
+LETTERS = 'etaoinshrdlcumwfgypbvkjxqz'
+
+
+def synthetic_vocabulary(vocabulary_size: int, seed: int = 0
+                         ) -> Tuple[List[str], List[float]]:
+    '''
+    :returns: Words, the most frequent being the function words of the stand
+              in tagger, and their Zipf like weights, which is roughly the
+              distribution of words in a thesis.
+    '''
+    rng = random.Random(seed)
+    words = list(FUNCTION_WORDS)
+    seen_words = set(words)
+    while len(words) < vocabulary_size:
+        word = ''.join(rng.choice(LETTERS) for _ in range(rng.randint(3, 11)))
+        if word not in seen_words:
+            seen_words.add(word)
+            words.append(word)
+    weights = [1.0 / (rank + 1) for rank in range(vocabulary_size)]
+    return words, weights
+
+
+def synthetic_text(rng: random.Random, words: List[str], weights: List[float],
+                   number_words: int) -> str:
+    '''
+    :returns: Sentences of Zipf distributed words, with some digits and
+              commas, each sentence ending with a full stop.
+    '''
+    sentences: List[str] = []
+    text_words = rng.choices(words, weights, k=number_words)
+    index = 0
+    while index < number_words:
+        sentence_length = rng.randint(8, 30)
+        sentence_words = text_words[index:index + sentence_length]
+        index += sentence_length
+        if rng.random() < 0.2:
+            sentence_words.insert(rng.randrange(len(sentence_words) + 1),
+                                  str(rng.randint(1, 2020)))
+        if rng.random() < 0.5 and len(sentence_words) > 3:
+            comma_index = rng.randrange(1, len(sentence_words) - 1)
+            sentence_words[comma_index] += ','
+        sentence_words[0] = sentence_words[0].capitalize()
+        sentences.append(' '.join(sentence_words) + '.')
+    return ' '.join(sentences)
+
+
+def write_reference_files(directory: Path, words: List[str],
+                          weights: List[float], size: int
+                          ) -> Tuple[Dict[str, int], Dict[str, int], Path]:
+    '''
+    :returns: The reference token and USAS tag counts, the expected counts of
+              a `size` word corpus of the synthetic vocabulary with a slightly
+              different distribution, and the USAS tag summary file that the
+              SigEff binary requires.
+    '''
+    rng = random.Random(1)
+    total_weight = sum(weights)
+    reference_token_counter: Dict[str, int] = {}
+    reference_usas_counter: typing.Counter[str] = Counter()
+    for word, weight in zip(words, weights):
+        count = int(size * weight / total_weight * rng.uniform(0.5, 1.5))
+        if not count:
+            continue
+        reference_token_counter[word] = count
+        fields = tag_token(word)
+        if len(fields) == 4:
+            for usas_tag in fields[3].split()[0].split('/'):
+                reference_usas_counter[usas_tag] += count
+    semtag_summary_file_path = Path(directory, 'semtags.txt')
+    with semtag_summary_file_path.open('w') as semtag_file:
+        for tag in sorted(set(WORD_USAS_TAGS) | {'Z5', 'Z6', 'Z8', 'N1'}):
+            semtag_file.write(f'{tag}\tSynthetic tag {tag}\n')
+    return reference_token_counter, dict(reference_usas_counter), semtag_summary_file_path
+
+
+def single_run(number_documents: int, args: argparse.Namespace) -> Dict[str, Any]:
+    '''
+    Benchmarks the tagging, counting and significance testing of a synthetic
+    corpus of `number_documents` documents. This should be run in its own
+    process so that the peak RSS is only that of this corpus.
+    '''
+    words, weights = synthetic_vocabulary(args.vocabulary_size)
+    rng = random.Random(number_documents)
+    result: Dict[str, Any] = {'documents': number_documents}
+    with tempfile.TemporaryDirectory(dir=args.work_directory) as directory:
+        usas_cache = USASCache(Path(directory), 'benchmark')
+        ucrel_api = UCREL_API('benchmark@localhost', 'http://127.0.0.1',
+                              str(args.stand_in_port))
+        texts = [(f'document_{index}.txt',
+                  synthetic_text(rng, words, weights, args.words_per_document))
+                 for index in range(number_documents)]
+
+        start_time = time.perf_counter()
+        with ThreadPoolExecutor(args.tag_workers) as executor:
+            usas_file_paths = list(executor.map(
+                lambda name_text: tag_and_cache_text(ucrel_api, usas_cache,
+                                                     *name_text, {}),
+                texts))
+        tagging_seconds = time.perf_counter() - start_time
+        if any(usas_file_path is None for usas_file_path in usas_file_paths):
+            raise ValueError('Tagging failed, is the USAS API stand-in running?')
+        del texts
+        result['tagging (documents/second)'] = number_documents / tagging_seconds
+
+        token_filter = TokenFilter(remove_punctuation=True, remove_determiners=True,
+                                   remove_stop_words=True, remove_digits=True,
+                                   lower_case=True)
+        token_counter: typing.Counter[str] = Counter()
+        usas_counter: typing.Counter[str] = Counter()
+        token_usas_tag: Dict[str, typing.Counter[str]] = defaultdict(lambda: Counter())
+        number_tokens = 0
+        start_time = time.perf_counter()
+        for usas_file_path in usas_file_paths:
+            number_tokens += count_tokens(iter_usas_tokens(usas_file_path),
+                                          token_filter, token_counter,
+                                          usas_counter, token_usas_tag)
+        counting_seconds = time.perf_counter() - start_time
+        result['tokens'] = number_tokens
+        result['tagging (tokens/second)'] = number_tokens / tagging_seconds
+        result['counting (tokens/second)'] = number_tokens / counting_seconds
+
+        reference_token_counter, reference_usas_counter, semtag_summary_file_path = \
+            write_reference_files(Path(directory), words, weights, 10 * number_tokens)
+        start_time = time.perf_counter()
+        extract_significant_key_words(dict(token_counter), reference_token_counter,
+                                      args.sigeff_binary_file_path,
+                                      semtag_summary_file_path)
+        extract_significant_key_words(dict(usas_counter), reference_usas_counter,
+                                      args.sigeff_binary_file_path,
+                                      semtag_summary_file_path)
+        result['significance testing (seconds)'] = time.perf_counter() - start_time
+    # ru_maxrss is in kilobytes on Linux.
+    result['peak RSS (MB)'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return result
+
+
+def wait_for_port(port: int, timeout: float = 10.0) -> None:
+    end_time = time.monotonic() + timeout
+    while True:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1):
+                return
+        except OSError:
+            if time.monotonic() > end_time:
+                raise
+            time.sleep(0.1)
+
+
+if __name__ == '__main__':
+    description = ('Benchmarks the tagging throughput, the counting tokens per '
+                   'second, the significance testing time and the peak RSS of '
+                   'token_tag_statistics.py on synthetic corpora of different '
+                   'numbers of documents. Tagging is done by the local USAS '
+                   'API stand-in, usas_api_stand_in.py, which is started by '
+                   'this script. Each corpus size is run in its own process.')
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('sigeff_binary_file_path', type=Path,
+                        help='File path to the SigEff C binary')
+    parser.add_argument('--document-counts', type=int, nargs='+',
+                        default=[10, 100, 1000],
+                        help='Number of documents of each synthetic corpus, '
+                             'up to 100000.')
+    parser.add_argument('--words-per-document', type=int, default=500)
+    parser.add_argument('--vocabulary-size', type=int, default=50000)
+    parser.add_argument('--tag-workers', type=int, default=4,
+                        help='Number of documents tagged at the same time.')
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='Latency of the USAS API stand-in in seconds.')
+    parser.add_argument('--stand-in-port', type=int, default=8099)
+    parser.add_argument('--work-directory', type=Path,
+                        help='Directory for the temporary corpora, by default '
+                             'the system temporary directory.')
+    parser.add_argument('--report', type=Path,
+                        help='File path to write the results to in JSON format.')
+    parser.add_argument('--single-run', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single_run is not None:
+        print(json.dumps(single_run(args.single_run, args)))
+        sys.exit(0)
+
+    script_directory = Path(__file__).resolve().parent
+    stand_in = subprocess.Popen([sys.executable, 'usas_api_stand_in.py',
+                                 '--port', str(args.stand_in_port),
+                                 '--latency', str(args.latency)],
+                                cwd=script_directory, stdout=subprocess.DEVNULL)
+    results: List[Dict[str, Any]] = []
+    try:
+        wait_for_port(args.stand_in_port)
+        for number_documents in args.document_counts:
+            completed = subprocess.run([sys.executable, Path(__file__).name,
+                                        str(args.sigeff_binary_file_path),
+                                        '--single-run', str(number_documents),
+                                        '--words-per-document', str(args.words_per_document),
+                                        '--vocabulary-size', str(args.vocabulary_size),
+                                        '--tag-workers', str(args.tag_workers),
+                                        '--stand-in-port', str(args.stand_in_port)]
+                                       + (['--work-directory', str(args.work_directory)]
+                                          if args.work_directory else []),
+                                       cwd=script_directory, check=True,
+                                       stdout=subprocess.PIPE, text=True)
+            result = json.loads(completed.stdout.strip().splitlines()[-1])
+            results.append(result)
+            print(', '.join(f'{name}: {value:,.1f}' if isinstance(value, float)
+                            else f'{name}: {value:,}'
+                            for name, value in result.items()), flush=True)
+    finally:
+        stand_in.terminate()
+        stand_in.wait()
+
+    if args.report is not None:
+        with args.report.open('w') as report_file:
+            json.dump({'words per document': args.words_per_document,
+                       'vocabulary size': args.vocabulary_size,
+                       'tag workers': args.tag_workers,
+                       'stand-in latency (seconds)': args.latency,
+                       'results': results}, report_file, indent=2)
@@ -0,0 +1,143 @@
+import argparse
+from collections import Counter, defaultdict
+import random
+from pathlib import Path
+import time
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+import typing
+
+from token_filter import (DETERMINER_TAGS, DIGIT_TAGS, PUNCTUATION_SYMBOLS,
+                          STOP_WORDS, TokenFilter, count_tokens)
+from usas_json_reader import TokenTuple, iter_usas_tokens
+
+def per_token_counting(tokens: Iterable[TokenTuple], remove_punctuation: bool,
+                       remove_determiners: bool, remove_stop_words: bool,
+                       remove_digits: bool, lower_case: bool
+                       ) -> Tuple[typing.Counter[str], typing.Counter[str],
+                                  Dict[str, typing.Counter[str]]]:
+    '''
+    The counting loop as it was before `TokenFilter`, whereby every flag is 
+    re-checked for every token. This is only used as the baseline of the 
+    benchmark.
+    '''
+    token_counter = Counter()
+    token_usas_tag: Dict[str, typing.Counter[str]] = defaultdict(lambda: Counter())
+    usas_counter = Counter()
+    token_texts: List[str] = []
+    token_usas_tags: List[str] = []
+    for token_text, lemma, pos_tag, usas_tag in tokens:
+        if lower_case:
+            token_text = token_text.lower()
+
+        if remove_punctuation and token_text in PUNCTUATION_SYMBOLS:
+            continue
+        if lemma is not None:
+            if remove_punctuation and lemma == 'PUNC':
+                continue
+        if pos_tag is not None:
+            if remove_determiners and pos_tag in DETERMINER_TAGS:
+                continue
+            if remove_digits and pos_tag in DIGIT_TAGS:
+                continue
+        if remove_stop_words and token_text.lower() in STOP_WORDS:
+            continue
+
+        token_texts.append(token_text)
+        if usas_tag is not None:
+            all_usas_tags = usas_tag.split('/')
+            for a_tag in all_usas_tags:
+                token_usas_tags.append(a_tag)
+            if all_usas_tags:
+                token_usas_tag[token_text].update(all_usas_tags)
+    token_counter.update(token_texts)
+    usas_counter.update(token_usas_tags)
+    return token_counter, usas_counter, token_usas_tag
+
+def compiled_counting(tokens: Iterable[TokenTuple], **flags: bool
+                      ) -> Tuple[typing.Counter[str], typing.Counter[str],
+                                 Dict[str, typing.Counter[str]]]:
+    token_counter = Counter()
+    token_usas_tag: Dict[str, typing.Counter[str]] = defaultdict(lambda: Counter())
+    usas_counter = Counter()
+    count_tokens(tokens, TokenFilter(**flags), token_counter, usas_counter,
+                 token_usas_tag)
+    return token_counter, usas_counter, token_usas_tag
+
+def synthetic_tokens(number_tokens: int, vocabulary_size: int,
+                     seed: int = 0) -> List[TokenTuple]:
+    '''
+    :returns: Tokens whose word types follow a Zipf like distribution, which
+              is roughly the distribution of word types in a thesis.
+    '''
+    rng = random.Random(seed)
+    stop_words = sorted(STOP_WORDS)
+    punctuation = sorted(PUNCTUATION_SYMBOLS)
+    vocabulary: List[TokenTuple] = []
+    for index in range(vocabulary_size):
+        if index % 10 == 0:
+            word = rng.choice(punctuation)
+            vocabulary.append((word, 'PUNC', word, None))
+        elif index % 5 == 0:
+            word = rng.choice(stop_words).title()
+            vocabulary.append((word, word.lower(), 'DD1', 'Z5'))
+        elif index % 7 == 0:
+            vocabulary.append((str(index), str(index), 'MC', 'N1'))
+        else:
+            word = f'Word{index}'
+            vocabulary.append((word, word.lower(), 'NN1', 'A1.1.1'))
+    weights = [1.0 / (rank + 1) for rank in range(vocabulary_size)]
+    return rng.choices(vocabulary, weights, k=number_tokens)
+
+def tokens_per_second(tokens: List[TokenTuple],
+                      counting_function: Callable[..., Any], repeats: int,
+                      **flags: bool) -> float:
+    best_time = float('inf')
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        counting_function(tokens, **flags)
+        best_time = min(best_time, time.perf_counter() - start_time)
+    return len(tokens) / best_time
+
+if __name__ == '__main__':
+    description = ('Micro-benchmark of the counting loop of '
+                   'token_tag_statistics.py, compares the tokens per second '
+                   'of the per token flag checks against the compiled '
+                   '`TokenFilter` with `count_tokens`, with all filtering '
+                   'flags on.')
+    usas_caching_directory_help = ('Optional directory of cached USAS JSON '
+                                   'files to benchmark on, if not given a '
+                                   'synthetic token stream is used.')
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('--usas-caching-directory', type=Path,
+                        help=usas_caching_directory_help)
+    parser.add_argument('--number-tokens', type=int, default=1000000,
+                        help='Number of synthetic tokens.')
+    parser.add_argument('--vocabulary-size', type=int, default=20000,
+                        help='Number of synthetic word types.')
+    parser.add_argument('--repeats', type=int, default=3,
+                        help='Number of times to run each filter, the best '
+                             'time is reported.')
+    args = parser.parse_args()
+
+    if args.usas_caching_directory is not None:
+        tokens = []
+        for usas_file_path in sorted(args.usas_caching_directory.glob('*.json')):
+            tokens.extend(iter_usas_tokens(usas_file_path))
+    else:
+        tokens = synthetic_tokens(args.number_tokens, args.vocabulary_size)
+
+    flags = dict(remove_punctuation=True, remove_determiners=True,
+                 remove_stop_words=True, remove_digits=True, lower_case=True)
+    baseline_counts = per_token_counting(tokens, **flags)
+    compiled_counts = compiled_counting(tokens, **flags)
+    if baseline_counts != compiled_counts:
+        raise ValueError('The counts from the two counting loops are different.')
+
+    baseline_speed = tokens_per_second(tokens, per_token_counting, args.repeats,
+                                       **flags)
+    compiled_speed = tokens_per_second(tokens, compiled_counting, args.repeats,
+                                       **flags)
+    print(f'Number of tokens: {len(tokens)}')
+    print(f'Per token flag checks: {baseline_speed:,.0f} tokens/second')
+    print(f'Compiled TokenFilter: {compiled_speed:,.0f} tokens/second')
+    print(f'Speed up: {compiled_speed / baseline_speed:.2f}x')
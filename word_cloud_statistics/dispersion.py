@@ -0,0 +1,91 @@
+from array import array
+import math
+from typing import Dict, Iterable, Mapping, Optional, Tuple
+
+
+class DocumentCounts():
+    '''
+    The count of each token/tag in each document, stored sparsely: for each
+    token/tag the indexes of only the documents it occurs in and its counts
+    in those documents, in two compact unsigned int arrays, and the size of
+    each document, the total of its counts.
+
+    From these the dispersion of a token/tag across the documents is
+    computed, so that a token used many times in one thesis can be told
+    apart from one used evenly across many theses.
+
+    References: Juilland and Chang-Rodríguez, Frequency dictionary of Spanish
+    words, 1964, and Gries, Dispersions and adjusted frequencies in corpora,
+    2008.
+    '''
+
+    def __init__(self) -> None:
+        self.document_sizes = array('Q')
+        self._counts: Dict[str, Tuple[array, array]] = {}
+
+    def add_document(self, counter: Mapping[str, int]) -> None:
+        '''
+        :param counter: The token/tag counts of the next document.
+        '''
+        document_index = len(self.document_sizes)
+        self.document_sizes.append(sum(counter.values()))
+        counts = self._counts
+        for key, count in counter.items():
+            key_counts = counts.get(key)
+            if key_counts is None:
+                key_counts = (array('I'), array('I'))
+                counts[key] = key_counts
+            key_counts[0].append(document_index)
+            key_counts[1].append(count)
+
+    def dispersion(self, keys: Optional[Iterable[str]] = None
+                   ) -> Dict[str, Dict[str, Optional[float]]]:
+        '''
+        Only the documents that a token/tag occurs in are visited, the
+        documents it does not occur in are accounted for through the sums
+        over all of the documents.
+
+        :param keys: The tokens/tags to compute the dispersion of, by default
+                     all of them.
+        :returns: For each token/tag, the `Document Frequency`, the number of
+                  documents it occurs in, `Juilland's D`, from 0 (in one
+                  document) to 1 (the same relative frequency in every
+                  document), which is None if there are less than 2
+                  documents, and Gries' `DP`, from 0 (used in proportion to
+                  the document sizes) to almost 1 (in one document).
+        '''
+        document_sizes = self.document_sizes
+        corpus_size = sum(document_sizes)
+        # Juilland's D is computed over the documents with at least one
+        # token/tag.
+        number_documents = sum(1 for size in document_sizes if size)
+        if keys is None:
+            keys = self._counts
+        results: Dict[str, Dict[str, Optional[float]]] = {}
+        for key in keys:
+            key_counts = self._counts.get(key)
+            if key_counts is None:
+                continue
+            document_indexes, counts = key_counts
+            key_total = sum(counts)
+            sizes = [document_sizes[index] for index in document_indexes]
+
+            relative_frequencies = [count / size for count, size in zip(counts, sizes)]
+            juilland_d: Optional[float] = None
+            if number_documents > 1:
+                mean = sum(relative_frequencies) / number_documents
+                variance = (sum(frequency * frequency for frequency in relative_frequencies)
+                            / number_documents) - mean * mean
+                standard_deviation = math.sqrt(max(variance, 0.0))
+                juilland_d = 1 - (standard_deviation / mean) / math.sqrt(number_documents - 1)
+
+            # DP = 0.5 * sum(|v_i - s_i|) over all documents, whereby v_i is 0
+            # for the documents the token/tag is not in.
+            size_proportions = [size / corpus_size for size in sizes]
+            dp = 0.5 * (sum(abs(count / key_total - size_proportion)
+                            for count, size_proportion in zip(counts, size_proportions))
+                        + 1 - sum(size_proportions))
+            results[key] = {'Document Frequency': len(counts),
+                            "Juilland's D": None if juilland_d is None else round(juilland_d, 4),
+                            'DP': round(dp, 4)}
+        return results
@@ -0,0 +1,214 @@
+from collections import Counter
+import heapq
+import itertools
+import json
+from pathlib import Path
+import sys
+import tempfile
+from typing import Dict, Iterator, List, Mapping, Optional, Set, Tuple, Union
+import typing
+
+# A token, a USAS tag or a (token, USAS tag) pair.
+CountKey = Union[str, Tuple[str, str]]
+# Rough number of bytes used by each dictionary entry excluding the key, this
+# is the dictionary slot, the list of count and sequence number and the two
+# ints within it.
+ENTRY_OVERHEAD_BYTES = 180
+
+
+def _key_size(key: CountKey) -> int:
+    if isinstance(key, tuple):
+        return sys.getsizeof(key) + sum(sys.getsizeof(value) for value in key)
+    return sys.getsizeof(key)
+
+
+class _SpillingCounts():
+    '''
+    Counts of one kind of key, of which the counts in memory are written to
+    disk as a run sorted by key when `spill` is called. Each key also stores
+    the sequence number of when it was first counted, so that the merged
+    counts can be returned in the same order as an in memory `Counter` would
+    have returned them.
+    '''
+
+    def __init__(self, name: str, spill_directory: Path) -> None:
+        self.name = name
+        self._spill_directory = spill_directory
+        self._counts: Dict[CountKey, List[int]] = {}
+        self._run_file_paths: List[Path] = []
+        self.estimated_bytes = 0
+
+    def add(self, key: CountKey, count: int, sequence_number: int) -> bool:
+        '''
+        :returns: True if the key was not already in memory.
+        '''
+        count_sequence = self._counts.get(key)
+        if count_sequence is None:
+            self._counts[key] = [count, sequence_number]
+            self.estimated_bytes += _key_size(key) + ENTRY_OVERHEAD_BYTES
+            return True
+        count_sequence[0] += count
+        return False
+
+    def spill(self) -> None:
+        '''
+        Writes the counts in memory to a new run file sorted by key and then
+        removes them from memory.
+        '''
+        if not self._counts:
+            return
+        run_file_path = Path(self._spill_directory,
+                             f'{self.name}_{len(self._run_file_paths)}.jsonl')
+        with run_file_path.open('w') as run_file:
+            for key in sorted(self._counts):
+                count, sequence_number = self._counts[key]
+                json_key = list(key) if isinstance(key, tuple) else key
+                run_file.write(json.dumps([json_key, count, sequence_number]))
+                run_file.write('\n')
+        self._run_file_paths.append(run_file_path)
+        self._counts = {}
+        self.estimated_bytes = 0
+
+    @staticmethod
+    def _read_run(run_file_path: Path) -> Iterator[Tuple[CountKey, int, int]]:
+        with run_file_path.open('r') as run_file:
+            for line in run_file:
+                key, count, sequence_number = json.loads(line)
+                if isinstance(key, list):
+                    key = tuple(key)
+                yield key, count, sequence_number
+
+    def merged(self) -> Iterator[Tuple[CountKey, int, int]]:
+        '''
+        K-way streaming merge of all of the runs on disk and the counts still
+        in memory.
+
+        :returns: Yields (key, total count, first sequence number) in key order.
+        '''
+        in_memory_run = ((key, count, sequence_number) for key, (count, sequence_number)
+                         in sorted(self._counts.items()))
+        runs = [self._read_run(run_file_path) for run_file_path in self._run_file_paths]
+        runs.append(in_memory_run)
+        merged_runs = heapq.merge(*runs, key=lambda record: record[0])
+        for key, records in itertools.groupby(merged_runs, key=lambda record: record[0]):
+            total_count = 0
+            first_sequence_number = None
+            for _, count, sequence_number in records:
+                total_count += count
+                if first_sequence_number is None or sequence_number < first_sequence_number:
+                    first_sequence_number = sequence_number
+            yield key, total_count, first_sequence_number
+
+
+class ExternalCounts():
+    '''
+    Memory bounded alternative to keeping the token, USAS tag, and token to
+    USAS tag counters in memory for the whole corpus. Once the estimated
+    memory of the counts exceeds `max_memory_bytes` they are spilt to disk as
+    sorted runs, the runs are then merged with a k-way streaming merge when
+    the counts are required. The merged counts are exactly the same,
+    including the order of the keys, as those from the in memory counters.
+    '''
+
+    def __init__(self, max_memory_bytes: int,
+                 spill_directory: Optional[Path] = None) -> None:
+        '''
+        :param max_memory_bytes: Estimated memory the counts can use before
+                                 they are spilt to disk.
+        :param spill_directory: Directory to create the temporary directory
+                                that stores the runs in. If None the default
+                                temporary directory is used.
+        '''
+        self.max_memory_bytes = max_memory_bytes
+        self._temporary_directory = tempfile.TemporaryDirectory(prefix='token_tag_counts_',
+                                                                dir=spill_directory)
+        directory = Path(self._temporary_directory.name)
+        self.token_counts = _SpillingCounts('token', directory)
+        self.usas_counts = _SpillingCounts('usas', directory)
+        self.token_usas_counts = _SpillingCounts('token_usas', directory)
+        self._all_counts = [self.token_counts, self.usas_counts,
+                            self.token_usas_counts]
+        self._sequence_number = 0
+        self.number_of_spills = 0
+
+    def __enter__(self) -> 'ExternalCounts':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        '''
+        Deletes all of the runs on disk.
+        '''
+        self._temporary_directory.cleanup()
+
+    def _add(self, counts: _SpillingCounts, key: CountKey, count: int) -> None:
+        if counts.add(key, count, self._sequence_number):
+            self._sequence_number += 1
+
+    def update(self, token_counter: Mapping[str, int],
+               usas_counter: Mapping[str, int],
+               token_usas_tag: Mapping[str, Mapping[str, int]]) -> None:
+        '''
+        Adds the counts, e.g. the counts from one document, and spills all of
+        the counts to disk if they are estimated to use more than
+        `max_memory_bytes`.
+        '''
+        for token, count in token_counter.items():
+            self._add(self.token_counts, token, count)
+        for tag, count in usas_counter.items():
+            self._add(self.usas_counts, tag, count)
+        for token, tag_counts in token_usas_tag.items():
+            for tag, count in tag_counts.items():
+                self._add(self.token_usas_counts, (token, tag), count)
+
+        estimated_bytes = sum(counts.estimated_bytes for counts in self._all_counts)
+        if estimated_bytes > self.max_memory_bytes:
+            for counts in self._all_counts:
+                counts.spill()
+            self.number_of_spills += 1
+
+    @staticmethod
+    def _in_first_counted_order(records: List[Tuple[int, CountKey, int]]
+                                ) -> Iterator[Tuple[CountKey, int]]:
+        for _, key, count in sorted(records, key=lambda record: record[0]):
+            yield key, count
+
+    def _counts(self, counts: _SpillingCounts,
+                min_count: int) -> Dict[str, int]:
+        records = [(sequence_number, key, count)
+                   for key, count, sequence_number in counts.merged()
+                   if count >= min_count]
+        return dict(self._in_first_counted_order(records))
+
+    def token_counter(self, min_count: int = 1) -> Dict[str, int]:
+        '''
+        :param min_count: Only tokens that occur at least this many times are
+                          returned, which is what keeps the returned
+                          dictionary small.
+        :returns: The token counts in the order the tokens were first counted.
+        '''
+        return self._counts(self.token_counts, min_count)
+
+    def usas_counter(self, min_count: int = 1) -> Dict[str, int]:
+        '''
+        :param min_count: Only USAS tags that occur at least this many times
+                          are returned.
+        :returns: The USAS tag counts in the order the tags were first counted.
+        '''
+        return self._counts(self.usas_counts, min_count)
+
+    def token_usas_tag(self, tokens: Set[str]) -> Dict[str, typing.Counter[str]]:
+        '''
+        :param tokens: The tokens to return the USAS tag counts for.
+        :returns: For each of the given tokens the count of each USAS tag that
+                  was associated with it, the tags are in the order they were
+                  first counted.
+        '''
+        records: Dict[str, List[Tuple[int, CountKey, int]]] = {token: [] for token in tokens}
+        for (token, tag), count, sequence_number in self.token_usas_counts.merged():
+            if token in records:
+                records[token].append((sequence_number, tag, count))
+        return {token: Counter(dict(self._in_first_counted_order(token_records)))
+                for token, token_records in records.items()}
@@ -0,0 +1,141 @@
+import csv
+import json
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from shard_counts import ShardCounts
+
+
+def read_facet_metadata(_file_path: Path) -> Dict[str, Dict[str, str]]:
+    '''
+    :param _file_path: The metadata sidecar of the texts. Either a JSON object
+                       of text name to an object of facet name to value e.g.
+                       `{"thesis.txt": {"year": "2019", "degree": "PhD"}}`, or
+                       a CSV file (`.csv` suffix) whose first column is the
+                       text name and whose other columns are the facets, named
+                       by the header row. The text name is either the text
+                       file name or the file name without the suffix.
+    :returns: The facet values of each text, all of the values are strings.
+    '''
+    if _file_path.suffix.lower() == '.csv':
+        with _file_path.open('r', newline='') as _file:
+            reader = csv.reader(_file)
+            facet_names = next(reader)[1:]
+            return {row[0]: dict(zip(facet_names, row[1:])) for row in reader if row}
+    with _file_path.open('r') as _file:
+        metadata = json.load(_file)
+    return {name: {facet: str(value) for facet, value in values.items()}
+            for name, values in metadata.items()}
+
+
+def text_facet_values(metadata: Mapping[str, Mapping[str, str]],
+                      text_name: str) -> Optional[Mapping[str, str]]:
+    '''
+    :param metadata: The output of `read_facet_metadata`.
+    :param text_name: The text file name.
+    :returns: The facet values of the text, None if it is not in the metadata.
+    '''
+    facet_values = metadata.get(text_name)
+    if facet_values is None:
+        facet_values = metadata.get(Path(text_name).stem)
+    return facet_values
+
+
+class FacetCube():
+    '''
+    The counts of the texts aggregated by their facet values, e.g. year,
+    department, and degree type, whereby each cell of the cube is the
+    `shard_counts.ShardCounts` of all of the texts with the same combination
+    of facet values. The counts of any slice of the texts, e.g. all of the
+    PhD theses from 2019, are the merge of the cells in the slice, so the
+    significant tokens and USAS tags of a slice are found without reading the
+    texts again. As the merged counts are in the same order as counting the
+    texts of the slice on their own, the output for a slice is the same as a
+    full run over only those texts.
+    '''
+
+    def __init__(self, facet_names: Iterable[str], settings: Mapping[str, Any]) -> None:
+        '''
+        :param facet_names: The names of the facets.
+        :param settings: The settings used to count, see
+                         `shard_counts.ShardCounts`.
+        '''
+        self.facet_names: List[str] = sorted(set(facet_names))
+        self.settings = dict(settings)
+        # Facet values, in the order of `facet_names`, to the counts of the
+        # texts with those values. A text without a value for a facet has
+        # the value None.
+        self.cells: Dict[Tuple[Optional[str], ...], ShardCounts] = {}
+
+    def update(self, document_name: str, facet_values: Mapping[str, str],
+               token_counter: Mapping[str, int], usas_counter: Mapping[str, int],
+               token_usas_tag: Mapping[str, Mapping[str, int]]) -> None:
+        '''
+        Adds the counts of one document to the cell of its facet values, see
+        `shard_counts.ShardCounts.update`.
+
+        :param document_name: Unique name of the document.
+        :param facet_values: The facet values of the document.
+        '''
+        key = tuple(facet_values.get(facet_name) for facet_name in self.facet_names)
+        cell = self.cells.get(key)
+        if cell is None:
+            cell = ShardCounts(self.settings)
+            self.cells[key] = cell
+        cell.update(document_name, token_counter, usas_counter, token_usas_tag)
+
+    def slice(self, selection: Mapping[str, Iterable[str]]) -> ShardCounts:
+        '''
+        :param selection: For each facet to select on, the values to select,
+                          e.g. `{'year': ['2019', '2020'], 'degree': ['PhD']}`.
+                          A text is in the slice if for every facet its value
+                          is one of the selected values.
+        :returns: The counts of the texts in the slice.
+        :raises ValueError: If a facet is not in the cube.
+        '''
+        unknown_facets = set(selection).difference(self.facet_names)
+        if unknown_facets:
+            raise ValueError(f'The facets {sorted(unknown_facets)} are not in the '
+                             f'facet cube, its facets are: {self.facet_names}')
+        selected_values = [(index, set(selection[facet_name]))
+                           for index, facet_name in enumerate(self.facet_names)
+                           if facet_name in selection]
+        counts = ShardCounts(self.settings)
+        for key, cell in self.cells.items():
+            if all(key[index] in values for index, values in selected_values):
+                counts.merge(cell)
+        return counts
+
+    def facet_values(self) -> Dict[str, Dict[Optional[str], int]]:
+        '''
+        :returns: For each facet, the number of texts with each of its values.
+        '''
+        facet_values: Dict[str, Dict[Optional[str], int]] = {facet_name: {}
+                                                             for facet_name in self.facet_names}
+        for key, cell in self.cells.items():
+            for facet_name, value in zip(self.facet_names, key):
+                value_counts = facet_values[facet_name]
+                value_counts[value] = value_counts.get(value, 0) + len(cell.documents)
+        return facet_values
+
+    def save(self, _file_path: Path) -> None:
+        '''
+        :param _file_path: File to store the cube in JSON format.
+        '''
+        data = {'facets': self.facet_names, 'settings': self.settings,
+                'cells': [{'values': list(key), 'counts': cell.to_dict()}
+                          for key, cell in self.cells.items()]}
+        with _file_path.open('w') as _file:
+            json.dump(data, _file)
+
+    @classmethod
+    def load(cls, _file_path: Path) -> 'FacetCube':
+        '''
+        :param _file_path: File created by `save`.
+        '''
+        with _file_path.open('r') as _file:
+            data = json.load(_file)
+        facet_cube = cls(data['facets'], data['settings'])
+        for cell in data['cells']:
+            facet_cube.cells[tuple(cell['values'])] = ShardCounts.from_dict(cell['counts'])
+        return facet_cube
@@ -0,0 +1,187 @@
+import json
+from pathlib import Path
+import sqlite3
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# The log-likelihood critical values of each significance level, 1 degree of
+# freedom.
+LOG_LIKELIHOOD_CRITICAL_VALUES = {0.05: 3.84, 0.01: 6.63, 0.001: 10.83,
+                                  0.0001: 15.13}
+# The direction of the difference in SigEff, `+` the token/tag is used more
+# in the target corpus than the reference corpus, `-` less.
+DIRECTIONS = {'overused': ('+',), 'underused': ('-',), 'both': ('+', '-')}
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS keyness (
+    kind TEXT NOT NULL,
+    item TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    direction TEXT NOT NULL,
+    target_frequency INTEGER NOT NULL,
+    target_relative_frequency REAL,
+    reference_frequency INTEGER NOT NULL,
+    reference_relative_frequency REAL,
+    log_likelihood REAL,
+    percent_difference REAL,
+    bayes_factor REAL,
+    effect_size_log_likelihood REAL,
+    relative_risk REAL,
+    log_ratio REAL,
+    odds_ratio REAL,
+    common_usas_tags TEXT,
+    PRIMARY KEY (kind, item)
+);
+CREATE INDEX IF NOT EXISTS keyness_log_likelihood
+    ON keyness (kind, direction, log_likelihood);
+CREATE INDEX IF NOT EXISTS keyness_target_frequency
+    ON keyness (kind, target_frequency);
+CREATE TABLE IF NOT EXISTS metadata (
+    name TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+'''
+
+
+def parse_sigeff_output(lines: Iterable[str]) -> Iterator[Tuple[Any, ...]]:
+    '''
+    :param lines: The lines of the SigEff output.
+    :returns: Yields for every token/tag, in the order of the output, its
+              token/tag, direction, target frequency, target relative
+              frequency, reference frequency, reference relative frequency,
+              log-likelihood, %DIFF, Bayes factor, effect size for the
+              log-likelihood, relative risk, log ratio, and odds ratio.
+    '''
+    for line_index, line in enumerate(lines):
+        # The first line only contains the total and the second are the headers
+        if line_index == 0 or line_index == 1:
+            continue
+        line_data = line.split()
+        number_fields = len(line_data)
+        number_error = (f'number of fields on line {line_index} is {number_fields}'
+                        f' when it should be at least 13.')
+        assert number_fields > 12, number_error
+        yield (line_data[0], line_data[5], int(line_data[1]), float(line_data[2]),
+               int(line_data[3]), float(line_data[4]),
+               *[float(value) for value in line_data[6:13]])
+
+
+class KeynessTable():
+    '''
+    The complete SigEff output, every token/tag in both directions with all
+    of the measures, of the tokens and the USAS tags stored in a SQLite
+    database, indexed so that the significant tokens/tags at any
+    significance level, frequency cut-off, direction, or top N are a range
+    query rather than running SigEff again.
+
+    The SigEff totals are those of the tokens/tags with at least the minimum
+    frequency the table was built with, therefore querying with a higher
+    minimum frequency only removes the less frequent tokens/tags, it does not
+    recompute the statistics with the totals of the remaining ones.
+    '''
+
+    def __init__(self, database_path: Path) -> None:
+        '''
+        :param database_path: File path of the SQLite database, created if it
+                              does not exist.
+        '''
+        self.database_path = database_path
+        self.connection = sqlite3.connect(str(database_path))
+        self.connection.executescript(_SCHEMA)
+
+    def add_sigeff_output(self, kind: str, sigeff_lines: Iterable[str],
+                          common_usas_tags: Optional[Dict[str, List[Tuple[str, float]]]] = None
+                          ) -> int:
+        '''
+        :param kind: What the SigEff output is of, `token` or `usas`.
+        :param sigeff_lines: The lines of the SigEff output.
+        :param common_usas_tags: The most common USAS tags of each token, see
+                                 `significance.common_usas_tags`.
+        :returns: The number of tokens/tags added.
+        '''
+        if common_usas_tags is None:
+            common_usas_tags = {}
+        rows = []
+        for position, row in enumerate(parse_sigeff_output(sigeff_lines)):
+            item = row[0]
+            tags = common_usas_tags.get(item)
+            rows.append((kind, item, position, *row[1:],
+                         None if tags is None else json.dumps(tags)))
+        with self.connection:
+            self.connection.execute('DELETE FROM keyness WHERE kind = ?', (kind,))
+            self.connection.executemany('INSERT INTO keyness VALUES '
+                                        '(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                                        rows)
+        return len(rows)
+
+    def set_metadata(self, name: str, value: Any) -> None:
+        '''
+        :param name: Name of the metadata e.g. `minimum_frequency`.
+        :param value: JSON serialisable value.
+        '''
+        with self.connection:
+            self.connection.execute('INSERT OR REPLACE INTO metadata VALUES (?, ?)',
+                                    (name, json.dumps(value)))
+
+    def metadata(self, name: str) -> Any:
+        '''
+        :param name: Name of the metadata.
+        :returns: The value of the metadata.
+        :raises KeyError: If the metadata does not exist.
+        '''
+        row = self.connection.execute('SELECT value FROM metadata WHERE name = ?',
+                                      (name,)).fetchone()
+        if row is None:
+            raise KeyError(f'{name} is not in the metadata of {self.database_path}')
+        return json.loads(row[0])
+
+    def query(self, kind: str, minimum_log_likelihood: float,
+              minimum_frequency: int = 0, direction: str = 'overused',
+              top_n: Optional[int] = None,
+              exclude: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        '''
+        :param kind: `token` or `usas`.
+        :param minimum_log_likelihood: Minimum log-likelihood of a token/tag
+                                       e.g. a value of
+                                       `LOG_LIKELIHOOD_CRITICAL_VALUES`.
+        :param minimum_frequency: Minimum frequency of a token/tag in the
+                                  target corpus.
+        :param direction: `overused`, `underused`, or `both`, see
+                          `DIRECTIONS`.
+        :param top_n: Only the `top_n` tokens/tags with the largest
+                      log-likelihood.
+        :param exclude: Tokens/tags that contain this are excluded e.g. `Z9`
+                        for the USAS tags Z9 and Z99.
+        :returns: The tokens/tags in the format of the token and usas output
+                  files of `token_tag_statistics.py`, in the order of the
+                  SigEff output, or by descending log-likelihood if `top_n`
+                  is given. The tokens also have their most common USAS tags.
+        '''
+        directions = DIRECTIONS[direction]
+        sql = ('SELECT item, log_likelihood, log_ratio, target_frequency, '
+               'target_relative_frequency, common_usas_tags FROM keyness '
+               f'WHERE kind = ? AND direction IN ({", ".join("?" * len(directions))}) '
+               'AND log_likelihood >= ? AND target_frequency >= ? ')
+        parameters: List[Any] = [kind, *directions, minimum_log_likelihood,
+                                 minimum_frequency]
+        if exclude is not None:
+            sql += 'AND instr(item, ?) = 0 '
+            parameters.append(exclude)
+        if top_n is not None:
+            sql += 'ORDER BY log_likelihood DESC, position LIMIT ?'
+            parameters.append(top_n)
+        else:
+            sql += 'ORDER BY position'
+        results: Dict[str, Dict[str, Any]] = {}
+        for item, log_likelihood, log_ratio, frequency, relative_frequency, tags \
+                in self.connection.execute(sql, parameters):
+            values = {'Log Likelihood': log_likelihood, 'Log Ratio': log_ratio,
+                      'Frequency': frequency,
+                      'Relative Frequency (%)': relative_frequency}
+            if kind == 'token':
+                values['Common associated USAS tags (%)'] = \
+                    [tuple(tag) for tag in json.loads(tags)] if tags else []
+            results[item] = values
+        return results
+
+    def close(self) -> None:
+        self.connection.close()
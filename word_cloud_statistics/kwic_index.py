@@ -0,0 +1,334 @@
+import argparse
+from array import array
+import json
+import logging
+import mmap
+from pathlib import Path
+import struct
+import sys
+from typing import (Any, Callable, Dict, Iterable, Iterator, List, Mapping,
+                    Optional, Tuple, TYPE_CHECKING)
+
+from usas_json_reader import TokenTuple, iter_usas_tokens
+
+if TYPE_CHECKING:
+    from token_filter import TokenFilter
+
+MAGIC = b'KWICIDX1'
+# The kinds of term in the index, the counted token texts and the USAS tags.
+KINDS = ['token', 'usas']
+
+logger = logging.getLogger(__name__)
+
+
+def encode_varint(value: int, output: bytearray) -> None:
+    '''
+    Appends the unsigned integer to the output in the LEB128 variable length
+    encoding, 7 bits per byte, so that small integers, e.g. the gaps between
+    the positions of a term, only take one byte.
+    '''
+    while value > 0x7F:
+        output.append((value & 0x7F) | 0x80)
+        value >>= 7
+    output.append(value)
+
+
+def decode_varint(data: Any, offset: int) -> Tuple[int, int]:
+    '''
+    :param data: Bytes like object e.g. a memory map.
+    :param offset: Index of the first byte of the encoded integer.
+    :returns: The integer and the index of the byte after it.
+    '''
+    value = 0
+    shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+
+def encode_postings(document_index_delta: int, positions: List[int],
+                    output: bytearray) -> None:
+    '''
+    Appends the postings of a term in one document: the difference to the
+    index of the previous document the term is in, the number of positions,
+    the number of bytes of the positions, so that the positions can be
+    skipped, and the gap encoded positions.
+    '''
+    encoded_positions = bytearray()
+    previous_position = 0
+    for position in positions:
+        encode_varint(position - previous_position, encoded_positions)
+        previous_position = position
+    encode_varint(document_index_delta, output)
+    encode_varint(len(positions), output)
+    encode_varint(len(encoded_positions), output)
+    output.extend(encoded_positions)
+
+
+def build_kwic_index(index_path: Path, documents: Mapping[str, Path],
+                     token_filter: 'TokenFilter', settings: Dict[str, Any],
+                     label_usas_tag: Optional[Callable[[str], str]] = None,
+                     read_tokens: Callable[[Path], Iterable[TokenTuple]] = iter_usas_tokens
+                     ) -> Dict[str, int]:
+    '''
+    Writes an inverted index from each counted token text, as decided by
+    `token_filter`, and each USAS tag to the positions it occurs at in the
+    cached USAS files, with the text of every token so that the context of
+    an occurrence can be read without the cached USAS files.
+
+    The index is a single file: the magic bytes, the token texts of each
+    document, UTF-8 encoded, followed by the little endian uint32 byte
+    offset of each token in those texts, the postings of each term, see
+    `encode_postings`, and lastly the JSON encoded footer, which contains
+    the documents, the terms with the location of their postings, and the
+    settings, followed by its length as a little endian uint64.
+
+    :param index_path: File path to write the index to.
+    :param documents: Document names and the cached USAS file of each.
+    :param token_filter: Decides which tokens are indexed and the text they
+                         are indexed by, the context contains every token.
+    :param settings: The pre-processing settings, stored in the footer.
+    :param label_usas_tag: Converts a USAS tag to its label, if given the
+                           USAS tags can also be looked up by their labels.
+    :param read_tokens: Reads the tokens from a cached USAS file.
+    :returns: The number of documents, tokens and terms indexed.
+    '''
+    postings: Dict[str, Dict[str, bytearray]] = {kind: {} for kind in KINDS}
+    # The index of the last document each term was in.
+    last_document: Dict[str, Dict[str, int]] = {kind: {} for kind in KINDS}
+    footer_documents: List[Dict[str, Any]] = []
+    number_tokens = 0
+    with index_path.open('wb') as index_file:
+        index_file.write(MAGIC)
+        for document_index, (document_name, usas_file_path) in enumerate(documents.items()):
+            document_positions: Dict[str, Dict[str, List[int]]] = {kind: {} for kind in KINDS}
+            text = bytearray()
+            token_offsets = array('I')
+            position = -1
+            for position, (token_text, lemma, pos_tag, usas_tag) in enumerate(read_tokens(usas_file_path)):
+                token_offsets.append(len(text))
+                text.extend(token_text.encode('utf-8'))
+                term = token_filter(token_text, lemma, pos_tag)
+                if term is None:
+                    continue
+                document_positions['token'].setdefault(term, []).append(position)
+                if usas_tag is not None:
+                    for a_tag in usas_tag.split('/'):
+                        document_positions['usas'].setdefault(a_tag, []).append(position)
+            token_offsets.append(len(text))
+            if sys.byteorder == 'big':
+                token_offsets.byteswap()
+            text_offset = index_file.tell()
+            index_file.write(text)
+            index_file.write(token_offsets.tobytes())
+            footer_documents.append({'name': document_name,
+                                     'text offset': text_offset,
+                                     'text length': len(text),
+                                     'tokens': position + 1})
+            number_tokens += position + 1
+            for kind, term_positions in document_positions.items():
+                kind_postings = postings[kind]
+                kind_last_document = last_document[kind]
+                for term, positions in term_positions.items():
+                    document_index_delta = document_index - kind_last_document.get(term, 0)
+                    kind_last_document[term] = document_index
+                    encode_postings(document_index_delta, positions,
+                                    kind_postings.setdefault(term, bytearray()))
+
+        terms: Dict[str, Dict[str, List[int]]] = {}
+        for kind, kind_postings in postings.items():
+            terms[kind] = {}
+            for term in sorted(kind_postings):
+                term_postings = kind_postings[term]
+                terms[kind][term] = [index_file.tell(), len(term_postings)]
+                index_file.write(term_postings)
+        footer = {'documents': footer_documents, 'terms': terms,
+                  'settings': settings}
+        if label_usas_tag is not None:
+            footer['usas_tag_labels'] = {label_usas_tag(tag): tag for tag in terms['usas']}
+        encoded_footer = json.dumps(footer).encode('utf-8')
+        index_file.write(encoded_footer)
+        index_file.write(struct.pack('<Q', len(encoded_footer)))
+    return {'documents': len(footer_documents), 'tokens': number_tokens,
+            'token terms': len(terms['token']), 'usas terms': len(terms['usas'])}
+
+
+class KWICIndex():
+    '''
+    Reads an index written by `build_kwic_index` through a memory map, so
+    that only the footer is read when it is opened and a lookup only reads
+    the postings of the term and the context of the occurrences it returns.
+    '''
+
+    def __init__(self, index_path: Path) -> None:
+        '''
+        :param index_path: File path of the index.
+        :raises ValueError: If the file is not an index.
+        '''
+        self.index_path = index_path
+        self._file = index_path.open('rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f'{index_path} is not a keyword in context index.')
+        footer_length, = struct.unpack('<Q', self._map[-8:])
+        footer_start = len(self._map) - 8 - footer_length
+        footer = json.loads(self._map[footer_start:-8].decode('utf-8'))
+        self.documents: List[Dict[str, Any]] = footer['documents']
+        self.terms: Dict[str, Dict[str, List[int]]] = footer['terms']
+        self.settings: Dict[str, Any] = footer['settings']
+        self.usas_tag_labels: Dict[str, str] = footer.get('usas_tag_labels', {})
+
+    def _term(self, term: str, kind: str) -> Optional[List[int]]:
+        kind_terms = self.terms[kind]
+        if kind == 'usas' and term not in kind_terms:
+            term = self.usas_tag_labels.get(term, term)
+        elif kind == 'token' and self.settings.get('lower_case'):
+            term = term.lower()
+        return kind_terms.get(term)
+
+    def _iter_document_postings(self, offset: int, length: int
+                                ) -> Iterator[Tuple[int, int, int, int]]:
+        '''
+        :returns: Yields for each document the term is in, the document
+                  index, the number of positions, and the start and end of
+                  the encoded positions.
+        '''
+        end = offset + length
+        document_index = 0
+        while offset < end:
+            document_index_delta, offset = decode_varint(self._map, offset)
+            document_index += document_index_delta
+            number_positions, offset = decode_varint(self._map, offset)
+            positions_length, offset = decode_varint(self._map, offset)
+            yield document_index, number_positions, offset, offset + positions_length
+            offset += positions_length
+
+    def _positions(self, start: int, end: int) -> Iterator[int]:
+        position = 0
+        while start < end:
+            gap, start = decode_varint(self._map, start)
+            position += gap
+            yield position
+
+    def frequency(self, term: str, kind: str = 'token') -> Dict[str, int]:
+        '''
+        :param term: Token text or USAS tag, or USAS tag label if the index
+                     was built with the labels.
+        :param kind: `token` or `usas`.
+        :returns: The number of times the term occurs in each document it
+                  occurs in.
+        '''
+        location = self._term(term, kind)
+        if location is None:
+            return {}
+        return {self.documents[document_index]['name']: number_positions
+                for document_index, number_positions, _, _
+                in self._iter_document_postings(*location)}
+
+    def _tokens(self, document_index: int, start: int, end: int) -> List[str]:
+        document = self.documents[document_index]
+        start = max(start, 0)
+        end = min(end, document['tokens'])
+        if start >= end:
+            return []
+        text_offset = document['text offset']
+        offsets_start = text_offset + document['text length'] + 4 * start
+        offsets = struct.unpack_from(f'<{end - start + 1}I', self._map, offsets_start)
+        return [self._map[text_offset + offsets[index]:
+                          text_offset + offsets[index + 1]].decode('utf-8')
+                for index in range(end - start)]
+
+    def lookup(self, term: str, kind: str = 'token', top_k: int = 10,
+               window: int = 5) -> List[Dict[str, Any]]:
+        '''
+        :param term: Token text or USAS tag, or USAS tag label if the index
+                     was built with the labels.
+        :param kind: `token` or `usas`.
+        :param top_k: Maximum number of keyword in context lines.
+        :param window: Number of tokens of context either side.
+        :returns: Up to `top_k` keyword in context lines, each with the
+                  `document` name, token `position`, and the `left`,
+                  `keyword`, and `right` text. The lines are taken in turn
+                  from the documents that use the term most, so that they
+                  come from as many documents as possible, and in the order
+                  they occur within a document.
+        '''
+        location = self._term(term, kind)
+        if location is None or top_k < 1:
+            return []
+        document_postings = sorted(self._iter_document_postings(*location),
+                                   key=lambda postings: -postings[1])
+        document_positions = [(document_index, self._positions(start, end))
+                              for document_index, _, start, end in document_postings]
+        lines: List[Dict[str, Any]] = []
+        while document_positions and len(lines) < top_k:
+            remaining_positions = []
+            for document_index, positions in document_positions:
+                position = next(positions, None)
+                if position is None:
+                    continue
+                remaining_positions.append((document_index, positions))
+                tokens = self._tokens(document_index, position - window,
+                                      position + window + 1)
+                keyword_index = min(position, window)
+                lines.append({'document': self.documents[document_index]['name'],
+                              'position': position,
+                              'left': ' '.join(tokens[:keyword_index]),
+                              'keyword': tokens[keyword_index],
+                              'right': ' '.join(tokens[keyword_index + 1:])})
+                if len(lines) == top_k:
+                    break
+            document_positions = remaining_positions
+        return lines
+
+    def close(self) -> None:
+        self._map.close()
+        self._file.close()
+
+
+if __name__ == '__main__':
+
+    description = ('Prints the keyword in context lines of a token or USAS '
+                   'tag from an index created by the `index` subcommand of '
+                   'token_tag_statistics.py.')
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('index_path', type=Path,
+                        help='The index written by the `index` subcommand.')
+    parser.add_argument('term', type=str,
+                        help=('Token, as it is in the token output file, or '
+                              'with `--usas` a USAS tag or label.'))
+    parser.add_argument('--usas', action='store_true',
+                        help='The term is a USAS tag or label.')
+    parser.add_argument('--top-k', type=int, default=10,
+                        help='Maximum number of lines.')
+    parser.add_argument('--window', type=int, default=5,
+                        help='Number of tokens of context either side.')
+    parser.add_argument('--json', action='store_true',
+                        help='Print the lines in JSON format.')
+    args = parser.parse_args()
+
+    # logs to stdout
+    logger.setLevel(logging.DEBUG)
+    stdout_handler = logging.StreamHandler(stream=sys.stdout)
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    stdout_handler.setFormatter(formatter)
+    logger.addHandler(stdout_handler)
+
+    kwic_index = KWICIndex(args.index_path)
+    kind = 'usas' if args.usas else 'token'
+    lines = kwic_index.lookup(args.term, kind, args.top_k, args.window)
+    if args.json:
+        print(json.dumps(lines))
+    else:
+        if not lines:
+            logger.info(f'{args.term} is not in the index.')
+        left_width = max((len(line['left']) for line in lines), default=0)
+        for line in lines:
+            print(f'{line["document"]}\t{line["left"]:>{left_width}} '
+                  f'[{line["keyword"]}] {line["right"]}')
+    kwic_index.close()
@@ -0,0 +1,177 @@
+from collections import Counter
+import math
+from pathlib import Path
+import re
+from typing import Any, Dict, List, Tuple
+
+# The most frequent words of each language, most frequent first, from which
+# the character trigram profile of each language is built. These are
+# mostly function words, which make up a large part of any running text and
+# differ between languages, so their trigrams identify the language of a
+# text without a trained model.
+FREQUENT_WORDS = {
+    'en': '''the of and to a in is that for it as was with be by on not this
+             are or from at which but have an they were been has their its
+             can we more one also these there other such than may would will
+             all into when only between both however where what about some
+             our who should each most through had how''',
+    'fr': '''de la le et les des en un du une que est pour qui dans par plus
+             pas au sur ne se ce il sont avec ou son mais comme on nous elle
+             été cette aux leur tout ses même ces sa être fait sans entre
+             aussi dont deux peut leurs très où selon lors ainsi après vers''',
+    'de': '''der die und in den von zu das mit sich des auf für ist im dem
+             nicht ein eine als auch es an werden aus er hat dass sie nach
+             wird bei einer um am sind noch wie einem über einen so zum war
+             haben nur oder aber vor zur bis mehr durch man sein wurde sei
+             kann diese zwischen sowie wenn diesem dieser unter können''',
+    'es': '''de la que el en y a los del se las por un para con no una su al
+             lo como más pero sus le ya o este fue porque esta entre cuando
+             muy sin sobre también me hasta hay donde desde todo nos durante
+             todos uno les ni contra otros ese eso ante ellos esto antes
+             estos según puede tiene además cada están son ser así forma
+             relación información otro mismo nuevo uso acciones''',
+    'it': '''di e il la che in a per un del è non una le si i da con al dei
+             sono come alla più ma anche ha della delle nel gli lo questo ci
+             o se loro essere tra quando molto nella sua suo dal degli stato
+             questa sul dalla nei ed cui tutti può sia anni parte''',
+    'pt': '''de a o que e do da em um para é com não uma os no se na por mais
+             as dos como mas foi ao ele das tem à seu sua ou ser quando muito
+             há nos já está também só pelo pela até isso ela entre era depois
+             sem mesmo aos ter seus quem nas esse eles estão foram essa num
+             nem suas são pode sobre este então assim ainda forma
+             relação informação estes nesta desta pelos cada uso ações''',
+    'nl': '''de en van het een in is dat op te zijn met voor niet aan er die
+             ook als bij door om maar dan tot uit wordt worden naar nog kan
+             wel over zo geen deze meer heeft dit was hij we ze al zich of
+             hebben werd onder wat veel tussen na kunnen omdat''',
+}
+# Languages that are identified from the script of the text rather than the
+# trigrams, when most of the letters are not Latin letters.
+NON_LATIN_SCRIPT = 'other'
+UNDETERMINED = 'und'
+
+_WORD_PATTERN = re.compile(r'[^\W\d_]+')
+# Log probability of a trigram that is not in a language's profile.
+_UNSEEN_LOG_PROBABILITY = math.log(1e-6)
+# The last Latin letter, Latin Extended-B.
+_LAST_LATIN_CODE_POINT = 0x24F
+
+
+def _word_trigrams(word: str) -> List[str]:
+    padded = f' {word} '
+    return [padded[index:index + 3] for index in range(len(padded) - 2)]
+
+
+def _build_profiles() -> Tuple[List[str], Dict[str, Tuple[float, ...]]]:
+    '''
+    :returns: The languages and, for every trigram in any of the profiles,
+              its log probability in each language.
+    '''
+    languages = sorted(FREQUENT_WORDS)
+    trigram_weights: Dict[str, Counter] = {}
+    for language in languages:
+        weights: Counter = Counter()
+        for rank, word in enumerate(FREQUENT_WORDS[language].split()):
+            # Zipf's law, the rank r word is used about 1/r as often as the
+            # most frequent word.
+            for trigram in _word_trigrams(word):
+                weights[trigram] += 1 / (rank + 1)
+        trigram_weights[language] = weights
+    total_weights = {language: sum(weights.values())
+                     for language, weights in trigram_weights.items()}
+    all_trigrams = set().union(*trigram_weights.values())
+    profiles: Dict[str, Tuple[float, ...]] = {}
+    for trigram in all_trigrams:
+        log_probabilities = []
+        for language in languages:
+            weights = trigram_weights[language]
+            weight = weights.get(trigram)
+            if weight is None:
+                log_probabilities.append(_UNSEEN_LOG_PROBABILITY)
+            else:
+                log_probabilities.append(math.log(weight / total_weights[language]))
+        profiles[trigram] = tuple(log_probabilities)
+    return languages, profiles
+
+
+def read_text_sample(_file_path: Path, prefix_size: int = 8192,
+                     number_windows: int = 4, window_size: int = 2048) -> str:
+    '''
+    :param _file_path: Text file.
+    :param prefix_size: Number of bytes of the start of the file to sample.
+    :param number_windows: Number of windows, evenly spaced through the rest
+                           of the file, to sample.
+    :param window_size: Number of bytes of each window.
+    :returns: The sampled text, at most `prefix_size + number_windows *
+              window_size` bytes of the file regardless of its size.
+    '''
+    with _file_path.open('rb') as _file:
+        samples = [_file.read(prefix_size)]
+        file_size = _file.seek(0, 2)
+        if file_size > prefix_size + window_size:
+            step = (file_size - prefix_size) // (number_windows + 1)
+            for window_index in range(1, number_windows + 1):
+                _file.seek(prefix_size + window_index * step)
+                samples.append(_file.read(window_size))
+    # Windows can start or end part way through a UTF-8 character.
+    return '\n'.join(sample.decode('utf-8', errors='ignore') for sample in samples)
+
+
+class LanguageIdentifier():
+    '''
+    Offline language identifier of the character trigrams of a text, built
+    from `FREQUENT_WORDS`, whereby the language is the one whose trigram
+    probabilities are most likely to have produced the trigrams of the text
+    that are in any of the profiles. Texts whose letters are mostly not
+    Latin letters are identified as `NON_LATIN_SCRIPT`, and texts with too
+    few known trigrams as `UNDETERMINED`.
+
+    Reference: Cavnar and Trenkle, N-Gram-Based Text Categorization, 1994.
+    '''
+
+    def __init__(self, minimum_trigrams: int = 20) -> None:
+        '''
+        :param minimum_trigrams: Minimum number of the text's trigrams that
+                                 have to be in the profiles to identify its
+                                 language.
+        '''
+        self.minimum_trigrams = minimum_trigrams
+        self.languages, self._profiles = _build_profiles()
+
+    def identify(self, text: str) -> Dict[str, Any]:
+        '''
+        :param text: Text, or a sample of a text see `read_text_sample`.
+        :returns: The `language`, a key of `FREQUENT_WORDS`,
+                  `NON_LATIN_SCRIPT`, or `UNDETERMINED`, the `confidence`,
+                  the average log probability per trigram that the language
+                  is more likely than the next most likely language, and the
+                  number of known `trigrams` in the text.
+        '''
+        words = _WORD_PATTERN.findall(text.lower())
+        number_letters = sum(len(word) for word in words)
+        number_non_latin = sum(1 for word in words for character in word
+                               if ord(character) > _LAST_LATIN_CODE_POINT)
+        if number_letters and number_non_latin / number_letters > 0.5:
+            return {'language': NON_LATIN_SCRIPT, 'confidence': 1.0,
+                    'trigrams': 0}
+        trigram_counts: Counter = Counter()
+        for word, count in Counter(words).items():
+            for trigram in _word_trigrams(word):
+                trigram_counts[trigram] += count
+        scores = [0.0] * len(self.languages)
+        number_trigrams = 0
+        profiles = self._profiles
+        for trigram, count in trigram_counts.items():
+            log_probabilities = profiles.get(trigram)
+            if log_probabilities is None:
+                continue
+            number_trigrams += count
+            for index, log_probability in enumerate(log_probabilities):
+                scores[index] += count * log_probability
+        if number_trigrams < self.minimum_trigrams:
+            return {'language': UNDETERMINED, 'confidence': 0.0,
+                    'trigrams': number_trigrams}
+        ranked = sorted(zip(scores, self.languages), reverse=True)
+        confidence = (ranked[0][0] - ranked[1][0]) / number_trigrams
+        return {'language': ranked[0][1], 'confidence': round(confidence, 4),
+                'trigrams': number_trigrams}
@@ -0,0 +1,82 @@
+import argparse
+import logging
+from pathlib import Path
+import sys
+from typing import List
+
+from shard_counts import ShardCounts
+from significance import significant_token_tag_statistics
+from token_tag_statistics import (create_output_file, path_type,
+                                  read_frequency_file)
+
+if __name__ == '__main__':
+
+    description = ('Merges the counts of the shards created by running '
+                   'token_tag_statistics.py with `--shard i/N` and '
+                   '`--shard-counts-file` on each shard (1st argument), and '
+                   'stores the Tokens and USAS tags that are used significantly'
+                   ' more in all of the texts compared to the reference texts '
+                   'in the token and usas output files (2nd and 3rd '
+                   'arguments). The output is identical to running '
+                   'token_tag_statistics.py on all of the texts at once.')
+    shard_counts_files_help = ('The count files of all of the shards.')
+    significance_help = ('The level of significance, 0.05 = 95%% '
+                         '0.01 = 99%%. significance levels allowed '
+                         'are: 0.05, 0.01, 0.001, and 0.0001.')
+    minimum_token_frequency_help = ('Minimum frequency of a token/tag for it '
+                                    'to be considered.')
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('shard_counts_files', type=path_type, nargs='+',
+                        help=shard_counts_files_help)
+    parser.add_argument('token_output_path', type=path_type,
+                        help='File path to store the significant tokens.')
+    parser.add_argument('usas_output_path', type=path_type,
+                        help='File path to store the significant USAS tags.')
+    parser.add_argument('reference_token_frequency_path', type=path_type,
+                        help='File Path to the reference token frequencies.')
+    parser.add_argument('reference_usas_tag_frequency_path', type=path_type,
+                        help='File Path to the reference USAS tag frequencies.')
+    parser.add_argument('sigeff_binary_file_path', type=path_type,
+                        help='File path to the SigEff C binary')
+    parser.add_argument('semtag_summary_file_path', type=path_type,
+                        help='File path to the USAS tag summary file.')
+    parser.add_argument('--significance-level', default=0.05, type=float,
+                        choices=[0.05, 0.01, 0.001, 0.0001],
+                        help=significance_help)
+    parser.add_argument('--minimum-token-frequency', default=5, type=int,
+                        help=minimum_token_frequency_help)
+    parser.add_argument('--USAS-tags-to-labels', action='store_true',
+                        help='Convert the USAS tags to labels.')
+    args = parser.parse_args()
+
+    # logs to stdout
+    logger = logging.getLogger(__name__)
+    logger.setLevel(logging.DEBUG)
+    stdout_handler = logging.StreamHandler(stream=sys.stdout)
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    stdout_handler.setFormatter(formatter)
+    logger.addHandler(stdout_handler)
+
+    shard_counts_files: List[Path] = args.shard_counts_files
+    logger.info(f'Loading shard counts from: {shard_counts_files[0].name}')
+    merged_counts = ShardCounts.load(shard_counts_files[0])
+    for shard_counts_file in shard_counts_files[1:]:
+        logger.info(f'Merging shard counts from: {shard_counts_file.name}')
+        merged_counts.merge(ShardCounts.load(shard_counts_file))
+    logger.info(f'Merged the counts of {len(merged_counts.documents)} texts')
+
+    lower_case = merged_counts.settings['lower_case']
+    reference_token_counter = read_frequency_file(args.reference_token_frequency_path,
+                                                  lower_case)
+    reference_usas_counter = read_frequency_file(args.reference_usas_tag_frequency_path,
+                                                 False)
+    significant_tokens, significant_tags = significant_token_tag_statistics(
+        merged_counts.token_counter(), merged_counts.usas_counter(),
+        merged_counts.token_usas_tag, reference_token_counter,
+        reference_usas_counter, args.sigeff_binary_file_path,
+        args.semtag_summary_file_path, args.significance_level,
+        args.minimum_token_frequency, args.USAS_tags_to_labels)
+    logger.info(f'Writing token/tag information to: {args.token_output_path.name}'
+                f' and {args.usas_output_path.name}')
+    create_output_file(args.token_output_path, significant_tokens)
+    create_output_file(args.usas_output_path, significant_tags)
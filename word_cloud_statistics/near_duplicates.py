@@ -0,0 +1,225 @@
+from collections import defaultdict
+import hashlib
+from typing import Dict, List, Set, Tuple
+
+# Signature value for a bin without any shingle in it, before densification.
+_EMPTY_BIN = -1
+
+
+def _hash(value: str) -> int:
+    digest = hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little')
+
+
+def shingle_hashes(text: str, shingle_size: int = 5) -> Set[int]:
+    '''
+    :param text: Text to shingle.
+    :param shingle_size: Number of words in a shingle.
+    :returns: The 64 bit hashes of the lower cased, whitespace tokenised, word
+              shingles of the text. If the text has fewer words than the
+              shingle size the text is one shingle.
+    '''
+    words = text.lower().split()
+    if len(words) < shingle_size:
+        return {_hash(' '.join(words))}
+    return {_hash(' '.join(words[index:index + shingle_size]))
+            for index in range(len(words) - shingle_size + 1)}
+
+
+def minhash_signature(hashes: Set[int], number_of_bins: int) -> Tuple[int, ...]:
+    '''
+    One permutation MinHash signature, the hashes are split into bins by
+    their value and the minimum of each bin is kept, empty bins are then
+    filled with the value of the next non empty bin (rotation
+    densification). This only requires one pass over the hashes rather than
+    one pass per hash function, while still estimating the Jaccard similarity
+    and being usable for locality sensitive hashing.
+
+    Reference: Shrivastava and Li, Densifying One Permutation Hashing via
+    Rotation for Fast Near Neighbor Search, 2014.
+
+    :param hashes: The shingle hashes of a document.
+    :param number_of_bins: Length of the signature.
+    :returns: The signature.
+    '''
+    bins = [_EMPTY_BIN] * number_of_bins
+    for a_hash in hashes:
+        bin_index = a_hash % number_of_bins
+        value = a_hash // number_of_bins
+        if bins[bin_index] == _EMPTY_BIN or value < bins[bin_index]:
+            bins[bin_index] = value
+    if all(value == _EMPTY_BIN for value in bins):
+        return tuple(bins)
+    # The offset keeps borrowed values distinct from the values of the bin
+    # they were borrowed from.
+    offset = 2 ** 64 // number_of_bins + 1
+    densified_bins = list(bins)
+    for bin_index, value in enumerate(bins):
+        if value != _EMPTY_BIN:
+            continue
+        distance = 1
+        while bins[(bin_index + distance) % number_of_bins] == _EMPTY_BIN:
+            distance += 1
+        densified_bins[bin_index] = (bins[(bin_index + distance) % number_of_bins]
+                                     + distance * offset)
+    return tuple(densified_bins)
+
+
+def signature_similarity(signature_1: Tuple[int, ...],
+                         signature_2: Tuple[int, ...]) -> float:
+    '''
+    :returns: The estimated Jaccard similarity of the two documents.
+    '''
+    number_equal = sum(1 for value_1, value_2 in zip(signature_1, signature_2)
+                       if value_1 == value_2)
+    return number_equal / len(signature_1)
+
+
+def _band_probability(similarity: float, bands: int, rows: int) -> float:
+    # Probability that two documents with the given similarity share a bucket.
+    return 1 - (1 - similarity ** rows) ** bands
+
+
+def lsh_bands(threshold: float, number_of_bins: int) -> Tuple[int, int]:
+    '''
+    :returns: The number of bands and rows per band, whose product is the
+              number of bins, that minimises the sum of the probabilities of
+              a pair below the threshold sharing a bucket and a pair above the
+              threshold not sharing a bucket.
+    '''
+    best_error = None
+    best_bands_rows = (number_of_bins, 1)
+    steps = 100
+    for rows in range(1, number_of_bins + 1):
+        if number_of_bins % rows:
+            continue
+        bands = number_of_bins // rows
+        false_positive = sum(_band_probability(threshold * step / steps, bands, rows)
+                             for step in range(steps)) / steps
+        false_negative = sum(1 - _band_probability(threshold + (1 - threshold) * step / steps,
+                                                   bands, rows)
+                             for step in range(steps)) / steps
+        error = false_positive + false_negative
+        if best_error is None or error < best_error:
+            best_error = error
+            best_bands_rows = (bands, rows)
+    return best_bands_rows
+
+
+class NearDuplicateIndex():
+    '''
+    Finds near duplicate documents, those whose estimated Jaccard similarity
+    of word shingles is at least `threshold`, using MinHash signatures and
+    locality sensitive hashing. Only documents that share an LSH bucket are
+    compared, therefore finding the near duplicates is sub-quadratic in the
+    number of documents.
+    '''
+
+    def __init__(self, threshold: float = 0.8, number_of_bins: int = 128,
+                 shingle_size: int = 5) -> None:
+        '''
+        :param threshold: Minimum estimated Jaccard similarity for two
+                          documents to be near duplicates.
+        :param number_of_bins: Length of each MinHash signature.
+        :param shingle_size: Number of words in a shingle.
+        :raises ValueError: If the threshold is not between 0 and 1.
+        '''
+        if not 0 < threshold <= 1:
+            raise ValueError(f'The threshold {threshold} has to be between 0 '
+                             'and 1.')
+        self.threshold = threshold
+        self.number_of_bins = number_of_bins
+        self.shingle_size = shingle_size
+        self.bands, self.rows = lsh_bands(threshold, number_of_bins)
+        self._signatures: Dict[str, Tuple[int, ...]] = {}
+        self._number_of_words: Dict[str, int] = {}
+        self._buckets: Dict[Tuple[int, Tuple[int, ...]], List[str]] = defaultdict(list)
+
+    def add(self, name: str, text: str) -> None:
+        '''
+        :param name: Unique name of the document, e.g. the file name.
+        :param text: The text of the document.
+        :raises ValueError: If a document with the same name has already been
+                            added.
+        '''
+        if name in self._signatures:
+            raise ValueError(f'The document {name} has already been added.')
+        signature = minhash_signature(shingle_hashes(text, self.shingle_size),
+                                      self.number_of_bins)
+        self._signatures[name] = signature
+        self._number_of_words[name] = len(text.split())
+        for band in range(self.bands):
+            band_values = signature[band * self.rows:(band + 1) * self.rows]
+            self._buckets[(band, band_values)].append(name)
+
+    def similarity(self, name_1: str, name_2: str) -> float:
+        '''
+        :returns: The estimated Jaccard similarity of the two documents.
+        '''
+        return signature_similarity(self._signatures[name_1],
+                                    self._signatures[name_2])
+
+    def clusters(self) -> List[Dict[str, object]]:
+        '''
+        :returns: One dictionary per cluster of two or more near duplicate
+                  documents with the following keys: `representative`, the
+                  longest document in the cluster by number of words (ties
+                  broken by name), `duplicates`, the names of the other
+                  documents in the cluster, and `similarity`, the estimated
+                  Jaccard similarity of each duplicate to the representative.
+                  Clusters are the connected components of near duplicate
+                  pairs.
+        '''
+        parents: Dict[str, str] = {}
+
+        def find(name: str) -> str:
+            parents.setdefault(name, name)
+            while parents[name] != name:
+                parents[name] = parents[parents[name]]
+                name = parents[name]
+            return name
+
+        compared: Set[Tuple[str, str]] = set()
+        for names in self._buckets.values():
+            for index, name_1 in enumerate(names):
+                for name_2 in names[index + 1:]:
+                    pair = (name_1, name_2)
+                    if pair in compared:
+                        continue
+                    compared.add(pair)
+                    if self.similarity(name_1, name_2) >= self.threshold:
+                        parents[find(name_1)] = find(name_2)
+
+        cluster_names: Dict[str, List[str]] = defaultdict(list)
+        for name in parents:
+            cluster_names[find(name)].append(name)
+        _clusters = []
+        for names in cluster_names.values():
+            if len(names) < 2:
+                continue
+            names = sorted(names, key=lambda name: (-self._number_of_words[name], name))
+            representative = names[0]
+            _clusters.append({'representative': representative,
+                              'duplicates': names[1:],
+                              'similarity': {name: self.similarity(representative, name)
+                                             for name in names[1:]}})
+        return sorted(_clusters, key=lambda cluster: cluster['representative'])
+
+    def duplicates(self) -> Set[str]:
+        '''
+        :returns: The names of all documents that are a near duplicate of a
+                  cluster representative, and therefore do not need to be
+                  processed. If the clusters are also needed use
+                  `cluster_duplicates` of `clusters` instead, rather than
+                  finding the clusters twice.
+        '''
+        return cluster_duplicates(self.clusters())
+
+
+def cluster_duplicates(clusters: List[Dict[str, object]]) -> Set[str]:
+    '''
+    :param clusters: The output of `NearDuplicateIndex.clusters`.
+    :returns: The names of all documents that are a near duplicate of a
+              cluster representative.
+    '''
+    return {name for cluster in clusters for name in cluster['duplicates']}
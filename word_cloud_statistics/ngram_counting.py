@@ -0,0 +1,241 @@
+from array import array
+from collections import Counter, deque
+from pathlib import Path
+from typing import (Any, Callable, Deque, Dict, Iterable, Iterator, List,
+                    Optional, Sequence, Set, Tuple, TYPE_CHECKING)
+import typing
+
+from usas_json_reader import TokenTuple, iter_usas_tokens
+
+if TYPE_CHECKING:
+    from token_filter import TokenFilter
+
+# Number of bits of each token id in a packed n-gram id.
+TOKEN_ID_BITS = 32
+_TOKEN_ID_MASK = (1 << TOKEN_ID_BITS) - 1
+# Odd multipliers of the multiply-shift hashes, one per row of the pruning
+# table.
+_MULTIPLIERS = (0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F)
+# Odd multiplier that folds the 64 bit words of a packed n-gram id, of more
+# than 2 tokens, into one before it is hashed.
+_FOLD_MULTIPLIER = 0xFF51AFD7ED558CCD
+_MASK_64 = (1 << 64) - 1
+
+
+def _fold_ngram_id(ngram_id: int) -> int:
+    '''
+    :param ngram_id: A packed n-gram id.
+    :returns: A 64 bit integer that depends on every token id of the n-gram,
+              the low 64 bits of the id are only its last 2 token ids.
+    '''
+    folded = ngram_id & _MASK_64
+    ngram_id >>= 64
+    while ngram_id:
+        folded = ((folded * _FOLD_MULTIPLIER) & _MASK_64) ^ (ngram_id & _MASK_64)
+        ngram_id >>= 64
+    return folded
+
+
+class NGramCounts():
+    '''
+    Exact counts of the n-grams of the cached USAS files that occur at least
+    `minimum_count` times, counted without holding every distinct n-gram in
+    memory.
+
+    Tokens are interned to integer ids and each n-gram is packed into a
+    single integer of its token ids, rather than a tuple of strings. The
+    first pass counts the tokens in an array indexed by token id, and the
+    n-grams in a fixed size table of hashed counters, two rows like a
+    count-min sketch, whose counters are never lower than the count of any
+    n-gram hashed to them. The second pass only counts the n-grams whose
+    counters are all at least `minimum_count` and whose tokens all occur at
+    least `minimum_count` times, all other n-grams cannot be frequent,
+    therefore the counts are exact and only the candidates are ever held in
+    memory.
+
+    N-grams never span a token that the token filter removes, e.g.
+    punctuation or stop words, nor the end of a text.
+    '''
+
+    def __init__(self, usas_file_paths: Sequence[Path],
+                 token_filter: 'TokenFilter', ngram_sizes: Iterable[int],
+                 minimum_count: int, table_size: int = 2**20,
+                 read_tokens: Callable[[Path], Iterable[TokenTuple]] = iter_usas_tokens
+                 ) -> None:
+        '''
+        :param usas_file_paths: Files that contain the cached USAS output.
+        :param token_filter: Decides which tokens are counted and the text
+                             that is counted for them.
+        :param ngram_sizes: The number of tokens of the n-grams to count,
+                            each at least 2.
+        :param minimum_count: N-grams that occur less than this are not kept.
+        :param table_size: Number of counters per row of the pruning table,
+                           rounded up to a power of 2. Each counter is 8
+                           bytes.
+        :param read_tokens: Reads the tokens from a cached USAS file.
+        :raises ValueError: If an n-gram size is less than 2.
+        '''
+        self.ngram_sizes = sorted(set(ngram_sizes))
+        if not self.ngram_sizes or self.ngram_sizes[0] < 2:
+            raise ValueError('The n-gram sizes have to be at least 2, '
+                             f'given: {self.ngram_sizes}')
+        self.usas_file_paths = list(usas_file_paths)
+        self.token_filter = token_filter
+        self.minimum_count = minimum_count
+        self.read_tokens = read_tokens
+        self._table_bits = max(1, (table_size - 1).bit_length())
+        self.table_size = 1 << self._table_bits
+        # Token id 0 is never used, so that no packed n-gram id has a leading
+        # zero token id and n-grams of different sizes never have the same id.
+        self.tokens: List[str] = ['']
+        self._token_ids: Dict[str, int] = {}
+        self._token_counts = array('Q', [0])
+        # The frequent n-grams by packed id, in the order first counted.
+        self.counts: Dict[int, int] = {}
+        self.number_ngrams = 0
+        self.number_candidates = 0
+
+    def _indexes(self, ngram_id: int) -> Iterator[int]:
+        folded = _fold_ngram_id(ngram_id)
+        for multiplier in _MULTIPLIERS:
+            yield ((folded * multiplier) & _MASK_64) >> (64 - self._table_bits)
+
+    def _iter_ngrams(self, usas_file_path: Path, first_pass: bool = False,
+                     with_usas_tags: bool = False
+                     ) -> Iterator[Tuple[int, Tuple[Optional[str], ...]]]:
+        '''
+        :param usas_file_path: File that contains the cached USAS output.
+        :param first_pass: Intern and count the tokens, otherwise tokens that
+                           occur less than `minimum_count` times end the
+                           n-grams like a removed token does.
+        :param with_usas_tags: Whether to also yield the USAS tags.
+        :returns: Yields the packed id of every n-gram in the file and, if
+                  `with_usas_tags`, the USAS tags of its tokens.
+        '''
+        max_size = self.ngram_sizes[-1]
+        ngram_sizes = set(self.ngram_sizes)
+        window_ids: Deque[int] = deque(maxlen=max_size)
+        window_tags: Deque[Optional[str]] = deque(maxlen=max_size)
+        token_ids = self._token_ids
+        token_counts = self._token_counts
+        minimum_count = self.minimum_count
+        for text, lemma, pos_tag, usas_tag in self.read_tokens(usas_file_path):
+            token = self.token_filter(text, lemma, pos_tag)
+            token_id = None
+            if token is not None:
+                token_id = token_ids.get(token)
+                if first_pass:
+                    if token_id is None:
+                        token_id = len(self.tokens)
+                        if token_id > _TOKEN_ID_MASK:
+                            raise ValueError('More distinct tokens than can '
+                                             'be packed into an n-gram id.')
+                        token_ids[token] = token_id
+                        self.tokens.append(token)
+                        token_counts.append(0)
+                    token_counts[token_id] += 1
+                elif token_id is not None and token_counts[token_id] < minimum_count:
+                    token_id = None
+            if token_id is None:
+                window_ids.clear()
+                window_tags.clear()
+                continue
+            window_ids.append(token_id)
+            window_tags.append(usas_tag)
+            ngram_id = token_id
+            ngram_size = 1
+            for previous_id in list(window_ids)[-2::-1]:
+                ngram_size += 1
+                ngram_id |= previous_id << (TOKEN_ID_BITS * (ngram_size - 1))
+                if ngram_size in ngram_sizes:
+                    if with_usas_tags:
+                        yield ngram_id, tuple(window_tags)[-ngram_size:]
+                    else:
+                        yield ngram_id, ()
+
+    def count(self) -> None:
+        '''
+        Counts the n-grams of the cached USAS files in two passes, after
+        which `counts` contains the n-grams that occur at least
+        `minimum_count` times.
+        '''
+        rows = [array('Q', bytes(8 * self.table_size)) for _ in _MULTIPLIERS]
+        for usas_file_path in self.usas_file_paths:
+            document_counts = Counter(ngram_id for ngram_id, _
+                                      in self._iter_ngrams(usas_file_path,
+                                                           first_pass=True))
+            for ngram_id, count in document_counts.items():
+                self.number_ngrams += count
+                for row, index in zip(rows, self._indexes(ngram_id)):
+                    row[index] += count
+
+        minimum_count = self.minimum_count
+        candidate_counts: Dict[int, int] = {}
+        for usas_file_path in self.usas_file_paths:
+            document_counts = Counter(ngram_id for ngram_id, _
+                                      in self._iter_ngrams(usas_file_path))
+            for ngram_id, count in document_counts.items():
+                if all(row[index] >= minimum_count
+                       for row, index in zip(rows, self._indexes(ngram_id))):
+                    candidate_counts[ngram_id] = candidate_counts.get(ngram_id, 0) + count
+        self.number_candidates = len(candidate_counts)
+        self.counts = {ngram_id: count for ngram_id, count in candidate_counts.items()
+                       if count >= minimum_count}
+
+    def ngram_text(self, ngram_id: int) -> str:
+        '''
+        :param ngram_id: Packed id of an n-gram.
+        :returns: The tokens of the n-gram separated by a space.
+        '''
+        token_ids: List[int] = []
+        while ngram_id:
+            token_ids.append(ngram_id & _TOKEN_ID_MASK)
+            ngram_id >>= TOKEN_ID_BITS
+        return ' '.join(self.tokens[token_id] for token_id in reversed(token_ids))
+
+    def ngram_counter(self) -> Dict[str, int]:
+        '''
+        :returns: The n-grams that occur at least `minimum_count` times, as
+                  their tokens separated by a space, and their counts.
+        '''
+        return {self.ngram_text(ngram_id): count
+                for ngram_id, count in self.counts.items()}
+
+    def ngram_usas_tag(self, ngrams: Set[str]) -> Dict[str, typing.Counter[str]]:
+        '''
+        Reads the cached USAS files again to count the USAS tags of only the
+        given n-grams.
+
+        :param ngrams: N-grams, as returned by `ngram_counter`.
+        :returns: The USAS tag counts of the tokens of each of the n-grams,
+                  whereby tokens with more than one USAS tag count towards
+                  each tag.
+        '''
+        ngram_ids = {ngram_id: self.ngram_text(ngram_id) for ngram_id in self.counts}
+        ngram_ids = {ngram_id: text for ngram_id, text in ngram_ids.items()
+                     if text in ngrams}
+        ngram_usas_tag: Dict[str, typing.Counter[str]] = {text: Counter()
+                                                          for text in ngram_ids.values()}
+        for usas_file_path in self.usas_file_paths:
+            for ngram_id, usas_tags in self._iter_ngrams(usas_file_path,
+                                                         with_usas_tags=True):
+                text = ngram_ids.get(ngram_id)
+                if text is None:
+                    continue
+                usas_tag_counter = ngram_usas_tag[text]
+                for usas_tag in usas_tags:
+                    if usas_tag is not None:
+                        usas_tag_counter.update(usas_tag.split('/'))
+        return ngram_usas_tag
+
+    def report(self) -> Dict[str, Any]:
+        '''
+        :returns: The sizes of the n-gram counting.
+        '''
+        return {'n-gram sizes': self.ngram_sizes,
+                'pruning table size': self.table_size,
+                'pruning table memory (bytes)': 8 * self.table_size * len(_MULTIPLIERS),
+                'distinct tokens': len(self.tokens) - 1,
+                'n-grams': self.number_ngrams,
+                'candidate n-grams': self.number_candidates,
+                'frequent n-grams': len(self.counts)}
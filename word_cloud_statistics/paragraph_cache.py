@@ -0,0 +1,170 @@
+import hashlib
+import json
+from pathlib import Path
+import sqlite3
+from time import sleep
+from typing import Any, Callable, Dict, List, Optional
+
+PARAGRAPH_CACHE_FILE_NAME = 'paragraphs.sqlite'
+# Added to the tagger version of the `usas_cache.USASCache` key of texts
+# tagged a paragraph at a time, as sentences and multi word expressions
+# cannot span paragraphs the result can differ from tagging the whole text.
+PARAGRAPH_TAGGER_VERSION_SUFFIX = ';paragraphs'
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS paragraphs (
+    key TEXT PRIMARY KEY,
+    tagged TEXT NOT NULL
+);
+'''
+
+
+def split_paragraphs(text: str) -> List[str]:
+    '''
+    :param text: A text, in which each paragraph is on its own line as in the
+                 exported Science Parse section text.
+    :returns: The paragraphs of the text, without their leading and trailing
+              whitespace, ignoring empty lines.
+    '''
+    paragraphs: List[str] = []
+    for line in text.split('\n'):
+        paragraph = line.strip()
+        if paragraph:
+            paragraphs.append(paragraph)
+    return paragraphs
+
+
+def paragraph_tagger_version(tagger_version: str) -> str:
+    '''
+    :param tagger_version: Version of the tagger.
+    :returns: The tagger version of the `usas_cache.USASCache` of texts that 
+              are tagged a paragraph at a time, so that they are cached 
+              separately from the same texts tagged whole.
+    '''
+    return f'{tagger_version}{PARAGRAPH_TAGGER_VERSION_SUFFIX}'
+
+
+class ParagraphCache():
+    '''
+    The USAS tagging cache of single paragraphs, stored in a SQLite database,
+    whereby each tagged paragraph is keyed by a hash of the paragraph and the
+    version of the tagger, the same as the `usas_cache.USASCache` key of a
+    whole text. Templated abstracts, ethics statements, running headers and
+    quoted passages that are the same across texts are therefore only tagged
+    once.
+
+    The number of paragraphs and characters that were, and were not, in the
+    cache are counted for the run report, see `statistics`.
+    '''
+
+    def __init__(self, database_path: Path, tagger_version: str) -> None:
+        '''
+        :param database_path: The SQLite database, created if it does not
+                              exist.
+        :param tagger_version: Version of the tagger, part of the cache key.
+        '''
+        self.database_path = database_path
+        self.tagger_version = tagger_version
+        self._connection = sqlite3.connect(str(database_path))
+        self._connection.executescript(_SCHEMA)
+        self.hits = 0
+        self.misses = 0
+        self.hit_characters = 0
+        self.miss_characters = 0
+
+    def key(self, paragraph: str) -> str:
+        '''
+        :returns: The cache key of the paragraph.
+        '''
+        hasher = hashlib.sha256()
+        hasher.update(self.tagger_version.encode('utf-8'))
+        hasher.update(b'\0')
+        hasher.update(paragraph.encode('utf-8'))
+        return hasher.hexdigest()
+
+    def get(self, paragraph: str) -> Optional[str]:
+        '''
+        :param paragraph: The paragraph.
+        :returns: The tagged paragraph, the output of `UCREL_Doc.to_json`, or
+                  None if the paragraph is not in the cache.
+        '''
+        row = self._connection.execute('SELECT tagged FROM paragraphs WHERE key = ?',
+                                       (self.key(paragraph),)).fetchone()
+        if row is None:
+            self.misses += 1
+            self.miss_characters += len(paragraph)
+            return None
+        self.hits += 1
+        self.hit_characters += len(paragraph)
+        return row[0]
+
+    def write(self, paragraph: str, tagged_json: str) -> None:
+        '''
+        The paragraph is committed straight away, so that the paragraphs
+        tagged before a run is interrupted are not tagged again.
+
+        :param paragraph: The paragraph that was tagged.
+        :param tagged_json: The tagged paragraph, the output of
+                            `UCREL_Doc.to_json`.
+        '''
+        with self._connection:
+            self._connection.execute('INSERT OR REPLACE INTO paragraphs VALUES (?, ?)',
+                                     (self.key(paragraph), tagged_json))
+
+    def statistics(self) -> Dict[str, Any]:
+        '''
+        :returns: The number of paragraph look ups, cache hits and misses,
+                  and the hit rate by paragraphs and by characters, since the
+                  cache was opened.
+        '''
+        paragraphs = self.hits + self.misses
+        characters = self.hit_characters + self.miss_characters
+        return {'paragraphs': paragraphs, 'hits': self.hits,
+                'misses': self.misses,
+                'hit rate': round(self.hits / paragraphs, 4) if paragraphs else 0.0,
+                'character hit rate': (round(self.hit_characters / characters, 4)
+                                       if characters else 0.0)}
+
+    def close(self) -> None:
+        self._connection.close()
+
+
+def tag_text_by_paragraph(text: str, paragraph_cache: ParagraphCache,
+                          tag_paragraph: Callable[[str], str],
+                          time_to_wait_between_calls: float = 0) -> str:
+    '''
+    Tags a text a paragraph at a time, only the paragraphs that are not in
+    the paragraph cache are tagged, and splices the tagged paragraphs back
+    together into the tagged text.
+
+    :param text: The text to tag.
+    :param paragraph_cache: The paragraph cache.
+    :param tag_paragraph: Tags a paragraph, returning the output of
+                          `UCREL_Doc.to_json`, e.g. with the UCREL API.
+    :param time_to_wait_between_calls: Seconds to wait between two calls of
+                                       `tag_paragraph`, so that a text of
+                                       many paragraphs does not call the
+                                       UCREL API more often than whole texts.
+    :returns: The tagged text in the same format as `UCREL_Doc.to_json`,
+              whereby the tokens are those of the paragraphs in order and the
+              sentence indexes of each paragraph are offset by the number of
+              tokens before it.
+    '''
+    token_jsons: List[str] = []
+    sentence_indexes: List[List[int]] = []
+    number_calls = 0
+    for paragraph in split_paragraphs(text):
+        tagged_json = paragraph_cache.get(paragraph)
+        if tagged_json is None:
+            if number_calls:
+                sleep(time_to_wait_between_calls)
+            tagged_json = tag_paragraph(paragraph)
+            number_calls += 1
+            paragraph_cache.write(paragraph, tagged_json)
+        tagged_paragraph = json.loads(tagged_json)
+        offset = len(token_jsons)
+        token_jsons.extend(json.dumps(token) for token in tagged_paragraph['tokens'])
+        sentence_indexes.extend([start + offset, end + offset]
+                                for start, end in tagged_paragraph['sentence_indexes'])
+    return ('{"text": ' + json.dumps(text) + ', "tokens": [' + ', '.join(token_jsons)
+            + '], "sentence_indexes": ' + json.dumps(sentence_indexes) + '}')
@@ -0,0 +1,122 @@
+import contextlib
+import cProfile
+from pathlib import Path
+import resource
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, TypeVar
+
+T = TypeVar('T')
+
+
+class TimedIterable():
+    '''
+    Wraps an iterable to record the time spent producing its items and the
+    number of items produced, e.g. the time spent decoding tokens from a
+    cached USAS file as opposed to the time spent counting them.
+    '''
+
+    def __init__(self) -> None:
+        self.seconds = 0.0
+        self.number_items = 0
+
+    def wrap(self, iterable: Iterable[T]) -> Iterator[T]:
+        iterator = iter(iterable)
+        while True:
+            start_time = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.seconds += time.perf_counter() - start_time
+                return
+            self.seconds += time.perf_counter() - start_time
+            self.number_items += 1
+            yield item
+
+    def wrap_function(self, function: Callable[..., Iterable[T]]
+                      ) -> Callable[..., Iterator[T]]:
+        '''
+        :returns: The function but whose returned iterable is timed.
+        '''
+        def timed_function(*args: Any, **kwargs: Any) -> Iterator[T]:
+            return self.wrap(function(*args, **kwargs))
+        return timed_function
+
+
+class StageProfiler():
+    '''
+    Records the wall time, CPU time, CPU time of child processes (e.g. the
+    SigEff binary), and the peak memory allocated by Python (through
+    `tracemalloc`) of each stage of a run, optionally with `cProfile` data for
+    one of the stages. A disabled profiler records nothing and adds no
+    overhead, so that the stages can always be wrapped in `stage`.
+    '''
+
+    def __init__(self, enabled: bool = True,
+                 cprofile_stage: Optional[str] = None,
+                 cprofile_path: Optional[Path] = None) -> None:
+        '''
+        :param enabled: Whether to record anything.
+        :param cprofile_stage: Name of the stage to profile with `cProfile`.
+        :param cprofile_path: File path to write the `cProfile` data to, which
+                              can be read with `pstats` or e.g. snakeviz.
+        '''
+        self.enabled = enabled
+        self.cprofile_stage = cprofile_stage
+        self.cprofile_path = cprofile_path
+        self.stages: List[Dict[str, Any]] = []
+        if enabled and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextlib.contextmanager
+    def stage(self, name: str) -> Iterator[Dict[str, Any]]:
+        '''
+        Records the stage run within the context.
+
+        :param name: Name of the stage.
+        :returns: A dictionary of additional values to record for the stage,
+                  e.g. the number of tokens counted.
+        '''
+        values: Dict[str, Any] = {}
+        if not self.enabled:
+            yield values
+            return
+        profiler = None
+        if name == self.cprofile_stage:
+            profiler = cProfile.Profile()
+        # Clearing the traces also resets the peak, so that the peak is of
+        # this stage only.
+        tracemalloc.clear_traces()
+        children_start = resource.getrusage(resource.RUSAGE_CHILDREN)
+        cpu_start = time.process_time()
+        wall_start = time.perf_counter()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            yield values
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            wall_seconds = time.perf_counter() - wall_start
+            cpu_seconds = time.process_time() - cpu_start
+            children_end = resource.getrusage(resource.RUSAGE_CHILDREN)
+            _, peak_bytes = tracemalloc.get_traced_memory()
+            stage_values = {'stage': name,
+                            'wall time (seconds)': wall_seconds,
+                            'CPU time (seconds)': cpu_seconds,
+                            'child process CPU time (seconds)':
+                                (children_end.ru_utime - children_start.ru_utime
+                                 + children_end.ru_stime - children_start.ru_stime),
+                            'peak Python memory (MB)': peak_bytes / (1024 * 1024)}
+            stage_values.update(values)
+            self.stages.append(stage_values)
+            if profiler is not None and self.cprofile_path is not None:
+                profiler.dump_stats(str(self.cprofile_path))
+
+    def report(self) -> Dict[str, Any]:
+        '''
+        :returns: The recorded stages, in the order they were run, and the
+                  total wall time of all of the stages.
+        '''
+        total = sum(stage['wall time (seconds)'] for stage in self.stages)
+        return {'stages': self.stages, 'total wall time (seconds)': total}
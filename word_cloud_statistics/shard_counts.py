@@ -0,0 +1,185 @@
+from collections import Counter
+import hashlib
+import json
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Set, Tuple
+import typing
+
+
+# `shard_type` and `in_shard` are copied in `pdfs_to_text/extract_text_from_thesis.py`
+# as the two directories are built into separate Docker images. Text
+# extraction and counting have to assign the same shards, so keep the two
+# copies the same.
+def shard_type(shard: str) -> Tuple[int, int]:
+    '''
+    :param shard: Shard in the format `i/N`, e.g. `2/4` is the second of
+                  four shards.
+    :returns: The shard index and the number of shards.
+    '''
+    try:
+        shard_index, number_of_shards = (int(value) for value in shard.split('/'))
+    except ValueError:
+        raise TypeError(f'The shard {shard} is not in the format `i/N` e.g. 1/4')
+    if not 1 <= shard_index <= number_of_shards:
+        raise TypeError(f'The shard index of {shard} has to be between 1 and '
+                        f'{number_of_shards}.')
+    return shard_index, number_of_shards
+
+
+def in_shard(_file_path: Path, shard_index: int, number_of_shards: int) -> bool:
+    '''
+    :param _file_path: File to partition.
+    :param shard_index: Shard index, between 1 and `number_of_shards`.
+    :param number_of_shards: Number of shards.
+    :returns: True if the file belongs to the shard. The partition is based on
+              a stable hash of the file name without the suffix, so that the
+              same thesis is in the same shard when it is a PDF and when it
+              is a text file, on every machine.
+    '''
+    digest = hashlib.sha1(_file_path.stem.encode('utf-8')).digest()
+    return int.from_bytes(digest[:8], 'big') % number_of_shards == shard_index - 1
+
+
+class ShardCounts():
+    '''
+    The token, USAS tag, and token to USAS tag counts of a shard of the
+    documents, which can be saved, loaded, and merged with the counts of the
+    other shards.
+
+    Each count also stores the first document it occurred in and the order it
+    was first counted within that document. Documents are counted in name
+    order, therefore the merged counts are in the same order as the counts of
+    a single run over all of the documents, which keeps the output of the
+    merged shards identical to that of a single run.
+    '''
+
+    def __init__(self, settings: Mapping[str, Any]) -> None:
+        '''
+        :param settings: The settings used to count, e.g. the token filtering
+                         flags. Only counts with the same settings can be
+                         merged.
+        '''
+        self.settings = dict(settings)
+        self.documents: List[str] = []
+        # key -> [count, first document name, order within that document]
+        self._token: Dict[str, List[Any]] = {}
+        self._usas: Dict[str, List[Any]] = {}
+        self._token_usas: Dict[Tuple[str, str], List[Any]] = {}
+
+    @staticmethod
+    def _add(counts: Dict[Any, List[Any]], key: Any, count: int,
+             document_name: str, order: int) -> None:
+        key_counts = counts.get(key)
+        if key_counts is None:
+            counts[key] = [count, document_name, order]
+            return
+        key_counts[0] += count
+        if (document_name, order) < (key_counts[1], key_counts[2]):
+            key_counts[1] = document_name
+            key_counts[2] = order
+
+    def update(self, document_name: str, token_counter: Mapping[str, int],
+               usas_counter: Mapping[str, int],
+               token_usas_tag: Mapping[str, Mapping[str, int]]) -> None:
+        '''
+        Adds the counts of one document.
+
+        :param document_name: Unique name of the document.
+        :param token_counter: Token counts of the document, in the order the
+                              tokens were first counted.
+        :param usas_counter: USAS tag counts of the document.
+        :param token_usas_tag: USAS tag counts per token of the document.
+        '''
+        self.documents.append(document_name)
+        for order, (token, count) in enumerate(token_counter.items()):
+            self._add(self._token, token, count, document_name, order)
+        for order, (tag, count) in enumerate(usas_counter.items()):
+            self._add(self._usas, tag, count, document_name, order)
+        order = 0
+        for token, tag_counts in token_usas_tag.items():
+            for tag, count in tag_counts.items():
+                self._add(self._token_usas, (token, tag), count, document_name, order)
+                order += 1
+
+    def merge(self, other: 'ShardCounts') -> None:
+        '''
+        Adds the counts of another shard.
+
+        :raises ValueError: If the other shard was counted with different
+                            settings or contains the same documents.
+        '''
+        if other.settings != self.settings:
+            raise ValueError('The shards were counted with different settings:'
+                             f' {self.settings} and {other.settings}')
+        overlap = set(self.documents).intersection(other.documents)
+        if overlap:
+            raise ValueError('The following documents have been counted in '
+                             f'more than one shard: {sorted(overlap)}')
+        self.documents.extend(other.documents)
+        for counts, other_counts in [(self._token, other._token),
+                                     (self._usas, other._usas),
+                                     (self._token_usas, other._token_usas)]:
+            for key, (count, document_name, order) in other_counts.items():
+                self._add(counts, key, count, document_name, order)
+
+    @staticmethod
+    def _in_first_counted_order(counts: Dict[Any, List[Any]]
+                                ) -> Iterable[Tuple[Any, int]]:
+        for key, (count, _, _) in sorted(counts.items(),
+                                         key=lambda item: (item[1][1], item[1][2])):
+            yield key, count
+
+    def token_counter(self) -> Dict[str, int]:
+        return dict(self._in_first_counted_order(self._token))
+
+    def usas_counter(self) -> Dict[str, int]:
+        return dict(self._in_first_counted_order(self._usas))
+
+    def token_usas_tag(self, tokens: Set[str]) -> Dict[str, typing.Counter[str]]:
+        '''
+        :param tokens: The tokens to return the USAS tag counts for.
+        :returns: For each of the given tokens the count of each USAS tag that
+                  was associated with it.
+        '''
+        _token_usas_tag: Dict[str, typing.Counter[str]] = {token: Counter() for token in tokens}
+        for (token, tag), count in self._in_first_counted_order(self._token_usas):
+            if token in _token_usas_tag:
+                _token_usas_tag[token][tag] = count
+        return _token_usas_tag
+
+    def to_dict(self) -> Dict[str, Any]:
+        '''
+        :returns: The counts as a JSON serialisable dictionary.
+        '''
+        return {'settings': self.settings, 'documents': self.documents,
+                'token': [[key, *values] for key, values in self._token.items()],
+                'usas': [[key, *values] for key, values in self._usas.items()],
+                'token_usas': [[*key, *values] for key, values in self._token_usas.items()]}
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> 'ShardCounts':
+        '''
+        :param data: The output of `to_dict`.
+        '''
+        shard_counts = cls(data['settings'])
+        shard_counts.documents = data['documents']
+        shard_counts._token = {key: values for key, *values in data['token']}
+        shard_counts._usas = {key: values for key, *values in data['usas']}
+        shard_counts._token_usas = {(token, tag): values for token, tag, *values
+                                    in data['token_usas']}
+        return shard_counts
+
+    def save(self, _file_path: Path) -> None:
+        '''
+        :param _file_path: File to store the counts in JSON format.
+        '''
+        with _file_path.open('w') as _file:
+            json.dump(self.to_dict(), _file)
+
+    @classmethod
+    def load(cls, _file_path: Path) -> 'ShardCounts':
+        '''
+        :param _file_path: File created by `save`.
+        '''
+        with _file_path.open('r') as _file:
+            return cls.from_dict(json.load(_file))
@@ -0,0 +1,346 @@
+import os
+from pathlib import Path
+import tempfile
+from typing import Any, Callable, Dict, List, Mapping, Optional, Set, Tuple
+import typing
+
+from dispersion import DocumentCounts
+from keyness_table import LOG_LIKELIHOOD_CRITICAL_VALUES, parse_sigeff_output
+from profiling import StageProfiler
+
+
+def sigeff_input_file(_file_path: Path, target_frequency_count: Dict[str, int], 
+                      reference_frequency_count: Dict[str, int], 
+                      min_target_frequency_count: int = 5) -> None:
+    '''
+    This first removes all of the words in the reference and target frequency 
+    count that are less than `min_target_frequency_count`. Then removes all of 
+    the words in the reference frequency count which are not in the target 
+    frequency count. 
+    
+    This then writes the following for each word in the `target_frequency_count`:
+
+    `WORD\t{target_frequency_count_for_word}\t{reference_frequency_count_for_word}\n`
+
+    This is written to the given `_file_path`. The top line is reserved for the 
+    following line:
+    
+    `Total\t{sum of all frequencies in this target column}\t
+     {sum of all frequencies in this reference column}\n`
+
+    This file will then be in the format required for the SigEff C script. An 
+    example of this file format can be seen below (acknowledge Paul Rayson):
+
+    TOTAL	10000	100000
+    Word1	1500	15000
+    Word2	340	2500
+    Word3	200	2500
+    Word4	7	0
+    Word5	654	654
+    Word6	89	536
+
+    :param _file_path: To write the sigeff data too that will be used as input 
+                       to the sigeff C script.
+    :param target_frequency_count: The token/tag frequency counts from the 
+                                   corpus you are interested in.
+    :param reference_frequency_count: The token/tag frequency counts from the  
+                                      reference corpus e.g. BNC. 
+    :param min_target_frequency_count: Minimum frequency count of a word/tag.
+                                       Any word/tag less than this is removed 
+                                       from the reference/target frequency 
+                                       dictionaries.
+    '''
+    reduced_target_frequency_count = {word: freq for word, freq in target_frequency_count.items() 
+                                      if freq>=min_target_frequency_count}
+    reduced_reference_frequency_count = {word: freq for word, freq in reference_frequency_count.items()
+                                         if word in reduced_target_frequency_count}
+    total_target_frequency_count = sum([freq for freq in reduced_target_frequency_count.values()])
+    total_reference_frequency_count = sum([freq for freq in reduced_reference_frequency_count.values()])
+    
+    with _file_path.open('w') as _file:
+        _file.write(f'Total\t{total_target_frequency_count}\t{total_reference_frequency_count}\n')
+        for word, target_frequency in reduced_target_frequency_count.items():
+            reference_frequency = reduced_reference_frequency_count.get(word, 0)
+            _file.write(f'{word}\t{target_frequency}\t{reference_frequency}\n')
+
+
+def _get_significant_key_words(file_lines: List[str], 
+                               significance_level: float = 0.05
+                               ) -> Dict[str, Dict[str, Any]]:
+    '''
+    :param file_lines: The output of the function readlines on the file that 
+                       contains the result from running the SigEff C script.
+    :param significance_level: The level of significance. 0.05 = 95% 0.01 = 99%.
+                               significance levels allowed are: 0.05, 0.01,
+                               0.001, and 0.0001.
+    :returns: All of the words that are significantly more likely to occur in the 
+              target corpus than the reference at the given significance level. 
+              The words are the keys and the values are a dictionary of statistics
+              with the statistic name as key with it's associated value e.g. 
+              `log-likelihood` : 12.3
+    '''
+    significant_words = {}
+    log_likelihood_sig_value = LOG_LIKELIHOOD_CRITICAL_VALUES[significance_level]
+    for row in parse_sigeff_output(file_lines):
+        (word, higher_symbol, frequency_in_target_corpus, 
+         relative_frequency_in_target_corpus, _, _, log_likelihood) = row[:7]
+        log_ratio = row[11]
+        # Only want words that are significantly more likely to occur in the 
+        # target than the reference corpus.
+        if higher_symbol != '+':
+            continue
+        # Checking if the word is significant
+        if log_likelihood < log_likelihood_sig_value:
+            continue
+        significant_words[word] = {'Log Likelihood': log_likelihood, 
+                                   'Log Ratio': log_ratio, 
+                                   'Frequency': frequency_in_target_corpus,
+                                   'Relative Frequency (%)': relative_frequency_in_target_corpus}
+    return significant_words
+
+
+def run_sigeff(target_counter: Dict[str, int], 
+               reference_counter: Dict[str, int],
+               sigeff_binary_file_path: Path,
+               semtag_summary_file_path: Path,
+               min_target_frequency_count: int = 5) -> List[str]:
+    '''
+    :param target_counter: The frequency counts of the token/tag from the corpus 
+                           you are interested in.
+    :param reference_counter: The frequency counts of the token/tag from the  
+                              reference corpus e.g. BNC.
+    :param sigeff_binary_file_path: File path to the SigEff C binary
+    :param semtag_summary_file_path: File path to the USAS tag summary file. 
+                                     This is used by the SigEff binary.
+    :param min_target_frequency_count: Minimum frequency count of a token/tag 
+                                       in the target counter, see 
+                                       `sigeff_input_file`.
+    :returns: The lines of the SigEff output, for every token/tag in the 
+              target counter with at least the minimum frequency count.
+    '''
+    with tempfile.NamedTemporaryFile('w+') as a_file:
+        temp_file_path = Path(a_file.name)
+        sigeff_input_file(temp_file_path, target_counter, reference_counter, 
+                          min_target_frequency_count=min_target_frequency_count)
+
+        with tempfile.NamedTemporaryFile('w+') as result_file:
+            run_command = [f"{str(sigeff_binary_file_path)}", "-X", 
+                           f"{str(semtag_summary_file_path)}", "<", 
+                           f"{a_file.name}", ">", f"{result_file.name}"]
+            os.system(' '.join(run_command))
+            return result_file.readlines()
+
+
+def extract_significant_key_words(target_counter: Dict[str, int], 
+                                  reference_counter: Dict[str, int],
+                                  sigeff_binary_file_path: Path,
+                                  semtag_summary_file_path: Path,
+                                  significance_level: float = 0.05,
+                                  min_target_frequency_count: int = 5
+                                  ) -> Dict[str, Dict[str, Any]]:
+    '''
+    :param target_counter: The frequency counts of the token/tag from the corpus 
+                           you are interested in.
+    :param reference_counter: The frequency counts of the token/tag from the  
+                              reference corpus e.g. BNC.
+    :param sigeff_binary_file_path: File path to the SigEff C binary
+    :param semtag_summary_file_path: File path to the USAS tag summary file. 
+                                     This is used by the SigEff binary.
+    :param significance_level: The level of significance. 0.05 = 95% 0.01 = 99%.
+                               significance levels allowed are: 0.05, 0.01,
+                               0.001, and 0.0001.
+    :param min_target_frequency_count: Minimum frequency count of a token/tag 
+                                       in the target counter to be considered 
+                                       in the token/tag significance list that 
+                                       is returned.
+    :returns: All of the token/tags that are significantly more likely to occur in the 
+              target corpus than the reference at the given significance level. 
+              The words are the keys and the values are a dictionary of statistics
+              with the statistic name as key with it's associated value e.g. 
+              `log-likelihood` : 12.3
+    '''
+    lines = run_sigeff(target_counter, reference_counter, sigeff_binary_file_path, 
+                       semtag_summary_file_path, min_target_frequency_count)
+    return _get_significant_key_words(lines, significance_level)
+
+
+def common_usas_tags(usas_tag_counter: typing.Counter[str]
+                     ) -> List[Tuple[str, float]]:
+    '''
+    :param usas_tag_counter: The USAS tag counts of a token.
+    :returns: The most and second most frequent USAS tags of the token with 
+              the percentage of the USAS tags of the token that they are.
+    '''
+    num_usas_tags = float(sum(usas_tag_counter.values()))
+    # Normalize the number of times the USAS tag occurred by the number of 
+    # USAS tags for that token.
+    return [(tag, (float(value) / num_usas_tags) * 100)
+            for tag, value in usas_tag_counter.most_common(2)]
+
+
+def read_usas_tag_labels(semtag_summary_file_path: Path) -> Dict[str, str]:
+    '''
+    :param semtag_summary_file_path: File path to the USAS tag summary file.
+    :returns: The USAS tags and their labels e.g. T and Time.
+    '''
+    usas_tag_label: Dict[str, str] = {}
+    with semtag_summary_file_path.open('r') as semtag_file:
+        for line in semtag_file:
+            if not line.strip():
+                continue
+            tag, label = line.split('\t')
+            tag = tag.strip()
+            label = label.strip()
+            usas_tag_label[tag] = label
+    return usas_tag_label
+
+
+def USAS_tag_to_label(usas_mapper: Dict[str, str], tag: str) -> str:
+    '''
+    :param usas_mapper: Maps USAS tags to labels e.g. T to Time.
+    :param tag: USAS tag to convert to label.
+    :returns: The label for the given USAS tag. This process performs removal 
+              of the USAS special symbols like `+` and `%` to find the relevant 
+              USAS label. It also adds these special specials symbols back on 
+              to the label so that it is possible to convert the returned label 
+              back to it's original tag.
+    '''
+    # For the list of symbols see page 2 of the following guide:
+    # http://ucrel.lancs.ac.uk/usas/usas_guide.pdf
+    other_usas_symbols = set(['%', '@', 'f', 'm', 'c', 'n', 'i', '+', '-'])
+    # Some USAS tags are not in the USAS tags to labels list as they 
+    # can have additional + or - sings at the end of the USAS tags. 
+    # Therefore we remove the + or - until we find the label.
+    temp_tag = tag
+    chars_removed = ''
+    while temp_tag not in usas_mapper:
+        last_tag_char = temp_tag[-1]
+        if last_tag_char in other_usas_symbols:
+            chars_removed += last_tag_char
+            temp_tag = temp_tag[:-1]
+        else:
+            break
+    else:
+        label = usas_mapper[temp_tag]
+        if chars_removed:
+            label += f' - {chars_removed}'
+        return label
+    raise ValueError(f'Special symbol in the USAS tag {tag} that is not one '
+                     f'of the special symbols: {other_usas_symbols} or a '
+                     'USAS tag itself.')
+
+
+def convert_usas_tags_to_labels(significant_tokens: Dict[str, Dict[str, Any]], 
+                                significant_tags: Dict[str, Dict[str, Any]],
+                                usas_tag_label: Dict[str, str]
+                                ) -> Tuple[Dict[str, Dict[str, Any]], 
+                                           Dict[str, Dict[str, Any]]]:
+    '''
+    :param significant_tokens: The significant tokens with their most common 
+                               USAS tags.
+    :param significant_tags: The significant USAS tags.
+    :param usas_tag_label: Maps USAS tags to labels e.g. T to Time.
+    :returns: The significant tokens, whose most common USAS tags are 
+              converted to labels in place, and the significant USAS tags 
+              keyed by their labels.
+    '''
+    temp_sig_tags = {}
+    for tag, values in significant_tags.items():
+        label = USAS_tag_to_label(usas_tag_label, tag)
+        if label in temp_sig_tags:
+            raise ValueError(f'This label {label} appears twice in the '
+                             'significantly occuring USAS labels.')
+        temp_sig_tags[label] = values
+    significant_tags = temp_sig_tags
+
+    for token, values in significant_tokens.items():
+        token_usas_tags = values['Common associated USAS tags (%)']
+        if not token_usas_tags:
+            continue
+        _token_usas_tags = []
+        for tag, value in token_usas_tags:
+            label = USAS_tag_to_label(usas_tag_label, tag)
+            _token_usas_tags.append((label, value))
+        values['Common associated USAS tags (%)'] = _token_usas_tags
+    return significant_tokens, significant_tags
+
+
+def significant_token_tag_statistics(token_counter: Dict[str, int], 
+                                     usas_counter: Dict[str, int],
+                                     get_token_usas_tag: Callable[[Set[str]], Mapping[str, typing.Counter[str]]],
+                                     reference_token_counter: Dict[str, int],
+                                     reference_usas_counter: Dict[str, int],
+                                     sigeff_binary_file_path: Path,
+                                     semtag_summary_file_path: Path,
+                                     significance_level: float = 0.05,
+                                     min_target_frequency_count: int = 5,
+                                     usas_tags_to_labels: bool = False,
+                                     profiler: Optional[StageProfiler] = None,
+                                     token_document_counts: Optional[DocumentCounts] = None,
+                                     usas_document_counts: Optional[DocumentCounts] = None
+                                     ) -> Tuple[Dict[str, Dict[str, Any]], 
+                                                Dict[str, Dict[str, Any]]]:
+    '''
+    :param token_counter: The token frequency counts of the target corpus.
+    :param usas_counter: The USAS tag frequency counts of the target corpus.
+    :param get_token_usas_tag: Given the significant tokens returns the USAS 
+                               tag counts of each of those tokens.
+    :param reference_token_counter: The token frequency counts of the 
+                                    reference corpus e.g. BNC.
+    :param reference_usas_counter: The USAS tag frequency counts of the 
+                                   reference corpus e.g. BNC.
+    :param sigeff_binary_file_path: File path to the SigEff C binary
+    :param semtag_summary_file_path: File path to the USAS tag summary file. 
+                                     This is used by the SigEff binary and to 
+                                     convert USAS tags to labels.
+    :param significance_level: The level of significance. 0.05 = 95% 0.01 = 99%.
+    :param min_target_frequency_count: Minimum frequency count of a token/tag 
+                                       in the target corpus.
+    :param usas_tags_to_labels: Whether to convert the USAS tags to labels.
+    :param profiler: Records the significance testing and label conversion 
+                     stages, if given.
+    :param token_document_counts: The token counts of each document, if given 
+                                  the dispersion of each significant token is 
+                                  added to its values, see 
+                                  `dispersion.DocumentCounts.dispersion`.
+    :param usas_document_counts: The USAS tag counts of each document, if 
+                                 given the dispersion of each significant USAS 
+                                 tag is added to its values.
+    :returns: The significant tokens, with their most common USAS tags, and 
+              the significant USAS tags excluding the Z9 and Z99 tags, in the 
+              format of the token and usas output files.
+    '''
+    if profiler is None:
+        profiler = StageProfiler(enabled=False)
+    with profiler.stage('token_significance'):
+        significant_tokens = extract_significant_key_words(token_counter, reference_token_counter, 
+                                                           sigeff_binary_file_path, semtag_summary_file_path, 
+                                                           significance_level, min_target_frequency_count)
+    token_usas_tag = get_token_usas_tag(set(significant_tokens))
+    # Add the most and second most frequent usas tags to the token information
+    for token, token_values in significant_tokens.items():
+        token_values['Common associated USAS tags (%)'] = common_usas_tags(token_usas_tag[token])
+
+    with profiler.stage('usas_significance'):
+        significant_tags = extract_significant_key_words(usas_counter, reference_usas_counter, 
+                                                         sigeff_binary_file_path, semtag_summary_file_path, 
+                                                         significance_level, min_target_frequency_count)
+    # Remove the Z99 and Z9 SemTags
+    temp_sig_tags = {tag: value for tag, value in significant_tags.items() if 'Z9' not in tag}
+    significant_tags = temp_sig_tags
+
+    if token_document_counts is not None or usas_document_counts is not None:
+        with profiler.stage('dispersion'):
+            for significant, document_counts in [(significant_tokens, token_document_counts),
+                                                 (significant_tags, usas_document_counts)]:
+                if document_counts is None:
+                    continue
+                for key, dispersion in document_counts.dispersion(significant).items():
+                    significant[key].update(dispersion)
+
+    if usas_tags_to_labels:
+        with profiler.stage('label_conversion'):
+            usas_tag_label = read_usas_tag_labels(semtag_summary_file_path)
+            significant_tokens, significant_tags = convert_usas_tags_to_labels(
+                significant_tokens, significant_tags, usas_tag_label)
+    return significant_tokens, significant_tags
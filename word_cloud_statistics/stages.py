@@ -0,0 +1,195 @@
+from collections import Counter, defaultdict
+from pathlib import Path
+from time import sleep
+import typing
+from typing import (TYPE_CHECKING, Any, Callable, Dict, Iterable, Iterator,
+                    Mapping, Optional, Tuple)
+
+from paragraph_cache import ParagraphCache
+from significance import significant_token_tag_statistics
+from token_filter import TokenFilter, count_tokens
+from usas_cache import USASCache
+from usas_json_reader import TokenTuple, iter_usas_tokens
+from usas_tagging import cached_usas_file, tag_and_cache_text
+
+if TYPE_CHECKING:
+    from ucrel_api.api import UCREL_API
+
+# The counts of a text: the token counts, USAS tag counts, and the USAS tag
+# counts per token.
+TextCounts = Tuple[typing.Counter[str], typing.Counter[str],
+                   Dict[str, typing.Counter[str]]]
+
+
+def iter_texts(text_file_paths: Iterable[Path]) -> Iterator[Tuple[str, str]]:
+    '''
+    :param text_file_paths: Text files, e.g. the exported theses.
+    :returns: Yields the name and text of each file, one file at a time.
+    '''
+    for _file_path in text_file_paths:
+        with _file_path.open('r') as _file:
+            yield _file_path.name, _file.read()
+
+
+def tag_texts(texts: Iterable[Tuple[str, str]], ucrel_api: 'UCREL_API',
+              usas_cache: USASCache, replace_usas_cache: bool = False,
+              time_to_wait_between_usas_api_calls: float = 0,
+              paragraph_cache: Optional[ParagraphCache] = None
+              ) -> Iterator[Tuple[str, Path]]:
+    '''
+    The tagging stage of `token_tag_statistics.py`, and of its `tag`
+    subcommand: texts that are in the USAS cache are not tagged again.
+
+    :param texts: The name and text of each text, e.g. from `iter_texts`.
+    :param ucrel_api: The UCREL API to tag with.
+    :param usas_cache: The USAS cache.
+    :param replace_usas_cache: Tag the texts even if they are in the cache.
+    :param time_to_wait_between_usas_api_calls: Seconds to wait after each
+                                                call of the UCREL API.
+    :param paragraph_cache: If given texts are tagged a paragraph at a time,
+                            see `usas_tagging.tag_and_cache_text`,
+                            and the USAS cache should be keyed by
+                            `paragraph_cache.paragraph_tagger_version`.
+    :returns: Yields the name and cached USAS file of each text, texts whose
+              tagging failed, which is logged, are not yielded.
+    '''
+    journal_status = usas_cache.journal_status()
+    for name, text in texts:
+        if not replace_usas_cache:
+            usas_file_path = cached_usas_file(usas_cache, Path(name), text)
+            if usas_file_path is not None:
+                yield name, usas_file_path
+                continue
+        usas_file_path = tag_and_cache_text(ucrel_api, usas_cache, name, text,
+                                            journal_status, paragraph_cache,
+                                            time_to_wait_between_usas_api_calls)
+        if usas_file_path is not None:
+            yield name, usas_file_path
+        sleep(time_to_wait_between_usas_api_calls)
+
+
+def read_tagged_texts(tagged_texts: Iterable[Tuple[str, Path]],
+                      read_tokens: Callable[[Path], Iterable[TokenTuple]] = iter_usas_tokens
+                      ) -> Iterator[Tuple[str, Iterable[TokenTuple]]]:
+    '''
+    :param tagged_texts: The name and cached USAS file of each text, e.g.
+                         from `tag_texts`.
+    :param read_tokens: Reads the tokens from a cached USAS file.
+    :returns: Yields the name and tokens of each text, the tokens are
+              streamed from the cached file when they are iterated over.
+    '''
+    for name, usas_file_path in tagged_texts:
+        yield name, read_tokens(usas_file_path)
+
+
+def filter_tokens(tokens: Iterable[TokenTuple], token_filter: TokenFilter
+                  ) -> Iterator[Tuple[str, Optional[str]]]:
+    '''
+    :param tokens: Tokens of a text, e.g. from `read_tagged_texts`.
+    :param token_filter: Decides which tokens are kept.
+    :returns: Yields the text to count, see `token_filter.TokenFilter`, and
+              the USAS tag of each token that is kept.
+    '''
+    for text, lemma, pos_tag, usas_tag in tokens:
+        token_text = token_filter(text, lemma, pos_tag)
+        if token_text is not None:
+            yield token_text, usas_tag
+
+
+def count_texts(texts: Iterable[Tuple[str, Iterable[TokenTuple]]],
+                token_filter: TokenFilter) -> Iterator[Tuple[str, TextCounts]]:
+    '''
+    :param texts: The name and tokens of each text, e.g. from
+                  `read_tagged_texts`.
+    :param token_filter: Decides which tokens are counted.
+    :returns: Yields the name and counts of each text, see
+              `token_filter.count_tokens`.
+    '''
+    for name, tokens in texts:
+        token_counter: typing.Counter[str] = Counter()
+        usas_counter: typing.Counter[str] = Counter()
+        token_usas_tag: Dict[str, typing.Counter[str]] = defaultdict(Counter)
+        count_tokens(tokens, token_filter, token_counter, usas_counter,
+                     token_usas_tag)
+        yield name, (token_counter, usas_counter, token_usas_tag)
+
+
+def count_all_texts(texts: Iterable[Tuple[str, Iterable[TokenTuple]]],
+                    token_filter: TokenFilter) -> TextCounts:
+    '''
+    The same as the `sum_counts` of `count_texts`, but the tokens of every
+    text are counted straight into the counts of all of the texts, for when
+    the counts of each text are not needed.
+
+    :param texts: The name and tokens of each text, e.g. from
+                  `read_tagged_texts`.
+    :param token_filter: Decides which tokens are counted.
+    :returns: The counts of all of the texts.
+    '''
+    token_counter: typing.Counter[str] = Counter()
+    usas_counter: typing.Counter[str] = Counter()
+    token_usas_tag: Dict[str, typing.Counter[str]] = defaultdict(Counter)
+    for _, tokens in texts:
+        count_tokens(tokens, token_filter, token_counter, usas_counter,
+                     token_usas_tag)
+    return token_counter, usas_counter, token_usas_tag
+
+
+def sum_counts(text_counts: Iterable[Tuple[str, TextCounts]],
+               add_text: Optional[Callable[[str, TextCounts], None]] = None
+               ) -> TextCounts:
+    '''
+    :param text_counts: The name and counts of each text, e.g. from
+                        `count_texts`.
+    :param add_text: Called with the name and counts of each text, e.g. to
+                     also keep the counts of each text for the dispersion.
+    :returns: The counts of all of the texts.
+    '''
+    token_counter: typing.Counter[str] = Counter()
+    usas_counter: typing.Counter[str] = Counter()
+    token_usas_tag: Dict[str, typing.Counter[str]] = defaultdict(Counter)
+    for name, counts in text_counts:
+        if add_text is not None:
+            add_text(name, counts)
+        text_token_counter, text_usas_counter, text_token_usas_tag = counts
+        token_counter.update(text_token_counter)
+        usas_counter.update(text_usas_counter)
+        for token, tag_counter in text_token_usas_tag.items():
+            token_usas_tag[token].update(tag_counter)
+    return token_counter, usas_counter, token_usas_tag
+
+
+def keyness(counts: TextCounts, reference_token_counter: Mapping[str, int],
+            reference_usas_counter: Mapping[str, int],
+            sigeff_binary_file_path: Path, semtag_summary_file_path: Path,
+            significance_level: float = 0.05,
+            min_target_frequency_count: int = 5,
+            usas_tags_to_labels: bool = False
+            ) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, Dict[str, Any]]]:
+    '''
+    :param counts: The counts of the target corpus, e.g. from `sum_counts`.
+    :param reference_token_counter: The token frequency counts of the
+                                    reference corpus, see
+                                    `token_tag_statistics.read_frequency_file`.
+    :param reference_usas_counter: The USAS tag frequency counts of the
+                                   reference corpus.
+    :param sigeff_binary_file_path: File path to the SigEff C binary.
+    :param semtag_summary_file_path: File path to the USAS tag summary file.
+    :param significance_level: The level of significance, one of 0.05, 0.01,
+                               0.001, and 0.0001.
+    :param min_target_frequency_count: Minimum frequency count of a token/tag
+                                       in the target corpus.
+    :param usas_tags_to_labels: Whether to convert the USAS tags to labels.
+    :returns: The significant tokens and USAS tags, the same as the token and
+              usas output files of `token_tag_statistics.py`.
+    '''
+    token_counter, usas_counter, token_usas_tag = counts
+    return significant_token_tag_statistics(dict(token_counter), dict(usas_counter),
+                                            lambda significant_tokens: token_usas_tag,
+                                            dict(reference_token_counter),
+                                            dict(reference_usas_counter),
+                                            sigeff_binary_file_path,
+                                            semtag_summary_file_path,
+                                            significance_level,
+                                            min_target_frequency_count,
+                                            usas_tags_to_labels)
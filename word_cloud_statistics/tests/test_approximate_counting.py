@@ -0,0 +1,100 @@
+from collections import Counter
+from pathlib import Path
+import random
+import sys
+from typing import List
+import typing
+import unittest
+
+# The modules are scripts in the directory above, not a package.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from approximate_counting import ApproximateCounts, CountMinSketch, HeavyHitters
+
+
+def zipf_documents(rng: random.Random, number_documents: int,
+                   vocabulary_size: int) -> List[typing.Counter[str]]:
+    words = [f'word{index}' for index in range(vocabulary_size)]
+    weights = [1 / (rank + 1) for rank in range(vocabulary_size)]
+    return [Counter(rng.choices(words, weights, k=rng.randint(0, 500)))
+            for _ in range(number_documents)]
+
+
+class TestCountMinSketch(unittest.TestCase):
+
+    def test_against_recount(self) -> None:
+        rng = random.Random(0)
+        sketch = CountMinSketch(0.01, 0.01)
+        counts: typing.Counter[str] = Counter()
+        for document_counts in zipf_documents(rng, 50, 2000):
+            for word, count in document_counts.items():
+                estimate = sketch.add(word, count)
+                counts[word] += count
+                self.assertGreaterEqual(estimate, counts[word])
+        self.assertEqual(sum(counts.values()), sketch.total_count)
+        over_bound = 0
+        for word, count in counts.items():
+            estimate = sketch.estimate(word)
+            # Never lower than the true count.
+            self.assertGreaterEqual(estimate, count)
+            if estimate - count > sketch.error_bound:
+                over_bound += 1
+        # Each estimate is within the error bound with probability 1 - delta.
+        self.assertLessEqual(over_bound, 0.01 * len(counts) + 1)
+        self.assertLessEqual(sketch.estimate('not a word'), sketch.error_bound)
+
+    def test_parameters(self) -> None:
+        for epsilon, delta in [(0, 0.1), (1, 0.1), (0.1, 0), (0.1, 1.5)]:
+            with self.assertRaises(ValueError):
+                CountMinSketch(epsilon, delta)
+
+
+class TestHeavyHitters(unittest.TestCase):
+
+    def test_keeps_largest(self) -> None:
+        heavy_hitters = HeavyHitters(capacity=3, threshold=5)
+        for key, estimate in [('a', 4), ('b', 5), ('c', 9), ('d', 7), ('e', 6),
+                              ('b', 10), ('f', 5)]:
+            heavy_hitters.offer(key, estimate)
+        self.assertEqual({'b', 'c', 'd'}, heavy_hitters.keys)
+        # b and then e evicted and f not added, all at least the threshold.
+        self.assertEqual(3, heavy_hitters.number_dropped)
+
+
+class TestApproximateCounts(unittest.TestCase):
+
+    def test_candidates_against_recount(self) -> None:
+        rng = random.Random(1)
+        minimum_count = 20
+        approximate_counts = ApproximateCounts(0.001, 0.01, 1000, minimum_count)
+        token_counts: typing.Counter[str] = Counter()
+        usas_counts: typing.Counter[str] = Counter()
+        for document_counts in zipf_documents(rng, 100, 3000):
+            usas_counter = Counter({f'Z{len(word) % 4}': count
+                                    for word, count in document_counts.items()})
+            approximate_counts.update(document_counts, usas_counter)
+            token_counts.update(document_counts)
+            usas_counts.update(usas_counter)
+        report = approximate_counts.report()
+        self.assertTrue(report['token']['all frequent items are candidates'])
+        self.assertEqual(sum(token_counts.values()), report['token']['total count'])
+        frequent_tokens = {token for token, count in token_counts.items()
+                           if count >= minimum_count}
+        self.assertTrue(frequent_tokens)
+        self.assertLessEqual(frequent_tokens, approximate_counts.token_candidates.keys)
+        frequent_tags = {tag for tag, count in usas_counts.items()
+                         if count >= minimum_count}
+        self.assertLessEqual(frequent_tags, approximate_counts.usas_candidates.keys)
+
+    def test_capacity_too_small(self) -> None:
+        rng = random.Random(2)
+        approximate_counts = ApproximateCounts(0.001, 0.01, 5, 1)
+        for document_counts in zipf_documents(rng, 10, 100):
+            approximate_counts.update(document_counts, {})
+        report = approximate_counts.report()
+        self.assertFalse(report['token']['all frequent items are candidates'])
+        self.assertEqual(5, report['token']['number of candidates'])
+
+
+if __name__ == '__main__':
+    unittest.main()
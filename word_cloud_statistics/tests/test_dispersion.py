@@ -0,0 +1,91 @@
+from collections import Counter
+import math
+from pathlib import Path
+import random
+import sys
+from typing import Dict, List, Optional
+import typing
+import unittest
+
+# The modules are scripts in the directory above, not a package.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from dispersion import DocumentCounts
+
+
+def naive_dispersion(documents: List[typing.Counter[str]], key: str
+                     ) -> Dict[str, Optional[float]]:
+    '''
+    The dispersion computed from the count of the key in every document,
+    including those it is not in.
+    '''
+    sizes = [sum(document.values()) for document in documents]
+    corpus_size = sum(sizes)
+    key_total = sum(document[key] for document in documents)
+    relative_frequencies = [document[key] / size
+                            for document, size in zip(documents, sizes) if size]
+    juilland_d = None
+    if len(relative_frequencies) > 1:
+        mean = sum(relative_frequencies) / len(relative_frequencies)
+        standard_deviation = math.sqrt(sum((frequency - mean) ** 2
+                                           for frequency in relative_frequencies)
+                                       / len(relative_frequencies))
+        juilland_d = 1 - (standard_deviation / mean) / math.sqrt(len(relative_frequencies) - 1)
+    dp = 0.5 * sum(abs(document[key] / key_total - size / corpus_size)
+                   for document, size in zip(documents, sizes))
+    return {'Document Frequency': sum(1 for document in documents if document[key]),
+            "Juilland's D": juilland_d, 'DP': dp}
+
+
+class TestDocumentCounts(unittest.TestCase):
+
+    def test_against_recount(self) -> None:
+        rng = random.Random(0)
+        words = [f'word{index}' for index in range(40)]
+        for _ in range(30):
+            documents = [Counter(rng.choices(words, [1 / (rank + 1) for rank in range(40)],
+                                             k=rng.choice([0, 1, 10, 200])))
+                         for _ in range(rng.randint(1, 15))]
+            document_counts = DocumentCounts()
+            for document in documents:
+                document_counts.add_document(document)
+            results = document_counts.dispersion()
+            keys = {key for document in documents for key in document}
+            self.assertEqual(keys, set(results))
+            for key in keys:
+                expected = naive_dispersion(documents, key)
+                values = results[key]
+                self.assertEqual(expected['Document Frequency'], values['Document Frequency'])
+                if expected["Juilland's D"] is None:
+                    self.assertIsNone(values["Juilland's D"])
+                else:
+                    self.assertAlmostEqual(expected["Juilland's D"], values["Juilland's D"],
+                                           delta=1e-4)
+                self.assertAlmostEqual(expected['DP'], values['DP'], delta=1e-4)
+            # Only the given keys, and not those that were never counted.
+            some_keys = sorted(keys)[:3] + ['not counted']
+            self.assertEqual(sorted(keys)[:3], sorted(document_counts.dispersion(some_keys)))
+
+    def test_extremes(self) -> None:
+        document_counts = DocumentCounts()
+        for _ in range(5):
+            document_counts.add_document({'even': 2, 'other': 8})
+        document_counts.add_document({'one': 5, 'other': 5})
+        results = document_counts.dispersion()
+        # The same relative frequency in 5 of the 6 documents.
+        self.assertEqual(5, results['even']['Document Frequency'])
+        # Only in one document, of a sixth of the corpus.
+        self.assertEqual({'Document Frequency': 1, "Juilland's D": 0.0,
+                          'DP': round(5 / 6, 4)}, results['one'])
+        document_counts = DocumentCounts()
+        for _ in range(3):
+            document_counts.add_document({'even': 1, 'other': 3})
+        self.assertEqual({'Document Frequency': 3, "Juilland's D": 1.0, 'DP': 0.0},
+                         document_counts.dispersion(['even'])['even'])
+        document_counts = DocumentCounts()
+        document_counts.add_document({'single': 1})
+        self.assertIsNone(document_counts.dispersion()['single']["Juilland's D"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+from collections import Counter, defaultdict
+from pathlib import Path
+import random
+import sys
+import tempfile
+from typing import Dict, List, Tuple
+import typing
+import unittest
+
+# The modules are scripts in the directory above, not a package.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from external_counting import ExternalCounts
+
+DocumentCounts = Tuple[typing.Counter[str], typing.Counter[str],
+                       Dict[str, typing.Counter[str]]]
+
+
+def random_documents(rng: random.Random, number_documents: int
+                     ) -> List[DocumentCounts]:
+    documents: List[DocumentCounts] = []
+    for _ in range(number_documents):
+        token_counter: typing.Counter[str] = Counter()
+        usas_counter: typing.Counter[str] = Counter()
+        token_usas_tag: Dict[str, typing.Counter[str]] = defaultdict(Counter)
+        for _ in range(rng.randint(0, 200)):
+            token = f'word{rng.randint(0, 300)}'
+            tags = rng.sample(['Z5', 'A1', 'W4', 'B2', 'PUNC'], rng.randint(0, 2))
+            token_counter[token] += 1
+            usas_counter.update(tags)
+            token_usas_tag[token].update(tags)
+        documents.append((token_counter, usas_counter, token_usas_tag))
+    return documents
+
+
+class TestExternalCounts(unittest.TestCase):
+
+    def test_against_recount(self) -> None:
+        rng = random.Random(0)
+        for _ in range(10):
+            documents = random_documents(rng, rng.randint(1, 30))
+            token_counter: typing.Counter[str] = Counter()
+            usas_counter: typing.Counter[str] = Counter()
+            token_usas_tag: Dict[str, typing.Counter[str]] = defaultdict(Counter)
+            for document_token, document_usas, document_token_usas in documents:
+                token_counter.update(document_token)
+                usas_counter.update(document_usas)
+                for token, tag_counts in document_token_usas.items():
+                    token_usas_tag[token].update(tag_counts)
+            min_count = rng.randint(1, 5)
+            expected_tokens = [(token, count) for token, count in token_counter.items()
+                               if count >= min_count]
+            expected_tags = [(tag, count) for tag, count in usas_counter.items()
+                             if count >= min_count]
+            tokens = {token for token, _ in expected_tokens}
+            # Spilling after every document, after some, and never.
+            for max_memory_bytes in [0, 20000, 10**9]:
+                with tempfile.TemporaryDirectory() as spill_directory:
+                    with ExternalCounts(max_memory_bytes, Path(spill_directory)) as counts:
+                        for document_counts in documents:
+                            counts.update(*document_counts)
+                        if max_memory_bytes == 0:
+                            self.assertEqual(sum(1 for document_counts in documents
+                                                 if document_counts[0]),
+                                             counts.number_of_spills)
+                        elif max_memory_bytes == 10**9:
+                            self.assertEqual(0, counts.number_of_spills)
+                        # Same counts in the same order as the Counters.
+                        self.assertEqual(expected_tokens,
+                                         list(counts.token_counter(min_count).items()))
+                        self.assertEqual(expected_tags,
+                                         list(counts.usas_counter(min_count).items()))
+                        token_tags = counts.token_usas_tag(tokens)
+                        self.assertEqual(tokens, set(token_tags))
+                        for token in tokens:
+                            self.assertEqual(list(token_usas_tag[token].items()),
+                                             list(token_tags[token].items()))
+                    self.assertEqual([], list(Path(spill_directory).iterdir()))
+
+
+if __name__ == '__main__':
+    unittest.main()
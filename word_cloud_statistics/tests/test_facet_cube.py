@@ -0,0 +1,116 @@
+from collections import Counter
+from pathlib import Path
+import random
+import sys
+import tempfile
+from typing import Dict, List, Mapping, Tuple
+import typing
+import unittest
+
+# The modules are scripts in the directory above, not a package.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from facet_cube import FacetCube, read_facet_metadata, text_facet_values
+
+FACETS = {'year': ['2018', '2019', '2020'], 'degree': ['PhD', 'MSc'],
+          'department': ['LEC', 'Law', 'History', 'Physics']}
+SETTINGS = {'lower_case': True}
+
+Document = Tuple[str, Dict[str, str], typing.Counter[str], typing.Counter[str]]
+
+
+def random_documents(rng: random.Random) -> List[Document]:
+    words = [f'word{index}' for index in range(30)]
+    tags = ['Z5', 'A1', 'W4', 'N5', 'Z8']
+    documents: List[Document] = []
+    for document_index in range(rng.randint(1, 40)):
+        # Some texts are missing a value for a facet.
+        facet_values = {facet_name: rng.choice(values)
+                        for facet_name, values in FACETS.items() if rng.random() < 0.9}
+        document_tags = rng.choices(tags, k=rng.choice([0, 5, 50]))
+        documents.append((f'thesis_{document_index:03d}.txt', facet_values,
+                          Counter(rng.choices(words, k=len(document_tags))),
+                          Counter(document_tags)))
+    return documents
+
+
+def naive_slice(documents: List[Document], selection: Mapping[str, List[str]]
+                ) -> Tuple[List[str], Dict[str, int], Dict[str, int]]:
+    '''
+    Counts only the documents in the slice, in order of their name.
+    '''
+    names: List[str] = []
+    token_counter: typing.Counter[str] = Counter()
+    usas_counter: typing.Counter[str] = Counter()
+    for name, facet_values, document_tokens, document_tags in sorted(documents):
+        if all(facet_values.get(facet_name) in values
+               for facet_name, values in selection.items()):
+            names.append(name)
+            token_counter.update(document_tokens)
+            usas_counter.update(document_tags)
+    return names, dict(token_counter), dict(usas_counter)
+
+
+class TestFacetCube(unittest.TestCase):
+
+    def test_slice_against_recount(self) -> None:
+        rng = random.Random(0)
+        with tempfile.TemporaryDirectory() as temporary_directory:
+            cube_file_path = Path(temporary_directory, 'cube.json')
+            for _ in range(40):
+                documents = random_documents(rng)
+                facet_cube = FacetCube(FACETS, SETTINGS)
+                for name, facet_values, document_tokens, document_tags in documents:
+                    token_usas_tag = {token: Counter({'Z5': count})
+                                      for token, count in document_tokens.items()}
+                    facet_cube.update(name, facet_values, document_tokens,
+                                      document_tags, token_usas_tag)
+                facet_cube.save(cube_file_path)
+                loaded_facet_cube = FacetCube.load(cube_file_path)
+                for _ in range(10):
+                    selection = {facet_name: rng.sample(values, rng.randint(0, len(values)))
+                                 for facet_name, values in FACETS.items()
+                                 if rng.random() < 0.5}
+                    names, token_counter, usas_counter = naive_slice(documents, selection)
+                    for cube in [facet_cube, loaded_facet_cube]:
+                        counts = cube.slice(selection)
+                        self.assertEqual(sorted(names), sorted(counts.documents))
+                        # The same counts in the same order as counting the
+                        # texts of the slice on their own.
+                        self.assertEqual(list(token_counter.items()),
+                                         list(counts.token_counter().items()))
+                        self.assertEqual(list(usas_counter.items()),
+                                         list(counts.usas_counter().items()))
+                        self.assertEqual({token: Counter({'Z5': count})
+                                          for token, count in token_counter.items()},
+                                         counts.token_usas_tag(set(token_counter)))
+                # The number of texts with each facet value.
+                for facet_name, value_counts in facet_cube.facet_values().items():
+                    expected = Counter(facet_values.get(facet_name)
+                                       for _, facet_values, _, _ in documents)
+                    self.assertEqual(dict(expected), value_counts)
+
+    def test_unknown_facet(self) -> None:
+        facet_cube = FacetCube(FACETS, SETTINGS)
+        with self.assertRaises(ValueError):
+            facet_cube.slice({'supervisor': ['Paul']})
+
+    def test_read_facet_metadata(self) -> None:
+        expected = {'thesis_1.txt': {'year': '2019', 'degree': 'PhD'},
+                    'thesis_2': {'year': '2020', 'degree': 'MSc'}}
+        with tempfile.TemporaryDirectory() as temporary_directory:
+            json_file_path = Path(temporary_directory, 'metadata.json')
+            json_file_path.write_text('{"thesis_1.txt": {"year": 2019, "degree": "PhD"},'
+                                      ' "thesis_2": {"year": "2020", "degree": "MSc"}}')
+            csv_file_path = Path(temporary_directory, 'metadata.csv')
+            csv_file_path.write_text('name,year,degree\nthesis_1.txt,2019,PhD\n'
+                                     'thesis_2,2020,MSc\n\n')
+            for metadata_file_path in [json_file_path, csv_file_path]:
+                metadata = read_facet_metadata(metadata_file_path)
+                self.assertEqual(expected, metadata)
+                self.assertEqual(expected['thesis_2'], text_facet_values(metadata, 'thesis_2.txt'))
+                self.assertIsNone(text_facet_values(metadata, 'thesis_3.txt'))
+
+
+if __name__ == '__main__':
+    unittest.main()
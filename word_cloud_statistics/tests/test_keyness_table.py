@@ -0,0 +1,114 @@
+from pathlib import Path
+import random
+import sys
+import tempfile
+from typing import Any, Dict, List, Optional, Tuple
+import unittest
+
+# The modules are scripts in the directory above, not a package.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from keyness_table import (DIRECTIONS, LOG_LIKELIHOOD_CRITICAL_VALUES,
+                           KeynessTable, parse_sigeff_output)
+from significance import _get_significant_key_words
+
+
+def random_sigeff_lines(rng: random.Random, items: List[str]) -> List[str]:
+    '''
+    :returns: Output in the format of SigEff, a totals line, a header line,
+              and a line of 13 tab separated fields per token/tag.
+    '''
+    lines = ['Total\t100000\t1000000\n',
+             'Item\tO1\t%1\tO2\t%2\t+-\tLL\t%DIFF\tBayes\tELL\tRRisk\tLogRatio\tOddsRatio\n']
+    for item in items:
+        # Few distinct log-likelihoods so that top N has ties to break.
+        log_likelihood = rng.choice([0.0, 1.5, 3.84, 6.63, 10.0, 10.83, 25.5, 100.25])
+        fields = [item, str(rng.randint(1, 500)), f'{rng.random():.4f}',
+                  str(rng.randint(0, 5000)), f'{rng.random():.4f}',
+                  rng.choice(['+', '-']), f'{log_likelihood:.2f}']
+        fields += [f'{rng.uniform(-100, 100):.4f}' for _ in range(6)]
+        lines.append('\t'.join(fields) + '\n')
+    return lines
+
+
+def naive_query(lines: List[str], minimum_log_likelihood: float,
+                minimum_frequency: int, direction: str, top_n: Optional[int],
+                exclude: Optional[str]) -> List[Tuple[str, Dict[str, Any]]]:
+    rows = []
+    for position, row in enumerate(parse_sigeff_output(lines)):
+        item, row_direction, frequency, relative_frequency = row[:4]
+        log_likelihood = row[6]
+        if row_direction not in DIRECTIONS[direction]:
+            continue
+        if log_likelihood < minimum_log_likelihood or frequency < minimum_frequency:
+            continue
+        if exclude is not None and exclude in item:
+            continue
+        rows.append((position, item, {'Log Likelihood': log_likelihood,
+                                      'Log Ratio': row[11], 'Frequency': frequency,
+                                      'Relative Frequency (%)': relative_frequency}))
+    if top_n is not None:
+        rows = sorted(rows, key=lambda row: (-row[2]['Log Likelihood'], row[0]))[:top_n]
+    return [(item, values) for _, item, values in rows]
+
+
+class TestKeynessTable(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.temporary_directory = tempfile.TemporaryDirectory()
+        self.table = KeynessTable(Path(self.temporary_directory.name, 'keyness.sqlite'))
+
+    def tearDown(self) -> None:
+        self.table.close()
+        self.temporary_directory.cleanup()
+
+    def test_query_against_recount(self) -> None:
+        rng = random.Random(0)
+        usas_tags = ['Z9', 'Z99', 'A1.1.1', 'W4', 'Z5', 'B2-', 'X2.1']
+        token_lines = random_sigeff_lines(rng, [f'word{index}' for index in range(300)])
+        usas_lines = random_sigeff_lines(rng, usas_tags)
+        self.table.add_sigeff_output('token', token_lines)
+        self.table.add_sigeff_output('usas', usas_lines)
+        for _ in range(200):
+            kind, lines = rng.choice([('token', token_lines), ('usas', usas_lines)])
+            parameters = {'minimum_log_likelihood': rng.choice([0, 3.84, 10.83, 50]),
+                          'minimum_frequency': rng.choice([0, 5, 100, 400]),
+                          'direction': rng.choice(sorted(DIRECTIONS)),
+                          'top_n': rng.choice([None, 0, 1, 10, 1000]),
+                          'exclude': rng.choice([None, 'Z9', 'word1'])}
+            results = self.table.query(kind, **parameters)
+            expected = naive_query(lines, **parameters)
+            if kind == 'token':
+                for _, values in expected:
+                    values['Common associated USAS tags (%)'] = []
+            self.assertEqual(expected, list(results.items()), parameters)
+
+    def test_same_as_score(self) -> None:
+        rng = random.Random(1)
+        lines = random_sigeff_lines(rng, [f'word{index}' for index in range(300)])
+        common_usas_tags = {'word1': [('Z5', 75.0), ('A1', 25.0)]}
+        self.table.add_sigeff_output('token', lines, common_usas_tags)
+        for significance_level, critical_value in LOG_LIKELIHOOD_CRITICAL_VALUES.items():
+            results = self.table.query('token', critical_value)
+            expected = _get_significant_key_words(lines, significance_level)
+            self.assertEqual(list(expected), list(results))
+            for token, values in results.items():
+                tags = values.pop('Common associated USAS tags (%)')
+                self.assertEqual(common_usas_tags.get(token, []), tags)
+                self.assertEqual(expected[token], values)
+
+    def test_replace_and_metadata(self) -> None:
+        rng = random.Random(2)
+        self.table.add_sigeff_output('usas', random_sigeff_lines(rng, ['A1', 'Z5']))
+        lines = random_sigeff_lines(rng, ['W4'])
+        self.assertEqual(1, self.table.add_sigeff_output('usas', lines))
+        self.assertEqual([item for item, _ in naive_query(lines, 0, 0, 'both', None, None)],
+                         list(self.table.query('usas', 0, direction='both')))
+        self.table.set_metadata('minimum_frequency', 5)
+        self.assertEqual(5, self.table.metadata('minimum_frequency'))
+        with self.assertRaises(KeyError):
+            self.table.metadata('not metadata')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,152 @@
+from collections import Counter
+from pathlib import Path
+import random
+import sys
+import tempfile
+from typing import Dict, List, Optional
+import unittest
+
+# The modules are scripts in the directory above, not a package.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from kwic_index import (KWICIndex, build_kwic_index, decode_varint,
+                        encode_postings, encode_varint)
+from usas_json_reader import TokenTuple
+
+WORDS = ['climate', 'change', 'the', ',', 'carbon', 'é', 'Emissions']
+USAS_TAGS = ['W4', 'A2.1+', 'Z5', 'PUNC', 'O1.1/W5', None]
+
+
+def random_documents(rng: random.Random) -> Dict[Path, List[TokenTuple]]:
+    documents: Dict[Path, List[TokenTuple]] = {}
+    for document_index in range(rng.randint(1, 12)):
+        tokens: List[TokenTuple] = []
+        # Some documents are long enough for the positions to need more than
+        # one byte.
+        for _ in range(rng.choice([0, 1, 5, 300])):
+            word = rng.choice(WORDS)
+            tokens.append((word, word.lower(), 'NN1', rng.choice(USAS_TAGS)))
+        documents[Path(f'{document_index}.json')] = tokens
+    return documents
+
+
+def token_filter(text: str, lemma: Optional[str], pos_tag: Optional[str]
+                 ) -> Optional[str]:
+    if text == ',':
+        return None
+    return text.lower()
+
+
+class TestVarint(unittest.TestCase):
+
+    def test_round_trip(self) -> None:
+        values = [0, 1, 127, 128, 255, 16383, 16384, 2**32 - 1, 2**32, 2**63 + 5]
+        output = bytearray()
+        for value in values:
+            encode_varint(value, output)
+        offset = 0
+        decoded = []
+        while offset < len(output):
+            value, offset = decode_varint(output, offset)
+            decoded.append(value)
+        self.assertEqual(values, decoded)
+
+    def test_small_values_one_byte(self) -> None:
+        for value in [0, 1, 127]:
+            output = bytearray()
+            encode_varint(value, output)
+            self.assertEqual(bytes([value]), bytes(output))
+        output = bytearray()
+        encode_varint(128, output)
+        self.assertEqual(2, len(output))
+
+    def test_postings(self) -> None:
+        rng = random.Random(0)
+        for _ in range(100):
+            positions = sorted(rng.sample(range(100000), rng.randint(1, 50)))
+            document_index_delta = rng.randint(0, 1000)
+            output = bytearray(b'\x00')
+            encode_postings(document_index_delta, positions, output)
+            delta, offset = decode_varint(output, 1)
+            number_positions, offset = decode_varint(output, offset)
+            positions_length, offset = decode_varint(output, offset)
+            self.assertEqual(document_index_delta, delta)
+            self.assertEqual(len(positions), number_positions)
+            self.assertEqual(len(output), offset + positions_length)
+            decoded = []
+            position = 0
+            while offset < len(output):
+                gap, offset = decode_varint(output, offset)
+                position += gap
+                decoded.append(position)
+            self.assertEqual(positions, decoded)
+
+
+class TestKWICIndex(unittest.TestCase):
+
+    def test_against_recount(self) -> None:
+        rng = random.Random(1)
+        for _ in range(20):
+            documents = random_documents(rng)
+            names = {usas_file_path: f'text {usas_file_path.stem}'
+                     for usas_file_path in documents}
+            with tempfile.TemporaryDirectory() as temp_directory:
+                index_path = Path(temp_directory, 'index')
+                build_kwic_index(index_path,
+                                 {name: usas_file_path
+                                  for usas_file_path, name in names.items()},
+                                 token_filter, {'lower_case': True},
+                                 read_tokens=lambda usas_file_path: documents[usas_file_path])
+                index = KWICIndex(index_path)
+                try:
+                    self.check_index(index, documents, names)
+                finally:
+                    index.close()
+
+    def check_index(self, index: KWICIndex,
+                    documents: Dict[Path, List[TokenTuple]],
+                    names: Dict[Path, str]) -> None:
+        token_positions: Dict[str, Dict[str, List[int]]] = {}
+        usas_counts: Dict[str, Counter] = {}
+        for usas_file_path, tokens in documents.items():
+            name = names[usas_file_path]
+            for position, (text, lemma, pos_tag, usas_tag) in enumerate(tokens):
+                term = token_filter(text, lemma, pos_tag)
+                if term is None:
+                    continue
+                token_positions.setdefault(term, {}).setdefault(name, []).append(position)
+                for tag in (usas_tag or '').split('/'):
+                    if tag:
+                        usas_counts.setdefault(tag, Counter())[name] += 1
+        for word in WORDS:
+            term = token_filter(word, None, None)
+            if term is None:
+                self.assertEqual({}, index.frequency(word))
+                continue
+            expected = {name: len(positions)
+                        for name, positions in token_positions.get(term, {}).items()}
+            # Looked up by the lower cased text as the index is lower cased.
+            self.assertEqual(expected, index.frequency(word.upper()))
+            lines = index.lookup(word, top_k=10**6, window=2)
+            self.assertEqual(sum(expected.values()), len(lines))
+            for line in lines:
+                usas_file_path = next(path for path, name in names.items()
+                                      if name == line['document'])
+                tokens = documents[usas_file_path]
+                position = line['position']
+                self.assertEqual(tokens[position][0], line['keyword'])
+                self.assertEqual(' '.join(token[0] for token in tokens[max(position - 2, 0):position]),
+                                 line['left'])
+                self.assertEqual(' '.join(token[0] for token in tokens[position + 1:position + 3]),
+                                 line['right'])
+            for name, positions in token_positions.get(term, {}).items():
+                self.assertEqual(positions, [line['position'] for line in lines
+                                             if line['document'] == name])
+        for tag, counts in usas_counts.items():
+            self.assertEqual(dict(counts), index.frequency(tag, 'usas'))
+        self.assertEqual({}, index.frequency('not a token'))
+        self.assertEqual([], index.lookup('not a token'))
+
+
+if __name__ == '__main__':
+    unittest.main()
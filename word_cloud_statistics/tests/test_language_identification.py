@@ -0,0 +1,115 @@
+import math
+from pathlib import Path
+import random
+import re
+import sys
+import tempfile
+from typing import Any, Dict, List
+import unittest
+
+# The modules are scripts in the directory above, not a package.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from language_identification import (FREQUENT_WORDS, NON_LATIN_SCRIPT,
+                                     UNDETERMINED, LanguageIdentifier,
+                                     read_text_sample)
+
+
+def naive_identify(text: str, minimum_trigrams: int = 20) -> Dict[str, Any]:
+    '''
+    Scores every trigram of every word of the text, one at a time, against
+    profiles built from `FREQUENT_WORDS`.
+    '''
+    languages = sorted(FREQUENT_WORDS)
+    weights: Dict[str, Dict[str, float]] = {language: {} for language in languages}
+    for language in languages:
+        for rank, word in enumerate(FREQUENT_WORDS[language].split()):
+            padded = f' {word} '
+            for index in range(len(padded) - 2):
+                trigram = padded[index:index + 3]
+                weights[language][trigram] = weights[language].get(trigram, 0) + 1 / (rank + 1)
+    known_trigrams = set().union(*weights.values())
+    scores = {language: 0.0 for language in languages}
+    number_trigrams = 0
+    for word in re.findall(r'[^\W\d_]+', text.lower()):
+        padded = f' {word} '
+        for index in range(len(padded) - 2):
+            trigram = padded[index:index + 3]
+            if trigram not in known_trigrams:
+                continue
+            number_trigrams += 1
+            for language in languages:
+                weight = weights[language].get(trigram)
+                scores[language] += (math.log(1e-6) if weight is None else
+                                     math.log(weight / sum(weights[language].values())))
+    if number_trigrams < minimum_trigrams:
+        return {'language': UNDETERMINED, 'confidence': 0.0,
+                'trigrams': number_trigrams}
+    ranked = sorted(((score, language) for language, score in scores.items()),
+                    reverse=True)
+    return {'language': ranked[0][1],
+            'confidence': round((ranked[0][0] - ranked[1][0]) / number_trigrams, 4),
+            'trigrams': number_trigrams}
+
+
+def random_text(rng: random.Random, language: str, number_words: int) -> str:
+    # Frequent words mixed with made up content words, e.g. names and terms.
+    frequent_words = FREQUENT_WORDS[language].split()
+    words: List[str] = []
+    for _ in range(number_words):
+        if rng.random() < 0.5:
+            words.append(rng.choice(frequent_words[:60]))
+        else:
+            words.append(''.join(rng.choices('abcdefghijklmnopqrstuvwxyz',
+                                              k=rng.randint(3, 10))))
+    return ' '.join(words).capitalize() + '.'
+
+
+class TestLanguageIdentifier(unittest.TestCase):
+
+    def test_against_naive_scores(self) -> None:
+        rng = random.Random(0)
+        identifier = LanguageIdentifier()
+        for _ in range(60):
+            language = rng.choice(sorted(FREQUENT_WORDS))
+            text = random_text(rng, language, rng.choice([2, 10, 50, 300]))
+            if rng.random() < 0.3:
+                text += ' 2019, 3.5% ' + random_text(rng, rng.choice(sorted(FREQUENT_WORDS)), 20)
+            decision = identifier.identify(text)
+            expected = naive_identify(text)
+            self.assertEqual(expected['language'], decision['language'])
+            self.assertEqual(expected['trigrams'], decision['trigrams'])
+            self.assertAlmostEqual(expected['confidence'], decision['confidence'],
+                                   delta=1e-4)
+
+    def test_languages(self) -> None:
+        rng = random.Random(1)
+        identifier = LanguageIdentifier()
+        for language in FREQUENT_WORDS:
+            for _ in range(10):
+                self.assertEqual(language,
+                                 identifier.identify(random_text(rng, language, 200))['language'])
+        self.assertEqual(NON_LATIN_SCRIPT,
+                         identifier.identify('气候变化 是 一个 问题 ' * 20)['language'])
+        self.assertEqual(UNDETERMINED, identifier.identify('1 2 3 4 | 5.6 | 7')['language'])
+
+    def test_read_text_sample(self) -> None:
+        rng = random.Random(2)
+        with tempfile.TemporaryDirectory() as temporary_directory:
+            text_file_path = Path(temporary_directory, 'thesis.txt')
+            for size in [0, 100, 8192, 8192 + 2048, 8192 + 2049, 50000, 10**6]:
+                data = ''.join(rng.choices('abc é\n', k=size)).encode('utf-8')[:size]
+                text_file_path.write_bytes(data)
+                samples = [data[:8192]]
+                if size > 8192 + 2048:
+                    step = (size - 8192) // 5
+                    samples += [data[8192 + index * step:8192 + index * step + 2048]
+                                for index in range(1, 5)]
+                expected = '\n'.join(sample.decode('utf-8', errors='ignore')
+                                     for sample in samples)
+                self.assertEqual(expected, read_text_sample(text_file_path))
+                self.assertLessEqual(len(read_text_sample(text_file_path)), 8192 + 4 * 2049)
+
+
+if __name__ == '__main__':
+    unittest.main()
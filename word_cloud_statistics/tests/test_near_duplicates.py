@@ -0,0 +1,109 @@
+from pathlib import Path
+import random
+import sys
+from typing import Dict, List, Set
+import unittest
+
+# The modules are scripts in the directory above, not a package.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from near_duplicates import NearDuplicateIndex, cluster_duplicates, shingle_hashes
+
+WORDS = [f'word{index}' for index in range(2000)]
+
+
+def edit(rng: random.Random, words: List[str], number_edits: int) -> List[str]:
+    words = list(words)
+    for _ in range(number_edits):
+        words[rng.randrange(len(words))] = rng.choice(WORDS)
+    return words
+
+
+def random_texts(rng: random.Random) -> Dict[str, str]:
+    '''
+    :returns: Texts of which some are lightly edited copies, e.g.
+              resubmissions, of others and the rest are unrelated.
+    '''
+    texts: Dict[str, str] = {}
+    for original_index in range(rng.randint(1, 12)):
+        words = rng.choices(WORDS, k=rng.randint(300, 600))
+        texts[f'{original_index}.txt'] = ' '.join(words)
+        for copy_index in range(rng.choice([0, 0, 1, 3])):
+            copy = edit(rng, words, rng.randint(0, 3))
+            if rng.random() < 0.3:
+                copy = copy[:-rng.randint(1, 20)]
+            texts[f'{original_index}_{copy_index}.txt'] = ' '.join(copy)
+    return texts
+
+
+def naive_clusters(index: NearDuplicateIndex, names: List[str]) -> List[Set[str]]:
+    '''
+    :returns: The connected components of every pair of documents, rather
+              than only those that share an LSH bucket, whose estimated
+              similarity is at least the threshold.
+    '''
+    clusters = [{name} for name in names]
+    for index_1, name_1 in enumerate(names):
+        for name_2 in names[index_1 + 1:]:
+            if index.similarity(name_1, name_2) < index.threshold:
+                continue
+            cluster_1 = next(cluster for cluster in clusters if name_1 in cluster)
+            cluster_2 = next(cluster for cluster in clusters if name_2 in cluster)
+            if cluster_1 is not cluster_2:
+                clusters.remove(cluster_2)
+                cluster_1.update(cluster_2)
+    return [cluster for cluster in clusters if len(cluster) > 1]
+
+
+def jaccard(text_1: str, text_2: str) -> float:
+    shingles_1 = shingle_hashes(text_1)
+    shingles_2 = shingle_hashes(text_2)
+    return len(shingles_1 & shingles_2) / len(shingles_1 | shingles_2)
+
+
+class TestNearDuplicateIndex(unittest.TestCase):
+
+    def test_against_all_pairs(self) -> None:
+        rng = random.Random(0)
+        for _ in range(20):
+            texts = random_texts(rng)
+            index = NearDuplicateIndex(threshold=0.8)
+            for name, text in texts.items():
+                index.add(name, text)
+            clusters = index.clusters()
+            expected = naive_clusters(index, list(texts))
+            self.assertEqual(sorted(map(sorted, expected)),
+                             sorted(sorted([cluster['representative']] + cluster['duplicates'])
+                                    for cluster in clusters))
+            for cluster in clusters:
+                # The longest text, by number of words, is kept.
+                self.assertEqual(max(len(texts[name].split())
+                                     for name in [cluster['representative']] + cluster['duplicates']),
+                                 len(texts[cluster['representative']].split()))
+            self.assertEqual({name for cluster in expected for name in cluster}
+                             - {cluster['representative'] for cluster in clusters},
+                             cluster_duplicates(clusters))
+            self.assertEqual(cluster_duplicates(clusters), index.duplicates())
+
+    def test_similarity_estimate(self) -> None:
+        rng = random.Random(1)
+        words = rng.choices(WORDS, k=500)
+        index = NearDuplicateIndex(number_of_bins=256)
+        texts = {'original': ' '.join(words)}
+        for number_edits in [0, 5, 20, 60, 500]:
+            texts[str(number_edits)] = ' '.join(edit(rng, words, number_edits))
+        for name, text in texts.items():
+            index.add(name, text)
+        for name, text in texts.items():
+            self.assertAlmostEqual(jaccard(texts['original'], text),
+                                   index.similarity('original', name), delta=0.1)
+
+    def test_add_twice(self) -> None:
+        index = NearDuplicateIndex()
+        index.add('a', 'some text')
+        with self.assertRaises(ValueError):
+            index.add('a', 'some other text')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+from collections import Counter
+from pathlib import Path
+import random
+import sys
+from typing import Dict, List, Optional
+import typing
+import unittest
+
+# The modules are scripts in the directory above, not a package.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from ngram_counting import TOKEN_ID_BITS, NGramCounts
+from usas_json_reader import TokenTuple
+
+
+def token_filter(text: str, lemma: Optional[str], pos_tag: Optional[str]
+                 ) -> Optional[str]:
+    if text == '.':
+        return None
+    return text
+
+
+def random_documents(rng: random.Random, vocabulary: str
+                     ) -> Dict[Path, List[TokenTuple]]:
+    return {Path(f'{document_index}.json'):
+            [(word, word, 'NN1', rng.choice(['A1', 'B2/C3', None]))
+             for word in rng.choices(vocabulary, k=rng.randint(0, 400))]
+            for document_index in range(rng.randint(1, 20))}
+
+
+def naive_counts(documents: Dict[Path, List[TokenTuple]], ngram_sizes: List[int]
+                 ) -> typing.Counter[str]:
+    counts: typing.Counter[str] = Counter()
+    for tokens in documents.values():
+        for ngram_size in ngram_sizes:
+            for start in range(len(tokens) - ngram_size + 1):
+                words = [token[0] for token in tokens[start:start + ngram_size]]
+                if '.' not in words:
+                    counts[' '.join(words)] += 1
+    return counts
+
+
+def pack(*token_ids: int) -> int:
+    ngram_id = 0
+    for token_id in token_ids:
+        ngram_id = (ngram_id << TOKEN_ID_BITS) | token_id
+    return ngram_id
+
+
+class TestNGramCounts(unittest.TestCase):
+
+    def test_against_recount(self) -> None:
+        rng = random.Random(0)
+        for _ in range(15):
+            documents = random_documents(rng, rng.choice(['abcd.', 'abcdefghij.', 'ab']))
+            ngram_sizes = rng.choice([[2], [2, 3], [3, 5], [2, 3, 4]])
+            minimum_count = rng.randint(1, 6)
+            expected = {ngram: count for ngram, count
+                        in naive_counts(documents, ngram_sizes).items()
+                        if count >= minimum_count}
+            # The counts are exact however small the pruning table is.
+            for table_size in [1, 16, 2**12]:
+                ngram_counts = NGramCounts(list(documents), token_filter,
+                                           ngram_sizes, minimum_count,
+                                           table_size=table_size,
+                                           read_tokens=documents.__getitem__)
+                ngram_counts.count()
+                self.assertEqual(expected, ngram_counts.ngram_counter())
+
+    def test_usas_tags(self) -> None:
+        rng = random.Random(1)
+        documents = random_documents(rng, 'abc.')
+        ngram_counts = NGramCounts(list(documents), token_filter, [2, 3], 3,
+                                   read_tokens=documents.__getitem__)
+        ngram_counts.count()
+        ngrams = set(list(ngram_counts.ngram_counter())[:5])
+        expected: Dict[str, typing.Counter[str]] = {ngram: Counter() for ngram in ngrams}
+        for tokens in documents.values():
+            for ngram_size in [2, 3]:
+                for start in range(len(tokens) - ngram_size + 1):
+                    ngram_tokens = tokens[start:start + ngram_size]
+                    ngram = ' '.join(token[0] for token in ngram_tokens)
+                    if ngram not in ngrams:
+                        continue
+                    for token in ngram_tokens:
+                        if token[3] is not None:
+                            expected[ngram].update(token[3].split('/'))
+        self.assertEqual(expected, ngram_counts.ngram_usas_tag(ngrams))
+
+    def test_indexes_use_every_token(self) -> None:
+        ngram_counts = NGramCounts([], token_filter, [2, 3, 4], 1,
+                                   table_size=2**20)
+        ngram_ids = [pack(1, 2, 3), pack(2, 3), pack(7, 2, 3), pack(9, 1, 2, 3),
+                     pack(7, 1, 2, 3)]
+        indexes = {tuple(ngram_counts._indexes(ngram_id)) for ngram_id in ngram_ids}
+        self.assertEqual(len(ngram_ids), len(indexes))
+
+    def test_ngram_sizes(self) -> None:
+        with self.assertRaises(ValueError):
+            NGramCounts([], token_filter, [1, 2], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
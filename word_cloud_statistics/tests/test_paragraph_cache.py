@@ -0,0 +1,103 @@
+import json
+from pathlib import Path
+import random
+import sys
+import tempfile
+from typing import Any, Dict, List
+import unittest
+
+# The modules are scripts in the directory above, not a package.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from paragraph_cache import ParagraphCache, split_paragraphs, tag_text_by_paragraph
+from usas_json_reader import iter_usas_tokens
+
+WORDS = ['climate', 'change', 'the', 'ethics', '.', 'é', '"quoted"', '\\']
+
+
+def tag(text: str) -> Dict[str, Any]:
+    '''
+    Stand in for the USAS tagger, a token per word and a sentence per full
+    stop or line, in the format of `UCREL_Doc.to_json`.
+    '''
+    tokens: List[Dict[str, Any]] = []
+    sentence_indexes: List[List[int]] = []
+    for line in text.split('\n'):
+        sentence_start = len(tokens)
+        for word in line.split():
+            tokens.append({'text': word, 'lemma': word.lower(), 'pos_tag': 'NN1',
+                           'usas_tag': 'Z5' if word == 'the' else 'W4'})
+            if word == '.':
+                sentence_indexes.append([sentence_start, len(tokens)])
+                sentence_start = len(tokens)
+        if sentence_start < len(tokens):
+            sentence_indexes.append([sentence_start, len(tokens)])
+    return {'text': text, 'tokens': tokens, 'sentence_indexes': sentence_indexes}
+
+
+def random_paragraph(rng: random.Random) -> str:
+    return ' '.join(rng.choices(WORDS, k=rng.randint(1, 15)))
+
+
+class TestParagraphCache(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.temporary_directory = tempfile.TemporaryDirectory()
+        self.paragraph_cache = ParagraphCache(Path(self.temporary_directory.name,
+                                                   'paragraphs.sqlite'), 'v1')
+
+    def tearDown(self) -> None:
+        self.paragraph_cache.close()
+        self.temporary_directory.cleanup()
+
+    def test_splice_against_whole_text(self) -> None:
+        rng = random.Random(0)
+        # Shared paragraphs, e.g. templated abstracts, across the texts.
+        shared_paragraphs = [random_paragraph(rng) for _ in range(5)]
+        tagged_paragraphs: List[str] = []
+
+        def tag_paragraph(paragraph: str) -> str:
+            tagged_paragraphs.append(paragraph)
+            return json.dumps(tag(paragraph))
+
+        for text_index in range(30):
+            paragraphs = [rng.choice(shared_paragraphs) if rng.random() < 0.4
+                          else random_paragraph(rng)
+                          for _ in range(rng.randint(0, 8))]
+            # Empty lines and surrounding whitespace are not paragraphs.
+            text = '\n'.join(rng.choice(['', '  ']) + paragraph + rng.choice(['', ' \t'])
+                             + rng.choice(['', '\n', '\n \n']) for paragraph in paragraphs)
+            tagged_json = tag_text_by_paragraph(text, self.paragraph_cache, tag_paragraph)
+            # Tagging the paragraphs on their own lines at once gives the
+            # same tokens and sentences.
+            expected = tag('\n'.join(paragraphs))
+            expected['text'] = text
+            self.assertEqual(expected, json.loads(tagged_json))
+            usas_file_path = Path(self.temporary_directory.name, f'{text_index}.json')
+            usas_file_path.write_text(tagged_json)
+            self.assertEqual([(token['text'], token['lemma'], token['pos_tag'],
+                               token['usas_tag']) for token in expected['tokens']],
+                             list(iter_usas_tokens(usas_file_path)))
+        # Each distinct paragraph is only tagged once.
+        self.assertEqual(len(tagged_paragraphs), len(set(tagged_paragraphs)))
+        statistics = self.paragraph_cache.statistics()
+        self.assertEqual(len(tagged_paragraphs), statistics['misses'])
+        self.assertEqual(statistics['paragraphs'], statistics['hits'] + statistics['misses'])
+        self.assertGreater(statistics['hits'], 0)
+
+    def test_tagger_version_key(self) -> None:
+        self.paragraph_cache.write('a paragraph', json.dumps(tag('a paragraph')))
+        other_cache = ParagraphCache(self.paragraph_cache.database_path, 'v2')
+        try:
+            self.assertIsNone(other_cache.get('a paragraph'))
+        finally:
+            other_cache.close()
+        self.assertEqual(tag('a paragraph'), json.loads(self.paragraph_cache.get('a paragraph')))
+
+    def test_split_paragraphs(self) -> None:
+        self.assertEqual(['a b', 'c'], split_paragraphs(' a b \n\n\t\nc\n'))
+        self.assertEqual([], split_paragraphs(''))
+
+
+if __name__ == '__main__':
+    unittest.main()
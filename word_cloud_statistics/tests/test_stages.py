@@ -0,0 +1,131 @@
+from collections import Counter, defaultdict
+import json
+from pathlib import Path
+import random
+import subprocess
+import sys
+import tempfile
+from typing import Any, Dict
+import typing
+import unittest
+
+# The modules are scripts in the directory above, not a package.
+SCRIPT_DIRECTORY = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(SCRIPT_DIRECTORY))
+
+from shard_counts import ShardCounts
+from stages import (count_all_texts, count_texts, iter_texts, read_tagged_texts,
+                    sum_counts, tag_texts)
+from token_filter import TokenFilter
+from usas_cache import USASCache
+from usas_json_reader import iter_usas_tokens
+
+WORDS = ['The', 'climate', 'Climate', 'change', ',', '.', 'of', '2019', 'carbon']
+
+
+class FakeUCRELAPI():
+    '''
+    Stand in for `UCREL_API`, a token per word.
+    '''
+
+    def __init__(self) -> None:
+        self.number_calls = 0
+
+    def usas(self, text: str) -> Any:
+        self.number_calls += 1
+        tokens = [{'text': word, 'lemma': word.lower(),
+                   'pos_tag': 'MC' if word.isdigit() else 'NN1',
+                   'usas_tag': 'PUNC' if word in ',.' else f'Z{len(word) % 3}/A1'}
+                  for word in text.split()]
+        tagged_json = json.dumps({'text': text, 'tokens': tokens,
+                                  'sentence_indexes': [[0, len(tokens)]]})
+
+        class TaggedText():
+            def to_json(self) -> str:
+                return tagged_json
+        return TaggedText()
+
+
+class TestStages(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.temporary_directory = tempfile.TemporaryDirectory()
+        self.directory = Path(self.temporary_directory.name)
+        rng = random.Random(0)
+        text_directory = Path(self.directory, 'export')
+        text_directory.mkdir()
+        for text_index in range(12):
+            Path(text_directory, f'thesis_{text_index}.txt').write_text(
+                ' '.join(rng.choices(WORDS, k=rng.randint(0, 300))))
+        self.text_file_paths = sorted(text_directory.iterdir())
+        self.cache_directory = Path(self.directory, 'cache')
+        self.cache_directory.mkdir()
+        self.usas_cache = USASCache(self.cache_directory, 'v1')
+
+    def tearDown(self) -> None:
+        self.temporary_directory.cleanup()
+
+    def tag(self) -> Dict[str, Path]:
+        ucrel_api = FakeUCRELAPI()
+        tagged_texts = dict(tag_texts(iter_texts(self.text_file_paths), ucrel_api,
+                                      self.usas_cache))
+        self.assertEqual(len(self.text_file_paths), ucrel_api.number_calls)
+        # Cached texts are not tagged again.
+        ucrel_api = FakeUCRELAPI()
+        self.assertEqual(tagged_texts, dict(tag_texts(iter_texts(self.text_file_paths),
+                                                      ucrel_api, self.usas_cache)))
+        self.assertEqual(0, ucrel_api.number_calls)
+        return tagged_texts
+
+    def test_count_against_recount(self) -> None:
+        tagged_texts = self.tag()
+        self.assertEqual([text_file_path.name for text_file_path in self.text_file_paths],
+                         list(tagged_texts))
+        token_filter = TokenFilter(remove_punctuation=True, lower_case=True)
+        token_counter: typing.Counter[str] = Counter()
+        usas_counter: typing.Counter[str] = Counter()
+        token_usas_tag: Dict[str, typing.Counter[str]] = defaultdict(Counter)
+        for text_file_path in self.text_file_paths:
+            for text, lemma, pos_tag, usas_tag in iter_usas_tokens(tagged_texts[text_file_path.name]):
+                self.assertIn(text, text_file_path.read_text().split())
+                token_text = token_filter(text, lemma, pos_tag)
+                if token_text is None:
+                    continue
+                token_counter[token_text] += 1
+                usas_counter.update(usas_tag.split('/'))
+                token_usas_tag[token_text].update(usas_tag.split('/'))
+        expected = (token_counter, usas_counter, token_usas_tag)
+        summed_counts = sum_counts(count_texts(read_tagged_texts(tagged_texts.items()),
+                                               token_filter))
+        all_counts = count_all_texts(read_tagged_texts(tagged_texts.items()), token_filter)
+        for counts in [summed_counts, all_counts]:
+            self.assertEqual(expected[0], counts[0])
+            self.assertEqual(expected[1], counts[1])
+            self.assertEqual(dict(expected[2]), dict(counts[2]))
+
+    def test_count_subcommand(self) -> None:
+        tagged_texts = self.tag()
+        manifest_path = Path(self.directory, 'tag_manifest.json')
+        manifest_path.write_text(json.dumps({
+            'usas_tagger_version': 'v1',
+            'usas_caching_directory': str(self.cache_directory),
+            'documents': {name: usas_file_path.name
+                          for name, usas_file_path in tagged_texts.items()}}))
+        counts_path = Path(self.directory, 'counts.json')
+        flags = ['--remove-stop-words', '--remove-digits', '--lower-case']
+        subprocess.run([sys.executable, 'token_tag_statistics.py', 'count',
+                        str(manifest_path), str(counts_path), *flags],
+                       cwd=SCRIPT_DIRECTORY, check=True, stdout=subprocess.DEVNULL)
+        counts = ShardCounts.load(counts_path)
+        token_filter = TokenFilter(remove_stop_words=True, remove_digits=True,
+                                   lower_case=True)
+        text_counts = list(count_texts(read_tagged_texts(tagged_texts.items()), token_filter))
+        expected = sum_counts(text_counts)
+        self.assertEqual([name for name, _ in text_counts], counts.documents)
+        self.assertEqual(dict(expected[0]), counts.token_counter())
+        self.assertEqual(dict(expected[1]), counts.usas_counter())
+        self.assertEqual(dict(expected[2]), counts.token_usas_tag(set(expected[0])))
+
+
+if __name__ == '__main__':
+    unittest.main()
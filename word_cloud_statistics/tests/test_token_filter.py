@@ -0,0 +1,99 @@
+from collections import Counter, defaultdict
+import itertools
+from pathlib import Path
+import random
+import sys
+from typing import Dict, List, Optional, Tuple
+import typing
+import unittest
+
+# The modules are scripts in the directory above, not a package.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from token_filter import (DETERMINER_TAGS, DIGIT_TAGS, PUNCTUATION_SYMBOLS,
+                          STOP_WORDS, TokenFilter, count_tokens)
+from usas_json_reader import TokenTuple
+
+TEXTS = ['The', 'the', 'climate', 'Climate', ',', '.', '2019', 'THEY', "n't",
+         "N’T", 'US$', 'us$', '—', 'each']
+LEMMAS = ['the', 'climate', 'PUNC', 'punc', None]
+POS_TAGS = ['AT', 'NN1', 'MC', 'DD1', 'Y', 'DA2', None]
+USAS_TAGS = ['Z5', 'W4/A2.1+', 'PUNC', '', None]
+FLAG_NAMES = ['remove_punctuation', 'remove_determiners', 'remove_stop_words',
+              'remove_digits', 'lower_case']
+
+
+def random_tokens(rng: random.Random) -> List[TokenTuple]:
+    return [(rng.choice(TEXTS), rng.choice(LEMMAS), rng.choice(POS_TAGS),
+             rng.choice(USAS_TAGS)) for _ in range(rng.randint(0, 300))]
+
+
+def naive_counts(tokens: List[TokenTuple], remove_punctuation: bool,
+                 remove_determiners: bool, remove_stop_words: bool,
+                 remove_digits: bool, lower_case: bool
+                 ) -> Tuple[typing.Counter[str], typing.Counter[str],
+                            Dict[str, typing.Counter[str]]]:
+    '''
+    The token loop of the script before the flags were compiled into a
+    `TokenFilter`.
+    '''
+    token_counter: typing.Counter[str] = Counter()
+    usas_counter: typing.Counter[str] = Counter()
+    token_usas_tag: Dict[str, typing.Counter[str]] = defaultdict(Counter)
+    for token_text, lemma, pos_tag, usas_tag in tokens:
+        if lower_case:
+            token_text = token_text.lower()
+        if remove_punctuation and token_text in PUNCTUATION_SYMBOLS:
+            continue
+        if lemma is not None:
+            if remove_punctuation and lemma == 'PUNC':
+                continue
+        if pos_tag is not None:
+            if remove_determiners and pos_tag in DETERMINER_TAGS:
+                continue
+            if remove_digits and pos_tag in DIGIT_TAGS:
+                continue
+        if remove_stop_words and token_text.lower() in STOP_WORDS:
+            continue
+        token_counter[token_text] += 1
+        if usas_tag is not None:
+            all_usas_tags = usas_tag.split('/')
+            usas_counter.update(all_usas_tags)
+            token_usas_tag[token_text].update(all_usas_tags)
+    return token_counter, usas_counter, token_usas_tag
+
+
+class TestTokenFilter(unittest.TestCase):
+
+    def test_against_recount(self) -> None:
+        rng = random.Random(0)
+        documents = [random_tokens(rng) for _ in range(20)]
+        for flags in itertools.product([False, True], repeat=len(FLAG_NAMES)):
+            settings = dict(zip(FLAG_NAMES, flags))
+            # One filter for all of the documents, as in the script, so that
+            # the later documents are decided from the vocabulary table.
+            token_filter = TokenFilter(**settings)
+            for tokens in documents:
+                token_counter: typing.Counter[str] = Counter()
+                usas_counter: typing.Counter[str] = Counter()
+                token_usas_tag: Dict[str, typing.Counter[str]] = defaultdict(Counter)
+                number_tokens = count_tokens(tokens, token_filter, token_counter,
+                                             usas_counter, token_usas_tag)
+                self.assertEqual(len(tokens), number_tokens)
+                expected = naive_counts(tokens, **settings)
+                self.assertEqual(expected[0], token_counter, settings)
+                self.assertEqual(expected[1], usas_counter, settings)
+                self.assertEqual(dict(expected[2]), dict(token_usas_tag), settings)
+
+    def test_vocabulary(self) -> None:
+        token_filter = TokenFilter(remove_stop_words=True, lower_case=True)
+        decisions: List[Optional[str]] = []
+        for _ in range(2):
+            decisions.append(token_filter('The', 'the', 'AT'))
+            decisions.append(token_filter('Climate', 'climate', 'NN1'))
+        self.assertEqual([None, 'climate', None, 'climate'], decisions)
+        self.assertEqual(2, len(token_filter))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,149 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+import random
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+import unittest
+
+# The modules are scripts in the directory above, not a package.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from usas_cache import (STALE_TEMPORARY_FILE_SECONDS, USASCache, atomic_write,
+                        remove_stale_temporary_files)
+from usas_tagging import cached_usas_file, tag_and_cache_text
+
+
+class _TaggedText():
+
+    def __init__(self, text: str) -> None:
+        self.text = text
+
+    def to_json(self) -> str:
+        return json.dumps({'text': self.text, 'sentence_indexes': [],
+                           'tokens': []})
+
+
+class FakeUCRELAPI():
+    '''
+    Stand in for `UCREL_API` that fails to tag the texts in `failing_texts`.
+    '''
+
+    def __init__(self, failing_texts: List[str]) -> None:
+        self.failing_texts = failing_texts
+        self.tagged_texts: List[str] = []
+
+    def usas(self, text: str) -> _TaggedText:
+        if text in self.failing_texts:
+            raise ConnectionError('The API is down')
+        self.tagged_texts.append(text)
+        return _TaggedText(text)
+
+
+class TestUSASCache(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.temporary_directory = tempfile.TemporaryDirectory()
+        self.cache_directory = Path(self.temporary_directory.name)
+
+    def tearDown(self) -> None:
+        self.temporary_directory.cleanup()
+
+    def test_content_keys(self) -> None:
+        cache = USASCache(self.cache_directory, 'ucrel_api==0.0.2;tagset=c7')
+        other_cache = USASCache(self.cache_directory, 'ucrel_api==0.0.3;tagset=c7')
+        texts = ['', 'a thesis', 'a thesis ', 'é \U0001F600', 'a thesis\0']
+        keys = {cache.key(text) for text in texts}
+        self.assertEqual(len(texts), len(keys))
+        self.assertFalse(keys & {other_cache.key(text) for text in texts})
+        for text in texts:
+            expected = hashlib.sha256(('ucrel_api==0.0.2;tagset=c7\0' + text)
+                                      .encode('utf-8')).hexdigest()
+            self.assertEqual(expected, cache.key(text))
+            self.assertEqual(Path(self.cache_directory, f'{expected}.json'),
+                             cache.cache_path(text))
+
+    def test_resume_against_journal(self) -> None:
+        rng = random.Random(0)
+        texts = {f'{index}.txt': f'thesis {index % 7}' for index in range(20)}
+        cache = USASCache(self.cache_directory, 'v1')
+        expected_status: Dict[str, str] = {}
+        for run in range(4):
+            failing_texts = rng.sample(sorted(set(texts.values())), 2)
+            ucrel_api = FakeUCRELAPI(failing_texts)
+            journal_status = cache.journal_status()
+            self.assertEqual(expected_status,
+                             {key: record['status'] for key, record in journal_status.items()})
+            for name, text in texts.items():
+                text_file_path = Path(name)
+                if cached_usas_file(cache, text_file_path, text) is not None:
+                    continue
+                usas_file_path = tag_and_cache_text(ucrel_api, cache, name,
+                                                    text, journal_status)
+                if text in failing_texts:
+                    self.assertIsNone(usas_file_path)
+                    expected_status[cache.key(text)] = 'failed'
+                else:
+                    self.assertEqual(cache.cache_path(text), usas_file_path)
+                    expected_status[cache.key(text)] = 'done'
+            # Renamed texts, and texts already tagged, are not tagged again.
+            self.assertEqual(len(ucrel_api.tagged_texts), len(set(ucrel_api.tagged_texts)))
+        for text in set(texts.values()):
+            usas_file_path = cached_usas_file(cache, Path('renamed.txt'), text)
+            if expected_status[cache.key(text)] == 'done':
+                self.assertEqual(text, json.loads(usas_file_path.read_text())['text'])
+            else:
+                self.assertIsNone(usas_file_path)
+
+    def test_partial_journal_line(self) -> None:
+        cache = USASCache(self.cache_directory, 'v1')
+        cache.journal_started('a', 'a.txt')
+        cache.journal_done('a', 'a.txt')
+        cache.journal_started('b', 'b.txt')
+        with cache.journal_path.open('a') as journal_file:
+            journal_file.write('{"key": "b", "name": "b.txt", "sta')
+        self.assertEqual({'a': 'done', 'b': 'started'},
+                         {key: record['status']
+                          for key, record in cache.journal_status().items()})
+
+    def test_atomic_write(self) -> None:
+        file_path = Path(self.cache_directory, 'tagged.json')
+        atomic_write(file_path, 'first')
+        with self.assertRaises(TypeError):
+            atomic_write(file_path, 5)  # type: ignore
+        # The failed write leaves neither a truncated file nor a temporary
+        # file behind.
+        self.assertEqual('first', file_path.read_text())
+        self.assertEqual([file_path], list(self.cache_directory.iterdir()))
+
+    def test_remove_stale_temporary_files(self) -> None:
+        stale_time = time.time() - STALE_TEMPORARY_FILE_SECONDS - 60
+        file_names = ['stale_1.tmp', 'stale_2.tmp', 'fresh.tmp', 'cached.json']
+        for file_name in file_names:
+            file_path = Path(self.cache_directory, file_name)
+            file_path.write_text('data')
+            if file_name.startswith('stale') or file_name == 'cached.json':
+                os.utime(file_path, (stale_time, stale_time))
+        self.assertEqual(2, remove_stale_temporary_files(self.cache_directory))
+        self.assertEqual(['cached.json', 'fresh.tmp'],
+                         sorted(path.name for path in self.cache_directory.iterdir()))
+
+    def test_adopt_legacy_file(self) -> None:
+        cache = USASCache(self.cache_directory, 'v1')
+        legacy_file_path = Path(self.cache_directory, 'thesis.json')
+        legacy_file_path.write_text(_TaggedText('old text').to_json())
+        new_file_path: Optional[Path] = cached_usas_file(cache, Path('thesis.txt'),
+                                                         'new text')
+        # The text has been edited since it was tagged.
+        self.assertIsNone(new_file_path)
+        self.assertTrue(legacy_file_path.exists())
+        self.assertEqual(cache.cache_path('old text'),
+                         cached_usas_file(cache, Path('thesis.txt'), 'old text'))
+        self.assertFalse(legacy_file_path.exists())
+
+
+if __name__ == '__main__':
+    unittest.main()
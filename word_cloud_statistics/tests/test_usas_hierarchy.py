@@ -0,0 +1,111 @@
+from collections import Counter
+import math
+from pathlib import Path
+import random
+import sys
+from typing import Dict, Optional
+import typing
+import unittest
+
+# The modules are scripts in the directory above, not a package.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from usas_hierarchy import USASTagTrie, usas_hierarchy_statistics, usas_tag_path
+
+TAGS = ['A1.1.1', 'A1.1.2+', 'A1.2', 'A1', 'A2.1%', 'A2.2', 'B1', 'B2-',
+        'N3.2+++', 'N5', 'Z5', 'Z8m', 'Z9', 'Z99', 'Z2c', 'PUNC', 'W4@', 'X2.1',
+        'X2.2+', 'S7.1-', 'Df']
+
+
+def level_tag(tag: str, level: int) -> Optional[str]:
+    '''
+    :returns: The tag at the given level of the hierarchy, or None if the tag
+              is not rolled up e.g. it is not a USAS tag.
+    '''
+    tag = tag.rstrip('%@fmcni+-')
+    if not tag or not tag[0].isupper() or tag in ['Z9', 'Z99']:
+        return None
+    numbers = tag[1:]
+    if numbers and not all(number.isdigit() for number in numbers.split('.')):
+        return None
+    if level == 1 or not numbers:
+        return tag[0]
+    return tag[0] + '.'.join(numbers.split('.')[:level - 1])
+
+
+def naive_level_counts(counts: Dict[str, int], level: int) -> typing.Counter[str]:
+    level_counts: typing.Counter[str] = Counter()
+    for tag, count in counts.items():
+        rolled_up_tag = level_tag(tag, level)
+        level_counts[tag if rolled_up_tag is None else rolled_up_tag] += count
+    return level_counts
+
+
+def log_likelihood(count: int, reference_count: int, total: int,
+                   reference_total: int) -> float:
+    expected = total * (count + reference_count) / (total + reference_total)
+    reference_expected = reference_total * (count + reference_count) / (total + reference_total)
+    value = 0.0
+    if count:
+        value += count * math.log(count / expected)
+    if reference_count:
+        value += reference_count * math.log(reference_count / reference_expected)
+    return 2 * value
+
+
+class TestUSASHierarchy(unittest.TestCase):
+
+    def test_usas_tag_path(self) -> None:
+        self.assertEqual(['A', 'A1', 'A1.1', 'A1.1.1'], usas_tag_path('A1.1.1+'))
+        self.assertEqual(['N', 'N3', 'N3.2'], usas_tag_path('N3.2+++'))
+        self.assertEqual(['Z', 'Z99'], usas_tag_path('Z99'))
+        self.assertEqual(['D'], usas_tag_path('Df'))
+        for tag in ['PUNC', 'a1', '', '1.1', 'A1.']:
+            self.assertIsNone(usas_tag_path(tag))
+
+    def test_level_counts_against_recount(self) -> None:
+        rng = random.Random(0)
+        for _ in range(50):
+            counts = {tag: rng.randint(1, 100)
+                      for tag in rng.sample(TAGS, rng.randint(1, len(TAGS)))}
+            trie = USASTagTrie()
+            for tag, count in counts.items():
+                trie.add(tag, count)
+            for level in range(1, trie.depth + 2):
+                level_counts = trie.level_counts(level)
+                self.assertEqual(naive_level_counts(counts, level), Counter(level_counts))
+                # Every level has the same total.
+                self.assertEqual(sum(counts.values()), sum(level_counts.values()))
+
+    def test_statistics_against_recount(self) -> None:
+        rng = random.Random(1)
+        for _ in range(30):
+            counts = {tag: rng.randint(0, 400) for tag in TAGS}
+            reference_counts = {tag: rng.randint(0, 4000) for tag in TAGS
+                                if rng.random() < 0.9}
+            minimum_count = rng.choice([1, 5, 50])
+            levels = usas_hierarchy_statistics(counts, reference_counts, 3.84,
+                                               minimum_count)
+            self.assertEqual([1, 2, 3, 4], sorted(levels))
+            for level, significant_tags in levels.items():
+                level_counts = {tag: count for tag, count
+                                in naive_level_counts(counts, level).items()
+                                if count >= minimum_count}
+                reference_level_counts = naive_level_counts(reference_counts, level)
+                total = sum(level_counts.values())
+                reference_total = sum(reference_level_counts[tag] for tag in level_counts)
+                expected = {}
+                for tag, count in level_counts.items():
+                    reference_count = reference_level_counts[tag]
+                    value = round(log_likelihood(count, reference_count, total,
+                                                 reference_total), 2)
+                    overused = count / total >= (reference_count / reference_total
+                                                 if reference_total else 0)
+                    if overused and value >= 3.84 and 'Z9' not in tag:
+                        expected[tag] = (value, count)
+                self.assertEqual(expected, {tag: (values['Log Likelihood'], values['Frequency'])
+                                            for tag, values in significant_tags.items()})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,167 @@
+import io
+import json
+from pathlib import Path
+import random
+import sys
+import tempfile
+from typing import Any, Iterator, List
+import unittest
+
+# The modules are scripts in the directory above, not a package.
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from usas_json_reader import _JSONStream, iter_token_dicts, iter_usas_tokens
+
+# Characters that have to be escaped in JSON, or are more than one byte in
+# UTF-8, to find any chunk boundary that splits an escape sequence.
+CHARACTERS = 'ab "\\/\n\té \U0001F600{}[],:0-'
+LITERALS = [0, -1, 12.5, -3e-07, 10**20, True, False, None]
+
+
+def random_string(rng: random.Random) -> str:
+    return ''.join(rng.choice(CHARACTERS) for _ in range(rng.randint(0, 12)))
+
+
+def random_value(rng: random.Random, depth: int = 0) -> Any:
+    kind = rng.choice(['string', 'literal', 'list', 'dict'] if depth < 3
+                      else ['string', 'literal'])
+    if kind == 'string':
+        return random_string(rng)
+    if kind == 'literal':
+        return rng.choice(LITERALS)
+    if kind == 'list':
+        return [random_value(rng, depth + 1) for _ in range(rng.randint(0, 4))]
+    return {random_string(rng): random_value(rng, depth + 1)
+            for _ in range(rng.randint(0, 4))}
+
+
+def random_document(rng: random.Random) -> str:
+    '''
+    :returns: A document in the format of `UCREL_Doc.to_json`, with other
+              values of every JSON type before and after the tokens.
+    '''
+    tokens = []
+    for _ in range(rng.randint(0, 20)):
+        token = {'text': random_string(rng), 'lemma': random_string(rng),
+                 'pos_tag': rng.choice(['NN1', 'JJ', None]),
+                 'usas_tag': rng.choice(['Z5', 'A1.1.1/T1', None]),
+                 'mwe_index': [[rng.randint(0, 99), rng.randint(0, 99)]]}
+        if rng.random() < 0.3:
+            token['other'] = random_value(rng)
+        tokens.append(token)
+    document = {random_string(rng) + 'a': random_value(rng)
+                for _ in range(rng.randint(0, 3))}
+    document['text'] = random_string(rng)
+    document['sentence_indexes'] = [[0, rng.randint(0, 9)]]
+    document['tokens'] = tokens
+    keys = list(document)
+    rng.shuffle(keys)
+    return json.dumps({key: document[key] for key in keys},
+                      ensure_ascii=rng.random() < 0.5,
+                      indent=rng.choice([None, 0, 2]))
+
+
+def random_chunks(text: str, rng: random.Random) -> Iterator[str]:
+    index = 0
+    while index < len(text):
+        size = rng.choice([0, 1, 1, 2, 3, 7, 64])
+        yield text[index:index + size]
+        index += size
+
+
+def decode(stream: _JSONStream) -> Any:
+    '''
+    Walks the whole of the next value with the stream, strings, objects and
+    arrays are decoded and numbers and literals are skipped, returning
+    `...` for them.
+    '''
+    character = stream.peek()
+    if character == '{':
+        value = {}
+        for key in stream.iter_object_keys():
+            value[key] = decode(stream)
+        return value
+    if character == '[':
+        return [decode(stream) for _ in stream.iter_array_items()]
+    if character == '"':
+        return stream.decode_value()
+    stream.skip_value()
+    return ...
+
+
+def without_literals(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {key: without_literals(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [without_literals(item) for item in value]
+    if isinstance(value, str):
+        return value
+    return ...
+
+
+class TestJSONStream(unittest.TestCase):
+
+    def test_token_dicts_every_chunk_size(self) -> None:
+        rng = random.Random(0)
+        for _ in range(40):
+            document = random_document(rng)
+            expected = json.loads(document)['tokens']
+            for chunk_size in list(range(1, 18)) + [64, 65536]:
+                token_dicts = list(iter_token_dicts(io.StringIO(document), chunk_size))
+                self.assertEqual(expected, token_dicts, (document, chunk_size))
+
+    def test_walk_random_chunks(self) -> None:
+        rng = random.Random(1)
+        for _ in range(300):
+            value = random_value(rng)
+            text = json.dumps(value, ensure_ascii=rng.random() < 0.5,
+                              indent=rng.choice([None, 1]))
+            # A number or literal on its own is only ended by the end of the
+            # stream, so every value is in an array.
+            text = f'[{text}]'
+            stream = _JSONStream(random_chunks(text, rng))
+            self.assertEqual(without_literals(json.loads(text)), decode(stream), text)
+            self.assertEqual('', stream.peek())
+
+    def test_skip_value(self) -> None:
+        rng = random.Random(2)
+        for _ in range(300):
+            values = [random_value(rng) for _ in range(3)]
+            text = json.dumps(values)
+            stream = _JSONStream(random_chunks(text, rng))
+            items = stream.iter_array_items()
+            next(items)
+            stream.skip_value()
+            next(items)
+            stream.skip_value()
+            next(items)
+            self.assertEqual(without_literals(values[2]), decode(stream), text)
+
+    def test_no_tokens(self) -> None:
+        with self.assertRaises(ValueError):
+            list(iter_token_dicts(io.StringIO('{"text": "a", "tokens_": []}')))
+
+    def test_invalid_json(self) -> None:
+        for text in ['{"tokens": [{"text": "a"}', '{"tokens" [] }',
+                     '{"tokens": [{"text": "a"} {"text": "b"}]}']:
+            with self.assertRaises(ValueError):
+                list(iter_token_dicts(io.StringIO(text), 4))
+
+    def test_usas_tokens(self) -> None:
+        tokens: List[Any] = [{'text': 'Climate', 'lemma': 'climate',
+                              'pos_tag': 'NN1', 'usas_tag': 'W4'},
+                             {'text': '"', 'lemma': None, 'pos_tag': None,
+                              'usas_tag': None},
+                             {'text': 'change'}]
+        with tempfile.TemporaryDirectory() as temp_directory:
+            usas_file_path = Path(temp_directory, 'text.json')
+            usas_file_path.write_text(json.dumps({'text': 'Climate " change',
+                                                  'tokens': tokens}))
+            self.assertEqual([('Climate', 'climate', 'NN1', 'W4'),
+                              ('"', None, None, None),
+                              ('change', None, None, None)],
+                             list(iter_usas_tokens(usas_file_path, chunk_size=3)))
+
+
+if __name__ == '__main__':
+    unittest.main()
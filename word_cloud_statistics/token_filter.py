@@ -0,0 +1,210 @@
+from collections import Counter
+from typing import Dict, Iterable, Optional, Set, Tuple
+import typing
+
+from usas_json_reader import TokenTuple
+
+DETERMINER_TAGS = set("""
+DA DA1 DA2 DAR DAT DB DB2 DD DD1 DD2 DDQ DDQGE DDQV
+""".split())
+
+DIGIT_TAGS = set("""
+FO MC MC1 MC2 MCGE MCMC MD MF
+""".split())
+
+# Taken from SpaCy:
+# https://github.com/explosion/spaCy/blob/master/spacy/lang/char_classes.py
+PUNCTUATION_SYMBOLS = set("""
+.. … …… , : ; ! ? ¿ ؟ ¡ ( ) [ ] { } < > _ # * & 。 ？ ！ ， 、 ； ： ～ · । ، ۔ ؛ ٪ % 
+' " ” “ ` ‘ ´ ’ ‚ , „ » « 「 」 『 』 （ ） 〔 〕 【 】 《 》 〈 〉 
+- – — -- --- —— ~ 
+$ £ € ¥ ฿ US$ C$ A$ ₽ ﷼ ₴
+""".split())
+
+# The stop words have come from SpaCy, reference:
+# https://github.com/explosion/spaCy/blob/master/spacy/lang/en/stop_words.py
+STOP_WORDS = set(
+    """
+a about above across after afterwards again against all almost alone along
+already also although always am among amongst amount an and another any anyhow
+anyone anything anyway anywhere are around as at
+back be became because become becomes becoming been before beforehand behind
+being below beside besides between beyond both bottom but by
+call can cannot ca could
+did do does doing done down due during
+each eight either eleven else elsewhere empty enough even ever every
+everyone everything everywhere except
+few fifteen fifty first five for former formerly forty four from front full
+further
+get give go
+had has have he hence her here hereafter hereby herein hereupon hers herself
+him himself his how however hundred
+i if in indeed into is it its itself
+keep
+last latter latterly least less
+just
+made make many may me meanwhile might mine more moreover most mostly move much
+must my myself
+name namely neither never nevertheless next nine no nobody none noone nor not
+nothing now nowhere
+of off often on once one only onto or other others otherwise our ours ourselves
+out over own
+part per perhaps please put
+quite
+rather re really regarding
+same say see seem seemed seeming seems serious several she should show side
+since six sixty so some somehow someone something sometime sometimes somewhere
+still such
+take ten than that the their them themselves then thence there thereafter
+thereby therefore therein thereupon these they third this those though three
+through throughout thru thus to together too top toward towards twelve twenty
+two
+under until up unless upon us used using
+various very very via was we well were what whatever when whence whenever where
+whereafter whereas whereby wherein whereupon wherever whether which while
+whither who whoever whole whom whose why will with within without would
+yet you your yours yourself yourselves
+""".split()
+)
+
+contractions = ["n't", "'d", "'ll", "'m", "'re", "'s", "'ve"]
+STOP_WORDS.update(contractions)
+
+for apostrophe in ["‘", "’"]:
+    for stopword in contractions:
+        STOP_WORDS.add(stopword.replace("'", apostrophe))
+
+
+class TokenFilter():
+    '''
+    The token pre-processing flags compiled into a filter plan. Calling an
+    instance with a token's text, lemma and POS tag returns the text to count
+    for that token, or None if the token should not be counted.
+
+    The decision for each distinct (text, POS tag, lemma) is only worked out
+    once and then stored in a vocabulary table. As most tokens in a text are
+    repeats of a word type already seen, most tokens only cost a single
+    dictionary lookup.
+    '''
+
+    def __init__(self, remove_punctuation: bool = False, 
+                 remove_determiners: bool = False, 
+                 remove_stop_words: bool = False, 
+                 remove_digits: bool = False, lower_case: bool = False) -> None:
+        '''
+        :param remove_punctuation: Do not count tokens in 
+                                   `PUNCTUATION_SYMBOLS` or that have the 
+                                   lemma `PUNC`.
+        :param remove_determiners: Do not count tokens that have a POS tag in 
+                                   `DETERMINER_TAGS`.
+        :param remove_stop_words: Do not count tokens that are in `STOP_WORDS`,
+                                  the comparison is lower cased.
+        :param remove_digits: Do not count tokens that have a POS tag in 
+                              `DIGIT_TAGS`.
+        :param lower_case: Lower case all tokens that are counted.
+        '''
+        self.remove_punctuation = remove_punctuation
+        self.remove_determiners = remove_determiners
+        self.remove_stop_words = remove_stop_words
+        self.remove_digits = remove_digits
+        self.lower_case = lower_case
+
+        # The filter plan, only the checks that have been asked for.
+        self._removed_pos_tags: Set[str] = set()
+        if remove_determiners:
+            self._removed_pos_tags.update(DETERMINER_TAGS)
+        if remove_digits:
+            self._removed_pos_tags.update(DIGIT_TAGS)
+        self._removed_lemma = 'PUNC' if remove_punctuation else None
+        # Punctuation is compared against the token text after lower casing 
+        # (if lower casing), stop words are always compared lower cased.
+        self._removed_texts: Set[str] = set()
+        self._removed_lower_texts: Set[str] = set()
+        if remove_punctuation:
+            if lower_case:
+                self._removed_lower_texts.update(PUNCTUATION_SYMBOLS)
+            else:
+                self._removed_texts.update(PUNCTUATION_SYMBOLS)
+        if remove_stop_words:
+            self._removed_lower_texts.update(STOP_WORDS)
+        self._check_lower_texts = bool(self._removed_lower_texts)
+
+        self._vocabulary: Dict[Tuple[str, Optional[str], Optional[str]], 
+                               Optional[str]] = {}
+
+    def _decide(self, text: str, lemma: Optional[str], 
+                pos_tag: Optional[str]) -> Optional[str]:
+        if text in self._removed_texts:
+            return None
+        if lemma is not None and lemma == self._removed_lemma:
+            return None
+        if pos_tag is not None and pos_tag in self._removed_pos_tags:
+            return None
+        lower_text = text
+        if self.lower_case or self._check_lower_texts:
+            lower_text = text.lower()
+        if lower_text in self._removed_lower_texts:
+            return None
+        if self.lower_case:
+            return lower_text
+        return text
+
+    def __call__(self, text: str, lemma: Optional[str], 
+                 pos_tag: Optional[str]) -> Optional[str]:
+        '''
+        :param text: The token text.
+        :param lemma: The lemma of the token.
+        :param pos_tag: The POS tag of the token.
+        :returns: The text to count for the token, this is lower cased if 
+                  `lower_case`, or None if the token is filtered out.
+        '''
+        key = (text, pos_tag, lemma)
+        try:
+            return self._vocabulary[key]
+        except KeyError:
+            decision = self._decide(text, lemma, pos_tag)
+            self._vocabulary[key] = decision
+            return decision
+
+    def __len__(self) -> int:
+        '''
+        :returns: The number of distinct (text, POS tag, lemma) seen so far.
+        '''
+        return len(self._vocabulary)
+
+def count_tokens(tokens: Iterable[TokenTuple], token_filter: TokenFilter,
+                 token_counter: typing.Counter[str], 
+                 usas_counter: typing.Counter[str],
+                 token_usas_tag: Dict[str, typing.Counter[str]]) -> int:
+    '''
+    Counts the tokens that pass the `token_filter` and their USAS tags. The 
+    tokens are first counted per distinct (text, lemma, POS tag, USAS tag), 
+    which happens within the C implementation of `Counter`, after which the 
+    filter and the USAS tag splitting is only performed once per distinct 
+    token.
+
+    :param tokens: Tokens to count, e.g. the output of 
+                   `usas_json_reader.iter_usas_tokens`.
+    :param token_filter: Decides which tokens are counted and the text that 
+                         is counted for them.
+    :param token_counter: Updated with the count of each token text.
+    :param usas_counter: Updated with the count of each USAS tag, whereby 
+                         tokens with more than one USAS tag e.g. `X9.2+/S7.3` 
+                         count towards each tag.
+    :param token_usas_tag: Updated with the count of each USAS tag per token 
+                           text, e.g. a defaultdict of Counters.
+    :returns: The number of tokens read, including those filtered out.
+    '''
+    number_tokens = 0
+    for (text, lemma, pos_tag, usas_tag), count in Counter(tokens).items():
+        number_tokens += count
+        token_text = token_filter(text, lemma, pos_tag)
+        if token_text is None:
+            continue
+        token_counter[token_text] += count
+        if usas_tag is not None:
+            associated_tags = token_usas_tag[token_text]
+            for a_tag in usas_tag.split('/'):
+                usas_counter[a_tag] += count
+                associated_tags[a_tag] += count
+    return number_tokens
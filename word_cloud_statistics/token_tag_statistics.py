@@ -3,85 +3,54 @@ import json
 from collections import Counter, defaultdict
 import logging
 from pathlib import Path
-from time import sleep
+import time
 import sys
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Iterable, Tuple, TYPE_CHECKING
 import typing
-import tempfile
-import os
-
-from ucrel_api.api import UCREL_API, UCREL_Doc
-
-DETERMINER_TAGS = set("""
-DA DA1 DA2 DAR DAT DB DB2 DD DD1 DD2 DDQ DDQGE DDQV
-""".split())
-
-DIGIT_TAGS = set("""
-FO MC MC1 MC2 MCGE MCMC MD MF
-""".split())
-
-# Taken from SpaCy:
-# https://github.com/explosion/spaCy/blob/master/spacy/lang/char_classes.py
-PUNCTUATION_SYMBOLS = set("""
-.. … …… , : ; ! ? ¿ ؟ ¡ ( ) [ ] { } < > _ # * & 。 ？ ！ ， 、 ； ： ～ · । ، ۔ ؛ ٪ % 
-' " ” “ ` ‘ ´ ’ ‚ , „ » « 「 」 『 』 （ ） 〔 〕 【 】 《 》 〈 〉 
-- – — -- --- —— ~ 
-$ £ € ¥ ฿ US$ C$ A$ ₽ ﷼ ₴
-""".split())
-
-# The stop words have come from SpaCy, reference:
-# https://github.com/explosion/spaCy/blob/master/spacy/lang/en/stop_words.py
-STOP_WORDS = set(
-    """
-a about above across after afterwards again against all almost alone along
-already also although always am among amongst amount an and another any anyhow
-anyone anything anyway anywhere are around as at
-back be became because become becomes becoming been before beforehand behind
-being below beside besides between beyond both bottom but by
-call can cannot ca could
-did do does doing done down due during
-each eight either eleven else elsewhere empty enough even ever every
-everyone everything everywhere except
-few fifteen fifty first five for former formerly forty four from front full
-further
-get give go
-had has have he hence her here hereafter hereby herein hereupon hers herself
-him himself his how however hundred
-i if in indeed into is it its itself
-keep
-last latter latterly least less
-just
-made make many may me meanwhile might mine more moreover most mostly move much
-must my myself
-name namely neither never nevertheless next nine no nobody none noone nor not
-nothing now nowhere
-of off often on once one only onto or other others otherwise our ours ourselves
-out over own
-part per perhaps please put
-quite
-rather re really regarding
-same say see seem seemed seeming seems serious several she should show side
-since six sixty so some somehow someone something sometime sometimes somewhere
-still such
-take ten than that the their them themselves then thence there thereafter
-thereby therefore therein thereupon these they third this those though three
-through throughout thru thus to together too top toward towards twelve twenty
-two
-under until up unless upon us used using
-various very very via was we well were what whatever when whence whenever where
-whereafter whereas whereby wherein whereupon wherever whether which while
-whither who whoever whole whom whose why will with within without would
-yet you your yours yourself yourselves
-""".split()
-)
-
-contractions = ["n't", "'d", "'ll", "'m", "'re", "'s", "'ve"]
-STOP_WORDS.update(contractions)
-
-for apostrophe in ["‘", "’"]:
-    for stopword in contractions:
-        STOP_WORDS.add(stopword.replace("'", apostrophe))
 
+from approximate_counting import ApproximateCounts
+from dispersion import DocumentCounts
+from external_counting import ExternalCounts
+from facet_cube import FacetCube, read_facet_metadata, text_facet_values
+from keyness_table import DIRECTIONS, LOG_LIKELIHOOD_CRITICAL_VALUES, KeynessTable
+from kwic_index import build_kwic_index
+from language_identification import (FREQUENT_WORDS, UNDETERMINED,
+                                     LanguageIdentifier, read_text_sample)
+from near_duplicates import NearDuplicateIndex, cluster_duplicates
+from ngram_counting import NGramCounts
+from paragraph_cache import (PARAGRAPH_CACHE_FILE_NAME, ParagraphCache,
+                             paragraph_tagger_version)
+from profiling import StageProfiler, TimedIterable
+from shard_counts import ShardCounts, in_shard, shard_type
+from significance import (USAS_tag_to_label, common_usas_tags,
+                          convert_usas_tags_to_labels,
+                          extract_significant_key_words, read_usas_tag_labels,
+                          run_sigeff, significant_token_tag_statistics)
+from usas_cache import USASCache, atomic_write
+from usas_hierarchy import USAS_MAJOR_FIELDS, usas_hierarchy_statistics
+from usas_json_reader import iter_usas_tokens
+
+# The UCREL API client and the token filter are only imported when texts are 
+# tagged and counted, so that e.g. the `score` subcommand starts instantly.
+if TYPE_CHECKING:
+    from ucrel_api.api import UCREL_API
+    from token_filter import TokenFilter
+
+# The subcommands that each run one stage of the full run, see 
+# `subcommand_parser`.
+SUBCOMMANDS = ['tag', 'count', 'score', 'keyness', 'query', 'ngrams', 'index',
+               'slice']
+# The stages of a run that are recorded by `--profile`, in the order they run.
+PROFILE_STAGES = ['language_identification', 'near_duplicates', 'tagging',
+                  'counting', 'reading_references',
+                  'token_significance', 'usas_significance', 'dispersion',
+                  'label_conversion', 'usas_hierarchy']
+# The flags of `token_filter_arguments`, in the order they are stored in the 
+# counting settings.
+TOKEN_FILTER_FLAGS = ['remove_punctuation', 'remove_determiners', 
+                      'remove_stop_words', 'remove_digits', 'lower_case']
+
+logger = logging.getLogger(__name__)
 
 def path_type(_file_path: str) -> Path:
     file_path = Path(_file_path)
@@ -148,186 +117,838 @@ def read_frequency_file(_file_path: Path, lower_case: bool) -> Dict[str, int]:
     
     return frequency_counter
 
-def sigeff_input_file(_file_path: Path, target_frequency_count: Dict[str, int], 
-                      reference_frequency_count: Dict[str, int], 
-                      min_target_frequency_count: int = 5) -> None:
+def usas_cache_tagger_version(usas_tagger_version: str, 
+                              paragraph_cache: bool) -> str:
     '''
-    This first removes all of the words in the reference and target frequency 
-    count that are less than `min_target_frequency_count`. Then removes all of 
-    the words in the reference frequency count which are not in the target 
-    frequency count. 
-    
-    This then writes the following for each word in the `target_frequency_count`:
+    :param usas_tagger_version: Version of the USAS tagger.
+    :param paragraph_cache: Whether the texts are tagged a paragraph at a 
+                            time, see `--paragraph-cache`.
+    :returns: The tagger version the USAS cache is keyed by, texts tagged a 
+              paragraph at a time are cached separately from the same texts 
+              tagged whole.
+    '''
+    if paragraph_cache:
+        return paragraph_tagger_version(usas_tagger_version)
+    return usas_tagger_version
 
-    `WORD\t{target_frequency_count_for_word}\t{reference_frequency_count_for_word}\n`
+def log_paragraph_cache_statistics(paragraph_statistics: Dict[str, Any]) -> None:
+    '''
+    :param paragraph_statistics: The output of `ParagraphCache.statistics`.
+    '''
+    logger.info(f'{paragraph_statistics["hits"]} of the '
+                f'{paragraph_statistics["paragraphs"]} paragraphs of the '
+                'tagged texts were in the paragraph cache, a hit rate of '
+                f'{paragraph_statistics["hit rate"]:.2%} by paragraph and '
+                f'{paragraph_statistics["character hit rate"]:.2%} by '
+                'character.')
 
-    This is written to the given `_file_path`. The top line is reserved for the 
-    following line:
-    
-    `Total\t{sum of all frequencies in this target column}\t
-     {sum of all frequencies in this reference column}\n`
-
-    This file will then be in the format required for the SigEff C script. An 
-    example of this file format can be seen below (acknowledge Paul Rayson):
-
-    TOTAL	10000	100000
-    Word1	1500	15000
-    Word2	340	2500
-    Word3	200	2500
-    Word4	7	0
-    Word5	654	654
-    Word6	89	536
-
-    :param _file_path: To write the sigeff data too that will be used as input 
-                       to the sigeff C script.
-    :param target_frequency_count: The token/tag frequency counts from the 
-                                   corpus you are interested in.
-    :param reference_frequency_count: The token/tag frequency counts from the  
-                                      reference corpus e.g. BNC. 
-    :param min_target_frequency_count: Minimum frequency count of a word/tag.
-                                       Any word/tag less than this is removed 
-                                       from the reference/target frequency 
-                                       dictionaries.
-    '''
-    reduced_target_frequency_count = {word: freq for word, freq in target_frequency_count.items() 
-                                      if freq>=min_target_frequency_count}
-    reduced_reference_frequency_count = {word: freq for word, freq in reference_frequency_count.items()
-                                         if word in reduced_target_frequency_count}
-    total_target_frequency_count = sum([freq for freq in reduced_target_frequency_count.values()])
-    total_reference_frequency_count = sum([freq for freq in reduced_reference_frequency_count.values()])
-    
-    with _file_path.open('w') as _file:
-        _file.write(f'Total\t{total_target_frequency_count}\t{total_reference_frequency_count}\n')
-        for word, target_frequency in reduced_target_frequency_count.items():
-            reference_frequency = reduced_reference_frequency_count.get(word, 0)
-            _file.write(f'{word}\t{target_frequency}\t{reference_frequency}\n')
+def identify_text_languages(text_file_paths: List[Path], languages: List[str]
+                            ) -> Tuple[List[Path], Dict[str, Dict[str, Any]]]:
+    '''
+    Identifies the language of each text, from a bounded sample of the text 
+    see `language_identification.read_text_sample`, so that texts in other 
+    languages are not sent to the English USAS tagger.
 
-def _get_significant_key_words(file_lines: List[str], 
-                               significance_level: float = 0.05
-                               ) -> Dict[str, Dict[str, Any]]:
+    :param text_file_paths: The texts.
+    :param languages: The languages to tag, keys of 
+                      `language_identification.FREQUENT_WORDS`.
+    :returns: The texts whose language is one of `languages`, or could not be 
+              determined, and for every text the identified language and 
+              whether it is tagged (`tag`) or not (`skip`).
     '''
-    :param file_lines: The output of the function readlines on the file that 
-                       contains the result from running the SigEff C script.
-    :param significance_level: The level of significance. 0.05 = 95% 0.01 = 99%.
-                               significance levels allowed are: 0.05, 0.01,
-                               0.001, and 0.0001.
-    :returns: All of the words that are significantly more likely to occur in the 
-              target corpus than the reference at the given significance level. 
-              The words are the keys and the values are a dictionary of statistics
-              with the statistic name as key with it's associated value e.g. 
-              `log-likelihood` : 12.3
-    '''
-    significant_words = {}
-    log_likelihood_sig_value_mapper = {0.05: 3.84, 0.01: 6.63, 0.001: 10.83,
-                                       0.0001: 15.13}
-    log_likelihood_sig_value = log_likelihood_sig_value_mapper[significance_level]
-    for line_index, line in enumerate(file_lines):
-        # The first line only contains the total and the second are the headers
-        if line_index == 0 or line_index == 1:
-            continue
-        line_data = line.split()
-        # Number of fields should be 13 after splitting on whitespace
-        number_fields = len(line_data)
-        number_error = (f'number of fields on line {line_index} is {number_fields}'
-                        f' when it should be at least 13.')
-        assert number_fields > 12, number_error
-        # Only want words that are significantly more likely to occur in the 
-        # target than the reference corpus.
-        higher_symbol = line_data[5]
-        if higher_symbol != '+':
-            continue
-        # Checking if the word is significant
-        log_likelihood = float(line_data[6])
-        if log_likelihood < log_likelihood_sig_value:
-            continue
-        log_ratio = float(line_data[11])
-        frequency_in_target_corpus = int(line_data[1])
-        relative_frequency_in_target_corpus = float(line_data[2])
-        word = line_data[0]
-        significant_words[word] = {'Log Likelihood': log_likelihood, 
-                                   'Log Ratio': log_ratio, 
-                                   'Frequency': frequency_in_target_corpus,
-                                   'Relative Frequency (%)': relative_frequency_in_target_corpus}
-    return significant_words
-
-def extract_significant_key_words(target_counter: Dict[str, int], 
-                                  reference_counter: Dict[str, int],
-                                  sigeff_binary_file_path: Path,
-                                  semtag_summary_file_path: Path,
-                                  significance_level: float = 0.05,
-                                  min_target_frequency_count: int = 5
-                                  ) -> Dict[str, Dict[str, Any]]:
-    '''
-    :param target_counter: The frequency counts of the token/tag from the corpus 
-                           you are interested in.
-    :param reference_counter: The frequency counts of the token/tag from the  
-                              reference corpus e.g. BNC.
-    :param sigeff_binary_file_path: File path to the SigEff C binary
-    :param semtag_summary_file_path: File path to the USAS tag summary file. 
-                                     This is used by the SigEff binary.
-    :param significance_level: The level of significance. 0.05 = 95% 0.01 = 99%.
-                               significance levels allowed are: 0.05, 0.01,
-                               0.001, and 0.0001.
-    :param min_target_frequency_count: Minimum frequency count of a token/tag 
-                                       in the target counter to be considered 
-                                       in the token/tag significance list that 
-                                       is returned.
-    :returns: All of the token/tags that are significantly more likely to occur in the 
-              target corpus than the reference at the given significance level. 
-              The words are the keys and the values are a dictionary of statistics
-              with the statistic name as key with it's associated value e.g. 
-              `log-likelihood` : 12.3
-    '''
-    with tempfile.NamedTemporaryFile('w+') as a_file:
-        temp_file_path = Path(a_file.name)
-        sigeff_input_file(temp_file_path, target_counter, reference_counter, 
-                          min_target_frequency_count=min_target_frequency_count)
-
-        with tempfile.NamedTemporaryFile('w+') as result_file:
-            run_command = [f"{str(sigeff_binary_file_path)}", "-X", 
-                           f"{str(semtag_summary_file_path)}", "<", 
-                           f"{a_file.name}", ">", f"{result_file.name}"]
-            os.system(' '.join(run_command))
-            lines = result_file.readlines()
-            return _get_significant_key_words(lines, significance_level)
-
-def USAS_tag_to_label(usas_mapper: Dict[str, str], tag: str) -> str:
-    '''
-    :param usas_mapper: Maps USAS tags to labels e.g. T to Time.
-    :param tag: USAS tag to convert to label.
-    :returns: The label for the given USAS tag. This process performs removal 
-              of the USAS special symbols like `+` and `%` to find the relevant 
-              USAS label. It also adds these special specials symbols back on 
-              to the label so that it is possible to convert the returned label 
-              back to it's original tag.
-    '''
-    # For the list of symbols see page 2 of the following guide:
-    # http://ucrel.lancs.ac.uk/usas/usas_guide.pdf
-    other_usas_symbols = set(['%', '@', 'f', 'm', 'c', 'n', 'i', '+', '-'])
-    # Some USAS tags are not in the USAS tags to labels list as they 
-    # can have additional + or - sings at the end of the USAS tags. 
-    # Therefore we remove the + or - until we find the label.
-    temp_tag = tag
-    chars_removed = ''
-    while temp_tag not in usas_mapper:
-        last_tag_char = temp_tag[-1]
-        if last_tag_char in other_usas_symbols:
-            chars_removed += last_tag_char
-            temp_tag = temp_tag[:-1]
+    language_identifier = LanguageIdentifier()
+    tagged_file_paths: List[Path] = []
+    decisions: Dict[str, Dict[str, Any]] = {}
+    for _file_path in text_file_paths:
+        decision = language_identifier.identify(read_text_sample(_file_path))
+        language = decision['language']
+        if language == UNDETERMINED or language in languages:
+            decision['action'] = 'tag'
+            tagged_file_paths.append(_file_path)
         else:
-            break
-    else:
-        label = usas_mapper[temp_tag]
-        if chars_removed:
-            label += f' - {chars_removed}'
-        return label
-    raise ValueError(f'Special symbol in the USAS tag {tag} that is not one '
-                     f'of the special symbols: {other_usas_symbols} or a '
-                     'USAS tag itself.')
+            decision['action'] = 'skip'
+            logger.info(f'Skipping {_file_path.name}, its language is '
+                        f'identified as {language}')
+        decisions[_file_path.name] = decision
+    return tagged_file_paths, decisions
+
+def select_texts_to_tag(text_file_paths: List[Path], 
+                        args: argparse.Namespace, profiler: StageProfiler
+                        ) -> Tuple[List[Path], Dict[str, Dict[str, Any]], 
+                                   List[Dict[str, object]]]:
+    '''
+    Removes the texts that are not in one of `args.languages`, if given, and 
+    if `args.remove_near_duplicates` the texts that are near duplicates of a 
+    longer text, writing the clusters to `args.near_duplicate_report` if 
+    given. Shared by the full run and the `tag` subcommand.
+
+    :param text_file_paths: The texts.
+    :param args: Arguments parsed with `--languages` and the 
+                 `near_duplicate_arguments` flags.
+    :param profiler: Records the `language_identification` and 
+                     `near_duplicates` stages.
+    :returns: The texts to tag, the identified language of every text see 
+              `identify_text_languages`, and the clusters of near duplicates 
+              see `NearDuplicateIndex.clusters`.
+    '''
+    language_decisions: Dict[str, Dict[str, Any]] = {}
+    if args.languages is not None:
+        with profiler.stage('language_identification') as stage_values:
+            logger.info('Identifying the language of the texts')
+            text_file_paths, language_decisions = identify_text_languages(text_file_paths, 
+                                                                          args.languages)
+            number_skipped = len(language_decisions) - len(text_file_paths)
+            logger.info(f'{number_skipped} texts are not in the languages '
+                        f'{", ".join(args.languages)} and will not be tagged '
+                        'or counted.')
+            stage_values['texts'] = len(language_decisions)
+            stage_values['texts skipped'] = number_skipped
+    near_duplicate_clusters: List[Dict[str, object]] = []
+    if args.remove_near_duplicates:
+        with profiler.stage('near_duplicates') as stage_values:
+            logger.info('Finding near duplicate texts')
+            near_duplicate_index = NearDuplicateIndex(args.near_duplicate_threshold)
+            for _file_path in text_file_paths:
+                with _file_path.open('r') as _file:
+                    near_duplicate_index.add(_file_path.name, _file.read())
+            near_duplicate_clusters = near_duplicate_index.clusters()
+            near_duplicates = cluster_duplicates(near_duplicate_clusters)
+            logger.info(f'Found {len(near_duplicate_clusters)} clusters of near '
+                        f'duplicates, {len(near_duplicates)} near duplicate texts '
+                        'will not be tagged or counted.')
+            for cluster in near_duplicate_clusters:
+                logger.info(f'Keeping {cluster["representative"]}, near '
+                            f'duplicates: {", ".join(cluster["duplicates"])}')
+            if args.near_duplicate_report is not None:
+                create_output_file(args.near_duplicate_report, 
+                                   {'threshold': args.near_duplicate_threshold,
+                                    'clusters': near_duplicate_clusters})
+            text_file_paths = [_file_path for _file_path in text_file_paths 
+                               if _file_path.name not in near_duplicates]
+            stage_values['texts'] = len(text_file_paths) + len(near_duplicates)
+            stage_values['near duplicate texts'] = len(near_duplicates)
+    return text_file_paths, language_decisions, near_duplicate_clusters
+
+def create_facet_cube(metadata: Dict[str, Dict[str, str]], 
+                      counting_settings: Dict[str, Any], 
+                      text_names: Iterable[str]) -> FacetCube:
+    '''
+    :param metadata: The facet values of each text, see 
+                     `facet_cube.read_facet_metadata`.
+    :param counting_settings: The settings used to count.
+    :param text_names: The names of the texts that will be counted, those 
+                       that are not in the metadata are logged.
+    :returns: An empty facet cube of all of the facets in the metadata.
+    '''
+    facet_names = set()
+    for facet_values in metadata.values():
+        facet_names.update(facet_values)
+    missing_text_names = [text_name for text_name in text_names 
+                          if text_facet_values(metadata, text_name) is None]
+    if missing_text_names:
+        logger.warning(f'{len(missing_text_names)} texts are not in the facet '
+                       'metadata, their facet values are null: '
+                       f'{", ".join(missing_text_names)}')
+    return FacetCube(facet_names, counting_settings)
+
+def create_usas_hierarchy_files(output_directory: Path, 
+                                usas_counter: Dict[str, int],
+                                reference_usas_counter: Dict[str, int],
+                                semtag_summary_file_path: Path,
+                                significance_level: float = 0.05,
+                                min_target_frequency_count: int = 5,
+                                usas_tags_to_labels: bool = False) -> None:
+    '''
+    Writes the significant USAS tags at each level of the USAS tag hierarchy 
+    to `usas_level_<level>.json` in the output directory, in the same format 
+    as the usas output file, see `usas_hierarchy.usas_hierarchy_statistics`.
+
+    :param output_directory: Directory to write the files to.
+    :param usas_counter: The USAS tag frequency counts of the target corpus.
+    :param reference_usas_counter: The USAS tag frequency counts of the 
+                                   reference corpus e.g. BNC.
+    :param semtag_summary_file_path: File path to the USAS tag summary file, 
+                                     used to convert USAS tags to labels.
+    :param significance_level: The level of significance. 0.05 = 95% 0.01 = 99%.
+    :param min_target_frequency_count: Minimum frequency count of a tag at a 
+                                       level in the target corpus.
+    :param usas_tags_to_labels: Whether to convert the USAS tags to labels, 
+                                tags without a label, e.g. `A1.1`, are kept.
+    :returns: None
+    '''
+    levels = usas_hierarchy_statistics(usas_counter, reference_usas_counter, 
+                                       LOG_LIKELIHOOD_CRITICAL_VALUES[significance_level],
+                                       min_target_frequency_count)
+    usas_tag_label = {}
+    if usas_tags_to_labels:
+        usas_tag_label = {**USAS_MAJOR_FIELDS, 
+                          **read_usas_tag_labels(semtag_summary_file_path)}
+    for level, significant_tags in levels.items():
+        if usas_tags_to_labels:
+            labelled_tags = {}
+            for tag, values in significant_tags.items():
+                label = usas_tag_label.get(tag, tag)
+                if label in labelled_tags:
+                    raise ValueError(f'This label {label} appears twice in the '
+                                     f'significantly occuring level {level} '
+                                     'USAS labels.')
+                labelled_tags[label] = values
+            significant_tags = labelled_tags
+        create_output_file(Path(output_directory, f'usas_level_{level}.json'), 
+                           significant_tags)
+
+def create_profile_report(_file_path: Path, profiler: StageProfiler, 
+                          run_information: Dict[str, Any]) -> None:
+    '''
+    Logs the time spent in each stage and writes the profile report.
+
+    :param _file_path: File to store the profile report in JSON format.
+    :param profiler: The profiler that recorded the stages of the run.
+    :param run_information: Information about the run, e.g. the number of 
+                            texts, stored with the recorded stages.
+    :returns: None
+    '''
+    report = profiler.report()
+    for stage in report['stages']:
+        logger.info(f'Stage {stage["stage"]}: '
+                    f'{stage["wall time (seconds)"]:.3f}s wall time, '
+                    f'{stage["CPU time (seconds)"]:.3f}s CPU time, '
+                    f'{stage["peak Python memory (MB)"]:.1f}MB peak Python memory')
+    logger.info(f'Profile report written to: {_file_path}')
+    with _file_path.open('w') as _file:
+        json.dump({**run_information, **report}, _file, indent=2)
+
+
+def tag_command(args: argparse.Namespace) -> None:
+    '''
+    The `tag` subcommand: tags the texts that are not in the USAS cache and 
+    writes the tag manifest, the cached USAS file of each text, which is the 
+    input of the `count` subcommand.
+    '''
+    from ucrel_api.api import UCREL_API
+    from stages import iter_texts, tag_texts
+
+    if args.usas_tagger_version is None:
+        args.usas_tagger_version = default_usas_tagger_version()
+    text_directory: Path = args.text_directory
+    usas_caching_directory: Path = args.usas_caching_directory
+    ucrel_api = UCREL_API(args.usas_api_email, args.usas_api_url, 
+                          args.usas_api_port)
+    text_file_paths = sorted(text_directory.iterdir())
+    text_file_paths, language_decisions, near_duplicate_clusters = \
+        select_texts_to_tag(text_file_paths, args, StageProfiler(enabled=False))
+
+    usas_cache = USASCache(usas_caching_directory, 
+                           usas_cache_tagger_version(args.usas_tagger_version, 
+                                                     args.paragraph_cache))
+    paragraph_cache: Optional[ParagraphCache] = None
+    if args.paragraph_cache:
+        paragraph_cache = ParagraphCache(Path(usas_caching_directory, 
+                                              PARAGRAPH_CACHE_FILE_NAME),
+                                         args.usas_tagger_version)
+    tagged_texts = tag_texts(iter_texts(text_file_paths), ucrel_api, usas_cache, 
+                             args.replace_usas_cache, 
+                             args.time_to_wait_between_usas_api_calls, 
+                             paragraph_cache)
+    documents: Dict[str, str] = {name: usas_file_path.name 
+                                 for name, usas_file_path in tagged_texts}
+    failed: List[str] = [_file_path.name for _file_path in text_file_paths 
+                         if _file_path.name not in documents]
+    if failed:
+        logger.warning(f'Tagging failed for {len(failed)} texts, see the '
+                       f'journal {usas_cache.journal_path}')
+    manifest = {'usas_tagger_version': usas_cache.tagger_version,
+                'usas_caching_directory': str(usas_caching_directory.resolve()),
+                'documents': documents, 'failed': failed,
+                'skipped_languages': {name: decision['language'] 
+                                      for name, decision in language_decisions.items()
+                                      if decision['action'] == 'skip'},
+                'near_duplicates': near_duplicate_clusters}
+    if paragraph_cache is not None:
+        paragraph_statistics = paragraph_cache.statistics()
+        paragraph_cache.close()
+        log_paragraph_cache_statistics(paragraph_statistics)
+        manifest['paragraph_cache'] = paragraph_statistics
+    atomic_write(args.tag_manifest_path, json.dumps(manifest))
+    logger.info(f'{len(documents)} tagged texts written to the tag manifest '
+                f'{args.tag_manifest_path}')
+
+def count_command(args: argparse.Namespace) -> None:
+    '''
+    The `count` subcommand: counts the tokens and USAS tags of the texts in 
+    the tag manifest and writes the counts, which are the input of the 
+    `score` subcommand, in the same format as a `--shard-counts-file`.
+    '''
+    from stages import count_texts, read_tagged_texts
+
+    with args.tag_manifest_path.open('r') as manifest_file:
+        manifest = json.load(manifest_file)
+    usas_caching_directory = Path(manifest['usas_caching_directory'])
+    token_filter, counting_settings = create_token_filter(args, 
+                                                          manifest['usas_tagger_version'])
+    counts = ShardCounts(counting_settings)
+    documents: Dict[str, str] = manifest['documents']
+    tagged_texts = read_tagged_texts((document_name, Path(usas_caching_directory, usas_file_name))
+                                     for document_name, usas_file_name in documents.items())
+    facet_metadata: Dict[str, Dict[str, str]] = {}
+    facet_cube: Optional[FacetCube] = None
+    if args.facet_metadata is not None:
+        if args.facet_cube_path is None:
+            raise SystemExit('`--facet-metadata` requires `--facet-cube-path`')
+        facet_metadata = read_facet_metadata(args.facet_metadata)
+        facet_cube = create_facet_cube(facet_metadata, counting_settings, documents)
+    for document_name, document_counts in count_texts(tagged_texts, token_filter):
+        counts.update(document_name, *document_counts)
+        if facet_cube is not None:
+            facet_values = text_facet_values(facet_metadata, document_name) or {}
+            facet_cube.update(document_name, facet_values, *document_counts)
+    counts.save(args.counts_path)
+    logger.info(f'The counts of {len(counts.documents)} texts have been '
+                f'written to {args.counts_path}')
+    if facet_cube is not None:
+        facet_cube.save(args.facet_cube_path)
+        logger.info(f'The facet cube of {len(facet_cube.cells)} facet value '
+                    f'combinations has been written to {args.facet_cube_path}')
+
+def score_command(args: argparse.Namespace) -> None:
+    '''
+    The `score` subcommand: finds the significant tokens and USAS tags from 
+    the counts and writes them to the token and usas output files.
+    '''
+    score_counts(ShardCounts.load(args.counts_path), args)
+
+def slice_command(args: argparse.Namespace) -> None:
+    '''
+    The `slice` subcommand: finds the significant tokens and USAS tags of the 
+    texts with the given facet values from a facet cube, and writes them to 
+    the token and usas output files the same as `score`.
+    '''
+    facet_cube = FacetCube.load(args.facet_cube_path)
+    for facet_name, value_counts in facet_cube.facet_values().items():
+        values = ', '.join(f'{value} ({count})' for value, count in value_counts.items())
+        logger.info(f'Facet {facet_name}, the values and their number of texts: '
+                    f'{values}')
+    selection: Dict[str, List[str]] = {}
+    for facet_name, values in args.facet:
+        selection.setdefault(facet_name, []).extend(values)
+    try:
+        counts = facet_cube.slice(selection)
+    except ValueError as error:
+        raise SystemExit(str(error))
+    if not counts.documents:
+        raise SystemExit(f'No texts have the facet values {selection}')
+    logger.info(f'The slice {selection} contains {len(counts.documents)} texts')
+    score_counts(counts, args)
+
+def score_counts(counts: ShardCounts, args: argparse.Namespace) -> None:
+    '''
+    Finds the significant tokens and USAS tags from the counts and writes 
+    them to the token and usas output files, and the USAS tag hierarchy 
+    files if `args.usas_hierarchy_output_directory` is given.
+
+    :param counts: The counts.
+    :param args: The arguments of the `score` or `slice` subcommand.
+    '''
+    lower_case = counts.settings['lower_case']
+    reference_token_counter = read_frequency_file(args.reference_token_frequency_path,
+                                                  lower_case)
+    reference_usas_counter = read_frequency_file(args.reference_usas_tag_frequency_path,
+                                                 False)
+    significant_tokens, significant_tags = significant_token_tag_statistics(
+        counts.token_counter(), counts.usas_counter(), counts.token_usas_tag, 
+        reference_token_counter, reference_usas_counter, 
+        args.sigeff_binary_file_path, args.semtag_summary_file_path, 
+        args.significance_level, args.minimum_token_frequency, 
+        args.USAS_tags_to_labels)
+    create_output_file(args.token_output_path, significant_tokens)
+    create_output_file(args.usas_output_path, significant_tags)
+    if args.usas_hierarchy_output_directory is not None:
+        create_usas_hierarchy_files(args.usas_hierarchy_output_directory, 
+                                    counts.usas_counter(), reference_usas_counter, 
+                                    args.semtag_summary_file_path, 
+                                    args.significance_level, 
+                                    args.minimum_token_frequency, 
+                                    args.USAS_tags_to_labels)
+
+def keyness_command(args: argparse.Namespace) -> None:
+    '''
+    The `keyness` subcommand: runs SigEff once on the tokens and the USAS 
+    tags of the counts and stores the complete output in a keyness table, 
+    which the `query` subcommand queries.
+    '''
+    counts = ShardCounts.load(args.counts_path)
+    lower_case = counts.settings['lower_case']
+    reference_token_counter = read_frequency_file(args.reference_token_frequency_path,
+                                                  lower_case)
+    reference_usas_counter = read_frequency_file(args.reference_usas_tag_frequency_path,
+                                                 False)
+    if args.keyness_table_path.exists():
+        args.keyness_table_path.unlink()
+    keyness_table = KeynessTable(args.keyness_table_path)
+    token_counter = counts.token_counter()
+    frequent_tokens = {token for token, count in token_counter.items() 
+                       if count >= args.minimum_token_frequency}
+    token_common_usas_tags = {token: common_usas_tags(usas_tag_counter) 
+                              for token, usas_tag_counter 
+                              in counts.token_usas_tag(frequent_tokens).items()}
+    number_tokens = keyness_table.add_sigeff_output(
+        'token', run_sigeff(token_counter, reference_token_counter, 
+                            args.sigeff_binary_file_path, 
+                            args.semtag_summary_file_path, 
+                            args.minimum_token_frequency),
+        token_common_usas_tags)
+    number_tags = keyness_table.add_sigeff_output(
+        'usas', run_sigeff(counts.usas_counter(), reference_usas_counter, 
+                           args.sigeff_binary_file_path, 
+                           args.semtag_summary_file_path, 
+                           args.minimum_token_frequency))
+    keyness_table.set_metadata('minimum_frequency', args.minimum_token_frequency)
+    keyness_table.set_metadata('counting_settings', counts.settings)
+    keyness_table.set_metadata('usas_tag_labels', 
+                               read_usas_tag_labels(args.semtag_summary_file_path))
+    keyness_table.close()
+    logger.info(f'The keyness of {number_tokens} tokens and {number_tags} USAS '
+                f'tags has been written to {args.keyness_table_path}')
+
+def query_command(args: argparse.Namespace) -> None:
+    '''
+    The `query` subcommand: writes the tokens and USAS tags of the keyness 
+    table that meet the given thresholds to the token and usas output files.
+    '''
+    keyness_table = KeynessTable(args.keyness_table_path)
+    table_minimum_frequency = keyness_table.metadata('minimum_frequency')
+    minimum_frequency = args.minimum_token_frequency
+    if minimum_frequency is None:
+        minimum_frequency = table_minimum_frequency
+    elif minimum_frequency < table_minimum_frequency:
+        raise SystemExit(f'The minimum frequency {minimum_frequency} is less '
+                         'than that of the keyness table '
+                         f'{table_minimum_frequency}, create the keyness '
+                         'table with a lower `--minimum-token-frequency`.')
+    minimum_log_likelihood = args.minimum_log_likelihood
+    if minimum_log_likelihood is None:
+        minimum_log_likelihood = LOG_LIKELIHOOD_CRITICAL_VALUES[args.significance_level]
+    significant_tokens = keyness_table.query('token', minimum_log_likelihood, 
+                                             minimum_frequency, args.direction, 
+                                             args.top_n)
+    # Without the Z99 and Z9 SemTags
+    significant_tags = keyness_table.query('usas', minimum_log_likelihood, 
+                                           minimum_frequency, args.direction, 
+                                           args.top_n, exclude='Z9')
+    if args.USAS_tags_to_labels:
+        significant_tokens, significant_tags = convert_usas_tags_to_labels(
+            significant_tokens, significant_tags, 
+            keyness_table.metadata('usas_tag_labels'))
+    keyness_table.close()
+    create_output_file(args.token_output_path, significant_tokens)
+    create_output_file(args.usas_output_path, significant_tags)
+
+def ngrams_command(args: argparse.Namespace) -> None:
+    '''
+    The `ngrams` subcommand: counts the n-grams of the texts in the tag 
+    manifest and writes the n-grams that are used significantly more than 
+    in the reference texts to the n-gram output file, in the same format as 
+    the token output file.
+    '''
+    with args.tag_manifest_path.open('r') as manifest_file:
+        manifest = json.load(manifest_file)
+    usas_caching_directory = Path(manifest['usas_caching_directory'])
+    token_filter, _ = create_token_filter(args, manifest['usas_tagger_version'])
+    usas_file_paths = [Path(usas_caching_directory, usas_file_name) 
+                       for usas_file_name in manifest['documents'].values()]
+    ngram_counts = NGramCounts(usas_file_paths, token_filter, args.ngram_sizes, 
+                               args.minimum_token_frequency, 
+                               args.ngram_table_size)
+    ngram_counts.count()
+    logger.info(f'N-gram counting: {ngram_counts.report()}')
+    # SigEff splits its input on whitespace, therefore the tokens of an 
+    # n-gram are joined by `_` in the SigEff input, the same as in the 
+    # reference n-gram frequency file.
+    ngram_counter = ngram_counts.ngram_counter()
+    sigeff_ngrams = {ngram.replace(' ', '_'): ngram for ngram in ngram_counter}
+    sigeff_ngram_counter = {sigeff_ngram: ngram_counter[ngram] 
+                            for sigeff_ngram, ngram in sigeff_ngrams.items()}
+    reference_ngram_counter = read_frequency_file(args.reference_ngram_frequency_path,
+                                                  args.lower_case)
+    significant_ngrams = extract_significant_key_words(sigeff_ngram_counter, 
+                                                       reference_ngram_counter, 
+                                                       args.sigeff_binary_file_path, 
+                                                       args.semtag_summary_file_path, 
+                                                       args.significance_level, 
+                                                       args.minimum_token_frequency)
+    significant_ngrams = {sigeff_ngrams[sigeff_ngram]: values 
+                          for sigeff_ngram, values in significant_ngrams.items()}
+    ngram_usas_tag = ngram_counts.ngram_usas_tag(set(significant_ngrams))
+    for ngram, ngram_values in significant_ngrams.items():
+        ngram_values['Common associated USAS tags (%)'] = common_usas_tags(ngram_usas_tag[ngram])
+    if args.USAS_tags_to_labels:
+        usas_tag_label = read_usas_tag_labels(args.semtag_summary_file_path)
+        significant_ngrams, _ = convert_usas_tags_to_labels(significant_ngrams, 
+                                                            {}, usas_tag_label)
+    create_output_file(args.ngram_output_path, significant_ngrams)
+
+def index_command(args: argparse.Namespace) -> None:
+    '''
+    The `index` subcommand: builds the keyword in context index, from each 
+    token and USAS tag to where it occurs, of the texts in the tag manifest, 
+    see `kwic_index.KWICIndex` for the lookups.
+    '''
+    with args.tag_manifest_path.open('r') as manifest_file:
+        manifest = json.load(manifest_file)
+    usas_caching_directory = Path(manifest['usas_caching_directory'])
+    token_filter, settings = create_token_filter(args, manifest['usas_tagger_version'])
+    documents = {document_name: Path(usas_caching_directory, usas_file_name) 
+                 for document_name, usas_file_name in manifest['documents'].items()}
+    label_usas_tag = None
+    if args.semtag_summary_file_path is not None:
+        usas_tag_label = read_usas_tag_labels(args.semtag_summary_file_path)
+
+        def label_usas_tag(tag: str) -> str:
+            try:
+                return USAS_tag_to_label(usas_tag_label, tag)
+            except ValueError:
+                return tag
+    index_sizes = build_kwic_index(args.index_path, documents, token_filter, 
+                                   settings, label_usas_tag)
+    logger.info(f'Indexed {index_sizes["tokens"]} tokens of '
+                f'{index_sizes["documents"]} texts, '
+                f'{index_sizes["token terms"]} distinct tokens and '
+                f'{index_sizes["usas terms"]} USAS tags, to {args.index_path}')
+
+def token_filter_arguments() -> argparse.ArgumentParser:
+    '''
+    :returns: Parent parser of the flags that control what tokens are 
+              counted, shared by the full run and the subcommands that count 
+              tokens, see `create_token_filter`.
+    '''
+    remove_punctuation_help = ('Do not include punctuation in the frequency lists.')
+    remove_determiners_help = ('Do not include determiners in the frequency lists.')
+    remove_stop_words_help = ('Do not include stop words in the frequency lists. '
+                              'This has come from SpaCy: '
+                              'https://github.com/explosion/spaCy/blob/master/spacy/lang/en/stop_words.py')
+    remove_digits_help = ('Do not include any standalone digits in the '
+                          'frequency lists. This is determined by the POS tag.'
+                          'It also includes any formula tokens like > or <')
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument('--remove-punctuation', action='store_true', 
+                        help=remove_punctuation_help)
+    parser.add_argument('--remove-determiners', action='store_true', 
+                        help=remove_determiners_help)
+    parser.add_argument('--remove-stop-words', action='store_true', 
+                        help=remove_stop_words_help)
+    parser.add_argument('--remove-digits', action='store_true', 
+                        help=remove_digits_help)
+    parser.add_argument('--lower-case', action='store_true', 
+                        help='Lower case all words')
+    return parser
+
+def create_token_filter(args: argparse.Namespace, usas_tagger_version: str
+                        ) -> Tuple['TokenFilter', Dict[str, Any]]:
+    '''
+    :param args: Arguments parsed with the `token_filter_arguments` flags.
+    :param usas_tagger_version: Version of the USAS tagger the counted texts 
+                                were tagged with.
+    :returns: The token filter of the flags, compiled once into a filter plan 
+              whose decisions are cached per word type, and the counting 
+              settings, the flags and the tagger version, that are stored 
+              with the counts see `shard_counts.ShardCounts`.
+    '''
+    from token_filter import TokenFilter
+
+    flags = {flag: getattr(args, flag) for flag in TOKEN_FILTER_FLAGS}
+    counting_settings: Dict[str, Any] = dict(flags)
+    counting_settings['usas_tagger_version'] = usas_tagger_version
+    return TokenFilter(**flags), counting_settings
+
+def near_duplicate_arguments() -> argparse.ArgumentParser:
+    '''
+    :returns: Parent parser of the near duplicate flags, shared by the full 
+              run and the `tag` subcommand, see `select_texts_to_tag`.
+    '''
+    remove_near_duplicates_help = ('Before tagging find the texts that are '
+                                   'near duplicates of each other, e.g. '
+                                   'resubmissions or corrected versions of a '
+                                   'thesis, using MinHash and locality '
+                                   'sensitive hashing. Only the longest text '
+                                   'in each cluster of near duplicates is '
+                                   'tagged and counted.')
+    near_duplicate_threshold_help = ('The estimated Jaccard similarity, of '
+                                     'the word 5-grams of two texts, at or '
+                                     'above which the two texts are near '
+                                     'duplicates.')
+    near_duplicate_report_help = ('File path to write the clusters of near '
+                                  'duplicates to in JSON format.')
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument('--remove-near-duplicates', action='store_true', 
+                        help=remove_near_duplicates_help)
+    parser.add_argument('--near-duplicate-threshold', type=float, default=0.8, 
+                        help=near_duplicate_threshold_help)
+    parser.add_argument('--near-duplicate-report', type=path_type, 
+                        help=near_duplicate_report_help)
+    return parser
+
+def facet_selection_type(facet_selection: str) -> Tuple[str, List[str]]:
+    '''
+    :param facet_selection: Facet and values in the format 
+                            `FACET=VALUE[,VALUE...]` e.g. `year=2019,2020`.
+    :returns: The facet name and values.
+    '''
+    facet_name, separator, values = facet_selection.partition('=')
+    if not separator or not facet_name or not values:
+        raise TypeError(f'The facet selection {facet_selection} is not in the '
+                        'format `FACET=VALUE[,VALUE...]` e.g. year=2019,2020')
+    return facet_name, values.split(',')
+
+def subcommand_parser() -> argparse.ArgumentParser:
+    '''
+    :returns: The parser of the subcommands, see `SUBCOMMANDS`, which each 
+              run one stage of the full run, or an alternative to it, from 
+              the persisted output of the previous stage.
+    '''
+    description = ('Runs one stage of the full run, which is run when no '
+                   'subcommand is given: `tag` tags the texts and writes a '
+                   'tag manifest, `count` counts the tokens and USAS tags of '
+                   'the tagged texts, and `score` finds the tokens and USAS '
+                   'tags that are used significantly more than in the '
+                   'reference texts from the counts. Instead of `score`, '
+                   '`keyness` stores the complete SigEff output of the '
+                   'counts in a keyness table, which `query` queries for any '
+                   'significance level, frequency, direction, or top N. '
+                   '`ngrams` finds the n-grams, e.g. `climate change`, that '
+                   'are used significantly more than in the reference texts. '
+                   '`index` builds a keyword in context index of the tagged '
+                   'texts, which kwic_index.py looks up. `slice` finds the '
+                   'significant tokens and USAS tags of the texts with the '
+                   'given facet values, e.g. year, from the facet cube of '
+                   '`count`.')
+    parser = argparse.ArgumentParser(description=description)
+    subparsers = parser.add_subparsers(dest='subcommand', required=True)
+
+    tag_parser = subparsers.add_parser('tag', parents=[near_duplicate_arguments()],
+                                       help='Tag and cache the texts.')
+    tag_parser.set_defaults(function=tag_command)
+    tag_parser.add_argument('text_directory', type=exist_dir_path,
+                            help='Directory of the plain texts to be tagged.')
+    tag_parser.add_argument('usas_caching_directory', type=create_dir_path,
+                            help='Directory that caches the USAS output.')
+    tag_parser.add_argument('tag_manifest_path', type=path_type,
+                            help=('File path to write the cached USAS file of '
+                                  'each text to in JSON format.'))
+    tag_parser.add_argument('--replace-usas-cache', action='store_true', 
+                            help='Tag the texts again even if they are cached.')
+    tag_parser.add_argument('--usas-api-url', type=str, 
+                            default='http://ucrel-api.lancaster.ac.uk')
+    tag_parser.add_argument('--usas-api-port', type=str, default='')
+    tag_parser.add_argument('--usas-api-email', type=str, 
+                            default='a.moore@lancaster.ac.uk')
+    tag_parser.add_argument('--usas-tagger-version', type=str,
+                            default=None, 
+                            help=('Version of the USAS tagger, by default that '
+                                  'of the full run.'))
+    tag_parser.add_argument('--time-to-wait-between-usas-api-calls', default=10, 
+                            type=int)
+    tag_parser.add_argument('--paragraph-cache', action='store_true',
+                            help=('Tag the texts a paragraph at a time, only '
+                                  'tagging the paragraphs that are not in '
+                                  'the paragraph cache.'))
+    tag_parser.add_argument('--languages', nargs='+', choices=sorted(FREQUENT_WORDS),
+                            help=('Only tag the texts identified as one of '
+                                  'these languages, the others are recorded '
+                                  'in the tag manifest.'))
+
+    filter_parser = token_filter_arguments()
+    count_parser = subparsers.add_parser('count', parents=[filter_parser],
+                                         help=('Count the tokens and USAS tags '
+                                               'of the tagged texts.'))
+    count_parser.set_defaults(function=count_command)
+    count_parser.add_argument('tag_manifest_path', type=path_type,
+                              help='The tag manifest written by `tag`.')
+    count_parser.add_argument('counts_path', type=path_type,
+                              help='File path to write the counts to in JSON format.')
+    count_parser.add_argument('--facet-metadata', type=path_type,
+                              help=('Metadata sidecar of the facet values, e.g. '
+                                    'year and department, of each text in '
+                                    'JSON or CSV format. If given the counts '
+                                    'are also aggregated by facet values into '
+                                    'a facet cube, which `slice` finds the '
+                                    'significant tokens and USAS tags of any '
+                                    'slice of.'))
+    count_parser.add_argument('--facet-cube-path', type=path_type,
+                              help=('File path to write the facet cube to in '
+                                    'JSON format, required with '
+                                    '`--facet-metadata`.'))
+
+    score_parser = subparsers.add_parser('score', help=('Find the significant '
+                                                        'tokens and USAS tags '
+                                                        'from the counts.'))
+    score_parser.set_defaults(function=score_command)
+    score_parser.add_argument('counts_path', type=path_type,
+                              help='The counts written by `count`.')
+    score_parser.add_argument('token_output_path', type=path_type)
+    score_parser.add_argument('usas_output_path', type=path_type)
+    score_parser.add_argument('reference_token_frequency_path', type=path_type)
+    score_parser.add_argument('reference_usas_tag_frequency_path', type=path_type)
+    score_parser.add_argument('sigeff_binary_file_path', type=path_type)
+    score_parser.add_argument('semtag_summary_file_path', type=path_type)
+    score_parser.add_argument('--significance-level', default=0.05, type=float,
+                              choices=[0.05, 0.01, 0.001, 0.0001])
+    score_parser.add_argument('--minimum-token-frequency', default=5, type=int)
+    score_parser.add_argument('--USAS-tags-to-labels', action='store_true')
+    score_parser.add_argument('--usas-hierarchy-output-directory', 
+                              type=create_dir_path,
+                              help=('Directory to write the significant USAS '
+                                    'tags at each level of the USAS tag '
+                                    'hierarchy to.'))
+
+    slice_parser = subparsers.add_parser('slice', help=('Find the significant '
+                                                        'tokens and USAS tags '
+                                                        'of the texts with the '
+                                                        'given facet values.'))
+    slice_parser.set_defaults(function=slice_command)
+    slice_parser.add_argument('facet_cube_path', type=path_type,
+                              help='The facet cube written by `count` or the full run.')
+    slice_parser.add_argument('token_output_path', type=path_type)
+    slice_parser.add_argument('usas_output_path', type=path_type)
+    slice_parser.add_argument('reference_token_frequency_path', type=path_type)
+    slice_parser.add_argument('reference_usas_tag_frequency_path', type=path_type)
+    slice_parser.add_argument('sigeff_binary_file_path', type=path_type)
+    slice_parser.add_argument('semtag_summary_file_path', type=path_type)
+    slice_parser.add_argument('--facet', type=facet_selection_type, action='append',
+                              default=[], metavar='FACET=VALUE[,VALUE...]',
+                              help=('Only the texts with one of these values '
+                                    'of the facet, e.g. `year=2019,2020`. '
+                                    'Can be given for more than one facet, '
+                                    'by default all of the texts.'))
+    slice_parser.add_argument('--significance-level', default=0.05, type=float,
+                              choices=[0.05, 0.01, 0.001, 0.0001])
+    slice_parser.add_argument('--minimum-token-frequency', default=5, type=int)
+    slice_parser.add_argument('--USAS-tags-to-labels', action='store_true')
+    slice_parser.add_argument('--usas-hierarchy-output-directory', 
+                              type=create_dir_path,
+                              help=('Directory to write the significant USAS '
+                                    'tags at each level of the USAS tag '
+                                    'hierarchy to.'))
+
+    keyness_parser = subparsers.add_parser('keyness', help=('Store the SigEff '
+                                                            'output of the '
+                                                            'counts in a '
+                                                            'keyness table.'))
+    keyness_parser.set_defaults(function=keyness_command)
+    keyness_parser.add_argument('counts_path', type=path_type,
+                                help='The counts written by `count`.')
+    keyness_parser.add_argument('keyness_table_path', type=path_type,
+                                help=('File path to write the keyness table to, '
+                                      'a SQLite database.'))
+    keyness_parser.add_argument('reference_token_frequency_path', type=path_type)
+    keyness_parser.add_argument('reference_usas_tag_frequency_path', type=path_type)
+    keyness_parser.add_argument('sigeff_binary_file_path', type=path_type)
+    keyness_parser.add_argument('semtag_summary_file_path', type=path_type)
+    keyness_parser.add_argument('--minimum-token-frequency', default=5, type=int,
+                                help=('Minimum frequency of a token/tag for it '
+                                      'to be in the keyness table, the SigEff '
+                                      'totals are of these tokens/tags.'))
+
+    query_parser = subparsers.add_parser('query', help=('Find the significant '
+                                                        'tokens and USAS tags '
+                                                        'in a keyness table.'))
+    query_parser.set_defaults(function=query_command)
+    query_parser.add_argument('keyness_table_path', type=path_type,
+                              help='The keyness table written by `keyness`.')
+    query_parser.add_argument('token_output_path', type=path_type)
+    query_parser.add_argument('usas_output_path', type=path_type)
+    query_parser.add_argument('--significance-level', default=0.05, type=float,
+                              choices=sorted(LOG_LIKELIHOOD_CRITICAL_VALUES, 
+                                             reverse=True))
+    query_parser.add_argument('--minimum-log-likelihood', type=float,
+                              help='Used instead of the `--significance-level`.')
+    query_parser.add_argument('--minimum-token-frequency', type=int,
+                              help=('By default that of the keyness table, it '
+                                    'cannot be less than that of the table.'))
+    query_parser.add_argument('--direction', default='overused', 
+                              choices=list(DIRECTIONS),
+                              help=('Tokens/tags used more (overused), less '
+                                    '(underused), or either compared to the '
+                                    'reference texts.'))
+    query_parser.add_argument('--top-n', type=int, 
+                              help=('Only the N tokens, and separately USAS '
+                                    'tags, with the largest log-likelihood.'))
+    query_parser.add_argument('--USAS-tags-to-labels', action='store_true')
+
+    ngrams_parser = subparsers.add_parser('ngrams', parents=[filter_parser],
+                                          help=('Find the significant n-grams '
+                                                'of the tagged texts.'))
+    ngrams_parser.set_defaults(function=ngrams_command)
+    ngrams_parser.add_argument('tag_manifest_path', type=path_type,
+                               help='The tag manifest written by `tag`.')
+    ngrams_parser.add_argument('ngram_output_path', type=path_type,
+                               help=('File path to write the significant '
+                                     'n-grams to, in the same format as the '
+                                     'token output file.'))
+    ngrams_parser.add_argument('reference_ngram_frequency_path', type=path_type,
+                               help=('Reference n-gram frequencies in the same '
+                                     'format as the reference token '
+                                     'frequencies, whereby the tokens of each '
+                                     'n-gram are joined by `_`.'))
+    ngrams_parser.add_argument('sigeff_binary_file_path', type=path_type)
+    ngrams_parser.add_argument('semtag_summary_file_path', type=path_type)
+    ngrams_parser.add_argument('--ngram-sizes', type=int, nargs='+', 
+                               default=[2, 3],
+                               help='Number of tokens of the n-grams, at least 2.')
+    ngrams_parser.add_argument('--ngram-table-size', type=int, default=2**20,
+                               help=('Number of counters per row of the table '
+                                     'that prunes the infrequent n-grams '
+                                     'before they are counted exactly, each '
+                                     'counter is 8 bytes and there are 2 '
+                                     'rows. A larger table prunes more '
+                                     'n-grams.'))
+    ngrams_parser.add_argument('--significance-level', default=0.05, type=float,
+                               choices=[0.05, 0.01, 0.001, 0.0001])
+    ngrams_parser.add_argument('--minimum-token-frequency', default=5, type=int,
+                               help='Minimum frequency of an n-gram.')
+    ngrams_parser.add_argument('--USAS-tags-to-labels', action='store_true')
+
+    index_parser = subparsers.add_parser('index', parents=[filter_parser],
+                                         help=('Build a keyword in context '
+                                               'index of the tagged texts.'))
+    index_parser.set_defaults(function=index_command)
+    index_parser.add_argument('tag_manifest_path', type=path_type,
+                              help='The tag manifest written by `tag`.')
+    index_parser.add_argument('index_path', type=path_type,
+                              help='File path to write the index to.')
+    index_parser.add_argument('--semtag-summary-file-path', type=path_type,
+                              help=('USAS tag summary file, if given the USAS '
+                                    'tags can also be looked up by their '
+                                    'labels.'))
+    return parser
+
+def default_usas_tagger_version() -> str:
+    '''
+    :returns: The default version of the USAS tagger, which keys the USAS 
+              cache, see `--usas-tagger-version`.
+    '''
+    import ucrel_api
+    return f'ucrel_api=={ucrel_api.__version__};tagset=c7'
 
 
 if __name__ == '__main__':
 
+    if len(sys.argv) > 1 and sys.argv[1] in SUBCOMMANDS:
+        args = subcommand_parser().parse_args()
+        # logs to stdout, including the logs of the tagging.
+        stdout_handler = logging.StreamHandler(stream=sys.stdout)
+        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+        stdout_handler.setFormatter(formatter)
+        for logger_name in [__name__, 'usas_tagging']:
+            stage_logger = logging.getLogger(logger_name)
+            stage_logger.setLevel(logging.DEBUG)
+            stage_logger.addHandler(stdout_handler)
+        args.function(args)
+        sys.exit(0)
+
+    from ucrel_api.api import UCREL_API
+    from stages import (TextCounts, count_all_texts, count_texts, iter_texts, 
+                        read_tagged_texts, sum_counts, tag_texts)
+
     description = ('Given a directory of texts (1st argument) each text will '
                    'be processed by the USAS tool chain and the result cached'
                    ' (2nd argument). The Tokens and USAS tags that are used '
@@ -377,14 +998,14 @@ if __name__ == '__main__':
     replace_usas_cache_help = ('If the `usas_caching_directory` exists will '
                                're-run the USAS tagging and store the new '
                                'results in that directory.')
-    remove_punctuation_help = ('Do not include punctuation in the frequency lists.')
-    remove_determiners_help = ('Do not include determiners in the frequency lists.')
-    remove_stop_words_help = ('Do not include stop words in the frequency lists. '
-                              'This has come from SpaCy: '
-                              'https://github.com/explosion/spaCy/blob/master/spacy/lang/en/stop_words.py')
-    remove_digits_help = ('Do not include any standalone digits in the '
-                          'frequency lists. This is determined by the POS tag.'
-                          'It also includes any formula tokens like > or <')
+    usas_api_url_help = ('URL of the UCREL API that tags the texts with USAS, '
+                         'e.g. the local stand-in usas_api_stand_in.py for '
+                         'testing and benchmarking.')
+    usas_tagger_version_help = ('Version of the USAS tagger, the USAS cache '
+                                'is keyed by a hash of this and the text, '
+                                'therefore changing it, e.g. when the tagger '
+                                'on the UCREL API server is updated, means all '
+                                'texts are tagged again.')
     significance_help = ('The level of significance, that the token/tags are '
                          'significantly more likely to occur in the target '
                          'corpus compared to the reference corpus. 0.05 = 95%% '
@@ -403,8 +1024,120 @@ if __name__ == '__main__':
                                                 'between calls to the USAS API,'
                                                 ' their is one call per text '
                                                 'file in the `text_directory`.')
+    max_memory_help = ('Maximum memory, in MB, that the token and USAS tag '
+                       'counts can use. When the counts are estimated to use '
+                       'more than this they are spilt to disk as sorted runs, '
+                       'which are merged before the significance testing. '
+                       'The resulting counts are exactly the same as when '
+                       'this is not set. By default all counts are kept in '
+                       'memory.')
+    approximate_counting_help = ('Approximate, fixed memory, first counting '
+                                 'pass using a count-min sketch whereby only '
+                                 'the tokens/tags estimated to occur at least '
+                                 '`--minimum-token-frequency` times are kept '
+                                 'as candidates, the candidates are then '
+                                 'counted exactly in a second pass over the '
+                                 'USAS cache. Cannot be used with '
+                                 '`--max-memory`.')
+    sketch_epsilon_help = ('Error of the count-min sketch estimates as a '
+                           'fraction of the total number of tokens/tags, '
+                           'the sketch uses e/epsilon counters per row.')
+    sketch_delta_help = ('Probability that a count-min sketch estimate is '
+                         'outside of the epsilon error bound, the sketch uses '
+                         'ln(1/delta) rows.')
+    heavy_hitters_capacity_help = ('Maximum number of candidate tokens, and '
+                                   'separately USAS tags, kept by the '
+                                   'approximate counting.')
+    approximate_counting_report_help = ('File path to write the error bounds '
+                                        'and sizes of the approximate '
+                                        'counting to in JSON format. They are '
+                                        'always logged.')
+    spill_directory_help = ('Directory to write the spilt counts to when '
+                            'using `--max-memory`. By default the system '
+                            'temporary directory.')
+    shard_help = ('Only tag and count the shard `i` of `N` shards of the texts '
+                  'e.g. `2/4`, texts are assigned to shards by a stable hash '
+                  'of their file name. The counts are written to '
+                  '`--shard-counts-file` rather than computing the '
+                  'statistics, which are computed from the counts of all of '
+                  'the shards by merge_shard_counts.py. Near duplicates are '
+                  'only removed within a shard.')
+    shard_counts_file_help = ('File path to write the counts of the shard to '
+                              'in JSON format, required with `--shard`.')
+    usas_hierarchy_output_directory_help = ('Directory to write the USAS tags '
+                                            'that occur statistically more '
+                                            'often at each level of the USAS '
+                                            'tag hierarchy to, e.g. the major '
+                                            'discourse field `A` is level 1 '
+                                            'and `A1.1.1` level 4, as '
+                                            '`usas_level_<level>.json` in the '
+                                            'same format as the usas output '
+                                            'file. Cannot be used with '
+                                            '`--approximate-counting` or '
+                                            '`--max-memory`, which do not keep '
+                                            'the infrequent tags.')
+    dispersion_help = ('Add the dispersion of each token/tag across the texts '
+                       'to the token and usas output files: the number of '
+                       'texts it occurs in (`Document Frequency`), '
+                       "Juilland's D (`Juilland's D`), and Gries' DP (`DP`). "
+                       'Cannot be used with `--shard`, '
+                       '`--approximate-counting`, or `--max-memory`.')
+    facet_metadata_help = ('Metadata sidecar of the facet values, e.g. year, '
+                           'department, and degree type, of each text. '
+                           'Either a JSON object of text name to an object '
+                           'of facet name to value, or a CSV file whose '
+                           'first column is the text name and the other '
+                           'columns the facets. The text name is the text '
+                           'file name with or without its suffix. In the same'
+                           ' pass as counting, the counts are aggregated by '
+                           'facet values into a facet cube written to '
+                           '`--facet-cube-output`, from which the `slice` '
+                           'subcommand finds the significant tokens and USAS '
+                           'tags of any slice of the texts without reading '
+                           'them again. Cannot be used with `--shard`, '
+                           '`--approximate-counting`, or `--max-memory`.')
+    facet_cube_output_help = ('File path to write the facet cube to in JSON '
+                              'format, required with `--facet-metadata`.')
+    languages_help = ('Before tagging identify the language of each text, '
+                      'from a sample of its start and a few windows, with an '
+                      'offline character trigram language identifier, and '
+                      'only tag and count the texts identified as one of '
+                      'these languages, e.g. `en`. Texts whose language '
+                      'cannot be determined are tagged. The decisions are '
+                      'logged, in the profile report, and written to '
+                      '`--language-report` if given.')
+    language_report_help = ('File path to write the identified language of '
+                            'each text, and whether it was tagged or '
+                            'skipped, to in JSON format.')
+    paragraph_cache_help = ('Tag the texts that are not in the USAS cache a '
+                            'paragraph, line, at a time. Each tagged '
+                            'paragraph is cached, in a SQLite database in '
+                            'the USAS cache directory keyed by the paragraph'
+                            ' and tagger version, and only the paragraphs '
+                            'that are not in it are sent to the UCREL API, '
+                            'so text repeated across texts, e.g. templated '
+                            'abstracts, ethics statements, and running '
+                            'headers, is only tagged once. The tagged '
+                            'paragraphs are spliced back together into the '
+                            'cached USAS file of the text. The paragraph '
+                            'cache hit rate is logged and added to the '
+                            '`--profile` report.')
+    profile_help = ('Record the wall time, CPU time, CPU time of the SigEff '
+                    'binary and peak Python memory (tracemalloc) of each stage'
+                    ', and the tokens per second of the counting stage. These '
+                    'are logged and written to `--profile-report`. '
+                    'Tracemalloc slows down the run.')
+    profile_stage_help = ('Also profile this stage with cProfile, the '
+                          'statistics are written next to the profile report '
+                          'as `<report name>_<stage>.prof`.')
+    profile_report_help = ('File path to write the profile report to in JSON '
+                           'format. By default `<token output name>_profile.json`'
+                           ' next to the token output file, or next to the '
+                           '`--shard-counts-file` with `--shard`.')
     
-    parser = argparse.ArgumentParser(description=description)
+    parser = argparse.ArgumentParser(description=description, 
+                                     parents=[token_filter_arguments(), 
+                                              near_duplicate_arguments()])
     parser.add_argument('text_directory', type=exist_dir_path,
                         help=text_directory_help)
     parser.add_argument('usas_caching_directory', type=create_dir_path,
@@ -423,16 +1156,17 @@ if __name__ == '__main__':
                         help=semtag_summary_file_path_help)
     parser.add_argument('--replace-usas-cache', action='store_true', 
                         help=replace_usas_cache_help)
-    parser.add_argument('--remove-punctuation', action='store_true', 
-                        help=remove_punctuation_help)
-    parser.add_argument('--remove-determiners', action='store_true', 
-                        help=remove_determiners_help)
-    parser.add_argument('--remove-stop-words', action='store_true', 
-                        help=remove_stop_words_help)
-    parser.add_argument('--remove-digits', action='store_true', 
-                        help=remove_digits_help)
-    parser.add_argument('--lower-case', action='store_true', 
-                        help='Lower case all words')
+    parser.add_argument('--usas-api-url', type=str, 
+                        default='http://ucrel-api.lancaster.ac.uk', 
+                        help=usas_api_url_help)
+    parser.add_argument('--usas-api-port', type=str, default='', 
+                        help='Port of the UCREL API, if required.')
+    parser.add_argument('--usas-api-email', type=str, 
+                        default='a.moore@lancaster.ac.uk', 
+                        help='Email address that identifies the user of the UCREL API.')
+    parser.add_argument('--usas-tagger-version', type=str,
+                        default=default_usas_tagger_version(),
+                        help=usas_tagger_version_help)
     parser.add_argument('--significance-level', default=0.05, type=float,
                         choices=[0.05, 0.01, 0.001, 0.0001], 
                         help=significance_help)
@@ -442,163 +1176,315 @@ if __name__ == '__main__':
                         help=USAS_tags_to_labels_help)
     parser.add_argument('--time-to-wait-between-usas-api-calls', default=10, 
                         type=int, help=time_to_wait_between_usas_api_calls_help)
+    parser.add_argument('--max-memory', type=int, help=max_memory_help)
+    parser.add_argument('--spill-directory', type=create_dir_path, 
+                        help=spill_directory_help)
+    parser.add_argument('--approximate-counting', action='store_true', 
+                        help=approximate_counting_help)
+    parser.add_argument('--sketch-epsilon', type=float, default=0.00001, 
+                        help=sketch_epsilon_help)
+    parser.add_argument('--sketch-delta', type=float, default=0.01, 
+                        help=sketch_delta_help)
+    parser.add_argument('--heavy-hitters-capacity', type=int, default=100000, 
+                        help=heavy_hitters_capacity_help)
+    parser.add_argument('--approximate-counting-report', type=path_type, 
+                        help=approximate_counting_report_help)
+    parser.add_argument('--shard', type=shard_type, help=shard_help)
+    parser.add_argument('--shard-counts-file', type=path_type, 
+                        help=shard_counts_file_help)
+    parser.add_argument('--usas-hierarchy-output-directory', type=create_dir_path,
+                        help=usas_hierarchy_output_directory_help)
+    parser.add_argument('--dispersion', action='store_true', help=dispersion_help)
+    parser.add_argument('--facet-metadata', type=path_type, 
+                        help=facet_metadata_help)
+    parser.add_argument('--facet-cube-output', type=path_type, 
+                        help=facet_cube_output_help)
+    parser.add_argument('--paragraph-cache', action='store_true', 
+                        help=paragraph_cache_help)
+    parser.add_argument('--languages', nargs='+', choices=sorted(FREQUENT_WORDS), 
+                        help=languages_help)
+    parser.add_argument('--language-report', type=path_type, 
+                        help=language_report_help)
+    parser.add_argument('--profile', action='store_true', help=profile_help)
+    parser.add_argument('--profile-stage', choices=PROFILE_STAGES, 
+                        help=profile_stage_help)
+    parser.add_argument('--profile-report', type=path_type, 
+                        help=profile_report_help)
     args = parser.parse_args()
+    if args.approximate_counting and args.max_memory is not None:
+        parser.error('`--approximate-counting` cannot be used with `--max-memory`')
+    if args.shard is not None:
+        if args.shard_counts_file is None:
+            parser.error('`--shard` requires `--shard-counts-file`')
+        if args.approximate_counting or args.max_memory is not None:
+            parser.error('`--shard` cannot be used with `--approximate-counting`'
+                         ' or `--max-memory`')
+    if args.usas_hierarchy_output_directory is not None and \
+       (args.approximate_counting or args.max_memory is not None):
+        parser.error('`--usas-hierarchy-output-directory` cannot be used with '
+                     '`--approximate-counting` or `--max-memory`')
+    if args.dispersion and (args.shard is not None or args.approximate_counting 
+                            or args.max_memory is not None):
+        parser.error('`--dispersion` cannot be used with `--shard`, '
+                     '`--approximate-counting`, or `--max-memory`')
+    if (args.facet_metadata is None) != (args.facet_cube_output is None):
+        parser.error('`--facet-metadata` and `--facet-cube-output` have to be '
+                     'given together')
+    if args.facet_metadata is not None and \
+       (args.shard is not None or args.approximate_counting 
+        or args.max_memory is not None):
+        parser.error('`--facet-metadata` cannot be used with `--shard`, '
+                     '`--approximate-counting`, or `--max-memory`')
+    if args.profile_stage is not None and not args.profile:
+        parser.error('`--profile-stage` requires `--profile`')
 
     text_directory: Path = args.text_directory
     usas_caching_directory: Path = args.usas_caching_directory
     
-    # logs to stdout
-    logger = logging.getLogger(__name__)
-    logger.setLevel(logging.DEBUG)
+    # logs to stdout, including the logs of the tagging.
     stdout_handler = logging.StreamHandler(stream=sys.stdout)
     formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
     stdout_handler.setFormatter(formatter)
-    logger.addHandler(stdout_handler)
+    for logger_name in [__name__, 'usas_tagging']:
+        stage_logger = logging.getLogger(logger_name)
+        stage_logger.setLevel(logging.DEBUG)
+        stage_logger.addHandler(stdout_handler)
+
+    ucrel_api = UCREL_API(args.usas_api_email, args.usas_api_url, 
+                          args.usas_api_port)
 
-    ucrel_api = UCREL_API('a.moore@lancaster.ac.uk', 
-                          'http://ucrel-api.lancaster.ac.uk')
+    profile_report_path: Optional[Path] = args.profile_report
+    if args.profile and profile_report_path is None:
+        profile_output_path: Path = args.token_output_path
+        if args.shard is not None:
+            profile_output_path = args.shard_counts_file
+        profile_report_path = Path(profile_output_path.parent, 
+                                   f'{profile_output_path.stem}_profile.json')
+    cprofile_path: Optional[Path] = None
+    if args.profile_stage is not None:
+        cprofile_path = Path(profile_report_path.parent, 
+                             f'{profile_report_path.stem}_{args.profile_stage}.prof')
+    profiler = StageProfiler(args.profile, args.profile_stage, cprofile_path)
+    # Records the time spent decoding the cached USAS files when counting.
+    timed_tokens = TimedIterable()
+    read_tokens = iter_usas_tokens
+    if args.profile:
+        read_tokens = timed_tokens.wrap_function(iter_usas_tokens)
+
+    # Sorted so that the order the texts are counted in, and therefore the 
+    # order of the output, does not depend on the file system.
+    text_file_paths = sorted(text_directory.iterdir())
+    if args.shard is not None:
+        shard_index, number_of_shards = args.shard
+        text_file_paths = [_file_path for _file_path in text_file_paths 
+                           if in_shard(_file_path, shard_index, number_of_shards)]
+        logger.info(f'Shard {shard_index}/{number_of_shards} contains '
+                    f'{len(text_file_paths)} texts')
+    text_file_paths, language_decisions, _ = select_texts_to_tag(text_file_paths, 
+                                                                 args, profiler)
+    if args.language_report is not None:
+        create_output_file(args.language_report, 
+                           {'languages': args.languages, 
+                            'texts': language_decisions})
 
     sleep_time: int = args.time_to_wait_between_usas_api_calls
-    logger.info(f'Tagging text and caching to {usas_caching_directory}')
-    for _file_path in text_directory.iterdir():
-        usas_file_path = Path(usas_caching_directory, f'{_file_path.stem}.json')
-        if usas_file_path.exists() and not args.replace_usas_cache:
-            continue
-        
-        with _file_path.open('r') as _file:
-            text = _file.read()
-            
-            logger.info(f'Tagging text for: {_file_path.name}')
-            ucrel_doc = ucrel_api.usas(text)
-            logger.info(f'Tagging finished')
-            with usas_file_path.open('w') as usas_file:
-                usas_file.write(ucrel_doc.to_json())
-            logger.info('Tagged data has been written and cached to '
-                        f'{usas_file_path.name}')
-            
-            logger.info(f'Waiting {sleep_time}s between calls of the UCREL API,'
-                    ' to ensure that we are not calling the API to frequently.')
-            sleep(sleep_time)
-    logger.info('Tagging completed and all tagged data has been cached to '
-                f'the {usas_caching_directory} directory.')
+    usas_cache = USASCache(usas_caching_directory, 
+                           usas_cache_tagger_version(args.usas_tagger_version, 
+                                                     args.paragraph_cache))
+    paragraph_cache: Optional[ParagraphCache] = None
+    if args.paragraph_cache:
+        paragraph_cache = ParagraphCache(Path(usas_caching_directory, 
+                                              PARAGRAPH_CACHE_FILE_NAME),
+                                         args.usas_tagger_version)
+    with profiler.stage('tagging') as stage_values:
+        logger.info(f'Tagging text and caching to {usas_caching_directory}, '
+                    f'waiting {sleep_time}s between calls of the UCREL API, '
+                    'to ensure that we are not calling the API to frequently.')
+        # The cached USAS file of each text, by file name, that has been 
+        # tagged successfully.
+        usas_file_paths: Dict[str, Path] = dict(tag_texts(iter_texts(text_file_paths), 
+                                                          ucrel_api, usas_cache, 
+                                                          args.replace_usas_cache, 
+                                                          sleep_time, 
+                                                          paragraph_cache))
+        number_failed = len(text_file_paths) - len(usas_file_paths)
+        if number_failed:
+            logger.warning(f'Tagging failed for {number_failed} texts, see the '
+                           f'journal {usas_cache.journal_path}')
+        logger.info('Tagging completed and all tagged data has been cached to '
+                    f'the {usas_caching_directory} directory.')
+        stage_values['texts'] = len(text_file_paths)
+        stage_values['texts failed'] = number_failed
+        paragraph_statistics: Optional[Dict[str, Any]] = None
+        if paragraph_cache is not None:
+            paragraph_statistics = paragraph_cache.statistics()
+            paragraph_cache.close()
+            log_paragraph_cache_statistics(paragraph_statistics)
+            stage_values['paragraph cache hit rate'] = paragraph_statistics['hit rate']
     
-    # Flags that control what tokens are added
-    remove_punctuation: bool = args.remove_punctuation
-    remove_determiners: bool = args.remove_determiners
-    remove_stop_words: bool = args.remove_stop_words
-    remove_digits: bool = args.remove_digits
+    # Flags that control what tokens are added.
+    token_filter, counting_settings = create_token_filter(args, 
+                                                          usas_cache.tagger_version)
     lower_case: bool = args.lower_case
     
-    token_counter = Counter()
-    token_usas_tag: Dict[str, typing.Counter[str]] = defaultdict(lambda: Counter())
-    usas_counter = Counter()
-    for _file_path in text_directory.iterdir():
-        usas_file_path = Path(usas_caching_directory, f'{_file_path.stem}.json')
-        with usas_file_path.open('r') as usas_file:
-            ucrel_doc = UCREL_Doc.from_json(usas_file.read())
-
-            token_texts: List[str] = []
-            token_usas_tags: List[str] = []
-            for token in ucrel_doc:
-
-                token_text = token.text
-                usas_tag = token.usas_tag
-                pos_tag = token.pos_tag
-                lemma = token.lemma
-                
-                if lower_case:
-                    token_text = token_text.lower()
-                
-                if remove_punctuation and token_text in PUNCTUATION_SYMBOLS:
-                    continue
-                if lemma is not None:
-                    if remove_punctuation and lemma == 'PUNC':
-                        continue
-                if pos_tag is not None:
-                    if remove_determiners and pos_tag in DETERMINER_TAGS:
-                        continue
-                    if remove_digits and pos_tag in DIGIT_TAGS:
-                        continue
-                if remove_stop_words and token_text.lower() in STOP_WORDS:
-                    continue
-
-                token_texts.append(token_text)
-                if usas_tag is not None:
-                    all_usas_tags = usas_tag.split('/')
-                    for a_tag in all_usas_tags:
-                        token_usas_tags.append(a_tag)
-                    if all_usas_tags:
-                        token_usas_tag[token_text].update(all_usas_tags)
-            token_counter.update(token_texts)
-            usas_counter.update(token_usas_tags)
-    
-    dict_token_counter = dict(token_counter)
-    dict_usas_counter = dict(usas_counter)
-
-    # Reference token and usas counts
-    reference_token_frequency_path: Path = args.reference_token_frequency_path
-    bnc_token_counter = read_frequency_file(reference_token_frequency_path, lower_case)
-    reference_usas_tag_frequency_path: Path = args.reference_usas_tag_frequency_path
-    bnc_usas_counter = read_frequency_file(reference_usas_tag_frequency_path, False)
-
-    # Extraction of significant token and tags
-    sigeff_binary_file_path: Path = args.sigeff_binary_file_path
-    semtag_summary_file_path: Path = args.semtag_summary_file_path
-    significance_level: float = args.significance_level
     minimum_token_frequency: int = args.minimum_token_frequency
+    max_memory: Optional[int] = args.max_memory
+    external_counts: Optional[ExternalCounts] = None
 
-    significant_tokens = extract_significant_key_words(dict_token_counter, bnc_token_counter, 
-                                                       sigeff_binary_file_path, semtag_summary_file_path, 
-                                                       significance_level, minimum_token_frequency)
-    # Add the most and second most frequent usas tags to the token information
-    for token, token_values in significant_tokens.items():
-        _usas_tags = token_usas_tag[token]
-        num_usas_tags = float(sum(_usas_tags.values()))
-        # Normalize the number of times the USAS tag occurred by the number of 
-        # USAS tags for that token.
-        tag_occurrence = [(tag, (float(value) / num_usas_tags) * 100)
-                          for tag, value in _usas_tags.most_common(2)]
-        token_values['Common associated USAS tags (%)'] = tag_occurrence
-
-    significant_tags = extract_significant_key_words(dict_usas_counter, bnc_usas_counter, 
-                                                     sigeff_binary_file_path, semtag_summary_file_path, 
-                                                     significance_level, minimum_token_frequency)
-    # Remove the Z99 and Z9 SemTags
-    temp_sig_tags = {tag: value for tag, value in significant_tags.items() if 'Z9' not in tag}
-    significant_tags = temp_sig_tags
+    token_counter: typing.Counter[str] = Counter()
+    token_usas_tag: Dict[str, typing.Counter[str]] = defaultdict(Counter)
+    usas_counter: typing.Counter[str] = Counter()
+    token_document_counts: Optional[DocumentCounts] = None
+    usas_document_counts: Optional[DocumentCounts] = None
+    if args.dispersion:
+        token_document_counts = DocumentCounts()
+        usas_document_counts = DocumentCounts()
+    facet_metadata: Dict[str, Dict[str, str]] = {}
+    facet_cube: Optional[FacetCube] = None
+    if args.facet_metadata is not None:
+        facet_metadata = read_facet_metadata(args.facet_metadata)
+        facet_cube = create_facet_cube(facet_metadata, counting_settings, 
+                                       usas_file_paths)
+    with profiler.stage('counting') as stage_values:
+        counting_start_time = time.perf_counter()
+        if args.shard is not None:
+            shard_counts = ShardCounts(counting_settings)
+            for document_name, document_counts in count_texts(read_tagged_texts(usas_file_paths.items(), 
+                                                                                read_tokens), 
+                                                              token_filter):
+                shard_counts.update(document_name, *document_counts)
+            shard_counts.save(args.shard_counts_file)
+        elif args.approximate_counting:
+            approximate_counts = ApproximateCounts(args.sketch_epsilon, 
+                                                   args.sketch_delta,
+                                                   args.heavy_hitters_capacity,
+                                                   minimum_token_frequency)
+            for _, document_counts in count_texts(read_tagged_texts(usas_file_paths.items(), 
+                                                                    read_tokens), 
+                                                  token_filter):
+                approximate_counts.update(*document_counts[:2])
+            approximate_counting_report = approximate_counts.report()
+            for name, values in approximate_counting_report.items():
+                logger.info(f'Approximate {name} counting: {values}')
+                if not values['all frequent items are candidates']:
+                    logger.warning(f'The {name} candidate capacity was too small, '
+                                   'some frequent items may be missing. Increase '
+                                   '`--heavy-hitters-capacity`.')
+            if args.approximate_counting_report is not None:
+                create_output_file(args.approximate_counting_report, 
+                                   approximate_counting_report)
 
-    if args.USAS_tags_to_labels:
-        temp_sig_tags = {}
-
-        usas_tag_label: Dict[str, str] = {}
-        with semtag_summary_file_path.open('r') as semtag_file:
-            for line in semtag_file:
-                if not line.strip():
-                    continue
-                tag, label = line.split('\t')
-                tag = tag.strip()
-                label = label.strip()
-                usas_tag_label[tag] = label
-
-        for tag, values in significant_tags.items():
-            label = USAS_tag_to_label(usas_tag_label, tag)
-            if label in temp_sig_tags:
-                raise ValueError(f'This label {label} appears twice in the '
-                                 'significantly occuring USAS labels.')
-            temp_sig_tags[label] = values
-        significant_tags = temp_sig_tags
-
-        for token, values in significant_tokens.items():
-            token_usas_tags = values['Common associated USAS tags (%)']
-            if not token_usas_tags:
-                continue
-            _token_usas_tags = []
-            for tag, value in token_usas_tags:
-                label = USAS_tag_to_label(usas_tag_label, tag)
-                _token_usas_tags.append((label, value))
-            values['Common associated USAS tags (%)'] = _token_usas_tags
+            # Exact counts of only the candidates.
+            candidate_tokens = approximate_counts.token_candidates.keys
+            candidate_tags = approximate_counts.usas_candidates.keys
+            for _, document_counts in count_texts(read_tagged_texts(usas_file_paths.items(), 
+                                                                    read_tokens), 
+                                                  token_filter):
+                document_token_counter, document_usas_counter, document_token_usas_tag = document_counts
+                for token, count in document_token_counter.items():
+                    if token in candidate_tokens:
+                        token_counter[token] += count
+                        token_usas_tag[token].update(document_token_usas_tag[token])
+                for tag, count in document_usas_counter.items():
+                    if tag in candidate_tags:
+                        usas_counter[tag] += count
+            dict_token_counter = dict(token_counter)
+            dict_usas_counter = dict(usas_counter)
+        elif max_memory is not None:
+            external_counts = ExternalCounts(max_memory * 1024 * 1024, 
+                                             args.spill_directory)
+            for _, document_counts in count_texts(read_tagged_texts(usas_file_paths.items(), 
+                                                                    read_tokens), 
+                                                  token_filter):
+                external_counts.update(*document_counts)
+            logger.info(f'Counts were spilt to disk {external_counts.number_of_spills}'
+                        ' times, merging the spilt counts.')
+            # Tokens and tags below the minimum frequency are never used, 
+            # therefore they are not loaded back into memory.
+            dict_token_counter = external_counts.token_counter(minimum_token_frequency)
+            dict_usas_counter = external_counts.usas_counter(minimum_token_frequency)
+        else:
+            # Streams the tokens from the cached files rather than loading 
+            # the whole documents into memory.
+            tagged_texts = read_tagged_texts(usas_file_paths.items(), read_tokens)
+            if token_document_counts is None and facet_cube is None:
+                token_counter, usas_counter, token_usas_tag = count_all_texts(tagged_texts, 
+                                                                              token_filter)
+            else:
+                # The counts of each document are also kept for the dispersion 
+                # and the facet cube.
+                def add_document(document_name: str, 
+                                 document_counts: TextCounts) -> None:
+                    if token_document_counts is not None:
+                        token_document_counts.add_document(document_counts[0])
+                        usas_document_counts.add_document(document_counts[1])
+                    if facet_cube is not None:
+                        facet_values = text_facet_values(facet_metadata, document_name) or {}
+                        facet_cube.update(document_name, facet_values, *document_counts)
+
+                token_counter, usas_counter, token_usas_tag = sum_counts(
+                    count_texts(tagged_texts, token_filter), add_document)
+            if facet_cube is not None:
+                facet_cube.save(args.facet_cube_output)
+                logger.info(f'The facet cube of {len(facet_cube.cells)} facet '
+                            'value combinations has been written to '
+                            f'{args.facet_cube_output}')
+            dict_token_counter = dict(token_counter)
+            dict_usas_counter = dict(usas_counter)
+        if args.profile:
+            # Tokens are read twice with `--approximate-counting`.
+            counting_seconds = time.perf_counter() - counting_start_time
+            stage_values['tokens read'] = timed_tokens.number_items
+            stage_values['tokens read per second'] = \
+                timed_tokens.number_items / max(counting_seconds, 1e-9)
+            stage_values['JSON decoding (seconds)'] = timed_tokens.seconds
+            stage_values['filtering and counting (seconds)'] = \
+                counting_seconds - timed_tokens.seconds
+
+    run_information = {'texts': len(text_file_paths),
+                       'texts counted': len(usas_file_paths),
+                       'python version': sys.version,
+                       'arguments': sys.argv[1:]}
+    if args.languages is not None:
+        run_information['language identification'] = language_decisions
+    if paragraph_statistics is not None:
+        run_information['paragraph cache'] = paragraph_statistics
+    if args.shard is not None:
+        logger.info(f'The counts of {len(shard_counts.documents)} texts have '
+                    f'been written to {args.shard_counts_file}, merge them '
+                    'with the other shards using merge_shard_counts.py')
+        if args.profile:
+            create_profile_report(profile_report_path, profiler, run_information)
+        sys.exit(0)
+
+    # Reference token and usas counts
+    with profiler.stage('reading_references'):
+        reference_token_frequency_path: Path = args.reference_token_frequency_path
+        bnc_token_counter = read_frequency_file(reference_token_frequency_path, lower_case)
+        reference_usas_tag_frequency_path: Path = args.reference_usas_tag_frequency_path
+        bnc_usas_counter = read_frequency_file(reference_usas_tag_frequency_path, False)
+
+    if external_counts is not None:
+        get_token_usas_tag = external_counts.token_usas_tag
+    else:
+        get_token_usas_tag = lambda tokens: token_usas_tag
+    significant_tokens, significant_tags = significant_token_tag_statistics(
+        dict_token_counter, dict_usas_counter, get_token_usas_tag, 
+        bnc_token_counter, bnc_usas_counter, args.sigeff_binary_file_path, 
+        args.semtag_summary_file_path, args.significance_level, 
+        minimum_token_frequency, args.USAS_tags_to_labels, profiler, 
+        token_document_counts, usas_document_counts)
+    if external_counts is not None:
+        external_counts.close()
     create_output_file(args.token_output_path, significant_tokens)
     create_output_file(args.usas_output_path, significant_tags)
-    
-    
-    
+    if args.usas_hierarchy_output_directory is not None:
+        with profiler.stage('usas_hierarchy'):
+            create_usas_hierarchy_files(args.usas_hierarchy_output_directory, 
+                                        dict_usas_counter, bnc_usas_counter, 
+                                        args.semtag_summary_file_path, 
+                                        args.significance_level, 
+                                        minimum_token_frequency, 
+                                        args.USAS_tags_to_labels)
+    if args.profile:
+        create_profile_report(profile_report_path, profiler, run_information)
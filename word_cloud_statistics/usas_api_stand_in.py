@@ -0,0 +1,176 @@
+import argparse
+import email.parser
+import hashlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import re
+import time
+from typing import Dict, List, Tuple
+
+USAS_ENDPOINT = '/cgi-bin/usas.pl'
+# The SGML entities the UCREL API client escapes before sending the text,
+# and un-escapes in the returned tokens.
+SGML_ENTITY_MAPPER = {'£': '&pound;', 'é': '&eacute;', '<': '&lt;',
+                      '>': '&gt;', '[': '&lsqb;', ']': '&rsqb;'}
+# CLAWS C7 POS tags and USAS tags that the synthetic words are tagged with,
+# all of which are in the C7 and USAS tagsets.
+WORD_POS_TAGS = ['NN1', 'NN1', 'NN1', 'NN2', 'NN2', 'JJ', 'JJ', 'VV0', 'VVD',
+                 'VVG', 'VVN', 'VVZ', 'RR', 'NP1']
+WORD_USAS_TAGS = ['A1.1.1', 'A2.1+', 'A3+', 'A5.1+', 'A7+', 'A11.1+', 'B1',
+                  'E2+', 'G1.1', 'H1', 'I1.1', 'I2.1', 'K1', 'M1', 'M7', 'N1',
+                  'N3.1', 'N5+', 'O1', 'P1', 'Q1.2', 'Q2.1', 'Q2.2', 'S1.1.1',
+                  'S2', 'S5+', 'S8+', 'T1.1.2', 'T1.3', 'T2+', 'W1', 'X2.1',
+                  'X2.2+', 'X4.1', 'X9.2+', 'Y1', 'Y2', 'Z1', 'Z2', 'Z3',
+                  'Z99']
+# Common closed class words and their POS and USAS tags.
+FUNCTION_WORDS: Dict[str, Tuple[str, str]] = {
+    'the': ('AT', 'Z5'), 'a': ('AT1', 'Z5'), 'an': ('AT1', 'Z5'),
+    'of': ('IO', 'Z5'), 'in': ('II', 'Z5'), 'to': ('TO', 'Z5'),
+    'and': ('CC', 'Z5'), 'or': ('CC', 'Z5'), 'but': ('CCB', 'Z5'),
+    'is': ('VBZ', 'A3+'), 'was': ('VBDZ', 'A3+'), 'are': ('VBR', 'A3+'),
+    'be': ('VBI', 'A3+'), 'this': ('DD1', 'Z8'), 'that': ('CST', 'Z8'),
+    'these': ('DD2', 'Z8'), 'it': ('PPH1', 'Z8'), 'we': ('PPIS2', 'Z8'),
+    'i': ('PPIS1', 'Z8'), 'they': ('PPHS2', 'Z8'), 'for': ('IF', 'Z5'),
+    'with': ('IW', 'Z5'), 'on': ('II', 'Z5'), 'by': ('II', 'Z5'),
+    'as': ('CSA', 'Z5'), 'not': ('XX', 'Z6'), 'which': ('DDQ', 'Z8'),
+}
+PUNCTUATION_POS_TAGS = {'.': 'YSTP', '!': 'YEX', '?': 'YQUE', ',': 'YCOM',
+                        ':': 'YCOL', ';': 'YSCOL', '(': 'YBL', ')': 'YBR',
+                        '"': 'YQUO', "'": 'YQUO', '-': 'YDSH'}
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+SENTENCE_END = {'.', '!', '?'}
+
+
+def _sgml_entity_escape(text: str) -> str:
+    text = text.replace('&', '&amp;')
+    for entity, escaped_entity in SGML_ENTITY_MAPPER.items():
+        text = text.replace(entity, escaped_entity)
+    return text
+
+
+def _sgml_entity_un_escape(text: str) -> str:
+    for entity, escaped_entity in SGML_ENTITY_MAPPER.items():
+        text = text.replace(escaped_entity, entity)
+    return text.replace('&amp;', '&')
+
+
+def _hash(word: str, salt: str) -> int:
+    digest = hashlib.blake2b(f'{salt}\0{word}'.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little')
+
+
+def _choice(word: str, salt: str, choices: List[str]) -> str:
+    return choices[_hash(word, salt) % len(choices)]
+
+
+def tag_token(token: str) -> List[str]:
+    '''
+    :param token: A token of the text.
+    :returns: The tab separated fields of the token in the USAS vertical
+              output: the token, its POS tag, its lemma and, unless it is
+              punctuation, its USAS tags. The tags are synthetic but
+              deterministic, the same token is always tagged the same way.
+    '''
+    lower_token = token.lower()
+    if not token[0].isalnum() and token[0] != '_':
+        return [token, PUNCTUATION_POS_TAGS.get(token, 'YSTP'), 'PUNC']
+    if token.isdigit():
+        return [token, 'MC', token, 'N1']
+    if lower_token in FUNCTION_WORDS:
+        pos_tag, usas_tag = FUNCTION_WORDS[lower_token]
+        return [token, pos_tag, lower_token, usas_tag]
+    pos_tag = _choice(lower_token, 'pos', WORD_POS_TAGS)
+    usas_tags = [_choice(lower_token, 'usas', WORD_USAS_TAGS),
+                 _choice(lower_token, 'usas_2', WORD_USAS_TAGS)]
+    # A quarter of the words have a portmanteau USAS tag e.g. `A1/B1`
+    if _hash(lower_token, 'portmanteau') % 4 == 0:
+        usas_tags[0] = f'{usas_tags[0]}/{usas_tags[1]}'
+    return [token, pos_tag, lower_token, ' '.join(usas_tags)]
+
+
+def tag_text(text: str) -> str:
+    '''
+    :param text: SGML escaped text, as sent by the UCREL API client.
+    :returns: The synthetic USAS vertical output of the text, one token per
+              line and each sentence within `<s>` and `</s>`.
+    '''
+    sentences: List[List[str]] = [[]]
+    for token in TOKEN_PATTERN.findall(_sgml_entity_un_escape(text)):
+        sentences[-1].append('\t'.join(_sgml_entity_escape(field)
+                                       for field in tag_token(token)))
+        if token in SENTENCE_END:
+            sentences.append([])
+    return ''.join('<s>\n' + '\n'.join(sentence) + '\n</s>\n'
+                   for sentence in sentences if sentence)
+
+
+def form_fields(body: bytes) -> Dict[str, str]:
+    '''
+    :param body: Body of a `multipart/form-data` request.
+    :returns: The form field names and their values.
+    '''
+    # The UCREL API client sends a `text/plain` content type header, so the
+    # boundary is taken from the first line of the body instead.
+    boundary = body.split(b'\r\n', 1)[0][2:]
+    message = email.parser.BytesParser().parsebytes(
+        b'Content-Type: multipart/form-data; boundary="' + boundary + b'"\r\n\r\n' + body)
+    fields: Dict[str, str] = {}
+    for part in message.get_payload():
+        name = part.get_param('name', header='content-disposition')
+        fields[name] = part.get_payload(decode=True).decode('utf-8')
+    return fields
+
+
+class USASStandInHandler(BaseHTTPRequestHandler):
+    '''
+    Handles the requests of `UCREL_API.usas`, see `USAS_ENDPOINT`, returning
+    synthetic USAS output after waiting `latency` seconds plus
+    `latency_per_1000_words` seconds for every 1000 words of the text.
+    '''
+    latency = 0.0
+    latency_per_1000_words = 0.0
+
+    def do_POST(self) -> None:
+        if self.path != USAS_ENDPOINT:
+            self.send_error(404)
+            return
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        fields = form_fields(body)
+        text = fields.get('text', '')
+        time.sleep(self.latency
+                   + self.latency_per_1000_words * len(text.split()) / 1000)
+        response = tag_text(text).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; charset=utf-8')
+        self.send_header('Content-Length', str(len(response)))
+        self.end_headers()
+        self.wfile.write(response)
+
+    def log_message(self, format: str, *args) -> None:
+        # Logging every request would slow down the benchmarks.
+        pass
+
+
+if __name__ == '__main__':
+    description = ('Local stand-in for the USAS endpoint of the UCREL API, '
+                   'so that everything downstream of tagging can be tested '
+                   'and benchmarked without calling the real service. Texts '
+                   'are tokenised on whitespace and punctuation and each '
+                   'token is given synthetic, but deterministic, CLAWS C7 POS '
+                   'and USAS tags. Point the scripts at it with '
+                   '`--usas-api-url http://127.0.0.1 --usas-api-port 8081`.')
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument('--host', default='127.0.0.1', type=str)
+    parser.add_argument('--port', default=8081, type=int)
+    parser.add_argument('--latency', default=0.0, type=float,
+                        help='Seconds to wait before responding to a request.')
+    parser.add_argument('--latency-per-1000-words', default=0.0, type=float,
+                        help='Additional seconds to wait per 1000 words of '
+                             'the text in the request.')
+    args = parser.parse_args()
+
+    USASStandInHandler.latency = args.latency
+    USASStandInHandler.latency_per_1000_words = args.latency_per_1000_words
+    server = ThreadingHTTPServer((args.host, args.port), USASStandInHandler)
+    print(f'USAS API stand-in listening on http://{args.host}:{args.port}{USAS_ENDPOINT}',
+          flush=True)
+    server.serve_forever()
@@ -0,0 +1,193 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+import tempfile
+import time
+from typing import Dict, Optional
+
+from usas_json_reader import _JSONStream, _read_chunks
+
+JOURNAL_FILE_NAME = 'journal.jsonl'
+TEMPORARY_FILE_SUFFIX = '.tmp'
+# Temporary files that have not been modified for this many seconds are from
+# writes that never completed. Younger temporary files may be being written
+# by another process sharing the cache directory, e.g. another shard.
+STALE_TEMPORARY_FILE_SECONDS = 24 * 60 * 60
+
+
+def atomic_write(_file_path: Path, data: str) -> None:
+    '''
+    Writes the data to a temporary file in the same directory, which is then
+    renamed to `_file_path`. Therefore `_file_path` either does not exist or
+    contains all of the data, even if the process is killed while writing.
+
+    :param _file_path: File to write the data to.
+    :param data: Data to write.
+    '''
+    temporary_file = tempfile.NamedTemporaryFile('w', dir=_file_path.parent,
+                                                 prefix=f'{_file_path.stem}_',
+                                                 suffix=TEMPORARY_FILE_SUFFIX,
+                                                 delete=False)
+    try:
+        with temporary_file:
+            temporary_file.write(data)
+            temporary_file.flush()
+            os.fsync(temporary_file.fileno())
+        os.replace(temporary_file.name, _file_path)
+    except BaseException:
+        _remove_file(Path(temporary_file.name))
+        raise
+
+
+def _remove_file(_file_path: Path) -> None:
+    # Another process sharing the directory may have already removed it.
+    try:
+        _file_path.unlink()
+    except FileNotFoundError:
+        pass
+
+
+def remove_stale_temporary_files(directory: Path,
+                                 stale_seconds: float = STALE_TEMPORARY_FILE_SECONDS
+                                 ) -> int:
+    '''
+    :param directory: Directory that `atomic_write` writes to.
+    :param stale_seconds: Temporary files that have not been modified for at
+                          least this many seconds are removed.
+    :returns: The number of temporary files removed.
+    '''
+    number_removed = 0
+    stale_time = time.time() - stale_seconds
+    for temporary_file_path in directory.glob(f'*{TEMPORARY_FILE_SUFFIX}'):
+        try:
+            if temporary_file_path.stat().st_mtime > stale_time:
+                continue
+        except FileNotFoundError:
+            continue
+        _remove_file(temporary_file_path)
+        number_removed += 1
+    return number_removed
+
+
+def _cached_text(_file_path: Path) -> Optional[str]:
+    # The `text` field of a cached `UCREL_Doc.to_json` file, None if the file
+    # cannot be read.
+    try:
+        with _file_path.open('r') as _file:
+            stream = _JSONStream(_read_chunks(_file, 65536))
+            for key in stream.iter_object_keys():
+                if key == 'text':
+                    return stream.decode_value()
+                stream.skip_value()
+    except ValueError:
+        return None
+    return None
+
+
+class USASCache():
+    '''
+    The USAS tagging cache, whereby each cached file is keyed by a hash of the
+    text that was tagged and the version of the tagger. Renaming a text
+    therefore does not require it to be tagged again, and editing a text or
+    changing the tagger does.
+
+    Cached files are written atomically and every tagging attempt is recorded
+    in a journal within the cache directory, so that an interrupted tagging
+    run can be resumed.
+    '''
+
+    def __init__(self, cache_directory: Path, tagger_version: str) -> None:
+        '''
+        :param cache_directory: Directory that stores the cached files.
+        :param tagger_version: Version of the tagger, part of the cache key.
+        '''
+        self.cache_directory = cache_directory
+        self.tagger_version = tagger_version
+        self.journal_path = Path(cache_directory, JOURNAL_FILE_NAME)
+        # Removes the temporary files of writes that never completed, but not 
+        # those of other processes that are writing to a shared cache.
+        remove_stale_temporary_files(cache_directory)
+
+    def key(self, text: str) -> str:
+        '''
+        :returns: The cache key of the text.
+        '''
+        hasher = hashlib.sha256()
+        hasher.update(self.tagger_version.encode('utf-8'))
+        hasher.update(b'\0')
+        hasher.update(text.encode('utf-8'))
+        return hasher.hexdigest()
+
+    def cache_path(self, text: str) -> Path:
+        '''
+        :returns: The file path that the tagged version of the text is or
+                  will be cached at.
+        '''
+        return Path(self.cache_directory, f'{self.key(text)}.json')
+
+    def adopt_legacy_file(self, legacy_file_path: Path, text: str) -> bool:
+        '''
+        Caches from before the cache was keyed by content were keyed by the
+        name of the text file. If the legacy cached file is of the same text it
+        is moved to its content keyed location.
+
+        :param legacy_file_path: Cached file keyed by the name of the text.
+        :param text: The text that is now in the text file.
+        :returns: True if the legacy file was of the same text and has been
+                  moved into the cache.
+        '''
+        if not legacy_file_path.exists():
+            return False
+        if _cached_text(legacy_file_path) != text:
+            return False
+        os.replace(legacy_file_path, self.cache_path(text))
+        return True
+
+    def write(self, text: str, tagged_json: str) -> Path:
+        '''
+        :param text: The text that was tagged.
+        :param tagged_json: The tagged text, the output of `UCREL_Doc.to_json`.
+        :returns: The file path the tagged text was written to.
+        '''
+        cache_path = self.cache_path(text)
+        atomic_write(cache_path, tagged_json)
+        return cache_path
+
+    def _journal(self, key: str, name: str, status: str,
+                 error: Optional[str] = None) -> None:
+        record = {'key': key, 'name': name, 'status': status}
+        if error is not None:
+            record['error'] = error
+        with self.journal_path.open('a') as journal_file:
+            journal_file.write(json.dumps(record) + '\n')
+            journal_file.flush()
+            os.fsync(journal_file.fileno())
+
+    def journal_started(self, key: str, name: str) -> None:
+        self._journal(key, name, 'started')
+
+    def journal_done(self, key: str, name: str) -> None:
+        self._journal(key, name, 'done')
+
+    def journal_failed(self, key: str, name: str, error: str) -> None:
+        self._journal(key, name, 'failed', error)
+
+    def journal_status(self) -> Dict[str, Dict[str, str]]:
+        '''
+        :returns: The last journal record of each cache key, e.g. the status
+                  of a key whose tagging was interrupted is `started`. A
+                  partially written last line, from a crash while writing to
+                  the journal, is ignored.
+        '''
+        status: Dict[str, Dict[str, str]] = {}
+        if not self.journal_path.exists():
+            return status
+        with self.journal_path.open('r') as journal_file:
+            for line in journal_file:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                status[record['key']] = record
+        return status
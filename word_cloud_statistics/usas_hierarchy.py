@@ -0,0 +1,249 @@
+import math
+import re
+from typing import Dict, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+# The symbols that can follow a USAS tag, see page 2 of the USAS guide:
+# http://ucrel.lancs.ac.uk/usas/usas_guide.pdf
+USAS_TAG_SYMBOLS = set(['%', '@', 'f', 'm', 'c', 'n', 'i', '+', '-'])
+# The labels of the top level of the USAS tag hierarchy, the 21 major
+# discourse fields, which are not in the USAS tag summary file.
+USAS_MAJOR_FIELDS = {'A': 'General and abstract terms',
+                     'B': 'The body and the individual',
+                     'C': 'Arts and crafts',
+                     'E': 'Emotion',
+                     'F': 'Food and farming',
+                     'G': 'Government and public',
+                     'H': 'Architecture, housing and the home',
+                     'I': 'Money and commerce in industry',
+                     'K': 'Entertainment, sports and games',
+                     'L': 'Life and living things',
+                     'M': 'Movement, location, travel and transport',
+                     'N': 'Numbers and measurement',
+                     'O': 'Substances, materials, objects and equipment',
+                     'P': 'Education',
+                     'Q': 'Language and communication',
+                     'S': 'Social actions, states and processes',
+                     'T': 'Time',
+                     'W': 'World and environment',
+                     'X': 'Psychological actions, states and processes',
+                     'Y': 'Science and technology',
+                     'Z': 'Names and grammar'}
+_USAS_TAG_PATTERN = re.compile(r'([A-Z])(\d+(?:\.\d+)*)?')
+# The grammatical bin and unmatched tags are not semantic fields, therefore
+# they are not rolled up into the Z field.
+_NOT_ROLLED_UP_TAGS = set(['Z9', 'Z99'])
+# The same corrections as the SigEff binary.
+_ZERO_CORRECTION_LOG_RATIO = 0.5
+
+
+def usas_tag_path(tag: str) -> Optional[List[str]]:
+    '''
+    :param tag: A USAS tag e.g. `A1.1.1+`.
+    :returns: The tags of the levels of the hierarchy from the top level
+              down to the tag, without the symbols that can follow the tag,
+              e.g. `['A', 'A1', 'A1.1', 'A1.1.1']`, or None if the tag does
+              not have the form of a USAS tag.
+    '''
+    end = len(tag)
+    while end > 1 and tag[end - 1] in USAS_TAG_SYMBOLS:
+        end -= 1
+    match = _USAS_TAG_PATTERN.fullmatch(tag, 0, end)
+    if match is None:
+        return None
+    major_field, numbers = match.groups()
+    path = [major_field]
+    if numbers:
+        number_parts = numbers.split('.')
+        for index in range(1, len(number_parts) + 1):
+            path.append(major_field + '.'.join(number_parts[:index]))
+    return path
+
+
+class _TrieNode():
+
+    __slots__ = ('tag', 'count', 'total', 'children')
+
+    def __init__(self, tag: str) -> None:
+        self.tag = tag
+        # Count of the tags that end at this node and the count of all of
+        # the tags at or below this node.
+        self.count = 0
+        self.total = 0
+        self.children: Dict[str, '_TrieNode'] = {}
+
+
+class USASTagTrie():
+    '''
+    Prefix trie over the USAS tags, whereby each level of the trie is a
+    level of the USAS tag hierarchy, so that the counts of the fine grained
+    tags are rolled up to every level at once. The symbols that can follow
+    a tag, e.g. `+` and `%`, are ignored.
+
+    At a given level each tag is counted as its ancestor at that level, or
+    as itself if it is at a higher level, e.g. at level 3 `A1.1.1` is
+    counted as `A1.1` and `A1` as `A1`, therefore the total count of every
+    level is the same. Tags that do not have the form of a USAS tag are
+    counted as themselves at every level, as are Z9 and Z99.
+    '''
+
+    def __init__(self) -> None:
+        self._root = _TrieNode('')
+        self.other_counts: Dict[str, int] = {}
+        self.depth = 0
+
+    def add(self, tag: str, count: int = 1) -> None:
+        path = usas_tag_path(tag)
+        if path is None or path[-1] in _NOT_ROLLED_UP_TAGS:
+            self.other_counts[tag] = self.other_counts.get(tag, 0) + count
+            return
+        self.depth = max(self.depth, len(path))
+        node = self._root
+        for level_tag in path:
+            child = node.children.get(level_tag)
+            if child is None:
+                child = _TrieNode(level_tag)
+                node.children[level_tag] = child
+            node = child
+            node.total += count
+        node.count += count
+
+    def _iter_level(self, node: _TrieNode, depth: int, level: int
+                    ) -> Iterator[Tuple[str, int]]:
+        for child in node.children.values():
+            if depth + 1 == level:
+                yield child.tag, child.total
+                continue
+            if child.count:
+                yield child.tag, child.count
+            yield from self._iter_level(child, depth + 1, level)
+
+    def level_counts(self, level: int) -> Dict[str, int]:
+        '''
+        :param level: Level of the hierarchy, 1 is the major discourse
+                      fields e.g. `A`.
+        :returns: The counts of the tags at the given level, in the order the
+                  tags were first added.
+        '''
+        counts = dict(self._iter_level(self._root, 0, level))
+        for tag, count in self.other_counts.items():
+            counts[tag] = counts.get(tag, 0) + count
+        return counts
+
+
+def keyness_statistics(target_counts: Sequence[int],
+                       reference_counts: Sequence[int],
+                       target_totals: Sequence[int],
+                       reference_totals: Sequence[int]
+                       ) -> List[Tuple[str, float, float, float]]:
+    '''
+    The log-likelihood and Log Ratio of many items at once, computed the same
+    way as the SigEff binary but in double rather than single precision.
+    Each item has its own totals so that items from different frequency
+    lists, e.g. the levels of the USAS tag hierarchy, are computed in one
+    batch.
+
+    :param target_counts: Frequency of each item in the target corpus.
+    :param reference_counts: Frequency of each item in the reference corpus.
+    :param target_totals: Total frequency of the target corpus of each item.
+    :param reference_totals: Total frequency of the reference corpus of each
+                             item.
+    :returns: For each item, the direction, `+` if it is used more in the
+              target corpus else `-`, the log-likelihood, the Log Ratio, and
+              the relative frequency (%) in the target corpus.
+    '''
+    statistics: List[Tuple[str, float, float, float]] = []
+    for target_count, reference_count, target_total, reference_total \
+            in zip(target_counts, reference_counts, target_totals, reference_totals):
+        overall_total = target_total + reference_total
+        overall_count = target_count + reference_count
+        target_expected = target_total * overall_count / overall_total
+        reference_expected = reference_total * overall_count / overall_total
+        log_likelihood = 0.0
+        if target_count:
+            log_likelihood += target_count * math.log(target_count / target_expected)
+        if reference_count:
+            log_likelihood += reference_count * math.log(reference_count / reference_expected)
+        log_likelihood = max(2 * log_likelihood, 0.0)
+        target_normalised = target_count / target_total
+        reference_normalised = reference_count / reference_total if reference_total else 0.0
+        direction = '-' if target_normalised < reference_normalised else '+'
+        top = target_normalised or _ZERO_CORRECTION_LOG_RATIO / target_total
+        bottom = (reference_normalised
+                  or _ZERO_CORRECTION_LOG_RATIO / max(reference_total, 1))
+        statistics.append((direction, log_likelihood, math.log2(top / bottom),
+                           target_normalised * 100))
+    return statistics
+
+
+def usas_hierarchy_statistics(usas_counter: Mapping[str, int],
+                              reference_usas_counter: Mapping[str, int],
+                              minimum_log_likelihood: float,
+                              min_target_frequency_count: int = 5
+                              ) -> Dict[int, Dict[str, Dict[str, float]]]:
+    '''
+    Rolls the USAS tag counts of the target and reference corpus up every
+    level of the USAS tag hierarchy and finds the tags at each level that
+    are used significantly more in the target corpus, with all of the levels
+    computed in one batch by `keyness_statistics`.
+
+    As with the SigEff input, see `significance.sigeff_input_file`,
+    the tags at a level with a target frequency below
+    `min_target_frequency_count` are removed before the totals of that level
+    are summed.
+
+    :param usas_counter: The USAS tag frequency counts of the target corpus.
+    :param reference_usas_counter: The USAS tag frequency counts of the
+                                   reference corpus e.g. BNC.
+    :param minimum_log_likelihood: Minimum log-likelihood of a significant
+                                   tag.
+    :param min_target_frequency_count: Minimum frequency count of a tag in
+                                       the target corpus.
+    :returns: For each level, starting at 1 the major discourse fields, the
+              significant tags excluding the Z9 and Z99 tags, in the format
+              of the usas output file, rounded like the SigEff output.
+    '''
+    target_trie = USASTagTrie()
+    for tag, count in usas_counter.items():
+        target_trie.add(tag, count)
+    reference_trie = USASTagTrie()
+    for tag, count in reference_usas_counter.items():
+        reference_trie.add(tag, count)
+
+    rows: List[Tuple[int, str]] = []
+    target_counts: List[int] = []
+    reference_counts: List[int] = []
+    target_totals: List[int] = []
+    reference_totals: List[int] = []
+    for level in range(1, target_trie.depth + 1):
+        level_counts = {tag: count for tag, count
+                        in target_trie.level_counts(level).items()
+                        if count >= min_target_frequency_count}
+        reference_level_counts = reference_trie.level_counts(level)
+        level_reference_counts = [reference_level_counts.get(tag, 0)
+                                  for tag in level_counts]
+        target_total = sum(level_counts.values())
+        reference_total = sum(level_reference_counts)
+        for (tag, count), reference_count in zip(level_counts.items(),
+                                                 level_reference_counts):
+            rows.append((level, tag))
+            target_counts.append(count)
+            reference_counts.append(reference_count)
+            target_totals.append(target_total)
+            reference_totals.append(reference_total)
+
+    levels: Dict[int, Dict[str, Dict[str, float]]] = {level: {} for level
+                                                      in range(1, target_trie.depth + 1)}
+    statistics = keyness_statistics(target_counts, reference_counts,
+                                    target_totals, reference_totals)
+    for (level, tag), count, (direction, log_likelihood, log_ratio, relative_frequency) \
+            in zip(rows, target_counts, statistics):
+        log_likelihood = round(log_likelihood, 2)
+        if direction != '+' or log_likelihood < minimum_log_likelihood:
+            continue
+        if 'Z9' in tag:
+            continue
+        levels[level][tag] = {'Log Likelihood': log_likelihood,
+                              'Log Ratio': round(log_ratio, 2),
+                              'Frequency': count,
+                              'Relative Frequency (%)': round(relative_frequency, 2)}
+    return levels
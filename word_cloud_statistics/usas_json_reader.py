@@ -0,0 +1,235 @@
+import json
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, Optional, TextIO, Tuple
+
+# (text, lemma, pos_tag, usas_tag) of a single token.
+TokenTuple = Tuple[str, Optional[str], Optional[str], Optional[str]]
+
+WHITESPACE = ' \t\n\r'
+_DECODER = json.JSONDecoder()
+
+
+class _JSONStream():
+    '''
+    A minimal pull based JSON walker over an iterable of string chunks. Only
+    the parts of the JSON that are asked for are decoded, everything else is
+    skipped over without being stored, so that at any one time only a chunk
+    and the value currently being decoded are held in memory.
+    '''
+
+    def __init__(self, chunks: Iterable[str]) -> None:
+        self._chunks = iter(chunks)
+        self._buffer = ''
+        self._index = 0
+        self._eof = False
+
+    def _fill(self) -> bool:
+        '''
+        :returns: True if more data was added to the buffer, False if the end
+                  of the stream has been reached.
+        '''
+        if self._eof:
+            return False
+        for chunk in self._chunks:
+            if chunk:
+                self._buffer = self._buffer[self._index:] + chunk
+                self._index = 0
+                return True
+        self._eof = True
+        return False
+
+    def _error(self, message: str) -> ValueError:
+        context = self._buffer[self._index:self._index + 30]
+        return ValueError(f'{message}, found: {context!r}')
+
+    def peek(self) -> str:
+        '''
+        :returns: The next non whitespace character without consuming it, an
+                  empty string at the end of the stream.
+        '''
+        while True:
+            buffer = self._buffer
+            index = self._index
+            length = len(buffer)
+            while index < length and buffer[index] in WHITESPACE:
+                index += 1
+            self._index = index
+            if index < length:
+                return buffer[index]
+            if not self._fill():
+                return ''
+
+    def expect(self, character: str) -> None:
+        if self.peek() != character:
+            raise self._error(f'Expected `{character}`')
+        self._index += 1
+
+    def decode_value(self) -> Any:
+        '''
+        Decodes the next string, object or array in full. Do not use this for
+        numbers or literals as they have no closing character and could be
+        split over two chunks.
+        '''
+        self.peek()
+        while True:
+            try:
+                value, end_index = _DECODER.raw_decode(self._buffer, self._index)
+                self._index = end_index
+                return value
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+
+    def _skip_string(self) -> None:
+        # Moves past the opening quote and then to just after the closing
+        # quote, taking into account escaped quotes.
+        self._index += 1
+        while True:
+            quote_index = self._buffer.find('"', self._index)
+            if quote_index == -1:
+                # Keep any trailing backslashes as they may escape a quote
+                # at the start of the next chunk.
+                end_index = len(self._buffer)
+                while (end_index > self._index
+                       and self._buffer[end_index - 1] == '\\'):
+                    end_index -= 1
+                self._index = end_index
+                if not self._fill():
+                    raise self._error('Unterminated string')
+                continue
+            backslashes = 0
+            backslash_index = quote_index - 1
+            while (backslash_index >= self._index
+                   and self._buffer[backslash_index] == '\\'):
+                backslashes += 1
+                backslash_index -= 1
+            if backslashes % 2:
+                self._index = quote_index + 1
+                continue
+            self._index = quote_index + 1
+            return
+
+    def skip_value(self) -> None:
+        '''
+        Moves past the next value without decoding it.
+        '''
+        character = self.peek()
+        if character == '"':
+            self._skip_string()
+            return
+        if character in '[{':
+            depth = 0
+            while True:
+                character = self.peek()
+                if character == '':
+                    raise self._error('Unterminated array or object')
+                if character == '"':
+                    self._skip_string()
+                    continue
+                self._index += 1
+                if character in '[{':
+                    depth += 1
+                elif character in ']}':
+                    depth -= 1
+                    if depth == 0:
+                        return
+        # A number or literal, ends at the next delimiter.
+        while True:
+            buffer = self._buffer
+            index = self._index
+            while index < len(buffer) and buffer[index] not in ',]}' + WHITESPACE:
+                index += 1
+            self._index = index
+            if index < len(buffer) or not self._fill():
+                return
+
+    def iter_object_keys(self) -> Iterator[str]:
+        '''
+        Yields each key of the next object, after each key is yielded the
+        caller has to either decode or skip the associated value.
+        '''
+        self.expect('{')
+        if self.peek() == '}':
+            self._index += 1
+            return
+        while True:
+            key = self.decode_value()
+            self.expect(':')
+            yield key
+            character = self.peek()
+            self._index += 1
+            if character == '}':
+                return
+            if character != ',':
+                self._index -= 1
+                raise self._error('Expected `,` or `}`')
+
+    def iter_array_items(self) -> Iterator[None]:
+        '''
+        Yields once for each item in the next array, after each yield the
+        caller has to either decode or skip the item.
+        '''
+        self.expect('[')
+        if self.peek() == ']':
+            self._index += 1
+            return
+        while True:
+            yield None
+            character = self.peek()
+            self._index += 1
+            if character == ']':
+                return
+            if character != ',':
+                self._index -= 1
+                raise self._error('Expected `,` or `]`')
+
+
+def _read_chunks(json_file: TextIO, chunk_size: int) -> Iterator[str]:
+    while True:
+        chunk = json_file.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+
+def iter_token_dicts(json_file: TextIO, chunk_size: int = 65536
+                     ) -> Iterator[Dict[str, Any]]:
+    '''
+    :param json_file: A file like object that contains the output of
+                      `UCREL_Doc.to_json`, this includes the labelled output of
+                      `web_demo/usas_text_to_json.py`.
+    :param chunk_size: Number of characters to read from the file at a time.
+    :returns: Yields each token as a dictionary in the order they occur in the
+              document. Neither the document text nor the sentence indexes
+              are decoded.
+    :raises ValueError: If the file is not valid JSON or does not contain a
+                        `tokens` array.
+    '''
+    stream = _JSONStream(_read_chunks(json_file, chunk_size))
+    found_tokens = False
+    for key in stream.iter_object_keys():
+        if key != 'tokens':
+            stream.skip_value()
+            continue
+        found_tokens = True
+        for _ in stream.iter_array_items():
+            yield stream.decode_value()
+    if not found_tokens:
+        raise ValueError('The JSON does not contain a `tokens` array.')
+
+
+def iter_usas_tokens(_file_path: Path, chunk_size: int = 65536
+                     ) -> Iterator[TokenTuple]:
+    '''
+    Memory efficient alternative to `UCREL_Doc.from_json(_file.read())` when
+    only the token information is required, the memory used stays flat
+    regardless of the size of the document.
+
+    :param _file_path: File that contains the output of `UCREL_Doc.to_json`.
+    :param chunk_size: Number of characters to read from the file at a time.
+    :returns: Yields for each token a tuple of (text, lemma, pos_tag, usas_tag).
+    '''
+    with _file_path.open('r') as json_file:
+        for token in iter_token_dicts(json_file, chunk_size):
+            yield (token['text'], token.get('lemma'), token.get('pos_tag'),
+                   token.get('usas_tag'))
@@ -0,0 +1,92 @@
+import logging
+from pathlib import Path
+from typing import Dict, Optional, TYPE_CHECKING
+
+from paragraph_cache import ParagraphCache, tag_text_by_paragraph
+from usas_cache import USASCache
+
+if TYPE_CHECKING:
+    from ucrel_api.api import UCREL_API
+
+logger = logging.getLogger(__name__)
+
+
+def cached_usas_file(usas_cache: USASCache, text_file_path: Path,
+                     text: str) -> Optional[Path]:
+    '''
+    :param usas_cache: The USAS cache.
+    :param text_file_path: The file the text is from.
+    :param text: The text.
+    :returns: The cached USAS file of the text, None if the text has not been
+              tagged. A cached file from before the cache was keyed by content,
+              which is keyed by the text file name, is moved into the cache if
+              it is of the same text.
+    '''
+    usas_file_path = usas_cache.cache_path(text)
+    if not usas_file_path.exists():
+        legacy_usas_file_path = Path(usas_cache.cache_directory,
+                                     f'{text_file_path.stem}.json')
+        if usas_cache.adopt_legacy_file(legacy_usas_file_path, text):
+            logger.info(f'Moved the cached file {legacy_usas_file_path.name}'
+                        f' to {usas_file_path.name}')
+    if usas_file_path.exists():
+        return usas_file_path
+    return None
+
+
+def tag_and_cache_text(ucrel_api: 'UCREL_API', usas_cache: USASCache,
+                       text_name: str, text: str,
+                       journal_status: Dict[str, Dict[str, str]],
+                       paragraph_cache: Optional[ParagraphCache] = None,
+                       time_to_wait_between_usas_api_calls: float = 0
+                       ) -> Optional[Path]:
+    '''
+    Tags the text with the UCREL API and caches the result, recording the
+    attempt in the journal of the cache.
+
+    :param ucrel_api: The UCREL API to tag with.
+    :param usas_cache: The USAS cache.
+    :param text_name: Name of the text, e.g. the file name, used for logging.
+    :param text: The text to tag.
+    :param journal_status: The journal status of the cache from before this
+                           run, see `USASCache.journal_status`.
+    :param paragraph_cache: If given the text is tagged a paragraph at a
+                            time and only the paragraphs that are not in this
+                            cache are tagged with the UCREL API, see
+                            `paragraph_cache.tag_text_by_paragraph`. The
+                            USAS cache should then be keyed by
+                            `paragraph_cache.paragraph_tagger_version`.
+    :param time_to_wait_between_usas_api_calls: Seconds to wait between the
+                                                calls of the UCREL API for
+                                                the paragraphs of the text.
+    :returns: The cached USAS file of the text, or None if the tagging failed
+              in which case the error has been logged.
+    '''
+    cache_key = usas_cache.key(text)
+    last_status = journal_status.get(cache_key, {}).get('status')
+    if last_status == 'started':
+        logger.info(f'Resuming the interrupted tagging of: {text_name}')
+    elif last_status == 'failed':
+        logger.info(f'Retrying the failed tagging of: {text_name}')
+
+    logger.info(f'Tagging text for: {text_name}')
+    usas_cache.journal_started(cache_key, text_name)
+    try:
+        if paragraph_cache is None:
+            tagged_json = ucrel_api.usas(text).to_json()
+        else:
+            tagged_json = tag_text_by_paragraph(
+                text, paragraph_cache,
+                lambda paragraph: ucrel_api.usas(paragraph).to_json(),
+                time_to_wait_between_usas_api_calls)
+        usas_file_path = usas_cache.write(text, tagged_json)
+    except Exception as error:
+        usas_cache.journal_failed(cache_key, text_name, repr(error))
+        logger.error(f'Tagging failed for: {text_name}, it will not '
+                     f'be counted and will be re-tried on the next run. '
+                     f'Error: {repr(error)}')
+        return None
+    usas_cache.journal_done(cache_key, text_name)
+    logger.info('Tagging finished, the tagged data has been written '
+                f'and cached to {usas_file_path.name}')
+    return usas_file_path